@@ -0,0 +1,63 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Returned by TTLCache.get on a miss so that None can be cached as a value
+MISSING: Any = object()
+
+
+class TTLCache:
+    """Bounded LRU cache with per-entry expiry.
+
+    Meant to be used from the event loop only, so there is no locking.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Return the cached value, or ``default`` if it is missing or expired."""
+        entry = self._data.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value for ``ttl`` seconds (defaults to the cache TTL)."""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is None or ttl <= 0:
+            return
+        self._data[key] = (monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -1,22 +1,169 @@
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Dict, Optional
+from uuid import uuid4
+
+from sqlalchemy import event, exc
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 
 from app.core.config import settings
+from app.core.metrics import Histogram, registry
+from app.core.request_context import add_timing, timed
 
 
 class Base(DeclarativeBase):
     pass
 
 
-engine = create_async_engine(settings.database_url, echo=False, future=True)
+class PoolMetrics:
+    """Checkout wait times and timeouts for the application's connection pool."""
+
+    def __init__(self) -> None:
+        self.wait_seconds = Histogram(buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0))
+        self.timeouts = 0
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waits for a connection."""
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.wait_seconds.observe(perf_counter() - start)
+
+
+def _engine_options(database_url: str) -> Dict[str, Any]:
+    """Pool and driver options from settings (SQLite keeps SQLAlchemy defaults)."""
+    if database_url.startswith("sqlite"):
+        return {}
+
+    options: Dict[str, Any] = {"pool_pre_ping": settings.db_pool_pre_ping}
+    connect_args: Dict[str, Any] = {}
+
+    if settings.db_pgbouncer_mode:
+        # PgBouncer in transaction mode hands each transaction to any server connection,
+        # so named prepared statements cannot be reused; pooling is left to PgBouncer.
+        options["poolclass"] = NullPool
+        if "+asyncpg" in database_url:
+            connect_args = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            }
+    else:
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+        )
+        if "+asyncpg" in database_url:
+            connect_args = {"prepared_statement_cache_size": settings.db_statement_cache_size}
+
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+engine = create_async_engine(
+    settings.database_url, echo=False, future=True, **_engine_options(str(settings.database_url))
+)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
 
+# A session checks out its connection when its first statement begins a transaction;
+# the "session" phase runs from there to the pool's checkout event (pool wait, connect, pre-ping)
+_checkout_start: ContextVar[Optional[float]] = ContextVar("checkout_start", default=None)
+
+
+@event.listens_for(Session, "after_transaction_create")
+def _start_checkout_timer(session, transaction):
+    if transaction.parent is None:
+        _checkout_start.set(perf_counter())
+
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _stop_checkout_timer(dbapi_connection, connection_record, connection_proxy):
+    start = _checkout_start.get()
+    if start is not None:
+        _checkout_start.set(None)
+        add_timing("session", perf_counter() - start)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(perf_counter())
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    add_timing("db", perf_counter() - conn.info["query_start"].pop())
+
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def _drop_query_timer(context):
+    # A failed statement never reaches after_cursor_execute; its timer would be left on the stack
+    stack = context.connection.info.get("query_start") if context.connection is not None else None
+    if context.execution_context is not None and stack:
+        add_timing("db", perf_counter() - stack.pop())
+
+
 async def get_session() -> AsyncSession:
-    async with SessionLocal() as session:
+    session = SessionLocal()
+    try:
         yield session
+    finally:
+        with timed("session"):
+            await session.close()
+
 
+def pool_stats() -> Dict[str, Any]:
+    """Return connection pool occupancy and checkout wait metrics."""
+    pool = engine.pool
+    stats: Dict[str, Any] = {
+        "pool": type(pool).__name__,
+        "pgbouncer_mode": settings.db_pgbouncer_mode,
+        "timeouts": pool_metrics.timeouts,
+        "wait_seconds": pool_metrics.wait_seconds.snapshot(),
+    }
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(0, pool.overflow()),
+            max_overflow=settings.db_max_overflow,
+            timeout=settings.db_pool_timeout,
+        )
+    return stats
 
 
+def _pool_gauge(read) -> Any:
+    pool = engine.pool
+    return read(pool) if isinstance(pool, QueuePool) else {}
 
 
+registry.gauge_callback("db_pool_size", "Connections kept open by the pool", lambda: _pool_gauge(QueuePool.size))
+registry.gauge_callback(
+    "db_pool_checked_out", "Connections currently in use", lambda: _pool_gauge(QueuePool.checkedout)
+)
+registry.gauge_callback(
+    "db_pool_overflow", "Connections open beyond pool_size", lambda: _pool_gauge(lambda pool: max(0, pool.overflow()))
+)
+registry.register_histogram(
+    "db_pool_wait_seconds", "Time spent waiting to check out a connection", pool_metrics.wait_seconds
+)
+registry.counter_callback(
+    "db_pool_timeouts_total", "Checkouts that gave up after pool_timeout", lambda: pool_metrics.timeouts
+)
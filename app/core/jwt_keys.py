@@ -0,0 +1,299 @@
+"""JWT signing keys: HS256, ES256 and EdDSA (Ed25519) compact JWS with key rotation.
+
+Generate a signing key (PEM on stdout, its kid on stderr):
+
+    python -m app.core.jwt_keys EdDSA > jwt-key.pem
+    python -m app.core.jwt_keys ES256 > jwt-key.pem
+"""
+import argparse
+import base64
+import binascii
+import calendar
+import hashlib
+import hmac
+import json
+import re
+import sys
+from datetime import datetime
+from time import time
+from typing import Any, Dict, Iterable, Optional
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature, encode_dss_signature
+
+from app.core.config import settings
+
+# Unpadded base64url only: b64decode with altchars would also take "+" and "/"
+_B64URL_SEGMENT = re.compile(r"[A-Za-z0-9_-]*")
+
+
+class TokenError(Exception):
+    """A token that is malformed, signed by an unknown key, badly signed or expired."""
+
+
+def b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def b64decode(segment: str) -> bytes:
+    if not _B64URL_SEGMENT.fullmatch(segment):
+        raise TokenError("Invalid base64url segment")
+    try:
+        return base64.b64decode(segment + "=" * (-len(segment) % 4), altchars=b"-_", validate=True)
+    except (binascii.Error, ValueError):
+        raise TokenError("Invalid base64url segment")
+
+
+def _thumbprint(members: Dict[str, str]) -> str:
+    """RFC 7638 JWK thumbprint: a kid that every party derives the same way from the public key."""
+    canonical = json.dumps(members, sort_keys=True, separators=(",", ":")).encode()
+    return b64encode(hashlib.sha256(canonical).digest())
+
+
+class JWSKey:
+    """One key of the keyring; ``kid`` is None only for the shared HS256 secret."""
+
+    alg: str
+    kid: Optional[str] = None
+    can_sign: bool = True
+
+    def sign(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def verify(self, data: bytes, signature: bytes) -> bool:
+        raise NotImplementedError
+
+    def jwk(self) -> Optional[Dict[str, str]]:
+        """Public JWK for /.well-known/jwks.json; None for secrets, which are never published."""
+        return None
+
+
+class HmacKey(JWSKey):
+    alg = "HS256"
+
+    def __init__(self, secret: str):
+        self._secret = secret.encode()
+
+    def sign(self, data: bytes) -> bytes:
+        return hmac.new(self._secret, data, hashlib.sha256).digest()
+
+    def verify(self, data: bytes, signature: bytes) -> bool:
+        return hmac.compare_digest(self.sign(data), signature)
+
+
+class AsymmetricKey(JWSKey):
+    """A private key signs and verifies; a public key (e.g. the previous one) only verifies."""
+
+    def __init__(self, private: Any, public: Any, members: Dict[str, str]):
+        self._private = private
+        self._public = public
+        self._members = members
+        self.can_sign = private is not None
+        self.kid = _thumbprint(members)
+
+    def jwk(self) -> Optional[Dict[str, str]]:
+        return {**self._members, "kid": self.kid, "alg": self.alg, "use": "sig"}
+
+    def private_pem(self) -> bytes:
+        return self._private.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+
+
+class EcKey(AsymmetricKey):
+    """ES256: ECDSA on P-256; signatures are raw r || s as JWS requires, not DER."""
+
+    alg = "ES256"
+
+    def __init__(self, key: Any):
+        private = key if isinstance(key, ec.EllipticCurvePrivateKey) else None
+        public = private.public_key() if private else key
+        if not isinstance(public.curve, ec.SECP256R1):
+            raise ValueError(f"ES256 needs a P-256 key, not {public.curve.name}")
+        numbers = public.public_numbers()
+        super().__init__(
+            private,
+            public,
+            {
+                "crv": "P-256",
+                "kty": "EC",
+                "x": b64encode(numbers.x.to_bytes(32, "big")),
+                "y": b64encode(numbers.y.to_bytes(32, "big")),
+            },
+        )
+
+    def sign(self, data: bytes) -> bytes:
+        r, s = decode_dss_signature(self._private.sign(data, ec.ECDSA(hashes.SHA256())))
+        return r.to_bytes(32, "big") + s.to_bytes(32, "big")
+
+    def verify(self, data: bytes, signature: bytes) -> bool:
+        if len(signature) != 64:
+            return False
+        der = encode_dss_signature(int.from_bytes(signature[:32], "big"), int.from_bytes(signature[32:], "big"))
+        try:
+            self._public.verify(der, data, ec.ECDSA(hashes.SHA256()))
+        except InvalidSignature:
+            return False
+        return True
+
+
+class Ed25519Key(AsymmetricKey):
+    """EdDSA with Ed25519 (RFC 8037)."""
+
+    alg = "EdDSA"
+
+    def __init__(self, key: Any):
+        private = key if isinstance(key, ed25519.Ed25519PrivateKey) else None
+        public = private.public_key() if private else key
+        raw = public.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+        super().__init__(private, public, {"crv": "Ed25519", "kty": "OKP", "x": b64encode(raw)})
+
+    def sign(self, data: bytes) -> bytes:
+        return self._private.sign(data)
+
+    def verify(self, data: bytes, signature: bytes) -> bool:
+        try:
+            self._public.verify(signature, data)
+        except InvalidSignature:
+            return False
+        return True
+
+
+def load_pem_key(data: bytes) -> AsymmetricKey:
+    """An EC P-256 or Ed25519 key from PEM; a public key can only verify."""
+    try:
+        key: Any = serialization.load_pem_private_key(data, password=None)
+    except ValueError:
+        key = serialization.load_pem_public_key(data)
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)):
+        return EcKey(key)
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return Ed25519Key(key)
+    raise ValueError(f"Unsupported JWT key type {type(key).__name__}; use EC P-256 (ES256) or Ed25519 (EdDSA)")
+
+
+def generate_key(alg: str) -> AsymmetricKey:
+    if alg == "ES256":
+        return EcKey(ec.generate_private_key(ec.SECP256R1()))
+    if alg == "EdDSA":
+        return Ed25519Key(ed25519.Ed25519PrivateKey.generate())
+    raise ValueError(f"Unknown JWT algorithm: {alg}")
+
+
+def _numeric_date(value: Any) -> Any:
+    # As python-jose encoded them: datetimes (naive ones are UTC) become seconds since the epoch
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    return value
+
+
+class Keyring:
+    """Signs tokens with one key and verifies them with any key it holds.
+
+    Tokens name their key in the ``kid`` header, so several verification keys
+    can be live at once: publish the next key before signing with it, and keep
+    the previous one until the tokens it signed have expired. The header
+    segment of each key is computed once; decoding a token with a known header
+    skips parsing it. The JWKS document is serialized once as well.
+    """
+
+    def __init__(self, signing_key: JWSKey, verification_keys: Iterable[JWSKey] = ()):
+        if not signing_key.can_sign:
+            raise ValueError("The JWT signing key must be a private key")
+        self.signing_key = signing_key
+        self.algorithm = signing_key.alg
+        self._keys: Dict[Optional[str], JWSKey] = {}
+        self._headers: Dict[str, JWSKey] = {}
+        for key in (signing_key, *verification_keys):
+            self._keys[key.kid] = key
+            self._headers[self._header(key)] = key
+        self.signing_header = self._header(signing_key)
+        self.jwks = json.dumps(
+            {"keys": [jwk for jwk in (key.jwk() for key in self._keys.values()) if jwk]}, separators=(",", ":")
+        ).encode()
+        self.jwks_etag = hashlib.sha256(self.jwks).hexdigest()[:32]
+
+    @staticmethod
+    def _header(key: JWSKey) -> str:
+        header = {"alg": key.alg, "typ": "JWT"}
+        if key.kid is not None:
+            header["kid"] = key.kid
+        return b64encode(json.dumps(header, separators=(",", ":")).encode())
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        payload = {name: _numeric_date(value) for name, value in claims.items()}
+        signing_input = f"{self.signing_header}.{b64encode(json.dumps(payload, separators=(',', ':')).encode())}"
+        return f"{signing_input}.{b64encode(self.signing_key.sign(signing_input.encode()))}"
+
+    def _key_for(self, header_segment: str) -> JWSKey:
+        key = self._headers.get(header_segment)
+        if key is not None:
+            return key
+        try:
+            header = json.loads(b64decode(header_segment))
+        except ValueError:
+            raise TokenError("Invalid token header")
+        if not isinstance(header, dict):
+            raise TokenError("Invalid token header")
+        key = self._keys.get(header.get("kid"))
+        # The algorithm comes from our key, never from the token
+        if key is None or header.get("alg") != key.alg:
+            raise TokenError("Unknown signing key")
+        return key
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """Verify the signature and expiry and return the claims."""
+        try:
+            header_segment, payload_segment, signature_segment = token.split(".")
+        except ValueError:
+            raise TokenError("Not a compact JWS")
+        key = self._key_for(header_segment)
+        signing_input = f"{header_segment}.{payload_segment}".encode()
+        if not key.verify(signing_input, b64decode(signature_segment)):
+            raise TokenError("Signature verification failed")
+        try:
+            claims = json.loads(b64decode(payload_segment))
+        except ValueError:
+            raise TokenError("Invalid token payload")
+        if not isinstance(claims, dict):
+            raise TokenError("Invalid token payload")
+        if "exp" in claims:
+            exp = claims["exp"]
+            if not isinstance(exp, (int, float)):
+                raise TokenError("Invalid exp claim")
+            if exp < time():
+                raise TokenError("Token has expired")
+        return claims
+
+
+def create_keyring() -> Keyring:
+    """Keyring from settings: HS256 with SECRET_KEY unless JWT_PRIVATE_KEY_FILE is set."""
+    verification_keys = []
+    for path in settings.jwt_public_key_files:
+        with open(path, "rb") as file:
+            verification_keys.append(load_pem_key(file.read()))
+    if not settings.jwt_private_key_file:
+        return Keyring(HmacKey(settings.secret_key), verification_keys)
+    with open(settings.jwt_private_key_file, "rb") as file:
+        signing_key = load_pem_key(file.read())
+    if settings.jwt_accept_hs256:
+        verification_keys.append(HmacKey(settings.secret_key))
+    return Keyring(signing_key, verification_keys)
+
+
+keyring = create_keyring()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("alg", choices=["EdDSA", "ES256"])
+    args = parser.parse_args()
+    key = generate_key(args.alg)
+    sys.stdout.write(key.private_pem().decode())
+    print(f"kid: {key.kid}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
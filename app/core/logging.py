@@ -1,14 +1,49 @@
+import atexit
+import copy
 import json
 import logging
+import queue
 import sys
-from datetime import datetime
-from typing import Any, Dict
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, TextIO
 
 import sentry_sdk
 from sentry_sdk.integrations.fastapi import FastApiIntegration
 from sentry_sdk.integrations.logging import LoggingIntegration
 
 from app.core.config import settings
+from app.core.request_context import RequestContextFilter
+
+try:  # optional fast JSON serializer
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+
+def _dumps_stdlib(data: Dict[str, Any]) -> str:
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _dumps_orjson(data: Dict[str, Any]) -> str:
+    return orjson.dumps(data, default=str).decode()
+
+
+dumps: Callable[[Dict[str, Any]], str] = _dumps_orjson if orjson is not None else _dumps_stdlib
+
+# (second, "YYYY-MM-DDTHH:MM:SS") of the last formatted timestamp
+_timestamp_cache = (-1, "")
+
+
+def format_timestamp(created: float) -> str:
+    """Format a record time as ISO 8601 UTC, reusing the date part within the same second."""
+    global _timestamp_cache
+    second = int(created)
+    cached_second, prefix = _timestamp_cache
+    if second != cached_second:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+        _timestamp_cache = (second, prefix)
+    return f"{prefix}.{int((created - second) * 1_000_000):06d}Z"
 
 
 class JSONFormatter(logging.Formatter):
@@ -16,7 +51,7 @@ class JSONFormatter(logging.Formatter):
 
     def format(self, record: logging.LogRecord) -> str:
         log_data: Dict[str, Any] = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": format_timestamp(record.created),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -27,6 +62,8 @@ class JSONFormatter(logging.Formatter):
 
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_data["exception"] = record.exc_text
 
         if hasattr(record, "request_id"):
             log_data["request_id"] = record.request_id
@@ -34,14 +71,188 @@ class JSONFormatter(logging.Formatter):
         if hasattr(record, "user_id"):
             log_data["user_id"] = record.user_id
 
-        return json.dumps(log_data, ensure_ascii=False)
+        if hasattr(record, "http"):
+            log_data["http"] = record.http
+
+        if hasattr(record, "audit"):
+            log_data["audit"] = record.audit
+
+        return dumps(log_data)
+
+
+class BoundedQueueHandler(logging.Handler):
+    """Hands records to a bounded queue so logging never waits on the output stream.
+
+    With the "drop" policy a full queue discards its oldest record to make
+    room, like a ring buffer, and counts it: when the output falls behind,
+    the latest records are the ones that explain what is happening. With
+    "block" the caller waits for room.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[Optional[logging.LogRecord]]", policy: str = "drop"):
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Unknown log queue policy: {policy}")
+        super().__init__()
+        self.queue = log_queue
+        self.block = policy == "block"
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Freeze message args and traceback so the record can be formatted later on another thread."""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            prepared = self.prepare(record)
+            if self.block:
+                self.queue.put(prepared)
+            else:
+                self._put_dropping_oldest(prepared)
+        except Exception:
+            self.handleError(record)
+
+    def _put_dropping_oldest(self, record: logging.LogRecord) -> None:
+        # emit() runs under the handler lock, so the writer is the only other party and it only makes room
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                pass
+            try:
+                oldest = self.queue.get_nowait()
+            except queue.Empty:
+                continue
+            self.dropped += 1
+            if oldest is None:
+                # The writer's stop marker must stay last; this record is the one dropped
+                self.queue.put_nowait(None)
+                return
+
+
+class BatchingLogWriter:
+    """Listener thread that formats queued records and writes them in batches."""
+
+    def __init__(
+        self,
+        log_queue: "queue.Queue[Optional[logging.LogRecord]]",
+        handler: BoundedQueueHandler,
+        stream: TextIO,
+        formatter: logging.Formatter,
+        batch_size: int = 256,
+    ):
+        self.queue = log_queue
+        self.handler = handler
+        self.stream = stream
+        self.formatter = formatter
+        self.batch_size = batch_size
+        self.written = 0
+        self.failed = 0  # records lost because the stream raised
+        self._reported_dropped = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Flush everything queued so far and stop the thread."""
+        if self._thread is not None:
+            self.queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            record = self.queue.get()
+            batch: List[logging.LogRecord] = []
+            stopping = record is None
+            if not stopping:
+                batch.append(record)
+            while not stopping and len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    stopping = True
+                else:
+                    batch.append(record)
+
+            self._write(batch)
+            if stopping:
+                return
+
+    def _write(self, batch: List[logging.LogRecord]) -> None:
+        lines = []
+        for record in batch:
+            try:
+                lines.append(self.formatter.format(record))
+            except Exception:
+                lines.append(dumps({"level": "ERROR", "message": "Failed to format log record"}))
+
+        dropped = self.handler.dropped
+        if dropped > self._reported_dropped:
+            lines.append(
+                dumps(
+                    {
+                        "timestamp": format_timestamp(time.time()),
+                        "level": "WARNING",
+                        "logger": __name__,
+                        "message": f"Log queue full, dropped {dropped - self._reported_dropped} records",
+                    }
+                )
+            )
+            self._reported_dropped = dropped
+
+        if not lines:
+            return
+        try:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+        except Exception:
+            # Nowhere left to report it; counted like queue drops, see stats()
+            self.failed += len(batch)
+            return
+        self.written += len(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "dropped": self.handler.dropped,
+            "failed": self.failed,
+        }
+
+
+log_writer: Optional[BatchingLogWriter] = None
 
 
 def setup_logging() -> None:
     """Configure JSON logging and Sentry."""
+    global log_writer
+
     # JSON logging
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(JSONFormatter())
+    if settings.log_async:
+        # Records go through a bounded queue to a writer thread, off the request path
+        log_queue: "queue.Queue[Optional[logging.LogRecord]]" = queue.Queue(maxsize=settings.log_queue_size)
+        handler: logging.Handler = BoundedQueueHandler(log_queue, policy=settings.log_queue_policy)
+        log_writer = BatchingLogWriter(
+            log_queue, handler, sys.stdout, JSONFormatter(), batch_size=settings.log_batch_size
+        )
+        log_writer.start()
+        atexit.register(log_writer.stop)
+    else:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JSONFormatter())
+
+    handler.addFilter(RequestContextFilter())
 
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.INFO)
@@ -58,8 +269,3 @@ def setup_logging() -> None:
             traces_sample_rate=0.1,
             environment="production",
         )
-
-
-
-
-
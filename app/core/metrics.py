@@ -0,0 +1,305 @@
+import json
+import logging
+import os
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, tuned for request/IO latencies
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (thread-safe)."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return count, sum and cumulative bucket counts keyed by upper bound."""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+
+        cumulative: Dict[str, int] = {}
+        running = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            running += bucket_count
+            cumulative[str(bound)] = running
+        cumulative["+Inf"] = count
+        return {"count": count, "sum": round(total, 6), "buckets": cumulative}
+
+
+class Counter:
+    """Monotonic counter. Increments come from the event loop thread, so no lock."""
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class MetricFamily:
+    """A named metric with a child per combination of label values."""
+
+    def __init__(self, name: str, help: str, kind: str, labelnames: Sequence[str], factory: Callable[[], Any]):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children: Dict[LabelValues, Any] = {}
+
+    def labels(self, *values: str) -> Any:
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children.setdefault(values, self._factory())
+        return child
+
+    def samples(self) -> Dict[LabelValues, Any]:
+        """Return {label values: counter value or histogram snapshot}."""
+        if self.kind == "histogram":
+            return {values: child.snapshot() for values, child in list(self._children.items())}
+        return {values: child.value for values, child in list(self._children.items())}
+
+
+class CallbackFamily:
+    """Gauge or counter whose value is read from the application when scraped."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        kind: str,
+        labelnames: Sequence[str],
+        func: Callable[[], Union[float, Dict[LabelValues, float]]],
+    ):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.func = func
+
+    def samples(self) -> Dict[LabelValues, float]:
+        value = self.func()
+        return value if isinstance(value, dict) else {(): float(value)}
+
+
+class MetricsRegistry:
+    """In-process metrics registry rendered in the Prometheus text format.
+
+    Each process records into its own memory, so recording never contends
+    across gunicorn workers. With ``multiproc_dir`` set, every process also
+    writes a snapshot file there periodically and a scrape of any worker
+    merges all of them: counters and histograms are summed (including
+    workers that have exited), gauges get a ``pid`` label and are only kept
+    for live processes.
+    """
+
+    def __init__(self) -> None:
+        self._families: Dict[str, Union[MetricFamily, CallbackFamily]] = {}
+        self.multiproc_dir: Optional[str] = None
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _register(self, family):
+        if family.name in self._families:
+            raise ValueError(f"Metric {family.name} is already registered")
+        self._families[family.name] = family
+        return family
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._register(MetricFamily(name, help, "counter", labelnames, Counter))
+
+    def histogram(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> MetricFamily:
+        return self._register(MetricFamily(name, help, "histogram", labelnames, lambda: Histogram(buckets)))
+
+    def register_histogram(self, name: str, help: str, histogram: Histogram) -> MetricFamily:
+        """Expose an existing unlabelled Histogram."""
+        family = MetricFamily(name, help, "histogram", (), lambda: histogram)
+        family.labels()
+        return self._register(family)
+
+    def gauge_callback(
+        self, name: str, help: str, func: Callable[[], Any], labelnames: Sequence[str] = ()
+    ) -> CallbackFamily:
+        return self._register(CallbackFamily(name, help, "gauge", labelnames, func))
+
+    def counter_callback(
+        self, name: str, help: str, func: Callable[[], Any], labelnames: Sequence[str] = ()
+    ) -> CallbackFamily:
+        return self._register(CallbackFamily(name, help, "counter", labelnames, func))
+
+    def collect(self) -> Dict[str, Dict[str, Any]]:
+        """Return this process's values as {name: {kind, help, labelnames, samples}}."""
+        collected = {}
+        for name, family in list(self._families.items()):
+            try:
+                samples = family.samples()
+            except Exception:
+                logger.exception("Failed to collect metric %s", name)
+                continue
+            collected[name] = {
+                "kind": family.kind,
+                "help": family.help,
+                "labelnames": list(family.labelnames),
+                "samples": [[list(values), value] for values, value in samples.items()],
+            }
+        return collected
+
+    # Multiprocess support
+
+    def start_multiprocess(self, directory: str, interval: float) -> None:
+        """Write this process's snapshot to ``directory`` every ``interval`` seconds."""
+        os.makedirs(directory, exist_ok=True)
+        self.multiproc_dir = directory
+        self._stop.clear()
+        self._flusher = threading.Thread(
+            target=self._flush_loop, args=(interval,), name="metrics-flush", daemon=True
+        )
+        self._flusher.start()
+
+    def stop_multiprocess(self) -> None:
+        if self._flusher is not None:
+            self._stop.set()
+            self._flusher.join()
+            self._flusher = None
+            self._flush()
+
+    def _flush_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self._flush()
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.multiproc_dir, f"metrics-{pid}.json")
+
+    def _flush(self) -> None:
+        path = self._snapshot_path(os.getpid())
+        try:
+            with open(path + ".tmp", "w") as fh:
+                json.dump(self.collect(), fh)
+            os.replace(path + ".tmp", path)
+        except Exception:
+            logger.exception("Failed to write metrics snapshot")
+
+    def _other_processes(self) -> List[Tuple[int, Dict[str, Any]]]:
+        snapshots = []
+        own_pid = os.getpid()
+        for filename in os.listdir(self.multiproc_dir):
+            if not (filename.startswith("metrics-") and filename.endswith(".json")):
+                continue
+            pid = int(filename[len("metrics-") : -len(".json")])
+            if pid == own_pid:
+                continue
+            try:
+                with open(os.path.join(self.multiproc_dir, filename)) as fh:
+                    snapshots.append((pid, json.load(fh)))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    # Exposition
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format (0.0.4)."""
+        processes = [(os.getpid(), self.collect())]
+        if self.multiproc_dir:
+            processes.extend(self._other_processes())
+
+        merged: Dict[str, Dict[str, Any]] = {}
+        for pid, collected in processes:
+            alive = pid == os.getpid() or _pid_alive(pid)
+            for name, metric in collected.items():
+                target = merged.setdefault(
+                    name,
+                    {"kind": metric["kind"], "help": metric["help"], "labelnames": metric["labelnames"], "samples": {}},
+                )
+                for values, value in metric["samples"]:
+                    if metric["kind"] == "gauge":
+                        if not alive:
+                            continue
+                        if self.multiproc_dir:
+                            values = values + [str(pid)]
+                    _merge_sample(target["samples"], tuple(values), value)
+
+        lines: List[str] = []
+        for name, metric in sorted(merged.items()):
+            labelnames = list(metric["labelnames"])
+            if metric["kind"] == "gauge" and self.multiproc_dir:
+                labelnames.append("pid")
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['kind']}")
+            for values, value in sorted(metric["samples"].items()):
+                labels = list(zip(labelnames, values))
+                if metric["kind"] == "histogram":
+                    for bound, count in value["buckets"].items():
+                        lines.append(f"{name}_bucket{_labels(labels + [('le', bound)])} {count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {value['sum']}")
+                    lines.append(f"{name}_count{_labels(labels)} {value['count']}")
+                else:
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _merge_sample(samples: Dict[LabelValues, Any], values: LabelValues, value: Any) -> None:
+    current = samples.get(values)
+    if current is None:
+        samples[values] = value
+    elif isinstance(value, dict):
+        buckets = dict(current["buckets"])
+        for bound, count in value["buckets"].items():
+            buckets[bound] = buckets.get(bound, 0) + count
+        samples[values] = {
+            "count": current["count"] + value["count"],
+            "sum": current["sum"] + value["sum"],
+            "buckets": buckets,
+        }
+    else:
+        samples[values] = current + value
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs: List[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+registry = MetricsRegistry()
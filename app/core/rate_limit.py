@@ -1,54 +1,250 @@
-from collections import defaultdict
-from time import time
-from typing import Dict, Tuple
+import abc
+import asyncio
+import math
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from time import monotonic, time
+from typing import Any, Dict, Optional, Tuple
 
-from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-# In-memory rate limiter (for dev/test)
-# For production, use Redis: https://redis.io/docs/manual/patterns/rate-limiting/
-_rate_limit_store: Dict[str, Tuple[float, int]] = defaultdict(lambda: (0.0, 0))
+from app.core.config import settings
+from app.core.metrics import registry
 
+# All backends implement GCRA (generic cell rate algorithm): a sliding window that
+# stores a single "theoretical arrival time" (TAT) per key instead of a counter.
+# A key may take `limit` requests at once and then one every `window / limit` seconds.
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Rate limiting middleware for critical endpoints."""
 
-    def __init__(self, app, rate_limit_config: Dict[str, Tuple[int, int]] = None):
-        super().__init__(app)
-        # rate_limit_config: {path: (max_requests, window_seconds)}
-        self.rate_limit_config = rate_limit_config or {
-            "/auth/login": (5, 60),  # 5 requests per 60 seconds
-            "/auth/refresh": (10, 60),  # 10 requests per 60 seconds
-            "/auth/reset-password": (3, 300),  # 3 requests per 5 minutes
-        }
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    retry_after: float = 0.0
+
+
+def _gcra(tat: Optional[float], now: float, limit: int, window: float) -> Tuple[bool, float]:
+    """Return (allowed, new TAT or seconds to wait) for one request."""
+    interval = window / limit
+    new_tat = max(tat or now, now) + interval
+    allow_at = new_tat - window
+    if allow_at > now:
+        return False, allow_at - now
+    return True, new_tat
+
+
+class RateLimitBackend(abc.ABC):
+    """Rate limit state shared by RateLimitMiddleware."""
+
+    @abc.abstractmethod
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        """Record a request for key and return whether it is allowed."""
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Per-process GCRA limiter with bounded memory (dev/test or single worker).
+
+    Keys are kept in least-recently-used order and dropped once their TAT has
+    passed (they would be allowed anyway) or when ``max_keys`` is exceeded.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._store: "OrderedDict[str, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        now = monotonic()
+        self._evict(now)
+        allowed, value = _gcra(self._store.get(key), now, limit, window)
+        if not allowed:
+            return RateLimitResult(False, value)
+        self._store[key] = value
+        self._store.move_to_end(key)
+        return RateLimitResult(True)
+
+    def _evict(self, now: float) -> None:
+        store = self._store
+        # Amortized TTL eviction: only look at the least recently used entries
+        for _ in range(2):
+            if not store:
+                return
+            oldest_key = next(iter(store))
+            if store[oldest_key] > now:
+                break
+            del store[oldest_key]
+        while len(store) >= self.max_keys:
+            store.popitem(last=False)
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    """GCRA limiter in a SQLite file, consistent across all workers on one host.
+
+    Each request is a single atomic UPSERT; SQLite calls run on a dedicated
+    thread so file locking never blocks the event loop.
+    """
 
-    async def dispatch(self, request: Request, call_next):
-        client_ip = request.client.host if request.client else "unknown"
-        path = request.url.path
+    _UPSERT = (
+        "INSERT INTO rate_limits (key, tat) VALUES (:key, :now + :interval) "
+        "ON CONFLICT (key) DO UPDATE SET tat = max(tat, :now) + :interval "
+        "WHERE max(tat, :now) + :interval - :window <= :now "
+        "RETURNING tat"
+    )
+    _PURGE_EVERY = 1000
 
-        # Check rate limit for configured paths
-        if path in self.rate_limit_config:
-            max_requests, window_seconds = self.rate_limit_config[path]
-            key = f"{client_ip}:{path}"
-            now = time()
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rate-limit-sqlite")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._hits = 0
 
-            last_reset, count = _rate_limit_store[key]
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limits_tat ON rate_limits (tat)")
+            self._conn = conn
+        return self._conn
 
-            # Reset window if expired
-            if now - last_reset > window_seconds:
-                _rate_limit_store[key] = (now, 1)
-            else:
-                if count >= max_requests:
-                    raise HTTPException(
-                        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                        detail=f"Rate limit exceeded: {max_requests} requests per {window_seconds} seconds",
-                    )
-                _rate_limit_store[key] = (last_reset, count + 1)
+    def _hit_sync(self, key: str, limit: int, window: float) -> RateLimitResult:
+        conn = self._connect()
+        now = time()
+        params = {"key": key, "now": now, "interval": window / limit, "window": window}
+        if conn.execute(self._UPSERT, params).fetchone() is not None:
+            self._hits += 1
+            if self._hits % self._PURGE_EVERY == 0:
+                conn.execute("DELETE FROM rate_limits WHERE tat < ?", (now,))
+            return RateLimitResult(True)
 
-        response = await call_next(request)
-        return response
+        row = conn.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+        _, retry_after = _gcra(row[0] if row else None, now, limit, window)
+        return RateLimitResult(False, retry_after)
 
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._hit_sync, key, limit, window)
 
+    async def close(self) -> None:
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            await asyncio.get_running_loop().run_in_executor(self._executor, conn.close)
+        self._executor.shutdown(wait=False)
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """GCRA limiter in Redis, shared by every worker and host.
+
+    The whole read-modify-write runs as one Lua script, so it is atomic and a
+    single round-trip. Uses the Redis server clock to avoid skew between hosts.
+    Requires the optional ``redis`` package.
+    """
+
+    _SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local interval = window / limit
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - window
+if allow_at > now then
+    return {0, tostring(allow_at - now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, '0'}
+"""
+
+    def __init__(self, url: str = "", client: Any = None, prefix: str = "ratelimit:"):
+        if client is None:
+            try:
+                from redis.asyncio import Redis
+            except ImportError as exc:
+                raise RuntimeError("rate_limit_backend=redis requires the 'redis' package") from exc
+            client = Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(self._SCRIPT)
+
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        allowed, retry_after = await self._script(keys=[self.prefix + key], args=[limit, window])
+        if int(allowed):
+            return RateLimitResult(True)
+        return RateLimitResult(False, float(retry_after))
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_rate_limit_backend() -> RateLimitBackend:
+    """Build the backend selected by settings.rate_limit_backend."""
+    backend = settings.rate_limit_backend
+    if backend == "memory":
+        return InMemoryRateLimitBackend(max_keys=settings.rate_limit_max_keys)
+    if backend == "sqlite":
+        return SQLiteRateLimitBackend(settings.rate_limit_sqlite_path)
+    if backend == "redis":
+        return RedisRateLimitBackend(settings.rate_limit_redis_url)
+    raise ValueError(f"Unknown rate limit backend: {backend}")
+
+
+rate_limit_rejections = registry.counter(
+    "rate_limit_rejections_total", "Requests rejected with 429 by the rate limiter", ("path",)
+)
+
+
+class RateLimitMiddleware:
+    """Rate limiting middleware for critical endpoints (pure ASGI).
+
+    Requests to paths without a limit are passed straight through without
+    building a Request object.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        rate_limit_config: Dict[str, Tuple[int, int]] = None,
+        backend: Optional[RateLimitBackend] = None,
+    ):
+        self.app = app
+        # rate_limit_config: {path: (max_requests, window_seconds)}
+        self.rate_limit_config = rate_limit_config or {
+            "/auth/login": (5, 60),  # 5 requests per 60 seconds
+            "/auth/refresh": (10, 60),  # 10 requests per 60 seconds
+            "/auth/reset-password": (3, 300),  # 3 requests per 5 minutes
+            "/delivery/quotes": (30, 60),  # each miss is a call to the delivery service
+        }
+        self.backend = backend or InMemoryRateLimitBackend()
 
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.rate_limit_config:
+            await self.app(scope, receive, send)
+            return
 
+        path = scope["path"]
+        max_requests, window_seconds = self.rate_limit_config[path]
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        result = await self.backend.hit(f"{client_ip}:{path}", max_requests, window_seconds)
+        if not result.allowed:
+            rate_limit_rejections.labels(path).inc()
+            response = JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"detail": f"Rate limit exceeded: {max_requests} requests per {window_seconds} seconds"},
+                headers={"Retry-After": str(max(1, math.ceil(result.retry_after)))},
+            )
+            await response(scope, receive, send)
+            return
 
+        await self.app(scope, receive, send)
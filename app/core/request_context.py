@@ -0,0 +1,168 @@
+import logging
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Callable, Dict, Iterator, Optional
+from uuid import uuid4
+
+from fastapi.routing import APIRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+access_logger = logging.getLogger("app.access")
+
+_REQUEST_ID_HEADER = b"x-request-id"
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+
+
+@dataclass
+class RequestContext:
+    """Per-request state shared by middleware, dependencies and logging."""
+
+    request_id: str
+    user_id: Optional[int] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def add_timing(self, phase: str, seconds: float) -> None:
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+
+_request_context: ContextVar[Optional[RequestContext]] = ContextVar("request_context", default=None)
+
+
+def current_request() -> Optional[RequestContext]:
+    """Return the context of the request being handled, if any."""
+    return _request_context.get()
+
+
+def add_timing(phase: str, seconds: float) -> None:
+    """Add time spent in a phase to the current request (no-op outside requests)."""
+    context = _request_context.get()
+    if context is not None:
+        context.add_timing(phase, seconds)
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(phase, perf_counter() - start)
+
+
+class RequestContextFilter(logging.Filter):
+    """Adds request_id and user_id of the current request to every log record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _request_context.get()
+        if context is not None:
+            if not hasattr(record, "request_id"):
+                record.request_id = context.request_id
+            if context.user_id is not None and not hasattr(record, "user_id"):
+                record.user_id = context.user_id
+        return True
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that records the time spent in dependency resolution and the endpoint."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            start = perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                add_timing("route", perf_counter() - start)
+
+        return timed_handler
+
+
+def _server_timing(timings: Dict[str, float], total: float) -> bytes:
+    """Build a Server-Timing header; "handler" is route time not spent resolving auth or the session."""
+    phases = dict(timings)
+    route = phases.pop("route", 0.0)
+    phases["handler"] = max(0.0, route - phases.get("auth", 0.0) - phases.get("session", 0.0))
+    phases["middleware"] = max(0.0, total - route)
+    parts = [f"total;dur={total * 1000:.2f}"]
+    parts.extend(f"{name};dur={seconds * 1000:.2f}" for name, seconds in phases.items())
+    return ", ".join(parts).encode("latin-1")
+
+
+class RequestContextMiddleware:
+    """Assigns or propagates X-Request-ID, times the request and writes the access log (pure ASGI).
+
+    Should be the outermost middleware so that its "total" covers the whole stack.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == _REQUEST_ID_HEADER:
+                candidate = value.decode("latin-1")
+                if _VALID_REQUEST_ID.fullmatch(candidate):
+                    request_id = candidate
+                break
+        context = RequestContext(request_id=request_id or uuid4().hex)
+        token = _request_context.set(context)
+        start = perf_counter()
+        status_code = 500
+
+        async def send_with_context(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", ()))
+                headers.append((_REQUEST_ID_HEADER, context.request_id.encode("latin-1")))
+                if settings.server_timing_enabled:
+                    headers.append((b"server-timing", _server_timing(context.timings, perf_counter() - start)))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_context)
+        finally:
+            duration = perf_counter() - start
+            # Label by route template, not the raw path, to keep cardinality bounded
+            route = scope.get("route")
+            http_request_duration.labels(
+                scope["method"], route.path if route is not None else "unmatched", str(status_code)
+            ).observe(duration)
+            if settings.access_log_enabled:
+                access_logger.info(
+                    "%s %s %d %.2fms",
+                    scope["method"],
+                    scope["path"],
+                    status_code,
+                    duration * 1000,
+                    extra={
+                        "http": {
+                            "method": scope["method"],
+                            "path": scope["path"],
+                            "status": status_code,
+                            "duration_ms": round(duration * 1000, 3),
+                            "timings_ms": {name: round(seconds * 1000, 3) for name, seconds in context.timings.items()},
+                            "client": scope["client"][0] if scope.get("client") else None,
+                        }
+                    },
+                )
+            _request_context.reset(token)
@@ -1,25 +1,36 @@
+import asyncio
+import hashlib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from time import perf_counter, time
+from typing import Any, Callable, Dict, Optional, Tuple
+from uuid import uuid4
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import MISSING, TTLCache
 from app.core.config import settings
 from app.core.db import get_session
+from app.core.jwt_keys import TokenError, keyring
+from app.core.metrics import Histogram, registry
+from app.core.request_context import current_request, timed
+from app.core.user_cache import user_cache
 from app.models.user import User
 from app.repositories.user import UserRepository
 
-# JWT settings
-ALGORITHM = "HS256"
+# JWT settings (signing keys: app.core.jwt_keys)
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
 REFRESH_TOKEN_EXPIRE_DAYS = 30
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer(auto_error=False)
 
+# Verified access token claims keyed by token digest; entries expire with the token
+access_token_cache = TTLCache(maxsize=settings.access_token_cache_size)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
@@ -31,6 +42,123 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def _timed_call(func: Callable[..., Any], *args: Any) -> Tuple[Any, float]:
+    """Run func in a worker and report how long it took there (picklable for process pools)."""
+    start = perf_counter()
+    result = func(*args)
+    return result, perf_counter() - start
+
+
+class PasswordHashPool:
+    """Bounded worker pool for bcrypt so hashing never blocks the event loop.
+
+    At most ``workers`` jobs run at once and ``max_queue`` more may wait; beyond
+    that callers get 503 instead of piling up behind a login burst.
+    """
+
+    def __init__(self, workers: int, max_queue: int, executor: str = "thread"):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown password hash executor: {executor}")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor_kind = executor
+        self.hash_seconds = Histogram()
+        self.wait_seconds = Histogram()
+        self.rejected = 0
+        self._pending = 0
+        self._executor: Optional[Executor] = None
+
+    @property
+    def in_flight(self) -> int:
+        return min(self._pending, self.workers)
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._pending - self.workers)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a hashing function in the pool, rejecting with 503 when the queue is full."""
+        if self._pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service is busy, try again later",
+                headers={"Retry-After": "1"},
+            )
+
+        self._pending += 1
+        loop = asyncio.get_running_loop()
+        start = perf_counter()
+        try:
+            result, elapsed = await loop.run_in_executor(
+                self._get_executor(), _timed_call, func, *args
+            )
+        finally:
+            self._pending -= 1
+        self.hash_seconds.observe(elapsed)
+        self.wait_seconds.observe(max(0.0, perf_counter() - start - elapsed))
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and latency metrics."""
+        return {
+            "executor": self.executor_kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "rejected": self.rejected,
+            "hash_seconds": self.hash_seconds.snapshot(),
+            "wait_seconds": self.wait_seconds.snapshot(),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hash_pool = PasswordHashPool(
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+    executor=settings.password_hash_executor,
+)
+
+registry.register_histogram(
+    "password_hash_duration_seconds", "Time spent in bcrypt per call", password_hash_pool.hash_seconds
+)
+registry.register_histogram(
+    "password_hash_wait_seconds", "Time bcrypt calls waited for a worker", password_hash_pool.wait_seconds
+)
+registry.gauge_callback("password_hash_in_flight", "bcrypt calls running", lambda: password_hash_pool.in_flight)
+registry.gauge_callback(
+    "password_hash_queue_depth", "bcrypt calls waiting for a worker", lambda: password_hash_pool.queue_depth
+)
+registry.counter_callback(
+    "password_hash_rejected_total", "bcrypt calls rejected with 503", lambda: password_hash_pool.rejected
+)
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash in the password hashing pool."""
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def aget_password_hash(password: str) -> str:
+    """Hash a password in the password hashing pool."""
+    return await password_hash_pool.run(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token (stored in memory only)."""
     to_encode = data.copy()
@@ -39,7 +167,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire, "type": "access"})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=ALGORITHM)
+    encoded_jwt = keyring.encode(to_encode)
     return encoded_jwt
 
 
@@ -47,23 +175,45 @@ def create_refresh_token(data: dict) -> str:
     """Create JWT refresh token (stored in HttpOnly cookie)."""
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=ALGORITHM)
+    # jti keeps tokens unique (and their hashes distinct) even within the same second
+    to_encode.update({"exp": expire, "type": "refresh", "jti": uuid4().hex})
+    encoded_jwt = keyring.encode(to_encode)
     return encoded_jwt
 
 
 def decode_token(token: str) -> dict:
     """Decode and verify JWT token."""
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
+        payload = keyring.decode(token)
         return payload
-    except JWTError:
+    except TokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token",
         )
 
 
+def decode_access_token(token: str) -> dict:
+    """Decode an access token, reusing verified claims for tokens seen before."""
+    key = hashlib.sha256(token.encode()).digest()
+    payload = access_token_cache.get(key)
+    if payload is not MISSING:
+        return payload
+
+    payload = decode_token(token)
+    if payload.get("type") != "access":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token type",
+        )
+
+    # Evict no later than the token expires so expired tokens are re-checked (and rejected)
+    exp = payload.get("exp")
+    if exp is not None:
+        access_token_cache.set(key, payload, ttl=exp - time())
+    return payload
+
+
 async def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     session: AsyncSession = Depends(get_session),
@@ -75,29 +225,57 @@ async def get_current_user(
             detail="Not authenticated",
         )
 
-    token = credentials.credentials
-    payload = decode_token(token)
+    with timed("auth"):
+        token = credentials.credentials
+        payload = decode_access_token(token)
 
-    if payload.get("type") != "access":
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token type",
-        )
+        subject: Optional[str] = payload.get("sub")
+        if subject is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid token payload",
+            )
+
+        user = await user_cache.get(UserRepository(session), int(subject))
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+            )
+        if not user.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="User account is disabled",
+            )
+        # "Log out everywhere" bumps token_version; checked against the cached user,
+        # so this costs no query (other processes notice within USER_CACHE_TTL)
+        if payload.get("ver", 0) != user.token_version:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked",
+            )
+
+    context = current_request()
+    if context is not None:
+        context.user_id = user.id
+    return user
 
-    user_id: int = payload.get("sub")
-    if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token payload",
-        )
 
-    user_repo = UserRepository(session)
-    user = await user_repo.get_by_id(user_id)
-    if user is None:
+async def get_current_superuser(user: User = Depends(get_current_user)) -> User:
+    """Current user, who must be a superuser (moderation and other back-office endpoints)."""
+    if not user.is_superuser:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
         )
-
     return user
 
+
+async def get_optional_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    session: AsyncSession = Depends(get_session),
+) -> Optional[User]:
+    """Current user for endpoints that also serve anonymous visitors; a bad token is still a 401."""
+    if not credentials:
+        return None
+    return await get_current_user(credentials, session)
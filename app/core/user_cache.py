@@ -0,0 +1,84 @@
+import logging
+from time import monotonic
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.cache import MISSING, TTLCache
+from app.core.config import settings
+from app.models.user import User
+
+if TYPE_CHECKING:
+    from app.repositories.user import UserRepository
+
+logger = logging.getLogger(__name__)
+
+# The password hash is not needed to authenticate a token and is kept out of memory;
+# on a cached User it is unloaded, and reading it raises instead of returning None
+_USER_COLUMNS = tuple(column.key for column in User.__table__.columns if column.key != "hashed_password")
+
+
+class UserCache:
+    """Read-through cache of users by id, in front of UserRepository.get_by_id.
+
+    Stores column values rather than ORM instances, so every hit gets its own
+    detached User and no session is shared between requests. Unknown ids are
+    cached for a shorter TTL.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: float, stats_interval: float):
+        self.negative_ttl = negative_ttl
+        self.stats_interval = stats_interval
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._last_report = monotonic()
+
+    async def get(self, user_repo: "UserRepository", user_id: int) -> Optional[User]:
+        """Return the user, hitting the database only on a cache miss."""
+        row = self._cache.get(user_id)
+        if row is MISSING:
+            user = await user_repo.get_by_id(user_id)
+            if user is None:
+                self._cache.set(user_id, None, ttl=self.negative_ttl)
+            else:
+                self._cache.set(user_id, {key: getattr(user, key) for key in _USER_COLUMNS})
+            self._maybe_report()
+            return user
+
+        self._maybe_report()
+        if row is None:
+            return None
+        user = User(**row)
+        make_transient_to_detached(user)
+        return user
+
+    def invalidate(self, user_id: int) -> None:
+        """Drop a user, e.g. after its password or is_active flag changed."""
+        self._cache.invalidate(user_id)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+    def _maybe_report(self) -> None:
+        now = monotonic()
+        if now - self._last_report < self.stats_interval:
+            return
+        self._last_report = now
+        stats = self._cache.stats()
+        logger.info(
+            "User cache hit ratio %.1f%% (hits=%d misses=%d size=%d)",
+            stats["hit_ratio"] * 100,
+            stats["hits"],
+            stats["misses"],
+            stats["size"],
+        )
+
+
+user_cache = UserCache(
+    maxsize=settings.user_cache_size,
+    ttl=settings.user_cache_ttl,
+    negative_ttl=settings.user_cache_negative_ttl,
+    stats_interval=settings.user_cache_stats_interval,
+)
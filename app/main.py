@@ -1,21 +1,79 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
+from app.core.db import SessionLocal
 from app.core.logging import setup_logging
-from app.core.rate_limit import RateLimitMiddleware
-from app.core.security_headers import security_headers_middleware
-from app.routers import auth, health
+from app.core.metrics import registry
+from app.core.rate_limit import RateLimitMiddleware, create_rate_limit_backend
+from app.core.request_context import RequestContextMiddleware, TimedRoute
+from app.core.security import password_hash_pool
+from app.core.security_headers import SecurityHeadersMiddleware
+from app.routers import auth, cart, catalog, delivery, health, internal, jwks, media, metrics, orders, reviews, stock
+from app.services.auth_events import auth_event_log
+from app.services.catalog_snapshot import catalog_snapshots
+from app.services.delivery import delivery_provider
+from app.services.health import loop_lag_monitor, readiness_monitor
+from app.services.media import image_variants
+from app.services.outbox import outbox_worker
+from app.services.payments import payment_provider
+from app.services.reviews import review_moderation
+from app.services.stock import stock_reservations
+from app.services.token_retention import create_refresh_token_reaper
 
 # Setup logging and Sentry
 setup_logging()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.metrics_multiproc_dir:
+        registry.start_multiprocess(settings.metrics_multiproc_dir, settings.metrics_flush_interval)
+
+    background_tasks = [
+        asyncio.create_task(readiness_monitor.run()),
+        asyncio.create_task(loop_lag_monitor.run()),
+        asyncio.create_task(auth_event_log.run()),
+    ]
+    if settings.catalog_snapshot_enabled:
+        background_tasks.append(asyncio.create_task(catalog_snapshots.run()))
+    if settings.refresh_token_reaper_enabled:
+        reaper = create_refresh_token_reaper(SessionLocal)
+        background_tasks.append(asyncio.create_task(reaper.run()))
+    if settings.review_moderation_enabled:
+        background_tasks.append(asyncio.create_task(review_moderation.run()))
+    if settings.media_processing_enabled:
+        background_tasks.append(asyncio.create_task(image_variants.run()))
+    if settings.stock_reaper_enabled:
+        background_tasks.append(asyncio.create_task(stock_reservations.run()))
+    if settings.outbox_worker_enabled:
+        background_tasks.append(asyncio.create_task(outbox_worker.run()))
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await auth_event_log.close()
+    password_hash_pool.shutdown()
+    image_variants.shutdown()
+    await payment_provider.close()
+    await delivery_provider.close()
+    await app.state.rate_limit_backend.close()
+    registry.stop_multiprocess()
+
+
 def create_app() -> FastAPI:
-    app = FastAPI(title="BoofMebel API", version="0.1.0")
+    app = FastAPI(title="BoofMebel API", version="0.1.0", lifespan=lifespan)
+    app.router.route_class = TimedRoute
 
     # Rate limiting (before CORS)
-    app.add_middleware(RateLimitMiddleware)
+    app.state.rate_limit_backend = create_rate_limit_backend()
+    app.add_middleware(RateLimitMiddleware, backend=app.state.rate_limit_backend)
 
     app.add_middleware(
         CORSMiddleware,
@@ -24,10 +82,22 @@ def create_app() -> FastAPI:
         allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
         allow_headers=["*"],
     )
-    app.middleware("http")(security_headers_middleware)
+    app.add_middleware(SecurityHeadersMiddleware)
+    # Outermost: request id, timing and access log cover the whole stack
+    app.add_middleware(RequestContextMiddleware)
 
     app.include_router(health.router, tags=["health"])
     app.include_router(auth.router)
+    app.include_router(jwks.router)
+    app.include_router(catalog.router)
+    app.include_router(cart.router)
+    app.include_router(orders.router)
+    app.include_router(delivery.router)
+    app.include_router(reviews.router)
+    app.include_router(media.router)
+    app.include_router(stock.router)
+    app.include_router(internal.router)
+    app.include_router(metrics.router)
 
     return app
 
@@ -1,3 +1,26 @@
+from app.models.auth_event import AuthEvent
+from app.models.cart import Cart, CartItem
+from app.models.catalog import Product, ProductFabric
+from app.models.media import MediaImage
+from app.models.order import Order, OrderItem
+from app.models.outbox import OutboxJob
+from app.models.review import Review
+from app.models.stock import StockItem, StockReservation
 from app.models.user import RefreshToken, User
 
-__all__ = ["User", "RefreshToken"]
+__all__ = [
+    "User",
+    "RefreshToken",
+    "Product",
+    "ProductFabric",
+    "Cart",
+    "CartItem",
+    "Order",
+    "OrderItem",
+    "Review",
+    "MediaImage",
+    "StockItem",
+    "StockReservation",
+    "OutboxJob",
+    "AuthEvent",
+]
@@ -0,0 +1,31 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.db import Base
+
+
+class AuthEvent(Base):
+    """Append-only audit trail of logins, refreshes and logouts.
+
+    Rows are written in batches by AuthEventLog and never updated. There is
+    no foreign key to users: the trail must outlive deleted accounts, and
+    attempts against unknown emails are recorded too.
+    """
+
+    __tablename__ = "auth_events"
+    __table_args__ = (
+        Index("ix_auth_events_email_created_at", "email", "created_at"),
+        Index("ix_auth_events_user_id_created_at", "user_id", "created_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    event: Mapped[str] = mapped_column(String(16), nullable=False)  # login, refresh or logout
+    outcome: Mapped[str] = mapped_column(String(32), nullable=False)  # success, invalid_credentials, locked, ...
+    user_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    email: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)  # as typed, lowercased
+    ip: Mapped[Optional[str]] = mapped_column(String(45), nullable=True)
+    device_info: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)  # User-Agent, truncated
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -0,0 +1,88 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import JSON, Boolean, DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.core.db import Base
+
+# Partial index predicates; they must match what ProductRepository puts in its WHERE clause
+_PG_ACTIVE = text("is_active")
+_SQLITE_ACTIVE = text("is_active = 1")
+
+
+class Product(Base):
+    """Catalog product."""
+
+    __tablename__ = "products"
+    # One index per sort order, with and without the category filter. Each ends
+    # with id, which breaks ties and makes (sort key, id) a unique keyset cursor.
+    __table_args__ = tuple(
+        Index(name, *columns, postgresql_where=_PG_ACTIVE, sqlite_where=_SQLITE_ACTIVE)
+        for name, columns in (
+            ("ix_products_popular", ("popularity", "id")),
+            ("ix_products_price", ("price", "id")),
+            ("ix_products_new", ("published_at", "id")),
+            ("ix_products_category_popular", ("category", "popularity", "id")),
+            ("ix_products_category_price", ("category", "price", "id")),
+            ("ix_products_category_new", ("category", "published_at", "id")),
+        )
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    slug: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    category: Mapped[str] = mapped_column(String(32), nullable=False)
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    badge: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+    price: Mapped[int] = mapped_column(Integer, nullable=False)  # rubles, base fabric
+    old_price: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    short: Mapped[str] = mapped_column(String(500), nullable=False, default="")
+    description: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    images: Mapped[list[str]] = mapped_column(JSON, nullable=False, default=list)
+    specs: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
+    dimensions: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
+    # Everything searchable except the name: category label, texts, specs, dimensions and
+    # fabric names. On PostgreSQL the generated search_vector column indexes it (see migration 004).
+    search_text: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    popularity: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # higher sorts first
+    # Approved reviews, maintained incrementally by the review moderation worker
+    rating_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    rating_sum: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    published_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    # Relationships
+    fabrics: Mapped[list["ProductFabric"]] = relationship(
+        "ProductFabric",
+        back_populates="product",
+        cascade="all, delete-orphan",
+        order_by="ProductFabric.position",
+    )
+
+    @property
+    def rating(self) -> Optional[float]:
+        """Average rating of approved reviews, to one decimal place."""
+        return round(self.rating_sum / self.rating_count, 1) if self.rating_count else None
+
+
+class ProductFabric(Base):
+    """Upholstery option of a product; price_delta is added to the product price."""
+
+    __tablename__ = "product_fabrics"
+    __table_args__ = (
+        UniqueConstraint("product_id", "code", name="uq_product_fabrics_product_code"),
+        Index("ix_product_fabrics_fabric_type", "fabric_type", "product_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    product_id: Mapped[int] = mapped_column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    code: Mapped[str] = mapped_column(String(64), nullable=False)
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    fabric_type: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)  # "Букле", "Велюр", ...
+    price_delta: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    color: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+    position: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # Relationships
+    product: Mapped["Product"] = relationship("Product", back_populates="fabrics")
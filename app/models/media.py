@@ -0,0 +1,42 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import JSON, DateTime, ForeignKey, Index, Integer, String, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.db import Base
+
+# Image statuses; the original is served from the moment it is uploaded
+IMAGE_PENDING = "pending"  # waiting for the variant worker
+IMAGE_PROCESSING = "processing"  # claimed by a worker (taken over again once stale)
+IMAGE_READY = "ready"
+IMAGE_FAILED = "failed"  # not a decodable image, or too large
+
+# Partial index predicate; it must match what MediaRepository.claim puts in its WHERE clause
+_UNPROCESSED = text("status IN ('pending', 'processing')")
+
+
+class MediaImage(Base):
+    """Uploaded image, stored under the SHA-256 of its content."""
+
+    __tablename__ = "images"
+    __table_args__ = (
+        Index("ix_images_unprocessed", "updated_at", postgresql_where=_UNPROCESSED, sqlite_where=_UNPROCESSED),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    sha256: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    content_type: Mapped[str] = mapped_column(String(32), nullable=False)
+    extension: Mapped[str] = mapped_column(String(8), nullable=False)  # "jpg", "png", "webp" or "avif"
+    size: Mapped[int] = mapped_column(Integer, nullable=False)  # bytes
+    width: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # known once processed
+    height: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default=IMAGE_PENDING)
+    # [{"width": 640, "format": "webp", "size": 48213}, ...]
+    variants: Mapped[list[dict[str, Any]]] = mapped_column(JSON, nullable=False, default=list)
+    error: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    uploaded_by: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True
+    )
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
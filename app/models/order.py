@@ -0,0 +1,100 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Float, ForeignKey, Index, Integer, String, Text, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.core.db import Base
+
+# Order statuses; "pending" is the only non-final one
+ORDER_PENDING = "pending"
+ORDER_PAID = "paid"  # paid online, shipment booked
+ORDER_CONFIRMED = "confirmed"  # cash on delivery, shipment booked
+ORDER_PAYMENT_FAILED = "payment_failed"
+ORDER_OUT_OF_STOCK = "out_of_stock"
+ORDER_FAILED = "failed"  # a provider was unavailable; payment and shipment were rolled back
+
+# Partial index predicates; OrderRepository.create_pending names them in ON CONFLICT
+_USER_ORDER = text("user_id IS NOT NULL")
+_ANONYMOUS_ORDER = text("user_id IS NULL")
+
+
+class Order(Base):
+    """Order placed from a cart. Prices are copied from the catalog at checkout."""
+
+    __tablename__ = "orders"
+    __table_args__ = (
+        # Idempotency keys are unique per user; anonymous checkouts share one key space
+        # (a key reused from another cart fails the request_hash check)
+        Index(
+            "uq_orders_user_idempotency_key",
+            "user_id",
+            "idempotency_key",
+            unique=True,
+            postgresql_where=_USER_ORDER,
+            sqlite_where=_USER_ORDER,
+        ),
+        Index(
+            "uq_orders_anonymous_idempotency_key",
+            "idempotency_key",
+            unique=True,
+            postgresql_where=_ANONYMOUS_ORDER,
+            sqlite_where=_ANONYMOUS_ORDER,
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # Client-chosen Idempotency-Key; retries with the same key return this order
+    idempotency_key: Mapped[str] = mapped_column(String(64), nullable=False)
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)  # a reused key must repeat the request
+    user_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True
+    )
+    status: Mapped[str] = mapped_column(String(24), nullable=False, default=ORDER_PENDING)
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    phone: Mapped[str] = mapped_column(String(32), nullable=False)
+    email: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    address: Mapped[str] = mapped_column(String(500), nullable=False)
+    comment: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    payment_method: Mapped[str] = mapped_column(String(16), nullable=False)  # "online" or "cod"
+    items_total: Mapped[int] = mapped_column(Integer, nullable=False)
+    delivery_price: Mapped[int] = mapped_column(Integer, nullable=False)
+    total: Mapped[int] = mapped_column(Integer, nullable=False)
+    weight: Mapped[float] = mapped_column(Float, nullable=False)  # kg, for the delivery booking
+    transaction_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    delivery_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    tracking: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    eta: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relationships
+    items: Mapped[list["OrderItem"]] = relationship(
+        "OrderItem", back_populates="order", cascade="all, delete-orphan", order_by="OrderItem.id"
+    )
+
+
+class OrderItem(Base):
+    """Order line with the product, fabric and price as they were at checkout."""
+
+    __tablename__ = "order_items"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    order_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    product_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("products.id", ondelete="SET NULL"), nullable=True
+    )
+    fabric_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("product_fabrics.id", ondelete="SET NULL"), nullable=True
+    )
+    product_slug: Mapped[str] = mapped_column(String(64), nullable=False)
+    product_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    fabric_name: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    unit_price: Mapped[int] = mapped_column(Integer, nullable=False)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    # Relationships
+    order: Mapped["Order"] = relationship("Order", back_populates="items")
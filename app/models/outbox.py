@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import JSON, DateTime, Index, Integer, String, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.db import Base
+
+# Job statuses; finished jobs are deleted
+JOB_PENDING = "pending"  # waiting for available_at
+JOB_RUNNING = "running"  # claimed by a worker until available_at, its lease (taken over again after it)
+JOB_DEAD = "dead"  # failed max_attempts times; kept for inspection and a manual retry
+
+# Partial index predicate; it must match what OutboxRepository.claim puts in its WHERE clause
+_QUEUED = text("status IN ('pending', 'running')")
+
+
+class OutboxJob(Base):
+    """Side effect of a business change, written in the same transaction and run by the outbox worker."""
+
+    __tablename__ = "outbox_jobs"
+    __table_args__ = (
+        Index("ix_outbox_jobs_queued", "available_at", postgresql_where=_QUEUED, sqlite_where=_QUEUED),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[str] = mapped_column(String(64), nullable=False)  # handler name, e.g. "email.order_confirmation"
+    payload: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default=JOB_PENDING)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Next run for a pending job, lease expiry for a running one
+    available_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,47 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, SmallInteger, String, Text, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.db import Base
+
+# Review statuses; only approved reviews are listed and counted in product ratings
+REVIEW_PENDING = "pending"  # waiting for the moderation worker
+REVIEW_APPROVED = "approved"
+REVIEW_FLAGGED = "flagged"  # held for a moderator by the automatic checks
+REVIEW_REJECTED = "rejected"
+
+# Partial index predicates; they must match what ReviewRepository puts in its WHERE clause
+_APPROVED = text("status = 'approved'")
+_PENDING = text("status = 'pending'")
+_FLAGGED = text("status = 'flagged'")
+
+
+class Review(Base):
+    """Review of a product, or of the store itself when product_id is NULL."""
+
+    __tablename__ = "reviews"
+    __table_args__ = (
+        # Keyset listing, newest first, of the approved reviews of a product (or of the store: NULL)
+        Index("ix_reviews_product_approved", "product_id", "id", postgresql_where=_APPROVED, sqlite_where=_APPROVED),
+        # The moderation queue and the moderators' list stay small however many reviews there are
+        Index("ix_reviews_pending", "id", postgresql_where=_PENDING, sqlite_where=_PENDING),
+        Index("ix_reviews_flagged", "id", postgresql_where=_FLAGGED, sqlite_where=_FLAGGED),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    product_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=True
+    )
+    user_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True
+    )
+    author: Mapped[str] = mapped_column(String(100), nullable=False)
+    rating: Mapped[int] = mapped_column(SmallInteger, nullable=False)  # 1-5
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default=REVIEW_PENDING)
+    # Set for reviews imported from products.js, so that re-running the import adds no duplicates
+    import_key: Mapped[Optional[str]] = mapped_column(String(64), unique=True, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    moderated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
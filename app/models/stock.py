@@ -0,0 +1,63 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import CheckConstraint, DateTime, ForeignKey, Index, Integer, String, UniqueConstraint, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.db import Base
+
+# Reservation statuses
+RESERVATION_HELD = "held"  # units taken from stock until the order completes or the reservation expires
+RESERVATION_COMMITTED = "committed"  # sold
+RESERVATION_RELEASED = "released"  # returned to stock (order failed, or an expired hold replaced by a new one)
+RESERVATION_EXPIRED = "expired"  # returned to stock by the reaper after the TTL; the order must not complete on it
+
+# Partial index predicate; it must match what StockRepository.release_expired puts in its WHERE clause
+_HELD = text("status = 'held'")
+
+
+class StockItem(Base):
+    """Available units of a SKU (a product in one fabric), split across shard rows.
+
+    A SKU's stock is the sum of its shards. Reservations decrement one shard
+    with a conditional UPDATE, so up to ``shards`` orders for the same SKU
+    can hold row locks at once instead of queueing on a single row.
+    """
+
+    __tablename__ = "stock_items"
+    __table_args__ = (
+        UniqueConstraint("product_id", "fabric_key", "shard", name="uq_stock_items_shard"),
+        CheckConstraint("quantity >= 0", name="ck_stock_items_quantity"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    product_id: Mapped[int] = mapped_column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    fabric_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("product_fabrics.id", ondelete="CASCADE"), nullable=True
+    )
+    # fabric_id, or 0 for the base fabric, as in cart_items
+    fabric_key: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    shard: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class StockReservation(Base):
+    """Units of one stock shard held for an order."""
+
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        Index("ix_stock_reservations_expires_at", "expires_at", postgresql_where=_HELD, sqlite_where=_HELD),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    order_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    stock_item_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("stock_items.id", ondelete="CASCADE"), nullable=False
+    )
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default=RESERVATION_HELD)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,21 @@
+from typing import Any, Dict, Sequence
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.auth_event import AuthEvent
+
+# Rows per INSERT statement; 7 columns each stays under SQLite's 32766 bound parameters
+INSERT_CHUNK_SIZE = 1000
+
+
+class AuthEventRepository:
+    """Repository for the auth audit trail."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def insert_many(self, rows: Sequence[Dict[str, Any]]) -> None:
+        """Append events with one multi-row INSERT per chunk."""
+        for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+            await self.session.execute(insert(AuthEvent).values(list(rows[start : start + INSERT_CHUNK_SIZE])))
@@ -0,0 +1,260 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Row, and_, case, delete, func, literal, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.models.cart import Cart, CartItem
+from app.models.catalog import Product, ProductFabric
+
+# (product slug, fabric code or None, quantity)
+Line = Tuple[str, Optional[str], int]
+
+
+class CartRepository:
+    """Repository for carts and cart lines.
+
+    Lines are addressed by product slug and fabric code, as the storefront
+    knows them, and resolved to ids inside the writing statement itself, so
+    every mutation is a single round-trip however the line is identified.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    def _insert(self):
+        dialect = self.session.get_bind().dialect.name
+        return postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+    async def get_id(self, user_id: Optional[int] = None, token_hash: Optional[str] = None) -> Optional[int]:
+        """Id of the cart of a user or of an anonymous cart token."""
+        owner = Cart.user_id == user_id if user_id is not None else Cart.token_hash == token_hash
+        result = await self.session.execute(select(Cart.id).where(owner))
+        return result.scalar_one_or_none()
+
+    async def touch(self, user_id: Optional[int] = None, token_hash: Optional[str] = None) -> Optional[int]:
+        """Mark a cart as modified now and return its id (lookup and update in one statement)."""
+        owner = Cart.user_id == user_id if user_id is not None else Cart.token_hash == token_hash
+        result = await self.session.execute(
+            update(Cart).where(owner).values(updated_at=datetime.utcnow()).returning(Cart.id),
+            execution_options={"synchronize_session": False},
+        )
+        return result.scalar_one_or_none()
+
+    async def create(self, user_id: Optional[int] = None, token_hash: Optional[str] = None) -> int:
+        """Create a cart, or return the existing one if a concurrent request just created it."""
+        now = datetime.utcnow()
+        stmt = (
+            self._insert()(Cart)
+            .values(user_id=user_id, token_hash=token_hash, created_at=now, updated_at=now)
+            .on_conflict_do_nothing()
+            .returning(Cart.id)
+        )
+        cart_id = (await self.session.execute(stmt)).scalar_one_or_none()
+        if cart_id is None:
+            cart_id = await self.get_id(user_id, token_hash)
+        return cart_id
+
+    async def set_line(
+        self, cart_id: int, slug: str, fabric_code: Optional[str], quantity: int, max_lines: int
+    ) -> bool:
+        """Set the quantity of a line, adding it if needed, in one ``INSERT ... SELECT ... ON CONFLICT``.
+
+        The SELECT resolves the slug and fabric code, so nothing is written
+        for an inactive product, a fabric of another product or a new line
+        beyond ``max_lines``. Returns whether the line was written.
+        """
+        fabric_key = func.coalesce(ProductFabric.id, 0)
+        other_lines = (
+            select(func.count(CartItem.id))
+            .where(
+                CartItem.cart_id == cart_id,
+                ~and_(CartItem.product_id == Product.id, CartItem.fabric_key == fabric_key),
+            )
+            .scalar_subquery()
+        )
+        fabric_join = and_(ProductFabric.product_id == Product.id, ProductFabric.code == fabric_code)
+        source = (
+            select(
+                literal(cart_id),
+                Product.id,
+                ProductFabric.id,
+                fabric_key,
+                literal(quantity),
+                literal(datetime.utcnow()),
+            )
+            .select_from(Product)
+            .outerjoin(ProductFabric, fabric_join)
+            .where(Product.slug == slug, Product.is_active, other_lines < max_lines)
+        )
+        if fabric_code is not None:
+            source = source.where(ProductFabric.id.is_not(None))
+
+        stmt = self._insert()(CartItem).from_select(
+            ["cart_id", "product_id", "fabric_id", "fabric_key", "quantity", "updated_at"], source
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CartItem.cart_id, CartItem.product_id, CartItem.fabric_key],
+            set_={"quantity": stmt.excluded.quantity, "updated_at": stmt.excluded.updated_at},
+        ).returning(CartItem.id)
+        return (await self.session.execute(stmt)).scalar_one_or_none() is not None
+
+    async def remove_line(self, cart_id: int, slug: str, fabric_code: Optional[str]) -> None:
+        product_id = select(Product.id).where(Product.slug == slug).scalar_subquery()
+        fabric_key: Any = 0
+        if fabric_code is not None:
+            fabric_key = (
+                select(ProductFabric.id)
+                .where(ProductFabric.product_id == product_id, ProductFabric.code == fabric_code)
+                .scalar_subquery()
+            )
+        await self.session.execute(
+            delete(CartItem).where(
+                CartItem.cart_id == cart_id, CartItem.product_id == product_id, CartItem.fabric_key == fabric_key
+            ),
+            execution_options={"synchronize_session": False},
+        )
+
+    async def replace_lines(self, cart_id: int, lines: Sequence[Line]) -> int:
+        """Replace all lines of a cart; lines of unknown or inactive products and fabrics are dropped.
+
+        Slugs and fabric codes are resolved in one query and the lines are
+        written with one multi-row INSERT. Returns the number of lines kept.
+        """
+        await self.clear(cart_id)
+        if not lines:
+            return 0
+
+        slugs = {slug for slug, _, _ in lines}
+        result = await self.session.execute(
+            select(Product.slug, Product.id, ProductFabric.code, ProductFabric.id)
+            .outerjoin(ProductFabric, ProductFabric.product_id == Product.id)
+            .where(Product.slug.in_(slugs), Product.is_active)
+        )
+        ids: Dict[Tuple[str, Optional[str]], Tuple[int, Optional[int]]] = {}
+        for slug, product_id, code, fabric_id in result:
+            ids[(slug, None)] = (product_id, None)
+            if code is not None:
+                ids[(slug, code)] = (product_id, fabric_id)
+
+        now = datetime.utcnow()
+        rows = []
+        for slug, fabric_code, quantity in lines:
+            if (slug, fabric_code) in ids:
+                product_id, fabric_id = ids[(slug, fabric_code)]
+                rows.append(
+                    {
+                        "cart_id": cart_id,
+                        "product_id": product_id,
+                        "fabric_id": fabric_id,
+                        "fabric_key": fabric_id or 0,
+                        "quantity": quantity,
+                        "updated_at": now,
+                    }
+                )
+        if rows:
+            await self.session.execute(self._insert()(CartItem).values(rows))
+        return len(rows)
+
+    async def clear(self, cart_id: int) -> None:
+        await self.session.execute(
+            delete(CartItem).where(CartItem.cart_id == cart_id), execution_options={"synchronize_session": False}
+        )
+
+    async def clear_owned(self, user_id: Optional[int] = None, token_hash: Optional[str] = None) -> None:
+        """Remove all lines of the cart of a user or of an anonymous cart token, in one statement."""
+        owner = Cart.user_id == user_id if user_id is not None else Cart.token_hash == token_hash
+        await self.session.execute(
+            delete(CartItem).where(CartItem.cart_id.in_(select(Cart.id).where(owner))),
+            execution_options={"synchronize_session": False},
+        )
+
+    async def count_lines(self, cart_id: int) -> int:
+        result = await self.session.execute(select(func.count(CartItem.id)).where(CartItem.cart_id == cart_id))
+        return result.scalar_one()
+
+    async def priced_lines(self, cart_id: int) -> List[Row]:
+        """All lines of a cart with current prices, in one query (base price plus fabric delta).
+
+        Lines of products that were deactivated are left out.
+        """
+        result = await self.session.execute(
+            select(
+                CartItem.product_id,
+                CartItem.fabric_id,
+                Product.slug,
+                Product.name,
+                Product.images,
+                Product.dimensions,
+                ProductFabric.code.label("fabric_code"),
+                ProductFabric.name.label("fabric_name"),
+                (Product.price + func.coalesce(ProductFabric.price_delta, 0)).label("unit_price"),
+                CartItem.quantity,
+            )
+            .select_from(CartItem)
+            .join(Product, Product.id == CartItem.product_id)
+            .outerjoin(ProductFabric, ProductFabric.id == CartItem.fabric_id)
+            .where(
+                CartItem.cart_id == cart_id,
+                Product.is_active,
+                # A line whose fabric was discontinued is dropped, not repriced at the base price
+                or_(CartItem.fabric_id.is_(None), ProductFabric.id.is_not(None)),
+            )
+            .order_by(CartItem.id)
+        )
+        return list(result)
+
+    async def merge(self, source_id: int, target_id: int, max_quantity: int, max_lines: int) -> None:
+        """Move the lines of one cart into another and delete it; quantities of shared lines add up.
+
+        Lines the target already has are always merged; new lines are added
+        in the order they were put in the source cart until the target holds
+        ``max_lines``, and the rest are dropped, all in the one INSERT.
+        """
+        source = aliased(CartItem)
+        target = aliased(CartItem)
+        shared = (
+            select(target.id)
+            .where(
+                target.cart_id == target_id,
+                target.product_id == source.product_id,
+                target.fabric_key == source.fabric_key,
+            )
+            .exists()
+        )
+        ranked = (
+            select(
+                source.product_id,
+                source.fabric_id,
+                source.fabric_key,
+                source.quantity,
+                shared.label("shared"),
+                func.row_number().over(partition_by=shared, order_by=source.id).label("line_number"),
+            )
+            .where(source.cart_id == source_id)
+            .subquery()
+        )
+        target_lines = select(func.count(target.id)).where(target.cart_id == target_id).scalar_subquery()
+        stmt = self._insert()(CartItem).from_select(
+            ["cart_id", "product_id", "fabric_id", "fabric_key", "quantity", "updated_at"],
+            select(
+                literal(target_id),
+                ranked.c.product_id,
+                ranked.c.fabric_id,
+                ranked.c.fabric_key,
+                ranked.c.quantity,
+                literal(datetime.utcnow()),
+            ).where(or_(ranked.c.shared, ranked.c.line_number <= max_lines - target_lines)),
+        )
+        summed = CartItem.quantity + stmt.excluded.quantity
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CartItem.cart_id, CartItem.product_id, CartItem.fabric_key],
+            set_={"quantity": case((summed > max_quantity, max_quantity), else_=summed)},
+        )
+        await self.session.execute(stmt)
+        await self.clear(source_id)
+        await self.session.execute(
+            delete(Cart).where(Cart.id == source_id), execution_options={"synchronize_session": False}
+        )
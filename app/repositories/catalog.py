@@ -0,0 +1,227 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import cast, delete, distinct, exists, func, literal_column, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import REGCONFIG, TSVECTOR
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, selectinload
+
+from app.models.catalog import Product, ProductFabric
+
+# sort name -> (sort column, descending)
+SORTS = {
+    "popular": (Product.popularity, True),
+    "price-asc": (Product.price, False),
+    "price-desc": (Product.price, True),
+    "new": (Product.published_at, True),
+}
+
+# Upper bounds of the search price facet buckets, in rubles (the last bucket is open-ended)
+PRICE_BUCKETS = (30_000, 50_000, 80_000, 120_000)
+
+# Rows per multi-row INSERT in bulk imports
+IMPORT_CHUNK_SIZE = 500
+
+# PostgreSQL only: generated from name and search_text, GIN-indexed (migration 004)
+_search_vector = literal_column("products.search_vector", TSVECTOR)
+
+
+class ProductRepository:
+    """Repository for catalog products."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_by_slug(self, slug: str) -> Optional[Product]:
+        """Get an active product with its fabrics."""
+        result = await self.session.execute(
+            select(Product)
+            .options(selectinload(Product.fabrics))
+            .where(Product.slug == slug, Product.is_active)
+        )
+        return result.scalar_one_or_none()
+
+    async def list_active(self) -> List[Product]:
+        """All active products with their fabrics (for the in-memory catalog snapshot)."""
+        result = await self.session.execute(
+            select(Product).options(selectinload(Product.fabrics)).where(Product.is_active).order_by(Product.id)
+        )
+        return list(result.scalars())
+
+    async def fingerprint(self) -> Tuple[int, Optional[datetime]]:
+        """(row count, latest updated_at) of products; changes whenever a product is written."""
+        result = await self.session.execute(select(func.count(Product.id), func.max(Product.updated_at)))
+        count, updated_at = result.one()
+        return count, updated_at
+
+    async def list_page(
+        self,
+        sort: str,
+        limit: int,
+        category: Optional[str] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        after: Optional[Tuple[Any, int]] = None,
+    ) -> List[Product]:
+        """List active products in ``sort`` order, starting after the (sort value, id) keyset ``after``.
+
+        The id tie-breaker runs in the same direction as the sort key, so the page
+        condition is a single row-value comparison that the matching composite
+        index can seek to, whatever the page number.
+        """
+        column, descending = SORTS[sort]
+        stmt = select(Product).where(Product.is_active)
+        if category is not None:
+            stmt = stmt.where(Product.category == category)
+        if min_price is not None:
+            stmt = stmt.where(Product.price >= min_price)
+        if max_price is not None:
+            stmt = stmt.where(Product.price <= max_price)
+        if after is not None:
+            keyset = tuple_(column, Product.id)
+            stmt = stmt.where(keyset < tuple_(*after) if descending else keyset > tuple_(*after))
+        if descending:
+            stmt = stmt.order_by(column.desc(), Product.id.desc())
+        else:
+            stmt = stmt.order_by(column.asc(), Product.id.asc())
+
+        result = await self.session.execute(stmt.limit(limit))
+        return list(result.scalars())
+
+    @staticmethod
+    def _search_conditions(
+        query: str,
+        category: Optional[str],
+        fabric_type: Optional[str],
+        min_price: Optional[int],
+        max_price: Optional[int],
+    ) -> list:
+        """WHERE clause of a full-text search (PostgreSQL)."""
+        tsquery = func.websearch_to_tsquery(cast("russian", REGCONFIG), query)
+        conditions = [Product.is_active, _search_vector.bool_op("@@")(tsquery)]
+        if category is not None:
+            conditions.append(Product.category == category)
+        if fabric_type is not None:
+            # Aliased so it stays correlated when the facet query joins product_fabrics itself
+            fabric = aliased(ProductFabric)
+            conditions.append(exists().where(fabric.product_id == Product.id, fabric.fabric_type == fabric_type))
+        if min_price is not None:
+            conditions.append(Product.price >= min_price)
+        if max_price is not None:
+            conditions.append(Product.price <= max_price)
+        return conditions
+
+    async def search(
+        self,
+        query: str,
+        limit: int,
+        offset: int = 0,
+        category: Optional[str] = None,
+        fabric_type: Optional[str] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+    ) -> List[Product]:
+        """Active products matching a web-search style query, best match first (PostgreSQL)."""
+        tsquery = func.websearch_to_tsquery(cast("russian", REGCONFIG), query)
+        rank = func.ts_rank_cd(_search_vector, tsquery)
+        stmt = (
+            select(Product)
+            .where(*self._search_conditions(query, category, fabric_type, min_price, max_price))
+            .order_by(rank.desc(), Product.popularity.desc(), Product.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars())
+
+    async def search_facets(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        fabric_type: Optional[str] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+    ) -> List[Tuple[Optional[str], Any, int]]:
+        """Facet counts of a search in one GROUPING SETS query (PostgreSQL).
+
+        Returns (facet, value, count) rows for the "category", "fabric" and
+        "price" (width_bucket index over PRICE_BUCKETS) facets, plus a
+        (None, None, total) row.
+        """
+        # Bounds inlined rather than bound: GROUPING() arguments must repeat the GROUP BY expressions
+        bounds = literal_column(f"ARRAY[{','.join(map(str, PRICE_BUCKETS))}]")
+        price_bucket = func.width_bucket(Product.price, bounds)
+        grouping = func.grouping(Product.category, ProductFabric.fabric_type, price_bucket)
+        hits = func.count(distinct(Product.id))
+        stmt = (
+            select(grouping, Product.category, ProductFabric.fabric_type, price_bucket, hits)
+            .select_from(Product)
+            .outerjoin(ProductFabric, ProductFabric.product_id == Product.id)
+            .where(*self._search_conditions(query, category, fabric_type, min_price, max_price))
+            .group_by(
+                func.grouping_sets(
+                    Product.category, ProductFabric.fabric_type, price_bucket, literal_column("()")
+                )
+            )
+        )
+        # GROUPING() sets a bit for each column not in the row's grouping set
+        facets = {0b011: "category", 0b101: "fabric", 0b110: "price", 0b111: None}
+        rows = []
+        for bits, category_value, fabric_value, bucket, count in await self.session.execute(stmt):
+            facet = facets[bits]
+            value = {"category": category_value, "fabric": fabric_value, "price": bucket, None: None}[facet]
+            rows.append((facet, value, count))
+        return rows
+
+    async def upsert_many(self, products: Sequence[Dict[str, Any]]) -> Dict[str, int]:
+        """Insert or update products by slug and their fabrics by code, in one transaction.
+
+        Each product dict holds Product columns plus a ``fabrics`` list of
+        ProductFabric column dicts. Rows are written with multi-row
+        ``INSERT ... ON CONFLICT DO UPDATE`` statements, so product and fabric
+        ids stay stable across imports (cart lines reference them); fabrics
+        no longer listed for a product are deleted. ``published_at`` of
+        existing products is left untouched. Returns {slug: product id}.
+        """
+        dialect = self.session.get_bind().dialect.name
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        now = datetime.utcnow()
+
+        ids: Dict[str, int] = {}
+        rows = [{key: value for key, value in product.items() if key != "fabrics"} for product in products]
+        for start in range(0, len(rows), IMPORT_CHUNK_SIZE):
+            chunk = [dict(row, updated_at=now) for row in rows[start : start + IMPORT_CHUNK_SIZE]]
+            stmt = dialect_insert(Product).values(chunk)
+            updated = {key: stmt.excluded[key] for key in chunk[0] if key not in ("slug", "published_at")}
+            stmt = stmt.on_conflict_do_update(index_elements=[Product.slug], set_=updated).returning(
+                Product.slug, Product.id
+            )
+            for slug, product_id in await self.session.execute(stmt):
+                ids[slug] = product_id
+
+        for start in range(0, len(products), IMPORT_CHUNK_SIZE):
+            chunk = products[start : start + IMPORT_CHUNK_SIZE]
+            fabrics = [
+                dict(fabric, product_id=ids[product["slug"]], position=position)
+                for product in chunk
+                for position, fabric in enumerate(product.get("fabrics", ()))
+            ]
+            kept: List[int] = []
+            if fabrics:
+                stmt = dialect_insert(ProductFabric).values(fabrics)
+                updated = {key: stmt.excluded[key] for key in fabrics[0] if key not in ("product_id", "code")}
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[ProductFabric.product_id, ProductFabric.code], set_=updated
+                ).returning(ProductFabric.id)
+                kept = list((await self.session.execute(stmt)).scalars())
+            await self.session.execute(
+                delete(ProductFabric).where(
+                    ProductFabric.product_id.in_([ids[product["slug"]] for product in chunk]),
+                    ProductFabric.id.not_in(kept),
+                ),
+                execution_options={"synchronize_session": False},
+            )
+
+        await self.session.commit()
+        return ids
@@ -0,0 +1,69 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.media import IMAGE_PENDING, IMAGE_PROCESSING, MediaImage
+
+
+class MediaRepository:
+    """Repository for uploaded images."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    def _insert(self):
+        dialect = self.session.get_bind().dialect.name
+        return postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+    async def create(self, values: Dict[str, Any]) -> Optional[int]:
+        """Insert an image unless one with the same content exists; returns the new id or None."""
+        now = datetime.utcnow()
+        stmt = (
+            self._insert()(MediaImage)
+            .values(**values, status=IMAGE_PENDING, variants=[], created_at=now, updated_at=now)
+            .on_conflict_do_nothing(index_elements=[MediaImage.sha256])
+            .returning(MediaImage.id)
+        )
+        return (await self.session.execute(stmt)).scalar_one_or_none()
+
+    async def get(self, image_id: int) -> Optional[MediaImage]:
+        return await self.session.get(MediaImage, image_id, populate_existing=True)
+
+    async def get_by_hash(self, sha256: str) -> Optional[MediaImage]:
+        result = await self.session.execute(select(MediaImage).where(MediaImage.sha256 == sha256))
+        return result.scalar_one_or_none()
+
+    async def claim(self, limit: int, stale_before: datetime) -> List[MediaImage]:
+        """Mark up to ``limit`` unprocessed images as processing and return them.
+
+        Pending images, and images whose worker stopped updating them (the
+        process died mid-conversion), are claimed with a conditional UPDATE,
+        so two workers never convert the same image. The claim is committed
+        by the caller before converting, so no transaction stays open while
+        the process pool works.
+        """
+        claimable = or_(
+            MediaImage.status == IMAGE_PENDING,
+            and_(MediaImage.status == IMAGE_PROCESSING, MediaImage.updated_at < stale_before),
+        )
+        ids = select(MediaImage.id).where(claimable).order_by(MediaImage.updated_at).limit(limit).scalar_subquery()
+        result = await self.session.execute(
+            update(MediaImage)
+            .where(MediaImage.id.in_(ids), claimable)
+            .values(status=IMAGE_PROCESSING, updated_at=datetime.utcnow())
+            .returning(MediaImage),
+            execution_options={"synchronize_session": False, "populate_existing": True},
+        )
+        return list(result.scalars())
+
+    async def finish(self, image_id: int, status: str, **values: Any) -> None:
+        """Store the outcome of processing: dimensions and variants, or the error."""
+        await self.session.execute(
+            update(MediaImage)
+            .where(MediaImage.id == image_id)
+            .values(status=status, updated_at=datetime.utcnow(), **values),
+            execution_options={"synchronize_session": False},
+        )
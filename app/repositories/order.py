@@ -0,0 +1,93 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.models.order import ORDER_PENDING, Order, OrderItem
+
+
+class OrderRepository:
+    """Repository for orders.
+
+    An order row is created as soon as a checkout starts and doubles as the
+    idempotency record: its ``idempotency_key``, unique per user (and among
+    anonymous orders), lets exactly one of several concurrent requests with
+    the same key claim the checkout.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    def _insert(self):
+        dialect = self.session.get_bind().dialect.name
+        return postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+    async def get_by_key(self, user_id: Optional[int], idempotency_key: str) -> Optional[Order]:
+        """Order a user (None: an anonymous cart) created with an Idempotency-Key, with its items."""
+        owner = Order.user_id == user_id if user_id is not None else Order.user_id.is_(None)
+        result = await self.session.execute(
+            select(Order)
+            .where(owner, Order.idempotency_key == idempotency_key)
+            .options(selectinload(Order.items))
+            .execution_options(populate_existing=True)
+        )
+        return result.scalar_one_or_none()
+
+    async def get(self, order_id: int) -> Optional[Order]:
+        """Order with its items."""
+        result = await self.session.execute(
+            select(Order).where(Order.id == order_id).options(selectinload(Order.items))
+        )
+        return result.scalar_one_or_none()
+
+    async def create_pending(self, values: Dict[str, Any], items: List[Dict[str, Any]]) -> Optional[int]:
+        """Insert a pending order and its items unless the idempotency key is taken.
+
+        ``INSERT ... ON CONFLICT (user_id, idempotency_key) DO NOTHING RETURNING id``
+        decides the race between concurrent retries; the loser gets None.
+        """
+        now = datetime.utcnow()
+        # The partial unique index that applies to this order (see Order.__table_args__)
+        if values.get("user_id") is not None:
+            key_columns, owner = [Order.user_id, Order.idempotency_key], Order.user_id.isnot(None)
+        else:
+            key_columns, owner = [Order.idempotency_key], Order.user_id.is_(None)
+        stmt = (
+            self._insert()(Order)
+            .values(**values, status=ORDER_PENDING, created_at=now, updated_at=now)
+            .on_conflict_do_nothing(index_elements=key_columns, index_where=owner)
+            .returning(Order.id)
+        )
+        order_id = (await self.session.execute(stmt)).scalar_one_or_none()
+        if order_id is not None and items:
+            await self.session.execute(
+                self._insert()(OrderItem).values([{**item, "order_id": order_id} for item in items])
+            )
+        return order_id
+
+    async def take_over(self, order_id: int, stale_before: datetime) -> bool:
+        """Claim a pending order whose checkout stopped updating it (e.g. the worker died).
+
+        The conditional UPDATE succeeds for one request only, so an order is
+        never processed by two requests at once.
+        """
+        result = await self.session.execute(
+            update(Order)
+            .where(Order.id == order_id, Order.status == ORDER_PENDING, Order.updated_at < stale_before)
+            .values(updated_at=datetime.utcnow())
+            .returning(Order.id),
+            execution_options={"synchronize_session": False},
+        )
+        return result.scalar_one_or_none() is not None
+
+    async def finish(self, order_id: int, status: str, **values: Any) -> None:
+        """Move an order to a final status, with the provider references or the error."""
+        await self.session.execute(
+            update(Order)
+            .where(Order.id == order_id)
+            .values(status=status, updated_at=datetime.utcnow(), **values),
+            execution_options={"synchronize_session": False},
+        )
@@ -0,0 +1,93 @@
+from datetime import datetime
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.outbox import JOB_DEAD, JOB_PENDING, JOB_RUNNING, OutboxJob
+
+_outbox_jobs = OutboxJob.__table__
+
+
+class OutboxRepository:
+    """Repository for outbox jobs."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    def add(self, kind: str, payload: Dict[str, Any]) -> None:
+        """Queue a job in the current transaction; it only exists once the caller commits."""
+        now = datetime.utcnow()
+        self.session.add(OutboxJob(kind=kind, payload=payload, status=JOB_PENDING, available_at=now, created_at=now))
+
+    async def claim(self, limit: int, now: datetime, lease_until: datetime) -> List[OutboxJob]:
+        """Lease up to ``limit`` due jobs to this worker until ``lease_until`` and return them.
+
+        Due jobs are pending ones whose backoff has passed and running ones
+        whose lease ran out (their worker died). They are picked with
+        ``SELECT ... FOR UPDATE SKIP LOCKED``, so concurrent workers claim
+        disjoint batches without waiting on each other; SQLite ignores the
+        lock clause and serializes writers anyway. The caller commits the
+        claim before running the jobs, so no transaction stays open meanwhile.
+        """
+        due = (
+            select(OutboxJob.id)
+            .where(OutboxJob.status.in_((JOB_PENDING, JOB_RUNNING)), OutboxJob.available_at <= now)
+            .order_by(OutboxJob.available_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        result = await self.session.execute(
+            update(OutboxJob)
+            .where(OutboxJob.id.in_(due), OutboxJob.available_at <= now)
+            .values(status=JOB_RUNNING, attempts=OutboxJob.attempts + 1, available_at=lease_until)
+            .returning(OutboxJob),
+            execution_options={"synchronize_session": False, "populate_existing": True},
+        )
+        return list(result.scalars())
+
+    async def complete(self, job_ids: Sequence[int]) -> None:
+        if job_ids:
+            await self.session.execute(
+                delete(OutboxJob).where(OutboxJob.id.in_(job_ids)),
+                execution_options={"synchronize_session": False},
+            )
+
+    async def fail(self, failures: Sequence[Dict[str, Any]]) -> None:
+        """Store failed runs: dicts of job_id, status (pending to retry, or dead), available_at and error."""
+        if failures:
+            await self.session.execute(
+                update(_outbox_jobs)
+                .where(_outbox_jobs.c.id == bindparam("job_id"))
+                .values(
+                    status=bindparam("new_status"),
+                    available_at=bindparam("retry_at"),
+                    last_error=bindparam("error"),
+                ),
+                [
+                    {
+                        "job_id": failure["job_id"],
+                        "new_status": failure["status"],
+                        "retry_at": failure["available_at"],
+                        "error": failure["error"],
+                    }
+                    for failure in failures
+                ],
+            )
+
+    async def retry_dead(self, kind: str = "") -> int:
+        """Queue dead jobs (of one kind, or all) again with fresh attempts; returns how many."""
+        stmt = update(OutboxJob).where(OutboxJob.status == JOB_DEAD)
+        if kind:
+            stmt = stmt.where(OutboxJob.kind == kind)
+        result = await self.session.execute(
+            stmt.values(status=JOB_PENDING, attempts=0, available_at=datetime.utcnow()),
+            execution_options={"synchronize_session": False},
+        )
+        return result.rowcount
+
+    async def counts(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        result = await self.session.execute(select(OutboxJob.status, func.count()).group_by(OutboxJob.status))
+        return dict(result.all())
@@ -0,0 +1,165 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import Row, and_, bindparam, func, insert, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.catalog import Product
+from app.models.review import REVIEW_APPROVED, REVIEW_PENDING, Review
+
+_products = Product.__table__
+
+
+class ReviewRepository:
+    """Repository for reviews and the rating aggregates kept on products.
+
+    ``products.rating_count`` and ``products.rating_sum`` always equal the
+    count and sum of the product's approved reviews; every status change that
+    enters or leaves "approved" adjusts them in the same transaction, so
+    product pages never run AVG() over the reviews table.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    def _insert(self):
+        dialect = self.session.get_bind().dialect.name
+        return postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+    async def submit(self, product_slug: Optional[str], values: Dict[str, Any]) -> Optional[int]:
+        """Queue a review for moderation; returns its id, or None if the product does not exist.
+
+        The product slug is resolved inside the INSERT, so accepting a review
+        is a single statement whatever the size of the reviews table.
+        """
+        values = {**values, "status": REVIEW_PENDING, "created_at": datetime.utcnow()}
+        if product_slug is None:
+            stmt = insert(Review).values(product_id=None, **values)
+        else:
+            source = select(Product.id, *(literal(value) for value in values.values())).where(
+                Product.slug == product_slug, Product.is_active.is_(True)
+            )
+            stmt = insert(Review).from_select(["product_id", *values], source)
+        result = await self.session.execute(stmt.returning(Review.id))
+        return result.scalar_one_or_none()
+
+    async def product_rating(self, slug: str) -> Optional[Row]:
+        """(id, rating_count, rating_sum) of an active product."""
+        result = await self.session.execute(
+            select(Product.id, Product.rating_count, Product.rating_sum).where(
+                Product.slug == slug, Product.is_active.is_(True)
+            )
+        )
+        return result.one_or_none()
+
+    async def list_approved(
+        self, product_id: Optional[int], limit: int, before_id: Optional[int] = None
+    ) -> List[Review]:
+        """Approved reviews of a product (or store reviews for None), newest first.
+
+        Keyset pagination on id: every page is a range scan of
+        ix_reviews_product_approved, however deep the page.
+        """
+        product = Review.product_id.is_(None) if product_id is None else Review.product_id == product_id
+        stmt = select(Review).where(product, Review.status == REVIEW_APPROVED)
+        if before_id is not None:
+            stmt = stmt.where(Review.id < before_id)
+        result = await self.session.execute(stmt.order_by(Review.id.desc()).limit(limit))
+        return list(result.scalars())
+
+    async def list_by_status(self, status: str, limit: int, before_id: Optional[int] = None) -> List[Review]:
+        """Reviews in a moderation status, newest first (keyset on id)."""
+        stmt = select(Review).where(Review.status == status)
+        if before_id is not None:
+            stmt = stmt.where(Review.id < before_id)
+        result = await self.session.execute(stmt.order_by(Review.id.desc()).limit(limit))
+        return list(result.scalars())
+
+    async def claim_pending(self, limit: int) -> List[Review]:
+        """Oldest pending reviews, locked for this transaction.
+
+        SKIP LOCKED lets several workers (one per process) drain the queue
+        without waiting on each other; SQLite ignores the lock clause and
+        serializes writers anyway.
+        """
+        result = await self.session.execute(
+            select(Review)
+            .where(Review.status == REVIEW_PENDING)
+            .order_by(Review.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list(result.scalars())
+
+    async def set_status(self, review_ids: Iterable[int], status: str, moderated_at: datetime) -> None:
+        ids = list(review_ids)
+        if ids:
+            await self.session.execute(
+                update(Review).where(Review.id.in_(ids)).values(status=status, moderated_at=moderated_at),
+                execution_options={"synchronize_session": False},
+            )
+
+    async def transition(self, review_id: int, from_status: str, to_status: str) -> bool:
+        """Move one review between statuses unless someone else moved it first."""
+        result = await self.session.execute(
+            update(Review)
+            .where(Review.id == review_id, Review.status == from_status)
+            .values(status=to_status, moderated_at=datetime.utcnow())
+            .returning(Review.id),
+            execution_options={"synchronize_session": False},
+        )
+        return result.scalar_one_or_none() is not None
+
+    async def get(self, review_id: int) -> Optional[Review]:
+        return await self.session.get(Review, review_id, populate_existing=True)
+
+    async def add_to_ratings(self, reviews: Iterable[Review], sign: int = 1) -> None:
+        """Add (sign=1) or remove (sign=-1) approved reviews from their products' aggregates.
+
+        Deltas are summed per product first, so a batch touches each product
+        row once: one executemany UPDATE of ``count + n, sum + s``, never a
+        recount.
+        """
+        deltas: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+        for review in reviews:
+            if review.product_id is not None:
+                deltas[review.product_id][0] += sign
+                deltas[review.product_id][1] += sign * review.rating
+        if not deltas:
+            return
+        # Ordered by id so concurrent workers lock product rows in the same order
+        params = [{"pid": pid, "dc": dc, "ds": ds} for pid, (dc, ds) in sorted(deltas.items())]
+        await self.session.execute(
+            update(_products)
+            .where(_products.c.id == bindparam("pid"))
+            .values(
+                rating_count=_products.c.rating_count + bindparam("dc"),
+                rating_sum=_products.c.rating_sum + bindparam("ds"),
+            ),
+            params,
+        )
+
+    async def import_approved(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert already-moderated reviews, skipping import keys that exist; returns rows inserted."""
+        if not rows:
+            return 0
+        now = datetime.utcnow()
+        stmt = (
+            self._insert()(Review)
+            .values([{**row, "status": REVIEW_APPROVED, "moderated_at": now} for row in rows])
+            .on_conflict_do_nothing(index_elements=[Review.import_key])
+            .returning(Review.id)
+        )
+        return len((await self.session.execute(stmt)).all())
+
+    async def recompute_ratings(self) -> None:
+        """Rebuild every product's aggregates from its approved reviews (after imports or repairs)."""
+        approved = and_(Review.product_id == _products.c.id, Review.status == REVIEW_APPROVED)
+        await self.session.execute(
+            update(_products).values(
+                rating_count=select(func.count()).where(approved).scalar_subquery(),
+                rating_sum=select(func.coalesce(func.sum(Review.rating), 0)).where(approved).scalar_subquery(),
+            )
+        )
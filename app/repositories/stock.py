@@ -0,0 +1,235 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, case, func, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.catalog import Product, ProductFabric
+from app.models.stock import (
+    RESERVATION_COMMITTED,
+    RESERVATION_EXPIRED,
+    RESERVATION_HELD,
+    RESERVATION_RELEASED,
+    StockItem,
+    StockReservation,
+)
+
+# (product id, fabric key); the fabric key is the fabric id, or 0 for the base fabric
+Sku = Tuple[int, int]
+# (stock item id, quantity)
+Taken = Tuple[int, int]
+
+_stock_items = StockItem.__table__
+
+
+class StockRepository:
+    """Repository for stock shards and reservations.
+
+    Stock only ever changes with conditional, relative UPDATEs
+    (``quantity = quantity - n WHERE quantity >= n``), so concurrent orders
+    can never take more units than a shard holds, whatever they read before.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    def _insert(self):
+        dialect = self.session.get_bind().dialect.name
+        return postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+    async def shards(self, skus: Sequence[Sku]) -> Dict[Sku, List[Taken]]:
+        """Shards of the given SKUs as (id, quantity), without locking; SKUs with no stock rows are absent."""
+        if not skus:
+            return {}
+        result = await self.session.execute(
+            select(StockItem.id, StockItem.product_id, StockItem.fabric_key, StockItem.quantity)
+            .where(tuple_(StockItem.product_id, StockItem.fabric_key).in_(list(skus)))
+            .order_by(StockItem.id)
+        )
+        shards: Dict[Sku, List[Taken]] = defaultdict(list)
+        for item_id, product_id, fabric_key, quantity in result:
+            shards[(product_id, fabric_key)].append((item_id, quantity))
+        return shards
+
+    async def take(self, stock_item_id: int, quantity: int) -> bool:
+        """Take units from one shard if it still has them."""
+        result = await self.session.execute(
+            update(StockItem)
+            .where(StockItem.id == stock_item_id, StockItem.quantity >= quantity)
+            .values(quantity=StockItem.quantity - quantity, updated_at=datetime.utcnow())
+            .returning(StockItem.id),
+            execution_options={"synchronize_session": False},
+        )
+        return result.scalar_one_or_none() is not None
+
+    async def restore(self, taken: Sequence[Taken]) -> None:
+        """Put units back into their shards (one executemany UPDATE)."""
+        if taken:
+            await self.session.execute(
+                update(_stock_items)
+                .where(_stock_items.c.id == bindparam("item_id"))
+                .values(quantity=_stock_items.c.quantity + bindparam("units"), updated_at=datetime.utcnow()),
+                [{"item_id": item_id, "units": units} for item_id, units in sorted(taken)],
+            )
+
+    async def _has_status(self, order_id: int, reservation_status: str) -> bool:
+        result = await self.session.execute(
+            select(StockReservation.id)
+            .where(StockReservation.order_id == order_id, StockReservation.status == reservation_status)
+            .limit(1)
+        )
+        return result.first() is not None
+
+    async def has_reservations(self, order_id: int) -> bool:
+        """Whether the order currently holds stock."""
+        return await self._has_status(order_id, RESERVATION_HELD)
+
+    async def has_expired(self, order_id: int) -> bool:
+        """Whether the reaper took back stock held for the order."""
+        return await self._has_status(order_id, RESERVATION_EXPIRED)
+
+    async def forget_expired(self, order_id: int) -> None:
+        """Mark the expired reservations of an order as released, once a new reservation replaces them."""
+        await self.session.execute(
+            update(StockReservation)
+            .where(StockReservation.order_id == order_id, StockReservation.status == RESERVATION_EXPIRED)
+            .values(status=RESERVATION_RELEASED),
+            execution_options={"synchronize_session": False},
+        )
+
+    async def hold(self, order_id: int, taken: Sequence[Taken], expires_at: datetime) -> None:
+        if taken:
+            now = datetime.utcnow()
+            await self.session.execute(
+                self._insert()(StockReservation).values(
+                    [
+                        {
+                            "order_id": order_id,
+                            "stock_item_id": item_id,
+                            "quantity": units,
+                            "status": RESERVATION_HELD,
+                            "expires_at": expires_at,
+                            "created_at": now,
+                        }
+                        for item_id, units in taken
+                    ]
+                )
+            )
+
+    async def _end_held(self, condition: Any, new_status: str) -> List[Taken]:
+        """Move held reservations to a final status; returns the (shard, units) they held."""
+        result = await self.session.execute(
+            update(StockReservation)
+            .where(condition, StockReservation.status == RESERVATION_HELD)
+            .values(status=new_status)
+            .returning(StockReservation.stock_item_id, StockReservation.quantity),
+            execution_options={"synchronize_session": False},
+        )
+        return [tuple(row) for row in result]
+
+    async def release_order(self, order_id: int) -> List[Taken]:
+        """Release the held reservations of an order and return their units to stock."""
+        released = await self._end_held(StockReservation.order_id == order_id, RESERVATION_RELEASED)
+        await self.restore(released)
+        return released
+
+    async def commit_order(self, order_id: int) -> int:
+        """Mark the held reservations of an order as sold; returns how many there were."""
+        return len(await self._end_held(StockReservation.order_id == order_id, RESERVATION_COMMITTED))
+
+    async def release_expired(self, now: datetime, limit: int) -> int:
+        """Release up to ``limit`` expired reservations; returns the number released."""
+        expired = (
+            select(StockReservation.id)
+            .where(StockReservation.status == RESERVATION_HELD, StockReservation.expires_at < now)
+            .order_by(StockReservation.expires_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        released = await self._end_held(StockReservation.id.in_(expired), RESERVATION_EXPIRED)
+        await self.restore(released)
+        return len(released)
+
+    async def resolve_sku(self, slug: str, fabric_code: Optional[str]) -> Optional[Tuple[int, Optional[int]]]:
+        """(product id, fabric id) of a product slug and fabric code; no fabric code means the base fabric."""
+        if fabric_code is None:
+            product_id = (await self.session.execute(select(Product.id).where(Product.slug == slug))).scalar_one_or_none()
+            return (product_id, None) if product_id is not None else None
+        row = (
+            await self.session.execute(
+                select(Product.id, ProductFabric.id)
+                .join(ProductFabric, ProductFabric.product_id == Product.id)
+                .where(Product.slug == slug, ProductFabric.code == fabric_code)
+            )
+        ).one_or_none()
+        return tuple(row) if row is not None else None
+
+    async def set_quantity(self, product_id: int, fabric_id: Optional[int], quantity: int, shards: int) -> None:
+        """Set the available units of a SKU, spread evenly over ``shards`` shard rows.
+
+        Existing shards are locked first, so concurrent reservations finish
+        before the new level is written; shards beyond the new count are
+        emptied rather than deleted, as reservations still reference them.
+        """
+        fabric_key = fabric_id or 0
+        await self.session.execute(
+            select(StockItem.id)
+            .where(StockItem.product_id == product_id, StockItem.fabric_key == fabric_key)
+            .with_for_update()
+        )
+        now = datetime.utcnow()
+        rows = [
+            {
+                "product_id": product_id,
+                "fabric_id": fabric_id,
+                "fabric_key": fabric_key,
+                "shard": shard,
+                "quantity": quantity // shards + (1 if shard < quantity % shards else 0),
+                "updated_at": now,
+            }
+            for shard in range(shards)
+        ]
+        stmt = self._insert()(StockItem).values(rows)
+        await self.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[StockItem.product_id, StockItem.fabric_key, StockItem.shard],
+                set_={"quantity": stmt.excluded.quantity, "updated_at": stmt.excluded.updated_at},
+            )
+        )
+        await self.session.execute(
+            update(StockItem)
+            .where(StockItem.product_id == product_id, StockItem.fabric_key == fabric_key, StockItem.shard >= shards)
+            .values(quantity=0, updated_at=now),
+            execution_options={"synchronize_session": False},
+        )
+
+    async def levels(self, product_id: int) -> List[Dict[str, Any]]:
+        """Per fabric of a product: available units, units held by reservations and shards holding units."""
+        result = await self.session.execute(
+            select(
+                StockItem.fabric_key,
+                ProductFabric.code,
+                func.sum(StockItem.quantity),
+                func.count(case((StockItem.quantity > 0, StockItem.id))),
+            )
+            .outerjoin(ProductFabric, ProductFabric.id == StockItem.fabric_id)
+            .where(StockItem.product_id == product_id)
+            .group_by(StockItem.fabric_key, ProductFabric.code)
+            .order_by(StockItem.fabric_key)
+        )
+        levels = {
+            fabric_key: {"fabric": code, "available": available, "reserved": 0, "shards": shards}
+            for fabric_key, code, available, shards in result
+        }
+        held = await self.session.execute(
+            select(StockItem.fabric_key, func.sum(StockReservation.quantity))
+            .join(StockItem, StockItem.id == StockReservation.stock_item_id)
+            .where(StockItem.product_id == product_id, StockReservation.status == RESERVATION_HELD)
+            .group_by(StockItem.fabric_key)
+        )
+        for fabric_key, units in held:
+            levels[fabric_key]["reserved"] = units
+        return list(levels.values())
@@ -1,11 +1,18 @@
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
 
-from sqlalchemy import select
+from sqlalchemy import delete, insert, literal, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.user_cache import user_cache
 from app.models.user import RefreshToken, User
 
 
+def normalize_email(email: str) -> str:
+    """The form emails are stored and looked up in."""
+    return email.strip().lower()
+
+
 class UserRepository:
     """Repository for user operations."""
 
@@ -18,23 +25,41 @@ class UserRepository:
         return result.scalar_one_or_none()
 
     async def get_by_email(self, email: str) -> Optional[User]:
-        """Get user by email."""
+        """Get user by email (as returned by normalize_email)."""
         result = await self.session.execute(select(User).where(User.email == email))
         return result.scalar_one_or_none()
 
     async def create(self, email: str, hashed_password: str, full_name: Optional[str] = None) -> User:
         """Create a new user."""
-        user = User(email=email, hashed_password=hashed_password, full_name=full_name)
+        user = User(email=normalize_email(email), hashed_password=hashed_password, full_name=full_name)
         self.session.add(user)
         await self.session.commit()
         await self.session.refresh(user)
         return user
 
+    async def update_password(self, user_id: int, hashed_password: str) -> None:
+        """Set a new password hash and drop the cached user."""
+        await self.session.execute(
+            update(User).where(User.id == user_id).values(hashed_password=hashed_password),
+            execution_options={"synchronize_session": False},
+        )
+        await self.session.commit()
+        user_cache.invalidate(user_id)
+
+    async def set_active(self, user_id: int, is_active: bool) -> None:
+        """Enable or disable a user and drop the cached user."""
+        await self.session.execute(
+            update(User).where(User.id == user_id).values(is_active=is_active),
+            execution_options={"synchronize_session": False},
+        )
+        await self.session.commit()
+        user_cache.invalidate(user_id)
+
     async def save_refresh_token(
-        self, user_id: int, token_hash: str, device_info: Optional[str] = None
+        self, user_id: int, token_hash: str, expires_at: datetime, device_info: Optional[str] = None
     ) -> RefreshToken:
         """Save refresh token to database."""
-        token = RefreshToken(user_id=user_id, token_hash=token_hash, device_info=device_info)
+        token = RefreshToken(user_id=user_id, token_hash=token_hash, device_info=device_info, expires_at=expires_at)
         self.session.add(token)
         await self.session.commit()
         await self.session.refresh(token)
@@ -49,16 +74,141 @@ class UserRepository:
         )
         return result.scalar_one_or_none()
 
-    async def revoke_refresh_token(self, token_hash: str) -> None:
-        """Revoke a refresh token (rotation)."""
-        from datetime import datetime
-
+    async def revoke_refresh_token(self, token_hash: str) -> Optional[int]:
+        """Revoke a refresh token (rotation); returns its owner's id, or None if it was not active."""
         token = await self.get_refresh_token(token_hash)
         if token:
             token.revoked_at = datetime.utcnow()
             await self.session.commit()
+            return token.user_id
+        return None
+
+    async def list_sessions(self, user_id: int, limit: int, before_id: Optional[int] = None) -> List[RefreshToken]:
+        """A user's active refresh tokens, newest first.
+
+        Keyset pagination on id: every page is a range scan of
+        ix_refresh_tokens_user_id (user_id, id), however many sessions there are.
+        """
+        stmt = select(RefreshToken).where(
+            RefreshToken.user_id == user_id,
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > datetime.utcnow(),
+        )
+        if before_id is not None:
+            stmt = stmt.where(RefreshToken.id < before_id)
+        result = await self.session.execute(stmt.order_by(RefreshToken.id.desc()).limit(limit))
+        return list(result.scalars())
 
+    async def revoke_session(self, user_id: int, session_id: int) -> bool:
+        """Revoke one of the user's refresh tokens by id; False if it is not theirs or not active."""
+        result = await self.session.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.id == session_id,
+                RefreshToken.user_id == user_id,
+                RefreshToken.revoked_at.is_(None),
+            )
+            .values(revoked_at=datetime.utcnow()),
+            execution_options={"synchronize_session": False},
+        )
+        await self.session.commit()
+        return result.rowcount > 0
 
+    async def revoke_all_sessions(self, user_id: int) -> int:
+        """Revoke every active refresh token of a user and bump their token_version.
 
+        One UPDATE per table in a single transaction, however many sessions the
+        user has. The new version makes all access tokens issued so far invalid
+        (see get_current_user). Returns the number of refresh tokens revoked.
+        """
+        result = await self.session.execute(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.utcnow()),
+            execution_options={"synchronize_session": False},
+        )
+        await self.session.execute(
+            update(User).where(User.id == user_id).values(token_version=User.token_version + 1),
+            execution_options={"synchronize_session": False},
+        )
+        await self.session.commit()
+        user_cache.invalidate(user_id)
+        return result.rowcount
+
+    async def rotate_refresh_token(
+        self, old_token_hash: str, new_token_hash: str, expires_at: datetime
+    ) -> Optional[int]:
+        """Revoke a refresh token and store its replacement in one transaction.
+
+        The old token is claimed with ``UPDATE ... WHERE revoked_at IS NULL RETURNING``,
+        so of several concurrent refreshes with the same token only one succeeds.
+        On PostgreSQL both statements run as a single CTE (one round-trip).
+        Returns the owner's user id, or None if the token is unknown or already revoked.
+        """
+        now = datetime.utcnow()
+        revoke = (
+            update(RefreshToken)
+            .where(RefreshToken.token_hash == old_token_hash, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=now)
+            .returning(RefreshToken.user_id, RefreshToken.device_info)
+        )
 
-
+        if self.session.get_bind().dialect.name == "postgresql":
+            revoked = revoke.cte("revoked")
+            stmt = (
+                insert(RefreshToken)
+                .from_select(
+                    ["user_id", "token_hash", "device_info", "issued_at", "expires_at"],
+                    select(
+                        revoked.c.user_id,
+                        literal(new_token_hash),
+                        revoked.c.device_info,
+                        literal(now),
+                        literal(expires_at),
+                    ),
+                )
+                .returning(RefreshToken.user_id)
+            )
+            user_id = (await self.session.execute(stmt)).scalar_one_or_none()
+        else:
+            row = (
+                await self.session.execute(revoke, execution_options={"synchronize_session": False})
+            ).one_or_none()
+            user_id = None
+            if row is not None:
+                user_id = row.user_id
+                await self.session.execute(
+                    insert(RefreshToken).values(
+                        user_id=row.user_id,
+                        token_hash=new_token_hash,
+                        device_info=row.device_info,
+                        issued_at=now,
+                        expires_at=expires_at,
+                    )
+                )
+
+        if user_id is None:
+            await self.session.rollback()
+            return None
+        await self.session.commit()
+        return user_id
+
+    async def delete_stale_refresh_tokens(self, revoked_before: datetime, limit: int) -> int:
+        """Delete up to ``limit`` expired tokens or tokens revoked before ``revoked_before``.
+
+        Each call is its own short transaction so the reaper never holds locks for long;
+        on PostgreSQL rows locked by concurrent refreshes are skipped.
+        """
+        stale = (
+            select(RefreshToken.id)
+            .where(or_(RefreshToken.expires_at < datetime.utcnow(), RefreshToken.revoked_at < revoked_before))
+            .limit(limit)
+        )
+        if self.session.get_bind().dialect.name == "postgresql":
+            stale = stale.with_for_update(skip_locked=True)
+        result = await self.session.execute(
+            delete(RefreshToken).where(RefreshToken.id.in_(stale.scalar_subquery())),
+            execution_options={"synchronize_session": False},
+        )
+        await self.session.commit()
+        return result.rowcount
@@ -1,19 +1,31 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from fastapi.security import HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.db import get_session
+from app.core.request_context import TimedRoute
 from app.core.security import get_current_user
 from app.models.user import User
-from app.schemas.auth import LoginRequest, RefreshRequest, TokenResponse
+from app.schemas.auth import LoginRequest, RefreshRequest, SessionPage, SessionsRevoked, TokenResponse
 from app.services.auth import AuthService
+from app.services.cart import CART_COOKIE
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=TimedRoute)
 security = HTTPBearer(auto_error=False)
 
 
+def _auth_service(request: Request, session: AsyncSession) -> AuthService:
+    """AuthService recording the client's IP and User-Agent in the audit trail."""
+    return AuthService(
+        session,
+        ip=request.client.host if request.client else None,
+        device_info=request.headers.get("User-Agent", "unknown"),
+    )
+
+
 @router.post("/login", response_model=TokenResponse, status_code=status.HTTP_200_OK)
 async def login(
     request: Request,
@@ -22,11 +34,10 @@ async def login(
     session: AsyncSession = Depends(get_session),
 ):
     """Login endpoint. Returns access token and sets refresh token in HttpOnly cookie."""
-    auth_service = AuthService(session)
-    device_info = request.headers.get("User-Agent", "unknown")
+    auth_service = _auth_service(request, session)
 
     access_token, refresh_token = await auth_service.login(
-        login_data.email, login_data.password, device_info
+        login_data.email, login_data.password, cart_token=request.cookies.get(CART_COOKIE)
     )
 
     # Set refresh token in HttpOnly, Secure, SameSite cookie
@@ -38,6 +49,9 @@ async def login(
         samesite="lax",
         max_age=30 * 24 * 60 * 60,  # 30 days
     )
+    # The anonymous cart has been merged into the user's cart
+    if CART_COOKIE in request.cookies:
+        response.delete_cookie(key=CART_COOKIE, httponly=True, secure=True, samesite="lax")
 
     return TokenResponse(access_token=access_token)
 
@@ -56,7 +70,7 @@ async def refresh(
             detail="Refresh token not found",
         )
 
-    auth_service = AuthService(session)
+    auth_service = _auth_service(request, session)
     new_access_token, new_refresh_token = await auth_service.refresh(refresh_token)
 
     # Set new refresh token in cookie (rotation)
@@ -81,7 +95,7 @@ async def logout(
     """Logout endpoint. Revokes refresh token."""
     refresh_token = request.cookies.get("refresh_token")
     if refresh_token:
-        auth_service = AuthService(session)
+        auth_service = _auth_service(request, session)
         await auth_service.logout(refresh_token)
 
     # Clear cookie
@@ -90,6 +104,44 @@ async def logout(
     return {"message": "Logged out successfully"}
 
 
+@router.get("/sessions", response_model=SessionPage)
+async def list_sessions(
+    request: Request,
+    limit: int = Query(settings.session_page_size, ge=1, le=100),
+    cursor: Optional[str] = Query(None, max_length=64),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Devices the user is logged in on (active refresh tokens), newest first."""
+    return await _auth_service(request, session).list_sessions(
+        current_user.id, limit, cursor, request.cookies.get("refresh_token")
+    )
+
+
+@router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_session(
+    request: Request,
+    session_id: int,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Log out one device."""
+    await _auth_service(request, session).revoke_session(current_user.id, session_id)
+
+
+@router.delete("/sessions", response_model=SessionsRevoked)
+async def revoke_all_sessions(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Log out everywhere, this device included: every refresh and access token stops working."""
+    revoked = await _auth_service(request, session).revoke_all_sessions(current_user.id)
+    response.delete_cookie(key="refresh_token", httponly=True, secure=True, samesite="lax")
+    return SessionsRevoked(revoked=revoked)
+
+
 @router.get("/me")
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Get current user info."""
@@ -0,0 +1,99 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import get_session
+from app.core.request_context import TimedRoute
+from app.core.security import get_optional_user
+from app.models.user import User
+from app.schemas.cart import CartLineUpdate, CartReplace, CartResponse
+from app.services.cart import CART_COOKIE, CartService
+
+router = APIRouter(prefix="/cart", tags=["cart"], route_class=TimedRoute)
+
+# Signed-in users get their own cart; anonymous visitors get one keyed by an
+# HttpOnly cookie, which is merged into the user's cart on login. All
+# mutations set absolute quantities, so they are safe to retry.
+
+
+def _user_id(user: Optional[User]) -> Optional[int]:
+    return user.id if user is not None else None
+
+
+def _set_cart_cookie(response: Response, cart_token: Optional[str]) -> None:
+    if cart_token:
+        response.set_cookie(
+            key=CART_COOKIE,
+            value=cart_token,
+            httponly=True,
+            secure=True,
+            samesite="lax",
+            max_age=settings.cart_cookie_max_age_days * 24 * 60 * 60,
+        )
+
+
+@router.get("", response_model=CartResponse)
+async def get_cart(
+    request: Request,
+    user: Optional[User] = Depends(get_optional_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Cart priced at current catalog prices."""
+    return await CartService(session).get_cart(_user_id(user), request.cookies.get(CART_COOKIE))
+
+
+@router.put("", response_model=CartResponse)
+async def replace_cart(
+    request: Request,
+    response: Response,
+    cart: CartReplace,
+    user: Optional[User] = Depends(get_optional_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Replace the whole cart (e.g. to upload a cart kept in localStorage)."""
+    result, cart_token = await CartService(session).replace(
+        _user_id(user), request.cookies.get(CART_COOKIE), cart.items
+    )
+    _set_cart_cookie(response, cart_token)
+    return result
+
+
+@router.delete("", response_model=CartResponse)
+async def clear_cart(
+    request: Request,
+    user: Optional[User] = Depends(get_optional_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Remove all lines."""
+    result, _ = await CartService(session).replace(_user_id(user), request.cookies.get(CART_COOKIE), [])
+    return result
+
+
+@router.put("/items", response_model=CartResponse)
+async def set_cart_item(
+    request: Request,
+    response: Response,
+    item: CartLineUpdate,
+    user: Optional[User] = Depends(get_optional_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Set the quantity of a product in a fabric; quantity 0 removes the line."""
+    result, cart_token = await CartService(session).set_item(_user_id(user), request.cookies.get(CART_COOKIE), item)
+    _set_cart_cookie(response, cart_token)
+    return result
+
+
+@router.delete("/items", response_model=CartResponse)
+async def remove_cart_item(
+    request: Request,
+    product: str = Query(..., max_length=64),
+    fabric: Optional[str] = Query(None, max_length=64),
+    user: Optional[User] = Depends(get_optional_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Remove a line."""
+    item = CartLineUpdate(product=product, fabric=fabric, quantity=0)
+    result, _ = await CartService(session).set_item(_user_id(user), request.cookies.get(CART_COOKIE), item)
+    return result
@@ -0,0 +1,87 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import get_session
+from app.core.request_context import TimedRoute
+from app.schemas.catalog import ProductDetail, ProductPage, SearchResponse
+from app.services.catalog import CatalogService
+from app.services.catalog_search import CatalogSearchService
+from app.services.catalog_snapshot import CatalogSnapshot, catalog_snapshots
+
+router = APIRouter(prefix="/catalog", tags=["catalog"], route_class=TimedRoute)
+
+# Listing and product pages are served from the in-memory catalog snapshot:
+# pre-serialized, precompressed bodies with strong ETags, and no database
+# access per request. With the snapshot disabled, or before the first one is
+# built, they fall back to CatalogService's keyset queries rather than making
+# the request wait for a full build. Search goes to the database's full-text index.
+
+
+def current_snapshot() -> Optional[CatalogSnapshot]:
+    return catalog_snapshots.current() if settings.catalog_snapshot_enabled else None
+
+
+@router.get("/products", response_model=ProductPage)
+async def list_products(
+    request: Request,
+    category: Optional[str] = Query(None, max_length=32),
+    min_price: Optional[int] = Query(None, ge=0),
+    max_price: Optional[int] = Query(None, ge=0),
+    sort: Literal["popular", "price-asc", "price-desc", "new"] = "popular",
+    limit: int = Query(settings.catalog_page_size, ge=1, le=100),
+    cursor: Optional[str] = Query(None, max_length=256),
+    session: AsyncSession = Depends(get_session),
+):
+    """List products with filters; follow next_cursor for the next page."""
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return await CatalogService(session).list_products(
+            sort, limit, category=category, min_price=min_price, max_price=max_price, cursor=cursor
+        )
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="min_price must not exceed max_price",
+        )
+    body = snapshot.listing(sort, limit, category=category, min_price=min_price, max_price=max_price, cursor=cursor)
+    return body.response(request)
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=200),
+    category: Optional[str] = Query(None, max_length=32),
+    fabric: Optional[str] = Query(None, max_length=64),
+    min_price: Optional[int] = Query(None, ge=0),
+    max_price: Optional[int] = Query(None, ge=0),
+    limit: int = Query(settings.catalog_page_size, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=settings.catalog_search_max_offset),
+    session: AsyncSession = Depends(get_session),
+):
+    """Full-text search with category, fabric type and price facet counts."""
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="min_price must not exceed max_price",
+        )
+    return await CatalogSearchService(session).search(
+        q, limit, offset, category=category, fabric=fabric, min_price=min_price, max_price=max_price
+    )
+
+
+@router.get("/products/{slug}", response_model=ProductDetail)
+async def get_product(request: Request, slug: str, session: AsyncSession = Depends(get_session)):
+    """Product page with fabrics, specs and dimensions."""
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return await CatalogService(session).get_product(slug)
+    body = snapshot.detail(slug)
+    if body is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found",
+        )
+    return body.response(request)
@@ -0,0 +1,29 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import get_session
+from app.core.request_context import TimedRoute
+from app.core.security import get_optional_user
+from app.models.user import User
+from app.schemas.delivery import QuoteBatchRequest, QuoteBatchResponse
+from app.services.cart import CART_COOKIE
+from app.services.delivery_quotes import quote_batch
+
+router = APIRouter(prefix="/delivery", tags=["delivery"], route_class=TimedRoute)
+
+
+@router.post("/quotes", response_model=QuoteBatchResponse)
+async def quote_delivery(
+    request: Request,
+    batch: QuoteBatchRequest,
+    user: Optional[User] = Depends(get_optional_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Quote delivery to several addresses and tariffs at once (quoted concurrently, cached).
+
+    Without ``weight`` the weight of the caller's cart is used. A quote the
+    delivery service failed to produce carries an ``error`` instead of a price.
+    """
+    return await quote_batch(session, user.id if user is not None else None, request.cookies.get(CART_COOKIE), batch)
@@ -1,6 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
 
-router = APIRouter()
+from app.core.request_context import TimedRoute
+from app.services.health import loop_lag_monitor, readiness_monitor
+
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get("/health")
@@ -10,9 +14,13 @@ async def health():
 
 @router.get("/ready")
 async def ready():
-    return {"status": "ready"}
-
-
-
+    """Cached dependency checks; never queries the database itself."""
+    is_ready, body = readiness_monitor.status()
+    return JSONResponse(body, status_code=status.HTTP_200_OK if is_ready else status.HTTP_503_SERVICE_UNAVAILABLE)
 
 
+@router.get("/live")
+async def live():
+    """Fails when the event loop has been blocked for longer than liveness_max_loop_lag."""
+    is_alive, body = loop_lag_monitor.status()
+    return JSONResponse(body, status_code=status.HTTP_200_OK if is_alive else status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+
+from app.core.db import pool_stats
+from app.core.request_context import TimedRoute
+from app.services.delivery_quotes import delivery_quotes
+
+# Operational endpoints; not proxied by Nginx (see deploy/setup.sh)
+router = APIRouter(prefix="/internal", include_in_schema=False, route_class=TimedRoute)
+
+
+@router.get("/db/pool")
+async def db_pool():
+    return pool_stats()
+
+
+@router.get("/delivery/quotes")
+async def delivery_quote_cache():
+    return delivery_quotes.stats()
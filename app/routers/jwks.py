@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Request, Response, status
+
+from app.core.config import settings
+from app.core.jwt_keys import keyring
+from app.core.request_context import TimedRoute
+
+router = APIRouter(tags=["auth"], route_class=TimedRoute)
+
+
+@router.get("/.well-known/jwks.json")
+async def jwks(request: Request):
+    """Public keys for verifying our tokens without calling this API; serialized once at startup."""
+    headers = {
+        "Cache-Control": f"public, max-age={settings.jwks_max_age}",
+        "ETag": f'"{keyring.jwks_etag}"',
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if keyring.jwks_etag in if_none_match or if_none_match.strip() == "*":
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=keyring.jwks, media_type="application/jwk-set+json", headers=headers)
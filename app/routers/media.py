@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, File, Request, Response, UploadFile, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import get_session
+from app.core.request_context import TimedRoute
+from app.core.security import get_current_superuser
+from app.models.user import User
+from app.schemas.media import ImageResponse
+from app.services.media import MediaService, serve_media
+
+router = APIRouter(prefix="/media", tags=["media"], route_class=TimedRoute)
+
+
+@router.post("/images", response_model=ImageResponse, status_code=status.HTTP_201_CREATED)
+async def upload_image(
+    response: Response,
+    file: UploadFile = File(...),
+    user: User = Depends(get_current_superuser),
+    session: AsyncSession = Depends(get_session),
+):
+    """Upload a JPEG, PNG, WebP or AVIF image (up to MEDIA_MAX_UPLOAD_SIZE).
+
+    Responsive WebP/AVIF variants are made in the background; poll the image
+    until its status is "ready". Uploading an existing image returns it with 200.
+    """
+    image, created = await MediaService(session).upload(user.id, file)
+    if not created:
+        response.status_code = status.HTTP_200_OK
+    return image
+
+
+@router.get("/images/{image_id}", response_model=ImageResponse)
+async def get_image(
+    image_id: int,
+    _: User = Depends(get_current_superuser),
+    session: AsyncSession = Depends(get_session),
+):
+    """Image with its processing status and variants."""
+    return await MediaService(session).get(image_id)
+
+
+@router.get("/{name}", include_in_schema=False)
+async def media_file(name: str, request: Request):
+    """Original or variant by its content-hashed name; supports Range."""
+    return serve_media(request, name)
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import registry
+from app.core.request_context import TimedRoute
+
+# Scraped by Prometheus from inside the network; not proxied by Nginx (see deploy/setup.sh)
+router = APIRouter(include_in_schema=False, route_class=TimedRoute)
+
+
+@router.get("/metrics")
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,37 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import get_session
+from app.core.request_context import TimedRoute
+from app.core.security import get_optional_user
+from app.models.user import User
+from app.schemas.order import CheckoutRequest, OrderResponse
+from app.services.cart import CART_COOKIE
+from app.services.orders import OrderService
+
+router = APIRouter(prefix="/orders", tags=["orders"], route_class=TimedRoute)
+
+
+@router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
+async def checkout(
+    request: Request,
+    response: Response,
+    data: CheckoutRequest,
+    idempotency_key: str = Header(..., min_length=8, max_length=64),
+    user: Optional[User] = Depends(get_optional_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Place an order from the cart: charge it (unless cash on delivery) and book the delivery.
+
+    The Idempotency-Key header (e.g. a UUID generated when the checkout form
+    is shown) makes the request safe to retry: a repeated key returns the
+    original order, or its original error, with ``Idempotent-Replayed: true``.
+    """
+    order, replayed = await OrderService(session).checkout(
+        user.id if user is not None else None, request.cookies.get(CART_COOKIE), idempotency_key, data
+    )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return order
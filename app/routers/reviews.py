@@ -0,0 +1,64 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import get_session
+from app.core.request_context import TimedRoute
+from app.core.security import get_current_superuser, get_optional_user
+from app.models.user import User
+from app.schemas.review import (
+    ModerationPage,
+    ModerationReview,
+    ReviewAccepted,
+    ReviewCreate,
+    ReviewModeration,
+    ReviewPage,
+)
+from app.services.reviews import ReviewService
+
+router = APIRouter(prefix="/reviews", tags=["reviews"], route_class=TimedRoute)
+
+
+@router.get("", response_model=ReviewPage)
+async def list_reviews(
+    product: Optional[str] = Query(None, max_length=64),
+    limit: int = Query(settings.review_page_size, ge=1, le=100),
+    cursor: Optional[str] = Query(None, max_length=64),
+    session: AsyncSession = Depends(get_session),
+):
+    """Approved reviews of a product (or of the store without ``product``), newest first."""
+    return await ReviewService(session).list_reviews(product, limit, cursor)
+
+
+@router.post("", response_model=ReviewAccepted, status_code=status.HTTP_202_ACCEPTED)
+async def submit_review(
+    data: ReviewCreate,
+    user: Optional[User] = Depends(get_optional_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Submit a review; it is moderated in the background and listed once approved."""
+    return await ReviewService(session).submit(user.id if user is not None else None, data)
+
+
+@router.get("/moderation", response_model=ModerationPage)
+async def moderation_queue(
+    limit: int = Query(settings.review_page_size, ge=1, le=100),
+    cursor: Optional[str] = Query(None, max_length=64),
+    _: User = Depends(get_current_superuser),
+    session: AsyncSession = Depends(get_session),
+):
+    """Reviews held for a moderator by the automatic checks."""
+    return await ReviewService(session).moderation_queue(limit, cursor)
+
+
+@router.patch("/{review_id}", response_model=ModerationReview)
+async def moderate_review(
+    review_id: int,
+    data: ReviewModeration,
+    _: User = Depends(get_current_superuser),
+    session: AsyncSession = Depends(get_session),
+):
+    """Approve or reject a review (also one that is already published)."""
+    return await ReviewService(session).moderate(review_id, data.status)
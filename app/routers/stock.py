@@ -0,0 +1,34 @@
+from typing import List
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import get_session
+from app.core.request_context import TimedRoute
+from app.core.security import get_current_superuser
+from app.models.user import User
+from app.schemas.stock import StockLevel, StockUpdate
+from app.services.stock import StockService
+
+router = APIRouter(prefix="/stock", tags=["stock"], route_class=TimedRoute)
+
+
+@router.get("/{slug}", response_model=List[StockLevel])
+async def get_stock(
+    slug: str,
+    _: User = Depends(get_current_superuser),
+    session: AsyncSession = Depends(get_session),
+):
+    """Stock of a product per fabric; empty for a product made to order."""
+    return await StockService(session).levels(slug)
+
+
+@router.put("/{slug}", response_model=List[StockLevel])
+async def set_stock(
+    slug: str,
+    data: StockUpdate,
+    _: User = Depends(get_current_superuser),
+    session: AsyncSession = Depends(get_session),
+):
+    """Set the available units of a product or of one of its fabrics."""
+    return await StockService(session).set_level(slug, data)
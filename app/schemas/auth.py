@@ -0,0 +1,48 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class LoginRequest(BaseModel):
+    """Login request body."""
+
+    email: str
+    password: str
+
+
+class RefreshRequest(BaseModel):
+    """Refresh request body (refresh token normally comes from the cookie)."""
+
+    refresh_token: Optional[str] = None
+
+
+class TokenResponse(BaseModel):
+    """Access token response."""
+
+    access_token: str
+    token_type: str = "bearer"
+
+
+class SessionResponse(BaseModel):
+    """An active refresh token, i.e. a device the user is logged in on."""
+
+    id: int
+    device_info: Optional[str] = None
+    issued_at: datetime
+    expires_at: datetime
+    current: bool = False  # the session making this request
+
+    class Config:
+        orm_mode = True
+
+
+class SessionPage(BaseModel):
+    """One page of sessions, newest first; pass next_cursor back to get the following page."""
+
+    items: List[SessionResponse]
+    next_cursor: Optional[str] = None
+
+
+class SessionsRevoked(BaseModel):
+    revoked: int
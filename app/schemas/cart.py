@@ -0,0 +1,41 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+
+
+class CartLineUpdate(BaseModel):
+    """Desired state of one cart line; quantity 0 removes it."""
+
+    product: str = Field(..., max_length=64)  # product slug
+    fabric: Optional[str] = Field(None, max_length=64)  # fabric code; None for the base fabric
+    quantity: int = Field(..., ge=0, le=settings.cart_max_quantity)
+
+
+class CartReplace(BaseModel):
+    """Full cart contents, e.g. a cart kept in localStorage before the first sync."""
+
+    items: List[CartLineUpdate] = Field(..., max_items=settings.cart_max_lines)
+
+
+class CartLine(BaseModel):
+    """Cart line priced at current catalog prices."""
+
+    product: str
+    name: str
+    image: Optional[str] = None
+    fabric: Optional[str] = None
+    fabric_name: Optional[str] = None
+    unit_price: int  # product price plus fabric price_delta
+    quantity: int
+    line_total: int
+    weight: Optional[float] = None  # kg per unit
+
+
+class CartResponse(BaseModel):
+    """Cart with server-side prices; the client never supplies prices."""
+
+    items: List[CartLine]
+    quantity: int
+    total: int
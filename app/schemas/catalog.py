@@ -0,0 +1,82 @@
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class FabricResponse(BaseModel):
+    """Upholstery option of a product."""
+
+    code: str
+    name: str
+    price_delta: int
+    color: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
+
+class ProductSummary(BaseModel):
+    """Product card in catalog listings."""
+
+    slug: str
+    category: str
+    name: str
+    badge: Optional[str] = None
+    price: int
+    old_price: Optional[int] = None
+    short: str
+    image: Optional[str] = None
+    rating: Optional[float] = None  # average of approved reviews
+    rating_count: int = 0
+
+
+class ProductDetail(BaseModel):
+    """Full product page."""
+
+    slug: str
+    category: str
+    name: str
+    badge: Optional[str] = None
+    price: int
+    old_price: Optional[int] = None
+    short: str
+    description: str
+    images: List[str]
+    specs: Dict[str, Any]
+    dimensions: Dict[str, Any]
+    fabrics: List[FabricResponse]
+    rating: Optional[float] = None
+    rating_count: int = 0
+
+    class Config:
+        orm_mode = True
+
+
+class ProductPage(BaseModel):
+    """One page of a catalog listing; pass next_cursor back to get the following page."""
+
+    items: List[ProductSummary]
+    next_cursor: Optional[str] = None
+
+
+class FacetCount(BaseModel):
+    """Number of search hits with one facet value."""
+
+    value: str
+    count: int
+
+
+class SearchFacets(BaseModel):
+    """Facet counts over all hits of a search, most frequent first."""
+
+    category: List[FacetCount]
+    fabric: List[FacetCount]
+    price: List[FacetCount]  # values like "30000-50000" and "120000+"
+
+
+class SearchResponse(BaseModel):
+    """One page of search hits, best match first."""
+
+    total: int
+    items: List[ProductSummary]
+    facets: SearchFacets
@@ -0,0 +1,34 @@
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+
+Tariff = Literal["courier", "express"]
+
+
+class QuoteRequest(BaseModel):
+    address: str = Field(..., min_length=5, max_length=500)
+    tariff: Tariff = "courier"
+
+
+class QuoteBatchRequest(BaseModel):
+    """Addresses and tariffs to quote for one shipment weight."""
+
+    quotes: List[QuoteRequest] = Field(..., min_items=1, max_items=settings.delivery_quote_max_batch)
+    weight: Optional[float] = Field(None, gt=0, le=5000)  # kg; defaults to the weight of the caller's cart
+
+
+class QuoteResponse(BaseModel):
+    """A quote, or the error of the delivery service for this address."""
+
+    address: str
+    tariff: str
+    weight: float  # billable weight, kg
+    price: Optional[int] = None
+    eta: Optional[str] = None
+    error: Optional[str] = None
+
+
+class QuoteBatchResponse(BaseModel):
+    quotes: List[QuoteResponse]  # in request order
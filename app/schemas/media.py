@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class ImageVariant(BaseModel):
+    """Resized copy of an image in a modern format."""
+
+    width: int
+    format: str  # "webp" or "avif"
+    size: int  # bytes
+    url: str
+
+
+class ImageResponse(BaseModel):
+    """Uploaded image; every URL is immutable and may be cached forever."""
+
+    id: int
+    sha256: str
+    url: str  # the original
+    content_type: str
+    size: int
+    width: Optional[int] = None  # known once processed
+    height: Optional[int] = None
+    status: str  # pending, processing, ready or failed
+    variants: List[ImageVariant]
+    srcset: Dict[str, str]  # by format, ready for <source type="image/..." srcset="...">
+    created_at: datetime
@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class CheckoutRequest(BaseModel):
+    """Checkout form; the items and prices come from the server-side cart."""
+
+    name: str = Field(..., min_length=1, max_length=255)
+    phone: str = Field(..., min_length=5, max_length=32)
+    email: Optional[str] = Field(None, max_length=255)
+    address: str = Field(..., min_length=5, max_length=500)
+    comment: Optional[str] = Field(None, max_length=2000)
+    pay: Literal["online", "cod"] = "online"  # "cod": cash on delivery, no payment call
+
+
+class OrderItemResponse(BaseModel):
+    product: str
+    name: str
+    fabric_name: Optional[str] = None
+    unit_price: int
+    quantity: int
+
+
+class OrderResponse(BaseModel):
+    """Order as stored, including the payment and delivery references."""
+
+    id: int
+    status: str
+    items: List[OrderItemResponse]
+    items_total: int
+    delivery_price: int
+    total: int
+    payment_method: str
+    transaction_id: Optional[str] = None
+    delivery_id: Optional[str] = None
+    tracking: Optional[str] = None
+    eta: Optional[str] = None
+    created_at: datetime
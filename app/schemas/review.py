@@ -0,0 +1,56 @@
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class ReviewCreate(BaseModel):
+    """Review form; without a product it is a review of the store."""
+
+    product: Optional[str] = Field(None, max_length=64)  # product slug
+    author: str = Field(..., min_length=1, max_length=100)
+    rating: int = Field(..., ge=1, le=5)
+    text: str = Field(..., min_length=3, max_length=2000)
+
+
+class ReviewAccepted(BaseModel):
+    """Submitted review; it is listed once moderation approves it."""
+
+    id: int
+    status: str
+
+
+class ReviewResponse(BaseModel):
+    id: int
+    author: str
+    rating: int
+    text: str
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class ReviewPage(BaseModel):
+    """One page of approved reviews, newest first, with the product's rating."""
+
+    rating: Optional[float] = None
+    rating_count: int = 0
+    items: List[ReviewResponse]
+    next_cursor: Optional[str] = None
+
+
+class ModerationReview(ReviewResponse):
+    product_id: Optional[int] = None
+    status: str
+
+
+class ModerationPage(BaseModel):
+    items: List[ModerationReview]
+    next_cursor: Optional[str] = None
+
+
+class ReviewModeration(BaseModel):
+    """Moderator's decision on a review."""
+
+    status: Literal["approved", "rejected"]
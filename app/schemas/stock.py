@@ -0,0 +1,18 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class StockUpdate(BaseModel):
+    """New stock level of a product, or of one of its fabrics."""
+
+    fabric: Optional[str] = Field(None, max_length=64)  # fabric code; none for the base fabric
+    quantity: int = Field(..., ge=0)  # units available, not counting those already reserved
+    shards: Optional[int] = Field(None, ge=1, le=64)  # rows the units are spread over; defaults to the setting
+
+
+class StockLevel(BaseModel):
+    fabric: Optional[str]
+    available: int
+    reserved: int  # held by checkouts in progress
+    shards: int  # shard rows with units left
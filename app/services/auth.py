@@ -1,92 +1,160 @@
-from datetime import datetime
+import base64
+import math
+from datetime import datetime, timedelta
 from typing import Optional
 
 from fastapi import HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.security import (
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    averify_password,
     create_access_token,
     create_refresh_token,
     decode_token,
-    get_password_hash,
-    verify_password,
 )
-from app.repositories.user import UserRepository
+from app.repositories.user import UserRepository, normalize_email
+from app.schemas.auth import SessionPage, SessionResponse
+from app.services.auth_events import auth_event_log, login_throttle
+from app.services.cart import CartService
+
+
+def _refresh_token_expiry() -> datetime:
+    return datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+
+
+def encode_cursor(session_id: int) -> str:
+    """Opaque cursor pointing just past a session (sessions are listed newest first)."""
+    return base64.urlsafe_b64encode(str(session_id).encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
 
 
 class AuthService:
-    """Authentication service."""
+    """Authentication service.
 
-    def __init__(self, session: AsyncSession):
+    Every login, refresh and logout is recorded in the audit trail with the
+    client's IP and device (buffered, see AuthEventLog), and failed logins
+    count towards the per-account lockout.
+    """
+
+    def __init__(self, session: AsyncSession, ip: Optional[str] = None, device_info: Optional[str] = None):
         self.session = session
         self.user_repo = UserRepository(session)
+        self.ip = ip
+        self.device_info = device_info
+
+    def _audit(self, event: str, outcome: str, user_id: Optional[int] = None, email: Optional[str] = None) -> None:
+        auth_event_log.record(event, outcome, user_id, email, self.ip, self.device_info)
+
+    async def login(self, email: str, password: str, cart_token: Optional[str] = None) -> tuple[str, str]:
+        """Authenticate user and return access + refresh tokens.
+
+        An anonymous cart (``cart_token`` cookie) is merged into the user's cart.
+        """
+        # One spelling of the address for the lockout, the lookup and the audit trail
+        email = normalize_email(email)
+        retry_after = login_throttle.retry_after(email)
+        if retry_after:
+            # Rejected before the password check, so a locked account costs no bcrypt round
+            self._audit("login", "locked", email=email)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many failed login attempts, try again later",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
 
-    async def login(self, email: str, password: str, device_info: Optional[str] = None) -> tuple[str, str]:
-        """Authenticate user and return access + refresh tokens."""
         user = await self.user_repo.get_by_email(email)
-        if not user or not verify_password(password, user.hashed_password):
+        if not user or not await averify_password(password, user.hashed_password):
+            login_throttle.record_failure(email)
+            self._audit("login", "invalid_credentials", user.id if user else None, email)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
             )
 
         if not user.is_active:
+            self._audit("login", "disabled", user.id, email)
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="User account is disabled",
             )
 
         # Create tokens
-        access_token = create_access_token(data={"sub": user.id})
-        refresh_token = create_refresh_token(data={"sub": user.id})
+        access_token = create_access_token(data={"sub": str(user.id), "ver": user.token_version})
+        refresh_token = create_refresh_token(data={"sub": str(user.id)})
 
         # Hash and save refresh token
         import hashlib
 
         token_hash = hashlib.sha256(refresh_token.encode()).hexdigest()
-        await self.user_repo.save_refresh_token(user.id, token_hash, device_info)
+        await self.user_repo.save_refresh_token(user.id, token_hash, _refresh_token_expiry(), self.device_info)
+        if cart_token:
+            await CartService(self.session).merge_anonymous_cart(user.id, cart_token)
 
+        login_throttle.reset(email)
+        self._audit("login", "success", user.id, email)
         return access_token, refresh_token
 
     async def refresh(self, refresh_token: str) -> tuple[str, str]:
         """Refresh access token with rotation."""
         # Decode token
-        payload = decode_token(refresh_token)
+        try:
+            payload = decode_token(refresh_token)
+        except HTTPException:
+            self._audit("refresh", "invalid_token")
+            raise
         if payload.get("type") != "refresh":
+            self._audit("refresh", "invalid_token")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token type",
             )
 
-        user_id: int = payload.get("sub")
-        if user_id is None:
+        subject: Optional[str] = payload.get("sub")
+        if subject is None:
+            self._audit("refresh", "invalid_token")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token payload",
             )
+        user_id = int(subject)
 
-        # Check token in database
+        # Rotate: revoke the presented token and store the new one atomically
         import hashlib
 
         token_hash = hashlib.sha256(refresh_token.encode()).hexdigest()
-        stored_token = await self.user_repo.get_refresh_token(token_hash)
-        if not stored_token:
+        new_refresh_token = create_refresh_token(data={"sub": str(user_id)})
+        new_token_hash = hashlib.sha256(new_refresh_token.encode()).hexdigest()
+
+        owner_id = await self.user_repo.rotate_refresh_token(token_hash, new_token_hash, _refresh_token_expiry())
+        if owner_id is None:
+            # A validly signed but revoked token presented again may have been stolen
+            self._audit("refresh", "revoked", user_id)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid or revoked refresh token",
             )
 
-        # Revoke old token (rotation)
-        await self.user_repo.revoke_refresh_token(token_hash)
-
-        # Create new tokens
-        new_access_token = create_access_token(data={"sub": user_id})
-        new_refresh_token = create_refresh_token(data={"sub": user_id})
-
-        # Save new refresh token
-        new_token_hash = hashlib.sha256(new_refresh_token.encode()).hexdigest()
-        await self.user_repo.save_refresh_token(user_id, new_token_hash, stored_token.device_info)
+        # Read from the database, not the user cache: the new access token must carry
+        # the current token_version even right after a "log out everywhere"
+        user = await self.user_repo.get_by_id(user_id)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+            )
+        new_access_token = create_access_token(data={"sub": str(user_id), "ver": user.token_version})
 
+        self._audit("refresh", "success", user_id)
         return new_access_token, new_refresh_token
 
     async def logout(self, refresh_token: str) -> None:
@@ -94,9 +162,38 @@ class AuthService:
         import hashlib
 
         token_hash = hashlib.sha256(refresh_token.encode()).hexdigest()
-        await self.user_repo.revoke_refresh_token(token_hash)
-
-
+        user_id = await self.user_repo.revoke_refresh_token(token_hash)
+        self._audit("logout", "success" if user_id is not None else "unknown_token", user_id)
 
+    async def list_sessions(
+        self, user_id: int, limit: int, cursor: Optional[str] = None, refresh_token: Optional[str] = None
+    ) -> SessionPage:
+        """A page of the user's active sessions; the one holding ``refresh_token`` is marked current."""
+        import hashlib
 
+        current_hash = hashlib.sha256(refresh_token.encode()).hexdigest() if refresh_token else None
+        tokens = await self.user_repo.list_sessions(user_id, limit + 1, decode_cursor(cursor) if cursor else None)
+        items = []
+        for token in tokens[:limit]:
+            item = SessionResponse.from_orm(token)
+            item.current = token.token_hash == current_hash
+            items.append(item)
+        return SessionPage(
+            items=items,
+            next_cursor=encode_cursor(tokens[limit - 1].id) if len(tokens) > limit else None,
+        )
+
+    async def revoke_session(self, user_id: int, session_id: int) -> None:
+        """Log one device out; its access token stays valid until it expires (minutes)."""
+        if not await self.user_repo.revoke_session(user_id, session_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Session not found",
+            )
+        self._audit("revoke", "success", user_id)
 
+    async def revoke_all_sessions(self, user_id: int) -> int:
+        """Log out everywhere: revoke all refresh tokens and invalidate all access tokens."""
+        revoked = await self.user_repo.revoke_all_sessions(user_id)
+        self._audit("logout_all", "success", user_id)
+        return revoked
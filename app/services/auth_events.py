@@ -0,0 +1,196 @@
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime
+from time import monotonic, perf_counter
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.core.metrics import registry
+from app.repositories.auth_event import AuthEventRepository
+
+logger = logging.getLogger(__name__)
+audit_logger = logging.getLogger("app.audit")
+
+auth_events = registry.counter("auth_events_total", "Login, refresh and logout outcomes", ("event", "outcome"))
+auth_events_dropped = registry.counter(
+    "auth_events_dropped_total", "Audit events discarded because the buffer was full (database unavailable)"
+)
+auth_event_flush_duration = registry.histogram(
+    "auth_event_flush_duration_seconds", "Time to write one batch of buffered audit events"
+)
+
+
+class AuthEventLog:
+    """Write-behind buffer for the auth audit trail.
+
+    record() only appends to an in-memory list, so auditing adds no database
+    round-trip to logins. run() writes the buffer with multi-row INSERTs every
+    ``flush_interval`` seconds, or as soon as ``batch_size`` events are
+    waiting. If the database is unavailable the events are kept and retried,
+    up to ``max_buffered``; beyond that the oldest are dropped and counted.
+    Events still buffered when a process is killed are lost; each is also
+    written to the ``app.audit`` log as it is recorded.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        batch_size: int,
+        flush_interval: float,
+        max_buffered: int,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.written = 0
+        self.dropped = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._wake = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def record(
+        self,
+        event: str,
+        outcome: str,
+        user_id: Optional[int] = None,
+        email: Optional[str] = None,
+        ip: Optional[str] = None,
+        device_info: Optional[str] = None,
+    ) -> None:
+        """Buffer one event; anything but a success is also logged as a warning."""
+        auth_events.labels(event, outcome).inc()
+        row = {
+            "event": event,
+            "outcome": outcome,
+            "user_id": user_id,
+            "email": email,
+            "ip": ip,
+            "device_info": device_info[:255] if device_info else device_info,
+            "created_at": datetime.utcnow(),
+        }
+        level = logging.INFO if outcome == "success" else logging.WARNING
+        audit_logger.log(level, "auth %s: %s", event, outcome, extra={"audit": row, "user_id": user_id})
+        self._buffer.append(row)
+        self._trim()
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    def _trim(self) -> None:
+        excess = len(self._buffer) - self.max_buffered
+        if excess > 0:
+            del self._buffer[:excess]
+            self.dropped += excess
+            auth_events_dropped.labels().inc(excess)
+
+    async def flush(self) -> int:
+        """Write everything buffered so far; returns the number of events written."""
+        rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+        start = perf_counter()
+        try:
+            async with self.session_factory() as session:
+                await AuthEventRepository(session).insert_many(rows)
+                await session.commit()
+        except BaseException:
+            # Put them back in front of the events recorded meanwhile, for the next flush
+            self._buffer[:0] = rows
+            self._trim()
+            raise
+        auth_event_flush_duration.labels().observe(perf_counter() - start)
+        self.written += len(rows)
+        return len(rows)
+
+    async def run(self) -> None:
+        """Flush forever; meant to run as a background task."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Writing %d audit events failed; will retry", len(self._buffer))
+
+    async def close(self) -> None:
+        """Write what is left on shutdown."""
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Dropping %d audit events on shutdown", len(self._buffer))
+
+
+class LoginThrottle:
+    """Per-account lockout after repeated failed logins (sliding window, per process).
+
+    Keeps the times of the last ``max_failures`` failures of each email; the
+    account is locked while all of them fall within the last ``window``
+    seconds, i.e. until the oldest one leaves the window. Locked attempts are
+    not counted, so an attacker cannot extend the lockout indefinitely, and a
+    successful login clears the history. Memory is bounded by ``max_keys``
+    emails, least recently failed first out.
+
+    This complements the per-IP limit of RateLimitMiddleware against
+    credential stuffing spread over many addresses. Like the in-memory rate
+    limiter the counters are per process, so with several workers an account
+    allows up to ``max_failures`` failures per worker and window.
+    """
+
+    def __init__(self, max_failures: int, window: float, max_keys: int):
+        self.max_failures = max_failures
+        self.window = window
+        self.max_keys = max_keys
+        self._failures: "OrderedDict[str, Deque[float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._failures)
+
+    def retry_after(self, email: str) -> float:
+        """Seconds until the account may try again; 0 if it is not locked."""
+        failures = self._failures.get(email)
+        if failures is None or len(failures) < self.max_failures:
+            return 0.0
+        return max(0.0, failures[0] + self.window - monotonic())
+
+    def record_failure(self, email: str) -> None:
+        failures = self._failures.get(email)
+        if failures is None:
+            failures = self._failures[email] = deque(maxlen=self.max_failures)
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+        else:
+            self._failures.move_to_end(email)
+        failures.append(monotonic())
+
+    def reset(self, email: str) -> None:
+        self._failures.pop(email, None)
+
+
+def create_auth_event_log(session_factory: async_sessionmaker[AsyncSession]) -> AuthEventLog:
+    return AuthEventLog(
+        session_factory,
+        batch_size=settings.auth_event_batch_size,
+        flush_interval=settings.auth_event_flush_interval,
+        max_buffered=settings.auth_event_max_buffered,
+    )
+
+
+auth_event_log = create_auth_event_log(SessionLocal)
+login_throttle = LoginThrottle(
+    max_failures=settings.login_lockout_failures,
+    window=settings.login_lockout_window,
+    max_keys=settings.login_lockout_max_keys,
+)
+registry.gauge_callback("auth_events_buffered", "Audit events waiting to be written", lambda: len(auth_event_log))
+registry.gauge_callback("login_lockout_tracked_accounts", "Emails with recent failed logins", lambda: len(login_throttle))
@@ -0,0 +1,151 @@
+import hashlib
+import secrets
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.repositories.cart import CartRepository, Line
+from app.schemas.cart import CartLine, CartLineUpdate, CartResponse
+from app.services.delivery import unit_weight
+
+# Cookie holding the token of an anonymous cart
+CART_COOKIE = "cart_token"
+
+
+def cart_token_hash(token: str) -> str:
+    """Cart tokens are stored hashed, like refresh tokens."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _merge_duplicates(items: List[CartLineUpdate]) -> List[Line]:
+    """Collapse repeated (product, fabric) lines into one, adding up quantities."""
+    quantities: Dict[Tuple[str, Optional[str]], int] = {}
+    for item in items:
+        key = (item.product, item.fabric)
+        quantities[key] = min(quantities.get(key, 0) + item.quantity, settings.cart_max_quantity)
+    return [(product, fabric, quantity) for (product, fabric), quantity in quantities.items() if quantity > 0]
+
+
+class CartService:
+    """Server-side cart of a user or an anonymous visitor.
+
+    Mutations take the desired state of a line (or of the whole cart) rather
+    than increments, so retrying one is harmless. Each returns the cart
+    repriced at current catalog prices by a single query.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.cart_repo = CartRepository(session)
+
+    async def _existing_cart(self, user_id: Optional[int], cart_token: Optional[str]) -> Optional[int]:
+        if user_id is not None:
+            return await self.cart_repo.get_id(user_id=user_id)
+        if cart_token:
+            return await self.cart_repo.get_id(token_hash=cart_token_hash(cart_token))
+        return None
+
+    async def _cart_for_update(self, user_id: Optional[int], cart_token: Optional[str]) -> Tuple[int, Optional[str]]:
+        """Id of the cart to modify, creating it if needed.
+
+        Returns (cart id, new cart token); the token is set only when a new
+        anonymous cart was created and the caller must set the cookie.
+        """
+        if user_id is not None:
+            cart_id = await self.cart_repo.touch(user_id=user_id)
+            return cart_id or await self.cart_repo.create(user_id=user_id), None
+        if cart_token:
+            cart_id = await self.cart_repo.touch(token_hash=cart_token_hash(cart_token))
+            if cart_id is not None:
+                return cart_id, None
+        # No cookie, or one for a cart that no longer exists
+        new_token = secrets.token_urlsafe(32)
+        return await self.cart_repo.create(token_hash=cart_token_hash(new_token)), new_token
+
+    async def _priced(self, cart_id: Optional[int]) -> CartResponse:
+        rows = await self.cart_repo.priced_lines(cart_id) if cart_id is not None else []
+        lines = []
+        for row in rows:
+            lines.append(
+                CartLine(
+                    product=row.slug,
+                    name=row.name,
+                    image=row.images[0] if row.images else None,
+                    fabric=row.fabric_code,
+                    fabric_name=row.fabric_name,
+                    unit_price=row.unit_price,
+                    quantity=row.quantity,
+                    line_total=row.unit_price * row.quantity,
+                    weight=unit_weight(row.dimensions),
+                )
+            )
+        return CartResponse(
+            items=lines,
+            quantity=sum(line.quantity for line in lines),
+            total=sum(line.line_total for line in lines),
+        )
+
+    async def get_cart(self, user_id: Optional[int], cart_token: Optional[str]) -> CartResponse:
+        return await self._priced(await self._existing_cart(user_id, cart_token))
+
+    async def set_item(
+        self, user_id: Optional[int], cart_token: Optional[str], item: CartLineUpdate
+    ) -> Tuple[CartResponse, Optional[str]]:
+        """Set the quantity of one line (0 removes it). Returns the cart and a new cart token, if any."""
+        if item.quantity == 0:
+            cart_id = await self._existing_cart(user_id, cart_token)
+            if cart_id is not None:
+                await self.cart_repo.remove_line(cart_id, item.product, item.fabric)
+            cart = await self._priced(cart_id)
+            await self.session.commit()
+            return cart, None
+
+        cart_id, new_token = await self._cart_for_update(user_id, cart_token)
+        written = await self.cart_repo.set_line(
+            cart_id, item.product, item.fabric, item.quantity, max_lines=settings.cart_max_lines
+        )
+        if not written:
+            cart_full = await self.cart_repo.count_lines(cart_id) >= settings.cart_max_lines
+            await self.session.rollback()
+            if cart_full:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"A cart holds at most {settings.cart_max_lines} lines",
+                )
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Product or fabric not found",
+            )
+        cart = await self._priced(cart_id)
+        await self.session.commit()
+        return cart, new_token
+
+    async def replace(
+        self, user_id: Optional[int], cart_token: Optional[str], items: List[CartLineUpdate]
+    ) -> Tuple[CartResponse, Optional[str]]:
+        """Replace the whole cart; unknown products and fabrics are dropped rather than rejected."""
+        lines = _merge_duplicates(items)
+        if not lines and await self._existing_cart(user_id, cart_token) is None:
+            return await self._priced(None), None
+
+        cart_id, new_token = await self._cart_for_update(user_id, cart_token)
+        await self.cart_repo.replace_lines(cart_id, lines)
+        cart = await self._priced(cart_id)
+        await self.session.commit()
+        return cart, new_token
+
+    async def merge_anonymous_cart(self, user_id: int, cart_token: str) -> None:
+        """Move an anonymous cart into the user's cart (on login); quantities of shared lines add up.
+
+        New lines beyond settings.cart_max_lines are dropped, as login must not fail over a full cart.
+        """
+        source_id = await self.cart_repo.get_id(token_hash=cart_token_hash(cart_token))
+        if source_id is None:
+            return
+        target_id, _ = await self._cart_for_update(user_id, None)
+        await self.cart_repo.merge(
+            source_id, target_id, max_quantity=settings.cart_max_quantity, max_lines=settings.cart_max_lines
+        )
+        await self.session.commit()
@@ -0,0 +1,99 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.catalog import Product
+from app.repositories.catalog import ProductRepository
+from app.schemas.catalog import ProductPage, ProductSummary
+
+
+def encode_cursor(sort: str, product: Product) -> str:
+    """Opaque cursor pointing just past ``product`` in ``sort`` order."""
+    value: Any = {
+        "popular": product.popularity,
+        "price-asc": product.price,
+        "price-desc": product.price,
+        "new": product.published_at.isoformat(),
+    }[sort]
+    raw = json.dumps([sort, value, product.id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(sort: str, cursor: str) -> Tuple[Any, int]:
+    """Return the (sort value, id) keyset of a cursor issued for the same sort order."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, product_id = json.loads(raw)
+        if cursor_sort != sort:
+            raise ValueError("cursor belongs to another sort order")
+        if sort == "new":
+            value = datetime.fromisoformat(value)
+        elif not isinstance(value, int):
+            raise ValueError("invalid sort value")
+        return value, int(product_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def to_summary(product: Product) -> ProductSummary:
+    return ProductSummary(
+        slug=product.slug,
+        category=product.category,
+        name=product.name,
+        badge=product.badge,
+        price=product.price,
+        old_price=product.old_price,
+        short=product.short,
+        image=product.images[0] if product.images else None,
+        rating=product.rating,
+        rating_count=product.rating_count,
+    )
+
+
+class CatalogService:
+    """Product catalog browsing."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.product_repo = ProductRepository(session)
+
+    async def list_products(
+        self,
+        sort: str,
+        limit: int,
+        category: Optional[str] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> ProductPage:
+        """Return one page of products and the cursor of the next page, if any."""
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="min_price must not exceed max_price",
+            )
+
+        after = decode_cursor(sort, cursor) if cursor else None
+        # Fetch one extra row to learn whether another page exists
+        products = await self.product_repo.list_page(
+            sort, limit + 1, category=category, min_price=min_price, max_price=max_price, after=after
+        )
+        next_cursor = encode_cursor(sort, products[limit - 1]) if len(products) > limit else None
+        return ProductPage(items=[to_summary(product) for product in products[:limit]], next_cursor=next_cursor)
+
+    async def get_product(self, slug: str) -> Product:
+        """Return an active product with its fabrics."""
+        product = await self.product_repo.get_by_slug(slug)
+        if product is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Product not found",
+            )
+        return product
@@ -0,0 +1,309 @@
+"""Bulk import of the storefront catalog (``PRODUCTS`` in products.js) into the database.
+
+    python -m app.services.catalog_import products.js
+
+Products are upserted by slug, so re-running the import after editing
+products.js updates prices and texts in place. The reviews listed with each
+product and in ``GLOBAL_REVIEWS`` are imported as approved reviews, once.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.db import SessionLocal, engine
+from app.repositories.catalog import IMPORT_CHUNK_SIZE, ProductRepository
+from app.repositories.review import ReviewRepository
+from app.services.catalog_search import fabric_type, search_text_for
+
+# products.js has no dates; the storefront sorts products with this badge first under "new"
+NEW_BADGE = "Новинка"
+
+_ESCAPES = {"b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "v": "\v", "0": "\0"}
+_NUMBER = re.compile(r"-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+_IDENTIFIER = re.compile(r"[A-Za-z_$][A-Za-z0-9_$]*")
+_LITERALS = {"true": True, "false": False, "null": None, "undefined": None}
+
+
+class JSLiteralParser:
+    """Parser for the JavaScript object/array literal subset used in products.js.
+
+    Supports unquoted keys, single/double/backtick strings (without ``${}``),
+    trailing commas and comments. Anything else is rejected with ValueError
+    rather than guessed at.
+    """
+
+    def __init__(self, source: str, pos: int = 0):
+        self.source = source
+        self.pos = pos
+
+    def error(self, message: str) -> ValueError:
+        line = self.source.count("\n", 0, self.pos) + 1
+        return ValueError(f"{message} at line {line}")
+
+    def skip(self) -> None:
+        """Skip whitespace and comments."""
+        source = self.source
+        while self.pos < len(source):
+            char = source[self.pos]
+            if char.isspace():
+                self.pos += 1
+            elif source.startswith("//", self.pos):
+                end = source.find("\n", self.pos)
+                self.pos = len(source) if end == -1 else end + 1
+            elif source.startswith("/*", self.pos):
+                end = source.find("*/", self.pos + 2)
+                if end == -1:
+                    raise self.error("Unterminated comment")
+                self.pos = end + 2
+            else:
+                return
+
+    def value(self) -> Any:
+        self.skip()
+        if self.pos >= len(self.source):
+            raise self.error("Unexpected end of input")
+        char = self.source[self.pos]
+        if char == "{":
+            return self.object()
+        if char == "[":
+            return self.array()
+        if char in "\"'`":
+            return self.string()
+        number = _NUMBER.match(self.source, self.pos)
+        if number:
+            self.pos = number.end()
+            text = number.group()
+            return float(text) if any(c in text for c in ".eE") else int(text)
+        identifier = _IDENTIFIER.match(self.source, self.pos)
+        if identifier and identifier.group() in _LITERALS:
+            self.pos = identifier.end()
+            return _LITERALS[identifier.group()]
+        raise self.error(f"Unsupported value starting with {char!r}")
+
+    def string(self) -> str:
+        quote = self.source[self.pos]
+        self.pos += 1
+        parts: List[str] = []
+        while True:
+            if self.pos >= len(self.source):
+                raise self.error("Unterminated string")
+            char = self.source[self.pos]
+            if char == quote:
+                self.pos += 1
+                return "".join(parts)
+            if char == "\\":
+                escape = self.source[self.pos + 1 : self.pos + 2]
+                if escape == "u":
+                    parts.append(chr(int(self.source[self.pos + 2 : self.pos + 6], 16)))
+                    self.pos += 6
+                    continue
+                if escape == "\n":  # line continuation
+                    self.pos += 2
+                    continue
+                parts.append(_ESCAPES.get(escape, escape))  # \" \' \\ etc. stand for themselves
+                self.pos += 2
+                continue
+            if quote == "`" and self.source.startswith("${", self.pos):
+                raise self.error("Template literal interpolation is not supported")
+            if char == "\n" and quote != "`":
+                raise self.error("Unterminated string")
+            parts.append(char)
+            self.pos += 1
+
+    def key(self) -> str:
+        char = self.source[self.pos]
+        if char in "\"'":
+            return self.string()
+        match = _IDENTIFIER.match(self.source, self.pos) or _NUMBER.match(self.source, self.pos)
+        if not match:
+            raise self.error(f"Invalid object key starting with {char!r}")
+        self.pos = match.end()
+        return match.group()
+
+    def expect(self, char: str) -> None:
+        self.skip()
+        if not self.source.startswith(char, self.pos):
+            raise self.error(f"Expected {char!r}")
+        self.pos += 1
+
+    def object(self) -> Dict[str, Any]:
+        self.pos += 1
+        result: Dict[str, Any] = {}
+        while True:
+            self.skip()
+            if self.source.startswith("}", self.pos):
+                self.pos += 1
+                return result
+            key = self.key()
+            self.expect(":")
+            result[key] = self.value()
+            self.skip()
+            if self.source.startswith(",", self.pos):
+                self.pos += 1
+            elif not self.source.startswith("}", self.pos):
+                raise self.error("Expected ',' or '}'")
+
+    def array(self) -> List[Any]:
+        self.pos += 1
+        result: List[Any] = []
+        while True:
+            self.skip()
+            if self.source.startswith("]", self.pos):
+                self.pos += 1
+                return result
+            result.append(self.value())
+            self.skip()
+            if self.source.startswith(",", self.pos):
+                self.pos += 1
+            elif not self.source.startswith("]", self.pos):
+                raise self.error("Expected ',' or ']'")
+
+
+def parse_js_constant(source: str, name: str) -> Any:
+    """Return the literal value assigned to ``const|let|var <name>`` in a JS source file."""
+    match = re.search(rf"\b(?:const|let|var)\s+{re.escape(name)}\s*=", source)
+    if match is None:
+        raise ValueError(f"{name} is not defined")
+    return JSLiteralParser(source, match.end()).value()
+
+
+def to_rows(products: List[Dict[str, Any]], now: datetime) -> List[Dict[str, Any]]:
+    """Map products.js entries to ProductRepository.upsert_many rows.
+
+    The array order is the storefront's "popular" order, so popularity counts
+    down from the number of products.
+    """
+    rows = []
+    for index, product in enumerate(products):
+        badge = product.get("badge") or None
+        fabrics = product.get("fabrics", [])
+        rows.append(
+            {
+                "slug": product["id"],
+                "category": product["category"],
+                "name": product["name"],
+                "badge": badge,
+                "price": int(product["price"]),
+                "old_price": int(product["oldPrice"]) if product.get("oldPrice") else None,
+                "short": product.get("short", ""),
+                "description": product.get("description", ""),
+                "images": list(product.get("images", [])),
+                "specs": dict(product.get("specs", {})),
+                "dimensions": dict(product.get("dimensions", {})),
+                "search_text": search_text_for(
+                    product["category"],
+                    product.get("short", ""),
+                    product.get("description", ""),
+                    product.get("specs", {}),
+                    product.get("dimensions", {}),
+                    [fabric["name"] for fabric in fabrics],
+                ),
+                "popularity": len(products) - index,
+                # Only used for new products; the upsert keeps published_at of existing ones
+                "published_at": now if badge == NEW_BADGE else now - timedelta(days=1),
+                "is_active": True,
+                "fabrics": [
+                    {
+                        "code": fabric["id"],
+                        "name": fabric["name"],
+                        "fabric_type": fabric_type(fabric["name"]),
+                        "price_delta": int(fabric.get("priceDelta", 0)),
+                        "color": fabric.get("color"),
+                    }
+                    for fabric in fabrics
+                ],
+            }
+        )
+    return rows
+
+
+def to_review_rows(
+    products: List[Dict[str, Any]], global_reviews: List[Dict[str, Any]], product_ids: Dict[str, int]
+) -> List[Dict[str, Any]]:
+    """Map the reviews in products.js to ReviewRepository.import_approved rows.
+
+    The import key is a hash of the product, author, date and text, so a
+    review is imported once however often the import runs.
+    """
+    reviews = [(product["id"], review) for product in products for review in product.get("reviews", [])]
+    reviews += [(None, review) for review in global_reviews]
+    rows = []
+    for slug, review in reviews:
+        key = "|".join((slug or "", review["author"], review.get("date", ""), review["text"]))
+        rows.append(
+            {
+                "product_id": product_ids[slug] if slug is not None else None,
+                "author": review["author"],
+                "rating": int(review["rating"]),
+                "text": review["text"],
+                "import_key": hashlib.sha256(key.encode()).hexdigest(),
+                "created_at": datetime.fromisoformat(review["date"]) if review.get("date") else datetime.utcnow(),
+            }
+        )
+    return rows
+
+
+def load_products(path: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """PRODUCTS and GLOBAL_REVIEWS (empty if not defined) from products.js."""
+    with open(path, encoding="utf-8") as fh:
+        source = fh.read()
+    products = parse_js_constant(source, "PRODUCTS")
+    if not isinstance(products, list):
+        raise ValueError("PRODUCTS is not an array")
+    global_reviews: List[Dict[str, Any]] = []
+    if re.search(r"\b(?:const|let|var)\s+GLOBAL_REVIEWS\s*=", source):
+        global_reviews = parse_js_constant(source, "GLOBAL_REVIEWS")
+        if not isinstance(global_reviews, list):
+            raise ValueError("GLOBAL_REVIEWS is not an array")
+    return products, global_reviews
+
+
+async def import_products(
+    session_factory: async_sessionmaker[AsyncSession],
+    products: List[Dict[str, Any]],
+    global_reviews: Optional[List[Dict[str, Any]]] = None,
+) -> Tuple[int, int, int]:
+    """Upsert products.js entries and import their reviews; returns (products, fabrics, new reviews)."""
+    rows = to_rows(products, datetime.utcnow())
+    async with session_factory() as session:
+        ids = await ProductRepository(session).upsert_many(rows)
+        reviews = to_review_rows(products, global_reviews or [], ids)
+        repo = ReviewRepository(session)
+        imported = 0
+        for start in range(0, len(reviews), IMPORT_CHUNK_SIZE):
+            imported += await repo.import_approved(reviews[start : start + IMPORT_CHUNK_SIZE])
+        if imported:
+            await repo.recompute_ratings()
+        await session.commit()
+    return len(rows), sum(len(row["fabrics"]) for row in rows), imported
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import the catalog from products.js")
+    parser.add_argument("path", nargs="?", default="products.js")
+    parser.add_argument("--dry-run", action="store_true", help="parse and print the rows without writing")
+    args = parser.parse_args()
+
+    products, global_reviews = load_products(args.path)
+    if args.dry_run:
+        print(json.dumps(to_rows(products, datetime.utcnow()), ensure_ascii=False, indent=2, default=str))
+        return
+
+    async def run() -> Tuple[int, int, int]:
+        try:
+            return await import_products(SessionLocal, products, global_reviews)
+        finally:
+            await engine.dispose()
+
+    product_count, fabric_count, review_count = asyncio.run(run())
+    print(f"Imported {product_count} products, {fabric_count} fabrics and {review_count} new reviews from {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.catalog import PRICE_BUCKETS, ProductRepository
+from app.schemas.catalog import FacetCount, ProductSummary, SearchFacets, SearchResponse
+from app.services.catalog import to_summary
+from app.services.catalog_snapshot import catalog_snapshots
+
+# Category labels as shown by the storefront, so "кресло" finds category "kreslo"
+CATEGORY_LABELS = {"divan": "Диван", "uglovoy": "Угловой диван", "kreslo": "Кресло"}
+
+# Dimension keys of products.js and the words customers use for them
+DIMENSION_LABELS = {
+    "width": "ширина",
+    "depth": "глубина",
+    "height": "высота",
+    "sleep": "спальное место",
+    "weight": "вес",
+}
+
+
+def fabric_type(fabric_name: str) -> str:
+    """Fabric type from a fabric name such as "Букле — песочный"."""
+    return fabric_name.split("—")[0].strip()
+
+
+def search_text_for(
+    category: str,
+    short: str,
+    description: str,
+    specs: Dict[str, Any],
+    dimensions: Dict[str, Any],
+    fabric_names: Iterable[str],
+) -> str:
+    """Text indexed for search besides the product name (which is weighted higher)."""
+    parts = [CATEGORY_LABELS.get(category, category), short, description]
+    parts.extend(str(value) for value in specs.values())
+    parts.extend(f"{DIMENSION_LABELS.get(key, key)} {value}" for key, value in dimensions.items())
+    parts.extend(fabric_names)
+    return "\n".join(part for part in parts if part)
+
+
+def price_bucket_label(index: int) -> str:
+    """Label of the width_bucket() index of a price: "0-30000", ..., "120000+"."""
+    bounds = (0, *PRICE_BUCKETS)
+    if index >= len(PRICE_BUCKETS):
+        return f"{PRICE_BUCKETS[-1]}+"
+    return f"{bounds[index]}-{bounds[index + 1]}"
+
+
+def _facet_counts(counts: Dict[Any, int], label=str) -> List[FacetCount]:
+    """Facet values, most frequent first."""
+    ordered = sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))
+    return [FacetCount(value=label(value), count=count) for value, count in ordered]
+
+
+class CatalogSearchService:
+    """Full-text product search with facets.
+
+    On PostgreSQL this runs against the products.search_vector tsvector
+    (russian configuration, GIN index): one query for the page of hits and
+    one GROUPING SETS query for all facet counts. Elsewhere (the SQLite
+    test setup) it searches an inverted index built over the catalog
+    snapshot.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.product_repo = ProductRepository(session)
+
+    async def search(
+        self,
+        query: str,
+        limit: int,
+        offset: int = 0,
+        category: Optional[str] = None,
+        fabric: Optional[str] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+    ) -> SearchResponse:
+        filters = dict(category=category, min_price=min_price, max_price=max_price)
+        if self.session.get_bind().dialect.name == "postgresql":
+            products = await self.product_repo.search(query, limit, offset, fabric_type=fabric, **filters)
+            rows = await self.product_repo.search_facets(query, fabric_type=fabric, **filters)
+            facets: Dict[str, Counter] = {"category": Counter(), "fabric": Counter(), "price": Counter()}
+            total = 0
+            for facet, value, count in rows:
+                if facet is None:
+                    total = count
+                elif value is not None:
+                    facets[facet][value] = count
+            items = [to_summary(product) for product in products]
+        else:
+            snapshot = await catalog_snapshots.get()
+            total, products, facets = snapshot.search_index.search(query, limit, offset, fabric=fabric, **filters)
+            items = [ProductSummary(**snapshot.summary(product.id)) for product in products]
+
+        return SearchResponse(
+            total=total,
+            items=items,
+            facets=SearchFacets(
+                category=_facet_counts(facets["category"]),
+                fabric=_facet_counts(facets["fabric"]),
+                price=_facet_counts(facets["price"], label=price_bucket_label),
+            ),
+        )
@@ -0,0 +1,355 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import cached_property
+from datetime import datetime
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi import Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.cache import MISSING, TTLCache
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.models.catalog import Product
+from app.repositories.catalog import SORTS, ProductRepository
+from app.schemas.catalog import ProductDetail
+from app.services.catalog import decode_cursor, encode_cursor, to_summary
+from app.services.search_index import InvertedIndex
+
+try:  # optional brotli encoder
+    import brotli
+except ImportError:  # pragma: no cover - depends on environment
+    brotli = None
+
+try:  # optional fast JSON serializer
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, default=str)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str).encode()
+
+
+@dataclass(frozen=True)
+class EncodedBody:
+    """One JSON document with its precompressed encodings and strong ETags."""
+
+    identity: bytes
+    gzip: Optional[bytes]
+    br: Optional[bytes]
+    etag: str  # hash of the identity body; content-coded variants append "-gzip"/"-br"
+
+    @classmethod
+    def build(cls, data: Any) -> "EncodedBody":
+        body = dumps(data)
+        compress = len(body) >= settings.catalog_compress_min_size
+        return cls(
+            identity=body,
+            gzip=gzip.compress(body, compresslevel=6, mtime=0) if compress else None,
+            br=brotli.compress(body, quality=settings.catalog_brotli_quality) if compress and brotli else None,
+            etag=hashlib.sha256(body).hexdigest()[:32],
+        )
+
+    def matches(self, if_none_match: str) -> bool:
+        """If-None-Match uses weak comparison, so any encoding of this body matches."""
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag.strip('"').split("-")[0] == self.etag:
+                return True
+        return False
+
+    def response(self, request: Request) -> Response:
+        """Serve the stored bytes as-is, or 304 if the client already has them."""
+        headers = {
+            "Cache-Control": f"public, max-age={settings.catalog_cache_max_age}",
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and self.matches(if_none_match):
+            headers["ETag"] = f'"{self.etag}"'
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        accepted = _accepted_codings(request.headers.get("accept-encoding", ""))
+        if self.br is not None and "br" in accepted:
+            body, coding = self.br, "br"
+        elif self.gzip is not None and "gzip" in accepted:
+            body, coding = self.gzip, "gzip"
+        else:
+            body, coding = self.identity, None
+        if coding:
+            headers["Content-Encoding"] = coding
+            headers["ETag"] = f'"{self.etag}-{coding}"'
+        else:
+            headers["ETag"] = f'"{self.etag}"'
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _accepted_codings(accept_encoding: str) -> Set[str]:
+    """Content codings from an Accept-Encoding header, minus those refused with q=0."""
+    codings = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        codings.add(coding.strip())
+    return codings
+
+
+def _order_key(sort: str) -> Callable[[Any, int], Tuple[float, int]]:
+    """Ascending key of (sort value, id) in ``sort`` order, for bisecting a sorted listing."""
+    descending = SORTS[sort][1]
+
+    def key(value: Any, product_id: int) -> Tuple[float, int]:
+        number = value.timestamp() if isinstance(value, datetime) else value
+        return (-number, -product_id) if descending else (number, product_id)
+
+    return key
+
+
+def _sort_value(sort: str, product: Product) -> Any:
+    return getattr(product, SORTS[sort][0].key)
+
+
+class CatalogSnapshot:
+    """Immutable view of the active catalog, with responses rendered ahead of time.
+
+    Default-size pages of every (sort, category) listing are serialized and
+    compressed when the snapshot is built. Product pages, and other listing
+    variants (price filters, custom limits, cursors from an older snapshot),
+    are rendered from memory on first request and memoized; nothing here
+    touches the database.
+    """
+
+    def __init__(
+        self,
+        products: List[Product],
+        fingerprint: Tuple[int, Any],
+        page_size: int,
+        build_search_index: bool = False,
+    ):
+        self.products = products
+        self.fingerprint = fingerprint
+        self.page_size = page_size
+        self.built_at = datetime.utcnow()
+        self.categories = sorted({product.category for product in products})
+        self._by_slug = {product.slug: product for product in products}
+        self._details: Dict[str, EncodedBody] = {}
+
+        self._listings: Dict[str, List[Product]] = {}
+        self._keys: Dict[str, List[Tuple[float, int]]] = {}
+        self._pages: Dict[Tuple[str, Optional[str], Optional[str]], EncodedBody] = {}
+        # LRU of rendered non-default variants; entries live as long as the snapshot
+        self._variants = TTLCache(maxsize=settings.catalog_variant_cache_size, ttl=float("inf"))
+        # Serialized once per product and shared by every page it appears on
+        self._summaries = {product.id: to_summary(product).dict() for product in products}
+        self._empty_page = self._render_page([], None)
+        if build_search_index:
+            self.search_index
+
+        for sort in SORTS:
+            key = _order_key(sort)
+            ordered = sorted(products, key=lambda product: key(_sort_value(sort, product), product.id))
+            self._listings[sort] = ordered
+            self._keys[sort] = [key(_sort_value(sort, product), product.id) for product in ordered]
+            for category in [None, *self.categories]:
+                items = [product for product in ordered if category is None or product.category == category]
+                cursor = None
+                for start in range(0, max(len(items), 1), page_size):
+                    page = items[start : start + page_size]
+                    has_more = start + page_size < len(items)
+                    next_cursor = encode_cursor(sort, page[-1]) if has_more else None
+                    self._pages[(sort, category, cursor)] = self._render_page(page, next_cursor)
+                    cursor = next_cursor
+
+    @cached_property
+    def search_index(self) -> InvertedIndex:
+        """Search fallback for databases without full-text search, built on first use."""
+        # Deep enough for the last allowed offset plus the largest page
+        depth = settings.catalog_search_max_offset + 100
+        return InvertedIndex(self.products, depth=depth, cache_size=settings.catalog_search_cache_size)
+
+    def detail(self, slug: str) -> Optional[EncodedBody]:
+        """Body of a ProductDetail, or None if there is no such active product."""
+        encoded = self._details.get(slug)
+        if encoded is None:
+            product = self._by_slug.get(slug)
+            if product is None:
+                return None
+            encoded = self._details[slug] = EncodedBody.build(ProductDetail.from_orm(product).dict())
+        return encoded
+
+    def summary(self, product_id: int) -> Dict[str, Any]:
+        """ProductSummary fields of a product in this snapshot."""
+        return self._summaries[product_id]
+
+    def _render_page(self, products: List[Product], next_cursor: Optional[str]) -> EncodedBody:
+        """Body of a ProductPage."""
+        return EncodedBody.build(
+            {"items": [self._summaries[product.id] for product in products], "next_cursor": next_cursor}
+        )
+
+    def listing(
+        self,
+        sort: str,
+        limit: int,
+        category: Optional[str] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> EncodedBody:
+        if limit == self.page_size and min_price is None and max_price is None:
+            page = self._pages.get((sort, category, cursor))
+            if page is not None:
+                return page
+            if cursor is None:  # no such category
+                return self._empty_page
+
+        variant = (sort, limit, category, min_price, max_price, cursor)
+        encoded = self._variants.get(variant)
+        if encoded is MISSING:
+            encoded = self._render_variant(*variant)
+            self._variants.set(variant, encoded)
+        return encoded
+
+    def _render_variant(
+        self,
+        sort: str,
+        limit: int,
+        category: Optional[str],
+        min_price: Optional[int],
+        max_price: Optional[int],
+        cursor: Optional[str],
+    ) -> EncodedBody:
+        ordered = self._listings[sort]
+        start = 0
+        if cursor:
+            start = bisect_right(self._keys[sort], _order_key(sort)(*decode_cursor(sort, cursor)))
+
+        page: List[Product] = []
+        for product in ordered[start:]:
+            if category is not None and product.category != category:
+                continue
+            if min_price is not None and product.price < min_price:
+                continue
+            if max_price is not None and product.price > max_price:
+                continue
+            page.append(product)
+            if len(page) > limit:
+                break
+        next_cursor = encode_cursor(sort, page[limit - 1]) if len(page) > limit else None
+        return self._render_page(page[:limit], next_cursor)
+
+
+class CatalogSnapshotStore:
+    """Holds the current CatalogSnapshot and replaces it when the catalog changes.
+
+    A background task compares the products fingerprint (row count and latest
+    updated_at) every ``poll_interval`` seconds and rebuilds on change;
+    readers always get a complete snapshot, swapped in with one assignment.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], poll_interval: float, page_size: int):
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.page_size = page_size
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self._lock = asyncio.Lock()
+        self._warming: Optional[asyncio.Task] = None
+
+    async def get(self) -> CatalogSnapshot:
+        """Return the current snapshot, building the first one if needed."""
+        snapshot = self.snapshot
+        if snapshot is None:
+            async with self._lock:
+                if self.snapshot is None:
+                    await self.rebuild()
+            snapshot = self.snapshot
+        return snapshot
+
+    def current(self) -> Optional[CatalogSnapshot]:
+        """Return the snapshot if one is built; otherwise start building it and return None.
+
+        For readers that can query the database instead of waiting for the
+        first build (at startup, or after invalidate()).
+        """
+        if self.snapshot is None and (self._warming is None or self._warming.done()):
+            self._warming = asyncio.create_task(self._warm())
+        return self.snapshot
+
+    async def _warm(self) -> None:
+        try:
+            await self.get()
+        except Exception:
+            logger.exception("Catalog snapshot build failed")
+
+    async def rebuild(self, fingerprint: Optional[Tuple[int, Any]] = None) -> CatalogSnapshot:
+        start = perf_counter()
+        async with self.session_factory() as session:
+            repo = ProductRepository(session)
+            if fingerprint is None:
+                fingerprint = await repo.fingerprint()
+            products = await repo.list_active()
+            # Without PostgreSQL full-text search, searches are answered from the snapshot
+            build_search_index = session.get_bind().dialect.name != "postgresql"
+        # Serialization and compression run in a worker thread, which lets the loop serve requests
+        # between GIL switches but still competes with it for the GIL; the build is therefore kept
+        # small: listing pages only (product pages render on demand), at gzip level 6
+        snapshot = await asyncio.to_thread(CatalogSnapshot, products, fingerprint, self.page_size, build_search_index)
+        self.snapshot = snapshot
+        logger.info("Catalog snapshot built: %d products in %.1fms", len(products), (perf_counter() - start) * 1000)
+        return snapshot
+
+    def invalidate(self) -> None:
+        """Drop the snapshot; the next request rebuilds it (for writers in this process)."""
+        self.snapshot = None
+
+    async def refresh_if_changed(self) -> bool:
+        async with self.session_factory() as session:
+            fingerprint = await ProductRepository(session).fingerprint()
+        if self.snapshot is not None and self.snapshot.fingerprint == fingerprint:
+            return False
+        async with self._lock:
+            await self.rebuild(fingerprint)
+        return True
+
+    async def run(self) -> None:
+        """Poll for catalog changes forever; meant to run as a background task."""
+        while True:
+            try:
+                await self.refresh_if_changed()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Catalog snapshot refresh failed")
+            await asyncio.sleep(self.poll_interval)
+
+
+def create_catalog_snapshot_store(session_factory: async_sessionmaker[AsyncSession]) -> CatalogSnapshotStore:
+    return CatalogSnapshotStore(
+        session_factory,
+        poll_interval=settings.catalog_snapshot_poll_interval,
+        page_size=settings.catalog_page_size,
+    )
+
+
+catalog_snapshots = create_catalog_snapshot_store(SessionLocal)
@@ -0,0 +1,128 @@
+import math
+import random
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+from uuid import uuid4
+
+from app.core.config import settings
+from app.services.providers import ProviderError, simulate_latency
+
+# Courier tariff of the storefront: a base fee plus a per-kg rate, capped
+DELIVERY_BASE_PRICE = 1200
+DELIVERY_PRICE_PER_KG = 20
+DELIVERY_MAX_VARIABLE_PRICE = 7000
+# Weight assumed for an order whose products have no weight in their dimensions
+DEFAULT_ORDER_WEIGHT = 60
+# Tariff: (price multiplier, delivery time)
+DELIVERY_TARIFFS = {
+    "courier": (1.0, "1–3 дня"),
+    "express": (1.5, "1 день"),
+}
+
+
+def unit_weight(dimensions: dict) -> Optional[float]:
+    """Weight in kg from a product's dimensions, if it has one."""
+    weight = dimensions.get("weight")
+    return weight if isinstance(weight, (int, float)) else None
+
+
+def order_weight(lines: Iterable[Tuple[Optional[float], int]]) -> float:
+    """Weight in kg of (unit weight, quantity) lines; DEFAULT_ORDER_WEIGHT if no line has a weight."""
+    return sum(weight * quantity for weight, quantity in lines if weight) or DEFAULT_ORDER_WEIGHT
+
+
+def billable_weight(weight: float) -> float:
+    """Weight rounded up to settings.delivery_quote_weight_step; prices and quotes are per step."""
+    step = settings.delivery_quote_weight_step
+    return math.ceil(weight / step) * step if step > 0 else weight
+
+
+def delivery_price(weight: float, tariff: str = "courier") -> int:
+    """Delivery price in rubles for an order of ``weight`` kg."""
+    variable = min(DELIVERY_MAX_VARIABLE_PRICE, billable_weight(weight) * DELIVERY_PRICE_PER_KG)
+    return round((DELIVERY_BASE_PRICE + variable) * DELIVERY_TARIFFS[tariff][0])
+
+
+@dataclass(frozen=True)
+class Quote:
+    tariff: str
+    weight: float  # billable weight, kg
+    price: int
+    eta: str
+
+
+@dataclass(frozen=True)
+class Shipment:
+    delivery_id: str
+    tracking: str
+    eta: str
+
+
+class DeliveryProvider:
+    """Delivery service adapter. Calls carry an idempotency key, as for PaymentProvider."""
+
+    name = "delivery"
+
+    async def quote(self, address: str, weight: float, tariff: str) -> Quote:
+        """Price of delivering ``weight`` kg to ``address``. Raises ProviderError."""
+        raise NotImplementedError
+
+    async def create_shipment(self, idempotency_key: str, address: str, weight: float, items: int) -> Shipment:
+        """Book a courier. Raises ProviderError."""
+        raise NotImplementedError
+
+    async def cancel_shipment(self, idempotency_key: str, delivery_id: str) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeDeliveryProvider(DeliveryProvider):
+    """In-process delivery service with simulated latency and transient failures."""
+
+    name = "fake-delivery"
+
+    def __init__(self, latency: float, failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.shipments: Dict[str, Shipment] = {}
+        self.cancelled: Dict[str, str] = {}
+
+    async def quote(self, address: str, weight: float, tariff: str) -> Quote:
+        await simulate_latency(self.latency)
+        if random.random() < self.failure_rate:
+            raise ProviderError("Delivery service unavailable", retryable=True)
+        return Quote(tariff=tariff, weight=weight, price=delivery_price(weight, tariff), eta=DELIVERY_TARIFFS[tariff][1])
+
+    async def create_shipment(self, idempotency_key: str, address: str, weight: float, items: int) -> Shipment:
+        await simulate_latency(self.latency)
+        if idempotency_key in self.shipments:
+            return self.shipments[idempotency_key]
+        if random.random() < self.failure_rate:
+            raise ProviderError("Delivery service unavailable", retryable=True)
+        shipment = Shipment(
+            delivery_id=str(random.randint(10000, 99999)),
+            tracking=f"YD-{uuid4().hex[:8]}",
+            eta="2–4 дня",
+        )
+        self.shipments[idempotency_key] = shipment
+        return shipment
+
+    async def cancel_shipment(self, idempotency_key: str, delivery_id: str) -> None:
+        await simulate_latency(self.latency)
+        if random.random() < self.failure_rate:
+            raise ProviderError("Delivery service unavailable", retryable=True)
+        self.cancelled.setdefault(idempotency_key, delivery_id)
+
+
+def create_delivery_provider() -> DeliveryProvider:
+    """Build the adapter selected by settings.delivery_provider."""
+    if settings.delivery_provider == "fake":
+        return FakeDeliveryProvider(
+            latency=settings.fake_delivery_latency, failure_rate=settings.fake_provider_failure_rate
+        )
+    raise ValueError(f"Unknown delivery provider: {settings.delivery_provider}")
+
+
+delivery_provider = create_delivery_provider()
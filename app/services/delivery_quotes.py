@@ -0,0 +1,170 @@
+import asyncio
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import MISSING, TTLCache
+from app.core.config import settings
+from app.core.metrics import registry
+from app.schemas.delivery import QuoteBatchRequest, QuoteBatchResponse, QuoteResponse
+from app.services.cart import CartService
+from app.services.delivery import DeliveryProvider, Quote, billable_weight, delivery_provider, order_weight
+from app.services.providers import ProviderError, call_with_retry
+
+# (normalized address, tariff, billable weight)
+QuoteKey = Tuple[str, str, float]
+
+quote_lookups = registry.counter(
+    "delivery_quote_lookups_total",
+    "Delivery quotes by how they were served: hit (cache), coalesced (joined an identical call) or miss",
+    ("result",),
+)
+
+_NON_WORD = re.compile(r"[\W_]+")
+_ADDRESS_ABBREVIATIONS = {
+    "город": "г",
+    "улица": "ул",
+    "проспект": "пр",
+    "переулок": "пер",
+    "шоссе": "ш",
+    "дом": "д",
+    "корпус": "к",
+    "строение": "стр",
+    "квартира": "кв",
+}
+
+
+def normalize_address(address: str) -> str:
+    """Cache key form of an address: case, punctuation, "ё" and common abbreviations are folded.
+
+    The flat number is dropped: delivery is priced to the building, so
+    "Москва, ул. Ленина, д.1, кв. 5" and "москва  улица ленина дом 1" get the same key.
+    """
+    words = [
+        _ADDRESS_ABBREVIATIONS.get(word, word) for word in _NON_WORD.sub(" ", address.casefold().replace("ё", "е")).split()
+    ]
+    if "кв" in words:
+        flat = words.index("кв")
+        del words[flat : flat + 2]
+    return " ".join(words)
+
+
+class DeliveryQuoter:
+    """Delivery quotes with a TTL cache and single-flight provider calls.
+
+    Quotes are cached per normalized address, tariff and billable weight
+    (the weight rounded up to settings.delivery_quote_weight_step), so
+    re-clicking "Рассчитать" or changing a quantity within the same step is
+    served from memory. Concurrent requests for a quote that is not cached
+    share one provider call instead of each making their own. Failures are
+    not cached. Meant to be used from the event loop only.
+    """
+
+    def __init__(self, provider: DeliveryProvider, ttl: float, maxsize: int):
+        self.provider = provider
+        self._cache = TTLCache(maxsize, ttl)
+        self._in_flight: Dict[QuoteKey, "asyncio.Task[Quote]"] = {}
+        self.lookups: Counter = Counter()  # hit / coalesced / miss, as quote_lookups
+
+    async def quote(self, address: str, weight: float, tariff: str = "courier") -> Quote:
+        """Quote for delivering ``weight`` kg to ``address``. Raises ProviderError."""
+        key = (normalize_address(address), tariff, billable_weight(weight))
+        quote = self._cache.get(key)
+        if quote is not MISSING:
+            self._count("hit")
+            return quote
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self._count("miss")
+            task = asyncio.create_task(self._fetch(key, address))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self._count("coalesced")
+        # A waiter that gives up (client disconnect) must not cancel the call the others wait for
+        return await asyncio.shield(task)
+
+    async def quote_many(
+        self, requests: Sequence[Tuple[str, str]], weight: float
+    ) -> List[Union[Quote, ProviderError]]:
+        """Quote (address, tariff) pairs concurrently; a failed quote is returned as its error."""
+        results = await asyncio.gather(
+            *(self.quote(address, weight, tariff) for address, tariff in requests), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(result, ProviderError):
+                raise result
+        return results
+
+    async def _fetch(self, key: QuoteKey, address: str) -> Quote:
+        _, tariff, weight = key
+        quote = await call_with_retry(
+            self.provider.name,
+            "quote",
+            lambda: self.provider.quote(address, weight, tariff),
+            timeout=settings.provider_timeout,
+            attempts=settings.provider_attempts,
+            backoff=settings.provider_backoff,
+        )
+        self._cache.set(key, quote)
+        return quote
+
+    def _count(self, result: str) -> None:
+        self.lookups[result] += 1
+        quote_lookups.labels(result).inc()
+
+    def _forget(self, key: QuoteKey, task: "asyncio.Task[Quote]") -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every waiter went away
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache size, lookups by result and the number of provider calls in flight."""
+        total = sum(self.lookups.values())
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "hits": self.lookups["hit"],
+            "coalesced": self.lookups["coalesced"],
+            "misses": self.lookups["miss"],
+            "hit_ratio": round(self.lookups["hit"] / total, 4) if total else 0.0,
+            "in_flight": len(self._in_flight),
+        }
+
+
+delivery_quotes = DeliveryQuoter(
+    delivery_provider, ttl=settings.delivery_quote_cache_ttl, maxsize=settings.delivery_quote_cache_size
+)
+registry.gauge_callback("delivery_quote_cache_size", "Cached delivery quotes", lambda: len(delivery_quotes._cache))
+registry.gauge_callback(
+    "delivery_quote_in_flight", "Delivery quote provider calls in flight", lambda: len(delivery_quotes._in_flight)
+)
+
+
+async def quote_batch(
+    session: AsyncSession, user_id: Optional[int], cart_token: Optional[str], batch: QuoteBatchRequest
+) -> QuoteBatchResponse:
+    """Quote a batch; without a weight in the request, the weight of the caller's cart is used."""
+    weight = batch.weight
+    if weight is None:
+        cart = await CartService(session).get_cart(user_id, cart_token)
+        weight = order_weight((line.weight, line.quantity) for line in cart.items)
+        await session.commit()  # no connection is held while the delivery service is called
+
+    requests = [(item.address, item.tariff) for item in batch.quotes]
+    results = await delivery_quotes.quote_many(requests, weight)
+    quotes = []
+    for (address, tariff), result in zip(requests, results):
+        if isinstance(result, ProviderError):
+            quotes.append(
+                QuoteResponse(address=address, tariff=tariff, weight=billable_weight(weight), error=str(result))
+            )
+        else:
+            quotes.append(
+                QuoteResponse(address=address, tariff=tariff, weight=result.weight, price=result.price, eta=result.eta)
+            )
+    return QuoteBatchResponse(quotes=quotes)
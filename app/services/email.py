@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import smtplib
+from email.message import EmailMessage
+from typing import List, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmailSender:
+    """Outgoing mail adapter; called from outbox jobs only, never on the request path."""
+
+    async def send(self, to: str, subject: str, body: str) -> None:
+        """Send a plain-text message; raises on failure so the job is retried."""
+        raise NotImplementedError
+
+
+class LogEmailSender(EmailSender):
+    """Logs messages instead of sending them, for development and load tests."""
+
+    def __init__(self) -> None:
+        self.sent: List[Tuple[str, str]] = []  # (recipient, subject)
+
+    async def send(self, to: str, subject: str, body: str) -> None:
+        self.sent.append((to, subject))
+        logger.info("Email to %s: %s", to, subject)
+
+
+class SmtpEmailSender(EmailSender):
+    """Sends through an SMTP relay; smtplib blocks, so each message is sent in a worker thread."""
+
+    def __init__(self, host: str, port: int, username: str, password: str, starttls: bool, sender: str):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.sender = sender
+
+    def _send(self, message: EmailMessage) -> None:
+        with smtplib.SMTP(self.host, self.port, timeout=settings.provider_timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+
+    async def send(self, to: str, subject: str, body: str) -> None:
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = to
+        message["Subject"] = subject
+        message.set_content(body)
+        await asyncio.to_thread(self._send, message)
+
+
+def create_email_sender() -> EmailSender:
+    """Build the adapter selected by settings.email_backend."""
+    if settings.email_backend == "log":
+        return LogEmailSender()
+    if settings.email_backend == "smtp":
+        return SmtpEmailSender(
+            settings.smtp_host,
+            settings.smtp_port,
+            settings.smtp_username,
+            settings.smtp_password,
+            settings.smtp_starttls,
+            settings.email_from,
+        )
+    raise ValueError(f"Unknown email backend: {settings.email_backend}")
+
+
+email_sender = create_email_sender()
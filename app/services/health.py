@@ -0,0 +1,187 @@
+import asyncio
+import logging
+from time import monotonic, perf_counter
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.metrics import registry
+from app.core.security import PasswordHashPool, password_hash_pool
+
+logger = logging.getLogger(__name__)
+
+CheckResult = Tuple[bool, Dict[str, Any]]
+
+
+class ReadinessMonitor:
+    """Runs dependency checks in the background and caches the outcome for /ready.
+
+    Probes only read the cached result, so they never touch the database no
+    matter how often they arrive. A result older than ``max_age`` (the
+    refresher died or is stuck) is reported as not ready.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        hash_pool: PasswordHashPool,
+        interval: float,
+        timeout: float,
+        max_age: float,
+        max_overflow: int,
+        pool_saturation: float,
+        hash_queue_saturation: float,
+    ):
+        self.engine = engine
+        self.hash_pool = hash_pool
+        self.interval = interval
+        self.timeout = timeout
+        self.max_age = max_age
+        self.max_overflow = max_overflow
+        self.pool_saturation = pool_saturation
+        self.hash_queue_saturation = hash_queue_saturation
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+
+    async def check_database(self) -> CheckResult:
+        """SELECT 1 through the application pool, so an exhausted pool fails too."""
+        async with self.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        return True, {}
+
+    async def check_db_pool(self) -> CheckResult:
+        pool = self.engine.pool
+        if not isinstance(pool, QueuePool):
+            return True, {"pool": type(pool).__name__}
+        capacity = pool.size() + max(0, self.max_overflow)
+        checked_out = pool.checkedout()
+        return checked_out < capacity * self.pool_saturation, {"checked_out": checked_out, "capacity": capacity}
+
+    async def check_password_hash(self) -> CheckResult:
+        queue_depth = self.hash_pool.queue_depth
+        max_queue = self.hash_pool.max_queue
+        return queue_depth < max(1, max_queue * self.hash_queue_saturation), {
+            "queue_depth": queue_depth,
+            "max_queue": max_queue,
+        }
+
+    async def _run_check(self, check: Callable[[], Awaitable[CheckResult]]) -> Dict[str, Any]:
+        start = perf_counter()
+        try:
+            ok, detail = await asyncio.wait_for(check(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            ok, detail = False, {"error": f"timed out after {self.timeout}s"}
+        except Exception as e:
+            ok, detail = False, {"error": f"{type(e).__name__}: {e}"}
+        return {"ok": ok, "latency_ms": round((perf_counter() - start) * 1000, 3), **detail}
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Run all checks once and cache the result."""
+        checks = {
+            "database": await self._run_check(self.check_database),
+            "db_pool": await self._run_check(self.check_db_pool),
+            "password_hash": await self._run_check(self.check_password_hash),
+        }
+        ready = all(check["ok"] for check in checks.values())
+        was_ready = self._result is not None and self._result["status"] == "ready"
+        if was_ready and not ready:
+            logger.warning(
+                "Readiness checks failing: %s", ", ".join(name for name, check in checks.items() if not check["ok"])
+            )
+        elif ready and not was_ready and self._result is not None:
+            logger.info("Readiness checks recovered")
+
+        self._result = {"status": "ready" if ready else "not_ready", "checks": checks}
+        self._checked_at = monotonic()
+        return self._result
+
+    def status(self) -> Tuple[bool, Dict[str, Any]]:
+        """Return (ready, body) from the cached result."""
+        if self._result is None:
+            return False, {"status": "starting"}
+        age = monotonic() - self._checked_at
+        body = dict(self._result, age_seconds=round(age, 3))
+        if age > self.max_age:
+            body["status"] = "stale"
+            return False, body
+        return body["status"] == "ready", body
+
+    async def run(self) -> None:
+        """Refresh forever; meant to run as a background task."""
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Readiness refresh failed")
+            await asyncio.sleep(self.interval)
+
+
+class LoopLagMonitor:
+    """Measures event loop lag: how late a sleep of ``interval`` seconds wakes up."""
+
+    def __init__(self, interval: float, max_lag: float):
+        self.interval = interval
+        self.max_lag = max_lag
+        self.lag = 0.0
+        self._last_tick: Optional[float] = None
+
+    def current_lag(self) -> float:
+        """Last measured lag, or the time the next tick is overdue if that is larger."""
+        if self._last_tick is None:
+            return 0.0
+        overdue = monotonic() - self._last_tick - self.interval
+        return max(self.lag, overdue)
+
+    def status(self) -> Tuple[bool, Dict[str, Any]]:
+        lag = self.current_lag()
+        alive = lag <= self.max_lag
+        return alive, {
+            "status": "alive" if alive else "stalled",
+            "loop_lag_ms": round(lag * 1000, 3),
+            "max_loop_lag_ms": self.max_lag * 1000,
+        }
+
+    async def run(self) -> None:
+        """Sample forever; meant to run as a background task."""
+        self._last_tick = monotonic()
+        while True:
+            await asyncio.sleep(self.interval)
+            now = monotonic()
+            self.lag = max(0.0, now - self._last_tick - self.interval)
+            self._last_tick = now
+
+
+readiness_monitor = ReadinessMonitor(
+    engine,
+    password_hash_pool,
+    interval=settings.readiness_check_interval,
+    timeout=settings.readiness_check_timeout,
+    max_age=settings.readiness_max_age,
+    max_overflow=settings.db_max_overflow,
+    pool_saturation=settings.readiness_pool_saturation,
+    hash_queue_saturation=settings.readiness_hash_queue_saturation,
+)
+loop_lag_monitor = LoopLagMonitor(interval=settings.loop_lag_interval, max_lag=settings.liveness_max_loop_lag)
+
+
+def _check_values(key: str, scale: float = 1.0) -> Dict[Tuple[str, ...], float]:
+    ready, body = readiness_monitor.status()
+    return {(name,): float(check[key]) * scale for name, check in body.get("checks", {}).items()}
+
+
+registry.gauge_callback(
+    "readiness_check_ok", "1 if the last readiness check passed", lambda: _check_values("ok"), ("check",)
+)
+registry.gauge_callback(
+    "readiness_check_latency_seconds",
+    "Latency of the last readiness check",
+    lambda: _check_values("latency_ms", scale=0.001),
+    ("check",),
+)
+registry.gauge_callback("event_loop_lag_seconds", "Event loop lag", loop_lag_monitor.current_lag)
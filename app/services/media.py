@@ -0,0 +1,479 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from collections import defaultdict
+from contextlib import suppress
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from importlib.util import find_spec
+from time import perf_counter
+from typing import Any, AsyncIterator, BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+import anyio
+from fastapi import HTTPException, Request, UploadFile, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.core.metrics import registry
+from app.models.media import IMAGE_FAILED, IMAGE_READY, MediaImage
+from app.repositories.media import MediaRepository
+from app.schemas.media import ImageResponse, ImageVariant
+
+logger = logging.getLogger(__name__)
+
+# Optional: without Pillow originals are stored and served, but no variants are made
+PILLOW_AVAILABLE = find_spec("PIL") is not None
+
+# Accepted uploads by content type. SVG is not accepted: it can carry scripts.
+IMAGE_EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp", "image/avif": "avif"}
+EXTENSION_TYPES = {
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+    "avif": "image/avif",
+}
+CHUNK_SIZE = 1024 * 1024
+
+# <sha256>.<ext> for originals, <sha256>-<width>.<format> for variants
+_MEDIA_NAME = re.compile(r"([0-9a-f]{64})(?:-([1-9][0-9]{1,4}))?\.(jpg|png|webp|avif)")
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+image_processing_duration = registry.histogram(
+    "image_processing_duration_seconds", "Time to make the variants of an uploaded image", ("status",)
+)
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Content type of an image from its first bytes (magic numbers), or None."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp":
+        # ISO BMFF: the major brand, then compatible brands up to the end of the ftyp box
+        box_end = min(int.from_bytes(head[:4], "big"), len(head))
+        brands = {head[8:12]} | {head[offset : offset + 4] for offset in range(16, box_end - 3, 4)}
+        if brands & {b"avif", b"avis"}:
+            return "image/avif"
+    return None
+
+
+def variant_name(sha256: str, width: int, image_format: str) -> str:
+    return f"{sha256}-{width}.{image_format}"
+
+
+def media_url(name: str) -> str:
+    return f"/media/{name}"
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    sha256: str
+    size: int
+    content_type: str
+
+
+class MediaStorage:
+    """Image files under ``root``, named by the SHA-256 of the original.
+
+    Originals live in ``originals/ab/<sha256>.<ext>`` and variants in
+    ``variants/ab/<sha256>-<width>.<format>`` (``ab`` being the first two hex
+    digits, to keep directories small). A name never changes meaning, so
+    every file can be cached immutably and uploading the same image twice
+    stores it once.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def original(self, sha256: str, extension: str) -> str:
+        return os.path.join(self.root, "originals", sha256[:2], f"{sha256}.{extension}")
+
+    def variants_dir(self, sha256: str) -> str:
+        return os.path.join(self.root, "variants", sha256[:2])
+
+    def path_for(self, name: str) -> Optional[Tuple[str, str]]:
+        """(path, content type) of a media URL name; None if the name is not one we issue."""
+        match = _MEDIA_NAME.fullmatch(name)
+        if match is None:
+            return None
+        sha256, width, extension = match.groups()
+        if width is None:
+            return self.original(sha256, extension), EXTENSION_TYPES[extension]
+        if extension not in ("webp", "avif"):
+            return None
+        return os.path.join(self.variants_dir(sha256), name), EXTENSION_TYPES[extension]
+
+    def store(self, source: BinaryIO, expected_type: str, max_size: int) -> StoredUpload:
+        """Copy an upload into place while hashing it; blocking, run it in a thread.
+
+        The upload is written to ``tmp/`` on the same filesystem and renamed
+        into place only after its size and magic bytes are checked, so a
+        rejected or interrupted upload never becomes visible.
+        """
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        head = b""
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as target:
+                while chunk := source.read(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_size:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Image is larger than {max_size // (1024 * 1024)} MB",
+                        )
+                    if len(head) < 64:
+                        head += chunk[: 64 - len(head)]
+                    digest.update(chunk)
+                    target.write(chunk)
+            if sniff_image_type(head) != expected_type:
+                raise HTTPException(
+                    status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                    detail="File content does not match its image type",
+                )
+            sha256 = digest.hexdigest()
+            final_path = self.original(sha256, IMAGE_EXTENSIONS[expected_type])
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, final_path)  # same content, so replacing an existing copy is harmless
+        except BaseException:
+            with suppress(OSError):
+                os.unlink(tmp_path)
+            raise
+        return StoredUpload(sha256=sha256, size=size, content_type=expected_type)
+
+
+def render_variants(
+    source: str,
+    target_dir: str,
+    sha256: str,
+    widths: Sequence[int],
+    formats: Sequence[str],
+    qualities: Dict[str, int],
+    max_pixels: int,
+) -> Tuple[int, int, List[Dict[str, Any]]]:
+    """Write resized copies of an image; runs in a worker process.
+
+    Widths not smaller than the original are skipped (an image is never
+    upscaled; a small image gets one variant at its own width), and so are
+    formats this Pillow build cannot write. Each width is resized from the
+    next larger one, which keeps large photos cheap. Returns the original
+    (width, height) and the variants written.
+    """
+    from PIL import Image, ImageOps
+
+    try:  # registers AVIF on Pillow versions without built-in support
+        import pillow_avif  # noqa: F401
+    except ImportError:
+        pass
+
+    Image.MAX_IMAGE_PIXELS = max_pixels  # larger images raise DecompressionBombError
+    Image.init()
+    formats = [image_format for image_format in formats if image_format.upper() in Image.SAVE]
+    os.makedirs(target_dir, exist_ok=True)
+
+    with Image.open(source) as opened:
+        image = ImageOps.exif_transpose(opened)
+        width, height = image.size
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+
+        targets = sorted({target for target in widths if target < width} or {width}, reverse=True)
+        variants = []
+        for target in targets:
+            if target != image.width:
+                image = image.resize((target, max(1, round(height * target / width))), Image.Resampling.LANCZOS)
+            for image_format in formats:
+                path = os.path.join(target_dir, variant_name(sha256, target, image_format))
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                image.save(tmp_path, format=image_format.upper(), quality=qualities.get(image_format, 80))
+                os.replace(tmp_path, path)
+                variants.append({"width": target, "format": image_format, "size": os.path.getsize(path)})
+    variants.sort(key=lambda variant: (variant["format"], variant["width"]))
+    return width, height, variants
+
+
+class ImageVariantWorker:
+    """Background conversion of uploaded images into responsive variants.
+
+    Claims unprocessed images (committing the claim, so no transaction is
+    open during conversion), converts them in a process pool of ``workers``
+    processes, since resizing and AVIF encoding are CPU-bound and would
+    block the event loop, and stores the dimensions and variants. Wakes up
+    on notify() (called after an upload) or every ``interval`` seconds; an
+    image left in "processing" by a dead worker is retried after
+    ``stale_after`` seconds.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        storage: MediaStorage,
+        workers: int,
+        interval: float,
+        stale_after: float,
+        widths: Sequence[int],
+        formats: Sequence[str],
+        qualities: Dict[str, int],
+        max_pixels: int,
+    ):
+        self.session_factory = session_factory
+        self.storage = storage
+        self.workers = workers
+        self.interval = interval
+        self.stale_after = stale_after
+        self.widths = list(widths)
+        self.formats = list(formats)
+        self.qualities = qualities
+        self.max_pixels = max_pixels
+        self._executor: Optional[Executor] = None
+        self._wake = asyncio.Event()
+
+    def notify(self) -> None:
+        """Wake the worker: an image was just uploaded."""
+        self._wake.set()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def process_batch(self) -> int:
+        """Claim and convert up to two images per worker process; returns the number claimed."""
+        async with self.session_factory() as session:
+            images = await MediaRepository(session).claim(
+                self.workers * 2, stale_before=datetime.utcnow() - timedelta(seconds=self.stale_after)
+            )
+            await session.commit()
+        await asyncio.gather(*(self._process(image) for image in images))
+        return len(images)
+
+    async def _process(self, image: MediaImage) -> None:
+        start = perf_counter()
+        values: Dict[str, Any] = {}
+        image_status = IMAGE_READY
+        if PILLOW_AVAILABLE:
+            loop = asyncio.get_running_loop()
+            try:
+                width, height, variants = await loop.run_in_executor(
+                    self._get_executor(),
+                    render_variants,
+                    self.storage.original(image.sha256, image.extension),
+                    self.storage.variants_dir(image.sha256),
+                    image.sha256,
+                    self.widths,
+                    self.formats,
+                    self.qualities,
+                    self.max_pixels,
+                )
+                values = {"width": width, "height": height, "variants": variants, "error": None}
+            except Exception as exc:
+                if isinstance(exc, BrokenProcessPool):  # a conversion killed its process; start a new pool
+                    self._executor = None
+                logger.warning("Image %d could not be processed: %s", image.id, exc)
+                image_status = IMAGE_FAILED
+                values = {"error": f"{type(exc).__name__}: {exc}"[:255]}
+
+        async with self.session_factory() as session:
+            await MediaRepository(session).finish(image.id, image_status, **values)
+            await session.commit()
+        image_processing_duration.labels(image_status).observe(perf_counter() - start)
+
+    async def drain(self) -> int:
+        """Convert images until none are waiting."""
+        processed = 0
+        while batch := await self.process_batch():
+            processed += batch
+        return processed
+
+    async def run(self) -> None:
+        """Drain the queue forever; meant to run as a background task."""
+        if not PILLOW_AVAILABLE:
+            logger.warning("Pillow is not installed: images are served without resized variants")
+        while True:
+            # Cleared before draining, so an upload meanwhile triggers another pass
+            self._wake.clear()
+            try:
+                await self.drain()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Image processing failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def create_image_variant_worker(session_factory: async_sessionmaker[AsyncSession]) -> ImageVariantWorker:
+    return ImageVariantWorker(
+        session_factory,
+        media_storage,
+        workers=settings.media_workers,
+        interval=settings.media_processing_interval,
+        stale_after=settings.media_processing_stale_after,
+        widths=settings.media_variant_widths,
+        formats=settings.media_variant_formats,
+        qualities={"webp": settings.media_webp_quality, "avif": settings.media_avif_quality},
+        max_pixels=settings.media_max_pixels,
+    )
+
+
+media_storage = MediaStorage(settings.media_root)
+image_variants = create_image_variant_worker(SessionLocal)
+
+
+def image_response(image: MediaImage) -> ImageResponse:
+    variants = [
+        ImageVariant(**variant, url=media_url(variant_name(image.sha256, variant["width"], variant["format"])))
+        for variant in image.variants
+    ]
+    srcset: Dict[str, List[str]] = defaultdict(list)
+    for variant in variants:
+        srcset[variant.format].append(f"{variant.url} {variant.width}w")
+    return ImageResponse(
+        id=image.id,
+        sha256=image.sha256,
+        url=media_url(f"{image.sha256}.{image.extension}"),
+        content_type=image.content_type,
+        size=image.size,
+        width=image.width,
+        height=image.height,
+        status=image.status,
+        variants=variants,
+        srcset={image_format: ", ".join(entries) for image_format, entries in srcset.items()},
+        created_at=image.created_at,
+    )
+
+
+class MediaService:
+    """Image uploads and their processing status."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.repo = MediaRepository(session)
+
+    async def upload(self, user_id: Optional[int], file: UploadFile) -> Tuple[ImageResponse, bool]:
+        """Store an uploaded image and queue it for processing; returns (image, created).
+
+        The declared content type, the file extension and the magic bytes
+        must all agree on one of the accepted types. Re-uploading an image
+        returns the existing record.
+        """
+        extension = os.path.splitext(file.filename or "")[1].lstrip(".").lower()
+        if file.content_type not in IMAGE_EXTENSIONS or EXTENSION_TYPES.get(extension) != file.content_type:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Only JPEG, PNG, WebP and AVIF images with a matching extension are accepted",
+            )
+        stored = await asyncio.to_thread(
+            media_storage.store, file.file, file.content_type, settings.media_max_upload_size
+        )
+        image_id = await self.repo.create(
+            {
+                "sha256": stored.sha256,
+                "content_type": stored.content_type,
+                "extension": IMAGE_EXTENSIONS[stored.content_type],
+                "size": stored.size,
+                "uploaded_by": user_id,
+            }
+        )
+        await self.session.commit()
+        if image_id is not None:
+            image_variants.notify()
+        image = await self.repo.get_by_hash(stored.sha256)
+        return image_response(image), image_id is not None
+
+    async def get(self, image_id: int) -> ImageResponse:
+        image = await self.repo.get(image_id)
+        if image is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Image not found",
+            )
+        return image_response(image)
+
+
+def serve_media(request: Request, name: str) -> Response:
+    """Response for /media/<name>: an original or a variant, cacheable forever.
+
+    With settings.media_accel_redirect the file is handed to Nginx with
+    X-Accel-Redirect, which sends it with sendfile (zero-copy) and handles
+    Range itself; otherwise it is sent from here, with single-range support.
+    """
+    found = media_storage.path_for(name)
+    if found is None or not os.path.isfile(found[0]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not found",
+        )
+    path, content_type = found
+    etag = f'"{name}"'
+    headers = {"Cache-Control": f"public, max-age={settings.media_cache_max_age}, immutable", "ETag": etag}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if settings.media_accel_redirect:
+        relative = os.path.relpath(path, media_storage.root).replace(os.sep, "/")
+        headers["X-Accel-Redirect"] = settings.media_accel_prefix + relative
+        return Response(media_type=content_type, headers=headers)
+    return file_response(request, path, content_type, headers)
+
+
+def file_response(request: Request, path: str, media_type: str, headers: Dict[str, str]) -> Response:
+    """FileResponse with single byte-range support (206/416); multiple ranges get the whole file."""
+    stat_result = os.stat(path)
+    size = stat_result.st_size
+    headers = {**headers, "Accept-Ranges": "bytes"}
+    requested = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    match = _RANGE.fullmatch(requested.strip()) if requested else None
+    if match is not None and (if_range is None or if_range == headers.get("ETag")) and any(match.groups()):
+        first, last = match.groups()
+        if first:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+        else:  # suffix range: the last N bytes
+            start, end = max(0, size - int(last)), size - 1
+        if start >= size or (not first and int(last) == 0):
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={**headers, "Content-Range": f"bytes */{size}"},
+            )
+        if start <= end:
+            headers.update({"Content-Range": f"bytes {start}-{end}/{size}", "Content-Length": str(end - start + 1)})
+            return StreamingResponse(
+                _read_range(path, start, end - start + 1),
+                status_code=status.HTTP_206_PARTIAL_CONTENT,
+                media_type=media_type,
+                headers=headers,
+            )
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat_result)
+
+
+async def _read_range(path: str, start: int, length: int) -> AsyncIterator[bytes]:
+    async with await anyio.open_file(path, "rb") as source:
+        await source.seek(start)
+        while length > 0:
+            chunk = await source.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
@@ -0,0 +1,335 @@
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.models.order import (
+    ORDER_CONFIRMED,
+    ORDER_FAILED,
+    ORDER_OUT_OF_STOCK,
+    ORDER_PAID,
+    ORDER_PAYMENT_FAILED,
+    ORDER_PENDING,
+    Order,
+)
+from app.repositories.cart import CartRepository
+from app.repositories.order import OrderRepository
+from app.schemas.order import CheckoutRequest, OrderItemResponse, OrderResponse
+from app.services.cart import cart_token_hash
+from app.services.delivery import (
+    DeliveryProvider,
+    Shipment,
+    delivery_price,
+    delivery_provider,
+    order_weight,
+    unit_weight,
+)
+from app.services.outbox import JOB_ORDER_CONFIRMATION, outbox_worker, queue_job
+from app.services.payments import Payment, PaymentDeclined, PaymentProvider, payment_provider
+from app.services.providers import ProviderError, call_with_retry
+from app.services.stock import StockReservations, stock_reservations
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+checkout_duration = registry.histogram(
+    "checkout_duration_seconds", "Checkouts by final order status, including provider calls", ("status",)
+)
+
+# HTTP status a failed order is reported with, on the first request and on replays
+FAILURE_STATUS_CODES = {
+    ORDER_PAYMENT_FAILED: status.HTTP_402_PAYMENT_REQUIRED,
+    ORDER_OUT_OF_STOCK: status.HTTP_409_CONFLICT,
+    ORDER_FAILED: status.HTTP_502_BAD_GATEWAY,
+}
+
+
+def checkout_request_hash(owner: str, data: CheckoutRequest) -> str:
+    """Fingerprint of a checkout request; a reused Idempotency-Key must come with the same one."""
+    payload = json.dumps({"owner": owner, **data.dict()}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def order_response(order: Order) -> OrderResponse:
+    return OrderResponse(
+        id=order.id,
+        status=order.status,
+        items=[
+            OrderItemResponse(
+                product=item.product_slug,
+                name=item.product_name,
+                fabric_name=item.fabric_name,
+                unit_price=item.unit_price,
+                quantity=item.quantity,
+            )
+            for item in order.items
+        ],
+        items_total=order.items_total,
+        delivery_price=order.delivery_price,
+        total=order.total,
+        payment_method=order.payment_method,
+        transaction_id=order.transaction_id,
+        delivery_id=order.delivery_id,
+        tracking=order.tracking,
+        eta=order.eta,
+        created_at=order.created_at,
+    )
+
+
+class OrderService:
+    """Checkout: turns the cart into an order, charges it and books the delivery.
+
+    The order row is written (status ``pending``) before any provider is
+    called and doubles as the idempotency record, so a retried request with
+    the same Idempotency-Key replays the stored result instead of charging
+    twice. The payment and the delivery booking run concurrently, each with
+    a timeout and retries; if one of them fails the other is rolled back.
+    No database connection is held while the providers are called.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        payments: Optional[PaymentProvider] = None,
+        delivery: Optional[DeliveryProvider] = None,
+        stock: Optional[StockReservations] = None,
+    ):
+        self.session = session
+        self.order_repo = OrderRepository(session)
+        self.cart_repo = CartRepository(session)
+        self.payments = payments or payment_provider
+        self.delivery = delivery or delivery_provider
+        self.stock = stock or stock_reservations
+
+    async def checkout(
+        self, user_id: Optional[int], cart_token: Optional[str], idempotency_key: str, data: CheckoutRequest
+    ) -> Tuple[OrderResponse, bool]:
+        """Place an order from the cart of a user or of an anonymous cart token.
+
+        Returns the order and whether it is a replay of an earlier request
+        with the same key. Failed orders raise HTTPException, on replays too.
+        """
+        owner = f"user:{user_id}" if user_id is not None else f"cart:{cart_token_hash(cart_token or '')}"
+        request_hash = checkout_request_hash(owner, data)
+
+        order = await self.order_repo.get_by_key(user_id, idempotency_key)
+        if order is None:
+            order, created = await self._create(idempotency_key, request_hash, user_id, cart_token, data)
+            if created:
+                return await self._process(order, user_id, cart_token), False
+        if order.request_hash != request_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used for a different request",
+            )
+        if order.status != ORDER_PENDING:
+            await self.session.commit()
+            return self._result(order, replayed=True), True
+
+        stale_before = datetime.utcnow() - timedelta(seconds=settings.checkout_stale_after)
+        taken_over = await self.order_repo.take_over(order.id, stale_before)
+        await self.session.commit()
+        if not taken_over:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A checkout with this Idempotency-Key is in progress",
+            )
+        logger.warning("Resuming stale checkout of order %s", order.id)
+        return await self._process(order, user_id, cart_token), False
+
+    async def _cart_id(self, user_id: Optional[int], cart_token: Optional[str]) -> Optional[int]:
+        if user_id is not None:
+            return await self.cart_repo.get_id(user_id=user_id)
+        if cart_token:
+            return await self.cart_repo.get_id(token_hash=cart_token_hash(cart_token))
+        return None
+
+    async def _create(
+        self,
+        idempotency_key: str,
+        request_hash: str,
+        user_id: Optional[int],
+        cart_token: Optional[str],
+        data: CheckoutRequest,
+    ) -> Tuple[Order, bool]:
+        """Price the cart and store the pending order.
+
+        Returns the order holding the key and whether this request created
+        it; a concurrent request with the same key may have won the insert.
+        """
+        cart_id = await self._cart_id(user_id, cart_token)
+        rows = await self.cart_repo.priced_lines(cart_id) if cart_id is not None else []
+        if not rows:
+            await self.session.rollback()
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cart is empty")
+
+        items = []
+        for row in rows:
+            items.append(
+                {
+                    "product_id": row.product_id,
+                    "fabric_id": row.fabric_id,
+                    "product_slug": row.slug,
+                    "product_name": row.name,
+                    "fabric_name": row.fabric_name,
+                    "unit_price": row.unit_price,
+                    "quantity": row.quantity,
+                }
+            )
+        weight = order_weight((unit_weight(row.dimensions), row.quantity) for row in rows)
+        items_total = sum(item["unit_price"] * item["quantity"] for item in items)
+        shipping = delivery_price(weight)
+
+        order_id = await self.order_repo.create_pending(
+            {
+                "idempotency_key": idempotency_key,
+                "request_hash": request_hash,
+                "user_id": user_id,
+                "name": data.name,
+                "phone": data.phone,
+                "email": data.email,
+                "address": data.address,
+                "comment": data.comment,
+                "payment_method": data.pay,
+                "items_total": items_total,
+                "delivery_price": shipping,
+                "total": items_total + shipping,
+                "weight": weight,
+            },
+            items,
+        )
+        order = await self.order_repo.get_by_key(user_id, idempotency_key)
+        await self.session.commit()
+        return order, order_id is not None
+
+    def _call(self, provider: str, operation: str, func: Callable[[], Awaitable[T]]) -> Awaitable[T]:
+        return call_with_retry(
+            provider,
+            operation,
+            func,
+            timeout=settings.provider_timeout,
+            attempts=settings.provider_attempts,
+            backoff=settings.provider_backoff,
+        )
+
+    async def _charge(self, order: Order) -> Optional[Payment]:
+        if order.payment_method != "online":
+            return None
+        return await self._call(
+            self.payments.name,
+            "charge",
+            lambda: self.payments.charge(f"order-{order.id}", order.total, f"Order {order.id}"),
+        )
+
+    async def _book_delivery(self, order: Order) -> Shipment:
+        quantity = sum(item.quantity for item in order.items)
+        return await self._call(
+            self.delivery.name,
+            "create_shipment",
+            lambda: self.delivery.create_shipment(f"order-{order.id}", order.address, order.weight, quantity),
+        )
+
+    async def _process(self, order: Order, user_id: Optional[int], cart_token: Optional[str]) -> OrderResponse:
+        """Reserve stock, then charge and book the delivery concurrently; store the outcome.
+
+        Provider calls use keys derived from the order id, so a checkout
+        resumed after a crash gets the original charge and shipment back.
+        """
+        start = perf_counter()
+        lines = [(item.product_id, item.fabric_id, item.quantity) for item in order.items if item.product_id]
+        if not await self.stock.reserve(order.id, lines):
+            await self._finish(order, ORDER_OUT_OF_STOCK, start, error="Some items are out of stock")
+            return self._result(order)
+
+        shipment, payment = await asyncio.gather(
+            self._book_delivery(order), self._charge(order), return_exceptions=True
+        )
+        references = {}
+        if isinstance(payment, Payment):
+            references["transaction_id"] = payment.transaction_id
+        if isinstance(shipment, Shipment):
+            references.update(delivery_id=shipment.delivery_id, tracking=shipment.tracking, eta=shipment.eta)
+
+        errors = [result for result in (payment, shipment) if isinstance(result, BaseException)]
+        if not errors:
+            if not await self.stock.commit(order.id):
+                await self._roll_back(order, shipment, payment)
+                await self._finish(
+                    order, ORDER_OUT_OF_STOCK, start, error="Stock reservation expired, please try again", **references
+                )
+                return self._result(order)
+            final = ORDER_PAID if payment is not None else ORDER_CONFIRMED
+            # The cart is emptied, and the confirmation queued, in the transaction that completes the order
+            if user_id is not None:
+                await self.cart_repo.clear_owned(user_id=user_id)
+            elif cart_token:
+                await self.cart_repo.clear_owned(token_hash=cart_token_hash(cart_token))
+            queue_job(self.session, JOB_ORDER_CONFIRMATION, {"order_id": order.id})
+            await self._finish(order, final, start, **references)
+            outbox_worker.notify()
+            return self._result(order)
+
+        for error in errors:
+            if not isinstance(error, ProviderError):
+                logger.error("Checkout of order %s failed", order.id, exc_info=error)
+        await self._roll_back(order, shipment, payment)
+        if isinstance(payment, PaymentDeclined):
+            final, message = ORDER_PAYMENT_FAILED, str(payment)
+        else:
+            final, message = ORDER_FAILED, "Payment or delivery service unavailable, please try again"
+        # References are kept so that a failed refund or cancellation can be finished by hand
+        await self._finish(order, final, start, error=message[:255], **references)
+        return self._result(order)
+
+    async def _roll_back(self, order: Order, shipment: object, payment: object) -> None:
+        """Best-effort compensation of a partly failed checkout: refund, cancel the shipment, release stock."""
+        undo: List[Awaitable[None]] = []
+        if isinstance(payment, Payment):
+            undo.append(
+                self._call(
+                    self.payments.name,
+                    "refund",
+                    lambda: self.payments.refund(f"refund-{order.id}", payment.transaction_id, payment.amount),
+                )
+            )
+        if isinstance(shipment, Shipment):
+            undo.append(
+                self._call(
+                    self.delivery.name,
+                    "cancel_shipment",
+                    lambda: self.delivery.cancel_shipment(f"cancel-{order.id}", shipment.delivery_id),
+                )
+            )
+        for result in await asyncio.gather(*undo, return_exceptions=True):
+            if isinstance(result, BaseException):
+                logger.error("Could not roll back order %s: %s", order.id, result)
+        await self.stock.release(order.id)
+
+    async def _finish(self, order: Order, final: str, start: float, **values) -> None:
+        await self.order_repo.finish(order.id, final, **values)
+        await self.session.commit()
+        # Mirror the UPDATE on the loaded order without marking it dirty
+        set_committed_value(order, "status", final)
+        for name, value in values.items():
+            set_committed_value(order, name, value)
+        checkout_duration.labels(final).observe(perf_counter() - start)
+
+    def _result(self, order: Order, replayed: bool = False) -> OrderResponse:
+        """Response for a final order; failed orders raise their HTTP error."""
+        if order.status in FAILURE_STATUS_CODES:
+            raise HTTPException(
+                status_code=FAILURE_STATUS_CODES[order.status],
+                detail={"order_id": order.id, "status": order.status, "message": order.error},
+                headers={"Idempotent-Replayed": "true"} if replayed else None,
+            )
+        return order_response(order)
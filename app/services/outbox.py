@@ -0,0 +1,248 @@
+"""Transactional outbox: side effects queued with the business change and run by a background worker.
+
+A service queues a job with queue_job() in the transaction that makes the
+change, so the job exists if and only if the change was committed; the
+worker then runs it with retries. Handlers must tolerate running twice: a
+worker that dies after a handler returned but before recording it leaves
+the job to be run again once its lease expires.
+
+Besides running in each app process (settings.outbox_worker_enabled), the
+worker can run on its own:
+
+    python -m app.services.outbox
+    python -m app.services.outbox --retry-dead
+"""
+import argparse
+import asyncio
+import logging
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.db import SessionLocal, engine
+from app.core.logging import setup_logging
+from app.core.metrics import registry
+from app.models.outbox import JOB_DEAD, JOB_PENDING, OutboxJob
+from app.repositories.order import OrderRepository
+from app.repositories.outbox import OutboxRepository
+from app.services.email import email_sender
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[AsyncSession, Dict[str, Any]], Awaitable[None]]
+
+outbox_jobs = registry.counter(
+    "outbox_jobs_total", "Outbox job runs by kind and outcome (done, retry or dead)", ("kind", "outcome")
+)
+outbox_job_duration = registry.histogram("outbox_job_duration_seconds", "Outbox job run time by kind", ("kind",))
+
+# Job kinds
+JOB_ORDER_CONFIRMATION = "email.order_confirmation"
+
+
+def queue_job(session: AsyncSession, kind: str, payload: Dict[str, Any]) -> None:
+    """Queue a job in the session's transaction; call outbox_worker.notify() after committing."""
+    OutboxRepository(session).add(kind, payload)
+
+
+async def send_order_confirmation(session: AsyncSession, payload: Dict[str, Any]) -> None:
+    order = await OrderRepository(session).get(payload["order_id"])
+    if order is None or not order.email:
+        return
+    lines = [f"{item.product_name} × {item.quantity}: {item.unit_price * item.quantity} ₽" for item in order.items]
+    body = "\n".join(
+        [
+            f"Здравствуйте, {order.name}!",
+            "",
+            f"Заказ №{order.id} оформлен.",
+            *lines,
+            f"Доставка: {order.delivery_price} ₽",
+            f"Итого: {order.total} ₽",
+        ]
+    )
+    await email_sender.send(order.email, f"Заказ №{order.id} оформлен", body)
+
+
+JOB_HANDLERS: Dict[str, JobHandler] = {
+    JOB_ORDER_CONFIRMATION: send_order_confirmation,
+}
+
+
+class OutboxWorker:
+    """Runs outbox jobs in batches with bounded concurrency.
+
+    Each pass claims up to ``batch_size`` due jobs in one short transaction,
+    runs them with at most ``concurrency`` at a time (each with its own
+    session), then records the outcomes in a second transaction: finished
+    jobs are deleted, failed ones go back to pending after an exponential
+    backoff, or to dead after ``max_attempts`` runs. It wakes up on notify()
+    or every ``interval`` seconds, so jobs queued by other processes are
+    picked up too.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        handlers: Dict[str, JobHandler],
+        batch_size: int,
+        concurrency: int,
+        interval: float,
+        lease: float,
+        max_attempts: int,
+        backoff: float,
+        backoff_max: float,
+    ):
+        self.session_factory = session_factory
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.interval = interval
+        self.lease = timedelta(seconds=lease)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.outcomes: Counter = Counter()  # as outbox_jobs, without the kind
+        self._wake = asyncio.Event()
+
+    def notify(self) -> None:
+        """Wake the worker: a job was just committed."""
+        self._wake.set()
+
+    def retry_delay(self, attempts: int) -> float:
+        """Seconds before the next run of a job that failed ``attempts`` times (full jitter)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** (attempts - 1)))
+
+    async def _run(self, job: OutboxJob, semaphore: asyncio.Semaphore) -> Optional[str]:
+        """Run one job; returns None on success, or the error."""
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            return f"No handler for job kind {job.kind!r}"
+        async with semaphore:
+            start = perf_counter()
+            try:
+                async with self.session_factory() as session:
+                    await handler(session, job.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Outbox job %s (%s) failed: %r", job.id, job.kind, exc)
+                return repr(exc)
+            finally:
+                outbox_job_duration.labels(job.kind).observe(perf_counter() - start)
+        return None
+
+    async def process_batch(self) -> int:
+        """Claim and run one batch of due jobs and return its size."""
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            jobs = await OutboxRepository(session).claim(self.batch_size, now, now + self.lease)
+            await session.commit()
+        if not jobs:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        errors = await asyncio.gather(*(self._run(job, semaphore) for job in jobs))
+
+        done: List[int] = []
+        failures: List[Dict[str, Any]] = []
+        now = datetime.utcnow()
+        for job, error in zip(jobs, errors):
+            if error is None:
+                done.append(job.id)
+                outcome = "done"
+            elif job.attempts >= self.max_attempts:
+                failures.append({"job_id": job.id, "status": JOB_DEAD, "available_at": now, "error": error[:500]})
+                outcome = "dead"
+                logger.error("Outbox job %s (%s) is dead after %d attempts: %s", job.id, job.kind, job.attempts, error)
+            else:
+                retry_at = now + timedelta(seconds=self.retry_delay(job.attempts))
+                failures.append({"job_id": job.id, "status": JOB_PENDING, "available_at": retry_at, "error": error[:500]})
+                outcome = "retry"
+            self.outcomes[outcome] += 1
+            outbox_jobs.labels(job.kind, outcome).inc()
+
+        async with self.session_factory() as session:
+            repo = OutboxRepository(session)
+            await repo.complete(done)
+            await repo.fail(failures)
+            await session.commit()
+        return len(jobs)
+
+    async def drain(self) -> int:
+        """Run batches until no job is due."""
+        processed = 0
+        while True:
+            batch = await self.process_batch()
+            processed += batch
+            if batch < self.batch_size:
+                return processed
+
+    async def run(self) -> None:
+        """Drain the queue forever; meant to run as a background task."""
+        while True:
+            # Cleared before draining, so a job queued meanwhile triggers another pass
+            self._wake.clear()
+            try:
+                await self.drain()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Outbox worker failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+def create_outbox_worker(session_factory: async_sessionmaker[AsyncSession]) -> OutboxWorker:
+    return OutboxWorker(
+        session_factory,
+        JOB_HANDLERS,
+        batch_size=settings.outbox_batch_size,
+        concurrency=settings.outbox_concurrency,
+        interval=settings.outbox_interval,
+        lease=settings.outbox_lease,
+        max_attempts=settings.outbox_max_attempts,
+        backoff=settings.outbox_backoff,
+        backoff_max=settings.outbox_backoff_max,
+    )
+
+
+outbox_worker = create_outbox_worker(SessionLocal)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the outbox worker")
+    parser.add_argument("--retry-dead", action="store_true", help="queue dead jobs again and exit")
+    parser.add_argument("--kind", default="", help="with --retry-dead: only jobs of this kind")
+    args = parser.parse_args()
+
+    async def retry_dead() -> int:
+        try:
+            async with SessionLocal() as session:
+                count = await OutboxRepository(session).retry_dead(args.kind)
+                await session.commit()
+            return count
+        finally:
+            await engine.dispose()
+
+    async def run() -> None:
+        try:
+            await outbox_worker.run()
+        finally:
+            await engine.dispose()
+
+    if args.retry_dead:
+        print(f"Queued {asyncio.run(retry_dead())} dead jobs again")
+        return
+    setup_logging()
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import random
+from dataclasses import dataclass
+from typing import Dict
+from uuid import uuid4
+
+from app.core.config import settings
+from app.services.providers import ProviderError, simulate_latency
+
+
+@dataclass(frozen=True)
+class Payment:
+    transaction_id: str
+    amount: int
+
+
+class PaymentDeclined(ProviderError):
+    """The payment was refused (card declined, insufficient funds); retrying will not help."""
+
+
+class PaymentProvider:
+    """Payment gateway adapter.
+
+    Every call carries an idempotency key; a gateway must return the
+    original result for a repeated key instead of charging twice, so that
+    call_with_retry can safely repeat timed-out calls.
+    """
+
+    name = "payment"
+
+    async def charge(self, idempotency_key: str, amount: int, description: str) -> Payment:
+        """Charge ``amount`` rubles. Raises PaymentDeclined or ProviderError."""
+        raise NotImplementedError
+
+    async def refund(self, idempotency_key: str, transaction_id: str, amount: int) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class FakePaymentProvider(PaymentProvider):
+    """In-process gateway for development, tests and load tests.
+
+    Simulates network latency, transient failures (retryable) and declines,
+    and deduplicates by idempotency key like a real gateway.
+    """
+
+    name = "fake-payment"
+
+    def __init__(self, latency: float, failure_rate: float = 0.0, decline_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.decline_rate = decline_rate
+        self.charges: Dict[str, Payment] = {}
+        self.refunds: Dict[str, str] = {}
+
+    async def charge(self, idempotency_key: str, amount: int, description: str) -> Payment:
+        await simulate_latency(self.latency)
+        if idempotency_key in self.charges:
+            return self.charges[idempotency_key]
+        if random.random() < self.failure_rate:
+            raise ProviderError("Payment gateway unavailable", retryable=True)
+        if random.random() < self.decline_rate:
+            raise PaymentDeclined("Card declined")
+        payment = Payment(transaction_id=f"TEST-{uuid4().hex[:12]}", amount=amount)
+        self.charges[idempotency_key] = payment
+        return payment
+
+    async def refund(self, idempotency_key: str, transaction_id: str, amount: int) -> None:
+        await simulate_latency(self.latency)
+        if random.random() < self.failure_rate:
+            raise ProviderError("Payment gateway unavailable", retryable=True)
+        self.refunds.setdefault(idempotency_key, transaction_id)
+
+
+def create_payment_provider() -> PaymentProvider:
+    """Build the adapter selected by settings.payment_provider."""
+    if settings.payment_provider == "fake":
+        return FakePaymentProvider(
+            latency=settings.fake_payment_latency,
+            failure_rate=settings.fake_provider_failure_rate,
+            decline_rate=settings.fake_payment_decline_rate,
+        )
+    raise ValueError(f"Unknown payment provider: {settings.payment_provider}")
+
+
+payment_provider = create_payment_provider()
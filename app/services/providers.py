@@ -0,0 +1,73 @@
+import asyncio
+import logging
+import random
+from time import perf_counter
+from typing import Awaitable, Callable, TypeVar
+
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+provider_call_duration = registry.histogram(
+    "provider_call_duration_seconds",
+    "Calls to external providers (payment, delivery), including retries",
+    ("provider", "operation", "outcome"),
+)
+provider_retries = registry.counter(
+    "provider_retries_total", "Provider call attempts that failed and were retried", ("provider", "operation")
+)
+
+
+class ProviderError(Exception):
+    """A provider call failed. ``retryable`` errors (timeouts, 5xx) may succeed if repeated."""
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+async def call_with_retry(
+    provider: str,
+    operation: str,
+    func: Callable[[], Awaitable[T]],
+    timeout: float,
+    attempts: int,
+    backoff: float,
+) -> T:
+    """Run ``func`` with a per-attempt timeout, retrying retryable failures.
+
+    Waits ``backoff * 2**n`` seconds (with full jitter) before retry n+1.
+    Only safe for calls the provider deduplicates, which is why every
+    adapter operation takes an idempotency key. Raises the last
+    ProviderError; timeouts are reported as retryable ProviderErrors.
+    """
+    start = perf_counter()
+    outcome = "error"
+    attempt = 0
+    try:
+        while True:
+            try:
+                result = await asyncio.wait_for(func(), timeout)
+                outcome = "ok"
+                return result
+            except asyncio.TimeoutError:
+                error = ProviderError(f"{provider} {operation} timed out after {timeout}s", retryable=True)
+            except ProviderError as exc:
+                error = exc
+            attempt += 1
+            if not error.retryable or attempt >= attempts:
+                outcome = "retryable_error" if error.retryable else "error"
+                raise error
+            provider_retries.labels(provider, operation).inc()
+            logger.warning("%s %s failed (attempt %d/%d): %s", provider, operation, attempt, attempts, error)
+            await asyncio.sleep(random.uniform(0, backoff * 2 ** (attempt - 1)))
+    finally:
+        provider_call_duration.labels(provider, operation, outcome).observe(perf_counter() - start)
+
+
+async def simulate_latency(mean: float) -> None:
+    """Sleep like a remote call: mostly near ``mean``, with an occasional slow tail."""
+    if mean > 0:
+        await asyncio.sleep(random.expovariate(1 / mean) * 0.5 + mean * 0.5)
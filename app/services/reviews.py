@@ -0,0 +1,225 @@
+import asyncio
+import base64
+import logging
+import re
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.core.metrics import registry
+from app.models.review import REVIEW_APPROVED, REVIEW_FLAGGED, REVIEW_PENDING, Review
+from app.repositories.review import ReviewRepository
+from app.schemas.review import (
+    ModerationPage,
+    ModerationReview,
+    ReviewAccepted,
+    ReviewCreate,
+    ReviewPage,
+    ReviewResponse,
+)
+
+logger = logging.getLogger(__name__)
+
+reviews_moderated = registry.counter(
+    "reviews_moderated_total", "Reviews moderated by the background worker, by resulting status", ("status",)
+)
+
+# Contact details and links are the usual payload of review spam
+_LINK = re.compile(r"https?://|www\.|\b[\w-]+\.(?:ru|com|net|org|рф)\b", re.IGNORECASE)
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.\w+")
+_PHONE = re.compile(r"(?:\+?\d[\s()-]*){10,}")
+
+
+def auto_moderate(author: str, text: str, stop_words: Sequence[str]) -> str:
+    """Status the moderation worker gives a review: approved, or flagged for a moderator."""
+    content = f"{author}\n{text}"
+    if _LINK.search(content) or _EMAIL.search(content) or _PHONE.search(content):
+        return REVIEW_FLAGGED
+    folded = content.casefold()
+    if any(word.casefold() in folded for word in stop_words):
+        return REVIEW_FLAGGED
+    return REVIEW_APPROVED
+
+
+def encode_cursor(review: Review) -> str:
+    """Opaque cursor pointing just past ``review`` (reviews are listed newest first)."""
+    return base64.urlsafe_b64encode(str(review.id).encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+class ReviewModerationWorker:
+    """Background moderation of submitted reviews (write-behind).
+
+    Submitting a review is a single INSERT of a pending row; this worker
+    claims pending reviews in batches of ``batch_size``, applies
+    auto_moderate, and in the same transaction adds the approved ones to
+    their products' rating aggregates with one UPDATE per product. It wakes
+    up on notify() (called after each submission) or every ``interval``
+    seconds, whichever comes first, so reviews from other processes are
+    picked up too.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        batch_size: int,
+        interval: float,
+        stop_words: Sequence[str],
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.interval = interval
+        self.stop_words = list(stop_words)
+        self.moderated: Counter = Counter()  # by resulting status, as reviews_moderated
+        self._wake = asyncio.Event()
+
+    def notify(self) -> None:
+        """Wake the worker: a review was just submitted."""
+        self._wake.set()
+
+    async def process_batch(self) -> int:
+        """Moderate one batch of pending reviews and return its size."""
+        async with self.session_factory() as session:
+            repo = ReviewRepository(session)
+            reviews = await repo.claim_pending(self.batch_size)
+            if not reviews:
+                return 0
+            decided: Dict[str, List[Review]] = defaultdict(list)
+            for review in reviews:
+                decided[auto_moderate(review.author, review.text, self.stop_words)].append(review)
+            now = datetime.utcnow()
+            for review_status, group in decided.items():
+                await repo.set_status((review.id for review in group), review_status, now)
+            await repo.add_to_ratings(decided.get(REVIEW_APPROVED, ()))
+            await session.commit()
+
+        for review_status, group in decided.items():
+            self.moderated[review_status] += len(group)
+            reviews_moderated.labels(review_status).inc(len(group))
+        return len(reviews)
+
+    async def drain(self) -> int:
+        """Moderate batches until the queue is empty."""
+        processed = 0
+        while True:
+            batch = await self.process_batch()
+            processed += batch
+            if batch < self.batch_size:
+                return processed
+
+    async def run(self) -> None:
+        """Drain the queue forever; meant to run as a background task."""
+        while True:
+            # Cleared before draining, so a review submitted meanwhile triggers another pass
+            self._wake.clear()
+            try:
+                await self.drain()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Review moderation failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+def create_review_moderation_worker(session_factory: async_sessionmaker[AsyncSession]) -> ReviewModerationWorker:
+    return ReviewModerationWorker(
+        session_factory,
+        batch_size=settings.review_moderation_batch_size,
+        interval=settings.review_moderation_interval,
+        stop_words=settings.review_stop_words,
+    )
+
+
+review_moderation = create_review_moderation_worker(SessionLocal)
+
+
+class ReviewService:
+    """Review submission, listing and manual moderation."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.repo = ReviewRepository(session)
+
+    async def submit(self, user_id: Optional[int], data: ReviewCreate) -> ReviewAccepted:
+        """Queue a review for moderation; it is listed once approved."""
+        review_id = await self.repo.submit(
+            data.product, {"user_id": user_id, "author": data.author, "rating": data.rating, "text": data.text}
+        )
+        if review_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Product not found",
+            )
+        await self.session.commit()
+        review_moderation.notify()
+        return ReviewAccepted(id=review_id, status=REVIEW_PENDING)
+
+    async def list_reviews(self, product: Optional[str], limit: int, cursor: Optional[str] = None) -> ReviewPage:
+        """One page of approved reviews of a product, or of the store without one."""
+        before_id = decode_cursor(cursor) if cursor else None
+        page = ReviewPage(items=[])
+        product_id = None
+        if product is not None:
+            row = await self.repo.product_rating(product)
+            if row is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Product not found",
+                )
+            product_id = row.id
+            page.rating_count = row.rating_count
+            page.rating = round(row.rating_sum / row.rating_count, 1) if row.rating_count else None
+
+        reviews = await self.repo.list_approved(product_id, limit + 1, before_id)
+        page.items = [ReviewResponse.from_orm(review) for review in reviews[:limit]]
+        page.next_cursor = encode_cursor(reviews[limit - 1]) if len(reviews) > limit else None
+        return page
+
+    async def moderation_queue(self, limit: int, cursor: Optional[str] = None) -> ModerationPage:
+        """Reviews the worker flagged for a moderator, newest first."""
+        reviews = await self.repo.list_by_status(REVIEW_FLAGGED, limit + 1, decode_cursor(cursor) if cursor else None)
+        return ModerationPage(
+            items=[ModerationReview.from_orm(review) for review in reviews[:limit]],
+            next_cursor=encode_cursor(reviews[limit - 1]) if len(reviews) > limit else None,
+        )
+
+    async def moderate(self, review_id: int, new_status: str) -> ModerationReview:
+        """Approve or reject a review, keeping the product's rating aggregates in step."""
+        review = await self.repo.get(review_id)
+        if review is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Review not found",
+            )
+        old_status = review.status
+        if old_status != new_status:
+            if not await self.repo.transition(review.id, old_status, new_status):
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Review was moderated concurrently, reload it",
+                )
+            if old_status == REVIEW_APPROVED:
+                await self.repo.add_to_ratings([review], sign=-1)
+            elif new_status == REVIEW_APPROVED:
+                await self.repo.add_to_ratings([review])
+            await self.session.commit()
+            set_committed_value(review, "status", new_status)
+        return ModerationReview.from_orm(review)
@@ -0,0 +1,213 @@
+import heapq
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.cache import MISSING, TTLCache
+from app.models.catalog import Product
+from app.repositories.catalog import PRICE_BUCKETS
+
+_VOWELS = "аеиоуыэюя"
+_PERFECTIVE_GERUND = (("в", "вши", "вшись"), ("ив", "ивши", "ившись", "ыв", "ывши", "ывшись"))
+_ADJECTIVE = (
+    "ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем", "им", "ым", "ом",
+    "его", "ого", "ему", "ому", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+)
+_PARTICIPLE = (("ем", "нн", "вш", "ющ", "щ"), ("ивш", "ывш", "ующ"))
+_REFLEXIVE = ("ся", "сь")
+_VERB = (
+    ("ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет", "ют", "ны", "ть", "ешь", "нно"),
+    (
+        "ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй", "ил", "ыл", "им", "ым", "ен",
+        "ило", "ыло", "ено", "ят", "ует", "уют", "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю",
+    ),
+)
+_NOUN = (
+    "а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии", "и", "ией", "ей", "ой", "ий", "й",
+    "иям", "ям", "ием", "ем", "ам", "ом", "о", "у", "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия", "ья", "я",
+)
+_DERIVATIONAL = ("ость", "ост")
+_SUPERLATIVE = ("ейше", "ейш")
+
+# Words the PostgreSQL "russian" configuration drops as stop words (the common ones)
+STOP_WORDS = frozenset(
+    "и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по только ее мне было вот "
+    "от меня еще нет о из ему теперь когда даже ну вдруг ли если уже или ни быть был него до вас нибудь "
+    "опять уж вам ведь там потом себя ничего ей может они тут где есть надо ней для мы тебя их чем была "
+    "сам чтоб без будто чего раз тоже себе под будет ж тогда кто этот того потому этого какой совсем ним "
+    "здесь этом один почти мой тем чтобы нее сейчас были куда зачем всех никогда можно при наконец два об "
+    "другой хоть после над больше тот через эти нас про всего них какая много разве три эту моя впрочем "
+    "хорошо свою этой перед иногда лучше чуть том нельзя такой им более всегда конечно всю между".split()
+)
+
+
+def price_bucket_index(price: int) -> int:
+    """Same result as PostgreSQL width_bucket(price, PRICE_BUCKETS)."""
+    return sum(1 for bound in PRICE_BUCKETS if price >= bound)
+
+
+_TOKEN = re.compile(r"[0-9]+|[a-zа-я]+")
+
+
+def _strip(word: str, start: int, endings: Sequence[str], after_a: bool = False) -> Optional[str]:
+    """Remove the longest of ``endings`` found at or after ``start``; with ``after_a`` it must follow а/я."""
+    for ending in sorted(endings, key=len, reverse=True):
+        if word.endswith(ending) and len(word) - len(ending) >= start:
+            stem = word[: -len(ending)]
+            if after_a and not (len(stem) > start and stem[-1] in "ая"):
+                continue
+            return stem
+    return None
+
+
+def _strip_grouped(word: str, start: int, groups: Tuple[Sequence[str], Sequence[str]]) -> Optional[str]:
+    """Snowball endings come in two groups; the first only counts after а/я."""
+    stems = (_strip(word, start, groups[0], after_a=True), _strip(word, start, groups[1]))
+    candidates = [stem for stem in stems if stem is not None]
+    return min(candidates, key=len) if candidates else None
+
+
+def _region(word: str, start: int) -> int:
+    """Start of the region after the first non-vowel that follows a vowel, from ``start``."""
+    for i in range(start + 1, len(word)):
+        if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+            return i + 1
+    return len(word)
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Snowball Russian stemmer (the algorithm behind PostgreSQL's russian configuration)."""
+    word = word.lower().replace("ё", "е")
+    rv = next((i + 1 for i, char in enumerate(word) if char in _VOWELS), len(word))
+    r2 = _region(word, _region(word, 0))
+
+    # Step 1
+    stripped = _strip_grouped(word, rv, _PERFECTIVE_GERUND)
+    if stripped is None:
+        word = _strip(word, rv, _REFLEXIVE) or word
+        stripped = _strip(word, rv, _ADJECTIVE)
+        if stripped is not None:
+            stripped = _strip_grouped(stripped, rv, _PARTICIPLE) or stripped
+        else:
+            stripped = _strip_grouped(word, rv, _VERB) or _strip(word, rv, _NOUN)
+    word = stripped if stripped is not None else word
+
+    # Step 2
+    if word.endswith("и") and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    # Step 3
+    word = _strip(word, max(r2, rv), _DERIVATIONAL) or word
+
+    # Step 4
+    if word.endswith("нн") and len(word) - 2 >= rv:
+        return word[:-1]
+    superlative = _strip(word, rv, _SUPERLATIVE)
+    if superlative is not None:
+        word = superlative
+        return word[:-1] if word.endswith("нн") and len(word) - 2 >= rv else word
+    if word.endswith("ь") and len(word) - 1 >= rv:
+        return word[:-1]
+    return word
+
+
+def terms(text: str) -> List[str]:
+    """Stemmed, stop-word-free search terms of a text."""
+    return [
+        token if token.isdigit() else stem(token)
+        for token in _TOKEN.findall(text.lower().replace("ё", "е"))
+        if token not in STOP_WORDS
+    ]
+
+
+class InvertedIndex:
+    """In-memory search index over a catalog snapshot.
+
+    Matching follows websearch_to_tsquery: every query term must occur.
+    Scores are weighted term frequencies (name terms count double), close
+    enough to ts_rank_cd for a test setup. Per-product facet values are kept
+    in flat dicts so that counting them over tens of thousands of hits stays
+    in C (Counter over map). Only the first ``depth`` hits are ranked, and
+    results are memoized per normalized query for the life of the index.
+    """
+
+    NAME_WEIGHT = 2.0
+
+    def __init__(self, products: Sequence[Product], depth: int, cache_size: int):
+        self.depth = depth
+        self.products = {product.id: product for product in products}
+        self.categories = {product.id: product.category for product in products}
+        self.prices = {product.id: product.price for product in products}
+        self.price_buckets = {product.id: price_bucket_index(product.price) for product in products}
+        self.fabric_types: Dict[int, FrozenSet[str]] = {
+            product.id: frozenset(fabric.fabric_type for fabric in product.fabrics if fabric.fabric_type)
+            for product in products
+        }
+        # Tie-breaker of equal scores: more popular first, then by id (as in the SQL ORDER BY)
+        self.tie_breakers = {product.id: (-product.popularity, product.id) for product in products}
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for product in products:
+            for weight, text in ((self.NAME_WEIGHT, product.name), (1.0, product.search_text)):
+                for term in terms(text):
+                    posting = self.postings[term]
+                    posting[product.id] = posting.get(product.id, 0.0) + weight
+        self.postings.default_factory = None
+        self._results = TTLCache(maxsize=cache_size, ttl=float("inf"))
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        offset: int = 0,
+        category: Optional[str] = None,
+        fabric: Optional[str] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+    ) -> Tuple[int, List[Product], Dict[str, Counter]]:
+        """Return the number of hits, one page of them best first, and facet counts over all hits."""
+        key = (frozenset(terms(query)), category, fabric, min_price, max_price)
+        result = self._results.get(key)
+        if result is MISSING:
+            result = self._search(*key)
+            self._results.set(key, result)
+        total, ranked, facets = result
+        return total, [self.products[product_id] for product_id in ranked[offset : offset + limit]], facets
+
+    def _search(
+        self,
+        query_terms: FrozenSet[str],
+        category: Optional[str],
+        fabric: Optional[str],
+        min_price: Optional[int],
+        max_price: Optional[int],
+    ) -> Tuple[int, List[int], Dict[str, Counter]]:
+        postings = sorted((self.postings.get(term, {}) for term in query_terms), key=len)
+        if not postings:
+            return 0, [], {"category": Counter(), "fabric": Counter(), "price": Counter()}
+
+        scores = postings[0]
+        for posting in postings[1:]:
+            scores = {hit: score + posting[hit] for hit, score in scores.items() if hit in posting}
+
+        hits: Iterable[int] = scores
+        if category is not None:
+            hits = [hit for hit in hits if self.categories[hit] == category]
+        if fabric is not None:
+            hits = [hit for hit in hits if fabric in self.fabric_types[hit]]
+        if min_price is not None:
+            hits = [hit for hit in hits if self.prices[hit] >= min_price]
+        if max_price is not None:
+            hits = [hit for hit in hits if self.prices[hit] <= max_price]
+        hits = list(hits)
+
+        facets = {
+            "category": Counter(map(self.categories.__getitem__, hits)),
+            "fabric": Counter(chain.from_iterable(map(self.fabric_types.__getitem__, hits))),
+            "price": Counter(map(self.price_buckets.__getitem__, hits)),
+        }
+        tie_breakers = self.tie_breakers
+        ranked = heapq.nsmallest(self.depth, hits, key=lambda hit: (-scores[hit], tie_breakers[hit]))
+        return len(hits), ranked, facets
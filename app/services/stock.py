@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.core.metrics import registry
+from app.repositories.stock import Sku, StockRepository, Taken
+from app.schemas.stock import StockLevel, StockUpdate
+
+logger = logging.getLogger(__name__)
+
+# (product id, fabric id or None, quantity)
+StockLine = Tuple[int, Optional[int], int]
+
+stock_reservations_total = registry.counter(
+    "stock_reservations_total", "Checkout stock reservations by result", ("result",)
+)
+stock_reserve_retries = registry.counter(
+    "stock_reserve_retries_total", "Reservation passes repeated because another order emptied a shard first"
+)
+stock_reservations_expired = registry.counter(
+    "stock_reservations_expired_total", "Reservations released by the reaper after their TTL"
+)
+
+
+def plan_take(shards: Sequence[Taken], units: int) -> Optional[List[Taken]]:
+    """Units to take from each shard of a SKU, or None if the SKU has too few.
+
+    A random shard that can cover the whole line is preferred, so concurrent
+    orders for the same SKU spread over its rows instead of queueing on the
+    first one; only when no single shard is enough is the line split, over
+    shards in id order so that two splitting orders lock rows in the same order.
+    """
+    whole = [item_id for item_id, quantity in shards if quantity >= units]
+    if whole:
+        return [(random.choice(whole), units)]
+    plan = []
+    for item_id, quantity in shards:
+        if units <= 0:
+            break
+        if quantity > 0:
+            plan.append((item_id, min(quantity, units)))
+            units -= quantity
+    return plan if units <= 0 else None
+
+
+class StockReservations:
+    """Stock reservation hook of the checkout.
+
+    The checkout reserves the order's lines before charging, commits the
+    reservation when the order completes and releases it if the order fails.
+    Units are taken with conditional decrements, never with read-modify-write,
+    so stock cannot be oversold however many checkouts race for the last
+    units. Reservations left held by a checkout that never finished return to
+    stock after ``ttl``, released by run().
+
+    SKUs without stock rows are made to order and always available.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        ttl: timedelta,
+        attempts: int,
+        reaper_batch_size: int,
+        reaper_interval: float,
+    ):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.attempts = attempts
+        self.reaper_batch_size = reaper_batch_size
+        self.reaper_interval = reaper_interval
+
+    async def reserve(self, order_id: int, lines: Sequence[StockLine]) -> bool:
+        """Reserve stock for an order; False if some line is unavailable.
+
+        Repeating a reservation that is still held is a no-op; a checkout
+        resumed after its reservation expired reserves the units again.
+        """
+        wanted: Dict[Sku, int] = defaultdict(int)
+        for product_id, fabric_id, quantity in lines:
+            wanted[(product_id, fabric_id or 0)] += quantity
+
+        for attempt in range(self.attempts):
+            if attempt:
+                stock_reserve_retries.labels().inc()
+            async with self.session_factory() as session:
+                repo = StockRepository(session)
+                if await repo.has_reservations(order_id):
+                    return True
+                shards = await repo.shards(list(wanted))
+                held: List[Taken] = []
+                contended = False
+                # SKUs in a fixed order, so orders with several hot SKUs never lock them in opposite orders
+                for sku in sorted(shards):
+                    plan = plan_take(shards[sku], wanted[sku])
+                    if plan is None:
+                        await session.rollback()
+                        stock_reservations_total.labels("out_of_stock").inc()
+                        return False
+                    for item_id, units in plan:
+                        if not await repo.take(item_id, units):
+                            contended = True
+                            break
+                        held.append((item_id, units))
+                    if contended:
+                        break
+                if contended:
+                    # Another order got there between the read and the decrement; retry on fresh quantities
+                    await session.rollback()
+                    continue
+                await repo.forget_expired(order_id)
+                await repo.hold(order_id, held, datetime.utcnow() + self.ttl)
+                await session.commit()
+            stock_reservations_total.labels("reserved").inc()
+            return True
+
+        stock_reservations_total.labels("contended").inc()
+        return False
+
+    async def release(self, order_id: int) -> None:
+        """Release the reservation of a failed order."""
+        async with self.session_factory() as session:
+            await StockRepository(session).release_order(order_id)
+            await session.commit()
+
+    async def commit(self, order_id: int) -> bool:
+        """Turn the reservation of a completed order into a sale.
+
+        False, with nothing committed, if the reaper returned some of the
+        order's units to stock first: they may already be sold to another
+        order, so this one must fail. The check follows the UPDATE, which
+        waits for a concurrent reaper, so an expiry cannot slip in between.
+        """
+        async with self.session_factory() as session:
+            repo = StockRepository(session)
+            await repo.commit_order(order_id)
+            if await repo.has_expired(order_id):
+                await session.rollback()
+                logger.warning("Stock reservation of order %s expired before the order completed", order_id)
+                return False
+            await session.commit()
+        return True
+
+    async def release_expired(self) -> int:
+        """Return the units of expired reservations to stock, in batches; returns how many were released."""
+        released = 0
+        while True:
+            async with self.session_factory() as session:
+                batch = await StockRepository(session).release_expired(datetime.utcnow(), self.reaper_batch_size)
+                await session.commit()
+            released += batch
+            stock_reservations_expired.labels().inc(batch)
+            if batch < self.reaper_batch_size:
+                return released
+
+    async def run(self) -> None:
+        """Release expired reservations forever; meant to run as a background task."""
+        while True:
+            try:
+                released = await self.release_expired()
+                if released:
+                    logger.info("Released %d expired stock reservations", released)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Releasing expired stock reservations failed")
+            await asyncio.sleep(self.reaper_interval)
+
+
+def create_stock_reservations(session_factory: async_sessionmaker[AsyncSession]) -> StockReservations:
+    return StockReservations(
+        session_factory,
+        ttl=timedelta(seconds=settings.stock_reservation_ttl),
+        attempts=settings.stock_reserve_attempts,
+        reaper_batch_size=settings.stock_reaper_batch_size,
+        reaper_interval=settings.stock_reaper_interval,
+    )
+
+
+stock_reservations = create_stock_reservations(SessionLocal)
+
+
+class StockService:
+    """Stock levels, as set and inspected by staff."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.repo = StockRepository(session)
+
+    async def _sku(self, slug: str, fabric: Optional[str]) -> Tuple[int, Optional[int]]:
+        sku = await self.repo.resolve_sku(slug, fabric)
+        if sku is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product or fabric not found")
+        return sku
+
+    async def levels(self, slug: str) -> List[StockLevel]:
+        product_id, _ = await self._sku(slug, None)
+        return [StockLevel(**level) for level in await self.repo.levels(product_id)]
+
+    async def set_level(self, slug: str, data: StockUpdate) -> List[StockLevel]:
+        """Set the available units of a product or of one of its fabrics."""
+        product_id, fabric_id = await self._sku(slug, data.fabric)
+        await self.repo.set_quantity(product_id, fabric_id, data.quantity, data.shards or settings.stock_default_shards)
+        await self.session.commit()
+        return [StockLevel(**level) for level in await self.repo.levels(product_id)]
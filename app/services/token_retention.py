@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.repositories.user import UserRepository
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshTokenReaper:
+    """Background purge of expired and revoked refresh tokens.
+
+    Deletes in batches of ``batch_size`` with a short pause between batches, so
+    each transaction stays small; once a batch comes back short the backlog is
+    cleared and the reaper idles for ``interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        batch_size: int,
+        batch_sleep: float,
+        interval: float,
+        revoked_retention: timedelta,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.batch_sleep = batch_sleep
+        self.interval = interval
+        self.revoked_retention = revoked_retention
+        self.deleted_total = 0
+
+    async def purge_batch(self) -> int:
+        """Delete one batch and return the number of rows removed."""
+        async with self.session_factory() as session:
+            deleted = await UserRepository(session).delete_stale_refresh_tokens(
+                revoked_before=datetime.utcnow() - self.revoked_retention,
+                limit=self.batch_size,
+            )
+        self.deleted_total += deleted
+        return deleted
+
+    async def purge(self) -> int:
+        """Delete batches until no stale tokens are left."""
+        deleted = 0
+        while True:
+            batch = await self.purge_batch()
+            deleted += batch
+            if batch < self.batch_size:
+                return deleted
+            await asyncio.sleep(self.batch_sleep)
+
+    async def run(self) -> None:
+        """Purge forever; meant to run as a background task."""
+        while True:
+            try:
+                deleted = await self.purge()
+                if deleted:
+                    logger.info("Purged %d stale refresh tokens", deleted)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Refresh token purge failed")
+            await asyncio.sleep(self.interval)
+
+
+def create_refresh_token_reaper(session_factory: async_sessionmaker[AsyncSession]) -> RefreshTokenReaper:
+    return RefreshTokenReaper(
+        session_factory,
+        batch_size=settings.refresh_token_reaper_batch_size,
+        batch_sleep=settings.refresh_token_reaper_batch_sleep,
+        interval=settings.refresh_token_reaper_interval,
+        revoked_retention=timedelta(days=settings.refresh_token_revoked_retention_days),
+    )
@@ -0,0 +1,140 @@
+"""ASGI-level benchmark: requests/sec through the middleware stack, before and after.
+
+"before" rebuilds the previous stack (BaseHTTPMiddleware rate limiter and an
+``app.middleware("http")`` security headers function); "after" is the pure
+ASGI stack from create_app. Requests are driven straight into the ASGI app,
+without a server or HTTP client, so only app and middleware overhead is
+measured. ``/auth/me`` runs with get_current_user overridden so that no
+database is needed.
+
+    python -m benchmarks.asgi_middleware --requests 5000
+"""
+import argparse
+import asyncio
+from time import perf_counter
+
+from fastapi import FastAPI, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.config import settings
+from app.core.rate_limit import InMemoryRateLimitBackend
+from app.core.security import get_current_user
+from app.core.security_headers import SECURITY_HEADERS
+from app.main import create_app
+from app.models.user import User
+from app.routers import auth, health
+
+PATHS = ["/", "/health", "/auth/me"]
+
+
+async def root():
+    return {"status": "ok"}
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app):
+        super().__init__(app)
+        self.rate_limit_config = {"/auth/login": (5, 60), "/auth/refresh": (10, 60)}
+        self.backend = InMemoryRateLimitBackend()
+
+    async def dispatch(self, request: Request, call_next):
+        client_ip = request.client.host if request.client else "unknown"
+        path = request.url.path
+        if path in self.rate_limit_config:
+            max_requests, window_seconds = self.rate_limit_config[path]
+            await self.backend.hit(f"{client_ip}:{path}", max_requests, window_seconds)
+        return await call_next(request)
+
+
+async def legacy_security_headers(request: Request, call_next):
+    response: Response = await call_next(request)
+    for name, value in SECURITY_HEADERS.items():
+        response.headers.setdefault(name, value)
+    return response
+
+
+def legacy_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(LegacyRateLimitMiddleware)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_origins,
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+        allow_headers=["*"],
+    )
+    app.middleware("http")(legacy_security_headers)
+    app.include_router(health.router)
+    app.include_router(auth.router)
+    app.get("/")(root)
+    return app
+
+
+def current_app() -> FastAPI:
+    app = create_app()
+    app.get("/")(root)
+    return app
+
+
+async def call(app, path: str) -> int:
+    status = 0
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"authorization", b"Bearer bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    return status
+
+
+async def bench(name: str, app: FastAPI, requests: int) -> None:
+    user = User(id=1, email="bench@example.com", hashed_password="", full_name="Bench", is_active=True)
+
+    async def current_user() -> User:
+        return user
+
+    app.dependency_overrides[get_current_user] = current_user
+    for path in PATHS:
+        await call(app, path)  # warm up routing and dependency caches
+        start = perf_counter()
+        for _ in range(requests):
+            status = await call(app, path)
+        elapsed = perf_counter() - start
+        print(f"{name:>6} {path:<9} status={status} {requests / elapsed:10,.0f} req/s {elapsed / requests * 1e6:8.1f} us/req")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    asyncio.run(bench("before", legacy_app(), args.requests))
+    asyncio.run(bench("after", current_app(), args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Benchmark: cost of auth auditing per request, buffered against one INSERT per event.
+
+Simulates --events logins from --concurrency concurrent clients and records an
+audit event for each, either
+
+* directly: one INSERT and commit per event on the request path, or
+* buffered: AuthEventLog.record() on the request path, with the background
+  flusher writing multi-row INSERTs every --flush-interval seconds.
+
+Reports the time the request path spends on auditing (p50/p99), events/s and
+how many statements reached the database, and checks that every event was
+written. The schema is created with metadata.create_all, so never point it at
+a real database.
+
+    python -m benchmarks.auth_audit --events 20000
+    python -m benchmarks.auth_audit --database-url postgresql+asyncpg://user:pw@localhost/bench
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+from contextlib import suppress
+from datetime import datetime
+from statistics import quantiles
+from time import perf_counter
+from typing import Any, Dict, List
+
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.db import Base
+from app.models.auth_event import AuthEvent
+from app.services.auth_events import AuthEventLog
+
+
+def _sqlite_wal(dbapi_connection, _) -> None:
+    # As in checkout_load: WAL and no fsync per commit
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def make_event(n: int) -> Dict[str, Any]:
+    return {
+        "event": "login",
+        "outcome": "invalid_credentials" if n % 10 == 0 else "success",
+        "user_id": n % 1000,
+        "email": f"user{n % 1000}@example.com",
+        "ip": f"10.0.{n % 256}.{n % 7}",
+        "device_info": "Mozilla/5.0 (X11; Linux x86_64) Firefox/131.0",
+    }
+
+
+def report(label: str, latencies: List[float], elapsed: float, statements: int) -> None:
+    p50, p99 = (q * 1000 for q in (quantiles(latencies, n=100)[i] for i in (49, 98)))
+    print(
+        f"  {label:<9} {len(latencies) / elapsed:10,.0f} events/s  "
+        f"request path p50 {p50:8.3f} ms  p99 {p99:8.3f} ms  {statements:,} INSERT statements"
+    )
+
+
+async def run(database_url: str, args: argparse.Namespace) -> None:
+    sqlite = database_url.startswith("sqlite")
+    options: Dict[str, Any] = {"pool_size": args.concurrency + 1, "max_overflow": 0}
+    if sqlite:
+        options.update(poolclass=AsyncAdaptedQueuePool, connect_args={"timeout": 30})
+    engine = create_async_engine(database_url, **options)
+    if sqlite:
+        event.listen(engine.sync_engine, "connect", _sqlite_wal)
+    statements = 0
+
+    def count_inserts(conn, cursor, statement, parameters, context, executemany) -> None:
+        nonlocal statements
+        if statement.startswith("INSERT INTO auth_events"):
+            statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_inserts)
+    sessions = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    async def written() -> int:
+        async with sessions() as session:
+            count = (await session.execute(select(func.count()).select_from(AuthEvent))).scalar_one()
+            await session.execute(delete(AuthEvent))
+            await session.commit()
+        return count
+
+    print(f"{args.events} events, concurrency {args.concurrency}")
+
+    # Direct: an INSERT and a commit per event
+    queue = list(range(args.events))
+    latencies: List[float] = []
+
+    async def direct_client() -> None:
+        while queue:
+            n = queue.pop()
+            start = perf_counter()
+            async with sessions() as session:
+                await session.execute(insert(AuthEvent).values(**make_event(n), created_at=datetime.utcnow()))
+                await session.commit()
+            latencies.append(perf_counter() - start)
+            await asyncio.sleep(0)
+
+    statements = 0
+    start = perf_counter()
+    await asyncio.gather(*(direct_client() for _ in range(args.concurrency)))
+    elapsed = perf_counter() - start
+    report("direct", latencies, elapsed, statements)
+    direct_written = await written()
+
+    # Buffered: record() on the request path, multi-row INSERTs in the background
+    log = AuthEventLog(
+        sessions, batch_size=args.batch_size, flush_interval=args.flush_interval, max_buffered=args.events
+    )
+    flusher = asyncio.create_task(log.run())
+    queue = list(range(args.events))
+    latencies = []
+
+    async def buffered_client() -> None:
+        while queue:
+            n = queue.pop()
+            start = perf_counter()
+            log.record(**make_event(n))
+            latencies.append(perf_counter() - start)
+            await asyncio.sleep(0)
+
+    statements = 0
+    start = perf_counter()
+    await asyncio.gather(*(buffered_client() for _ in range(args.concurrency)))
+    while log.written < args.events:
+        await asyncio.sleep(0.01)
+    elapsed = perf_counter() - start
+    flusher.cancel()
+    with suppress(asyncio.CancelledError):
+        await flusher
+    report("buffered", latencies, elapsed, statements)
+    buffered_written = await written()
+
+    ok = direct_written == buffered_written == args.events
+    print(f"written: direct {direct_written}, buffered {buffered_written}: {'OK' if ok else 'MISMATCH'}")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--flush-interval", type=float, default=0.5)
+    parser.add_argument("--database-url", default="")
+    args = parser.parse_args()
+    # One audit log line per event would dominate the buffered timings
+    logging.getLogger("app.audit").setLevel(logging.ERROR)
+
+    if args.database_url:
+        asyncio.run(run(args.database_url, args))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}", args))
+
+
+if __name__ == "__main__":
+    main()
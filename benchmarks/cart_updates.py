@@ -0,0 +1,147 @@
+"""Benchmark: cart updates/sec and statements per update at realistic cart sizes.
+
+Each update is CartService.set_item on an existing anonymous cart (change the
+quantity of a random line, as the storefront's +/- buttons do), including the
+batched repricing of the whole cart. For comparison, "per-line pricing" prices
+the same carts the way a naive implementation would: one product and one
+fabric lookup per line. Runs against a scratch SQLite database by default
+(needs ``aiosqlite``) or a throwaway PostgreSQL database via --database-url;
+the schema is created with metadata.create_all, so never point it at a real one.
+
+    python -m benchmarks.cart_updates --carts 200 --updates 2000
+    python -m benchmarks.cart_updates --database-url postgresql+asyncpg://user:pw@localhost/bench
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+from datetime import datetime
+from time import perf_counter
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.db import Base
+from app.models.cart import CartItem
+from app.models.catalog import Product, ProductFabric
+from app.repositories.cart import CartRepository
+from app.repositories.catalog import ProductRepository
+from app.schemas.cart import CartLineUpdate
+from app.services.cart import CartService, cart_token_hash
+
+CART_SIZES = (1, 3, 8, 20)
+
+
+def make_products(count: int):
+    return [
+        {
+            "slug": f"product-{i}",
+            "category": "divan",
+            "name": f"Диван {i}",
+            "badge": None,
+            "price": 50_000 + i * 100,
+            "old_price": None,
+            "short": "",
+            "description": "",
+            "images": [f"images/p{i}.webp"],
+            "specs": {},
+            "dimensions": {"weight": 60},
+            "popularity": i,
+            "published_at": datetime.utcnow(),
+            "is_active": True,
+            "fabrics": [
+                {"code": f"fabric-{j}", "name": f"Велюр — {j}", "price_delta": j * 1000, "color": None}
+                for j in range(4)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+async def run(database_url: str, carts: int, updates: int) -> None:
+    engine = create_async_engine(database_url)
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    sessions = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with sessions() as session:
+        await ProductRepository(session).upsert_many(make_products(500))
+
+    rng = random.Random(1)
+    for size in CART_SIZES:
+        # Fill `carts` anonymous carts with `size` lines each
+        filled = []
+        async with sessions() as session:
+            service = CartService(session)
+            for _ in range(carts):
+                lines = [
+                    CartLineUpdate(product=f"product-{i}", fabric=f"fabric-{rng.randrange(4)}", quantity=1)
+                    for i in rng.sample(range(500), size)
+                ]
+                _, token = await service.replace(None, None, lines)
+                cart_id = await CartRepository(session).get_id(token_hash=cart_token_hash(token))
+                filled.append((token, cart_id, lines))
+
+        statements = 0
+        start = perf_counter()
+        for i in range(updates):
+            token, _, lines = filled[i % carts]
+            line = rng.choice(lines)
+            async with sessions() as session:
+                item = CartLineUpdate(product=line.product, fabric=line.fabric, quantity=rng.randint(1, 5))
+                await CartService(session).set_item(None, token, item)
+        elapsed = perf_counter() - start
+        print(
+            f"{size:>2} lines: {updates / elapsed:8,.0f} updates/s "
+            f"{elapsed / updates * 1000:6.2f} ms/update {statements / updates:4.1f} statements/update"
+        )
+
+        # Naive repricing of the same carts: a product and a fabric lookup per line
+        statements = 0
+        start = perf_counter()
+        for i in range(updates):
+            async with sessions() as session:
+                cart_id = filled[i % carts][1]
+                items = (await session.execute(select(CartItem).where(CartItem.cart_id == cart_id))).scalars()
+                total = 0
+                for cart_item in items:
+                    product = await session.get(Product, cart_item.product_id)
+                    fabric = await session.get(ProductFabric, cart_item.fabric_id) if cart_item.fabric_id else None
+                    total += (product.price + (fabric.price_delta if fabric else 0)) * cart_item.quantity
+        elapsed = perf_counter() - start
+        print(
+            f"{'':>10}per-line pricing only: {elapsed / updates * 1000:6.2f} ms/cart "
+            f"{statements / updates:4.1f} statements/cart"
+        )
+
+        async with engine.begin() as conn:
+            await conn.execute(Base.metadata.tables["cart_items"].delete())
+            await conn.execute(Base.metadata.tables["carts"].delete())
+
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--carts", type=int, default=200)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--database-url", default="")
+    args = parser.parse_args()
+
+    if args.database_url:
+        asyncio.run(run(args.database_url, args.carts, args.updates))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}", args.carts, args.updates))
+
+
+if __name__ == "__main__":
+    main()
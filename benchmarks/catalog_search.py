@@ -0,0 +1,224 @@
+"""Benchmark: /catalog/search latency (hits + facet counts) on a generated catalog.
+
+Generates ``--products`` products with realistic names, descriptions, specs,
+dimensions and fabrics, then times CatalogSearchService.search for a mix of
+one-word, multi-word and filtered queries and reports p50/p95/p99. On
+PostgreSQL (--database-url) this exercises the tsvector/GIN query and the
+GROUPING SETS facet query; on the default scratch SQLite database it
+exercises the in-memory inverted index fallback. The schema is created with
+metadata.create_all, so never point it at a real database.
+
+    python -m benchmarks.catalog_search --products 100000 --queries 500
+    python -m benchmarks.catalog_search --database-url postgresql+asyncpg://user:pw@localhost/bench
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Any, Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.db import Base
+from app.repositories.catalog import ProductRepository
+from app.services.catalog_search import CatalogSearchService, fabric_type, search_text_for
+from app.services.catalog_snapshot import catalog_snapshots
+
+CATEGORIES = {"divan": "Диван", "uglovoy": "Угловой диван", "kreslo": "Кресло"}
+MODELS = ("Осло", "Берген", "Милан", "Тоскана", "Верона", "Лофт", "Сканди", "Рим", "Нордик", "Прага", "Турин", "Бари")
+STYLES = ("прямой", "модульный", "раскладной", "компактный", "мягкий", "классический", "современный")
+FABRICS = {
+    "Букле": ("песочный", "молочный", "графит"),
+    "Велюр": ("изумрудный", "терракота", "серый", "синий"),
+    "Рогожка": ("бежевый", "оливковый", "серый"),
+    "Шенилл": ("мокко", "капучино"),
+    "Экокожа": ("черный", "коньяк", "белый"),
+    "Микрофибра": ("графит", "какао"),
+}
+FRAMES = ("Массив сосны", "Берёзовая фанера", "Металлокаркас", "Массив бука")
+FILLERS = ("HR-пена 35/45", "Пружинный блок", "Независимые пружины", "Пенополиуретан и холлофайбер")
+MECHANISMS = ("Еврокнижка", "Дельфин", "Аккордеон", "Клик-кляк", "Без механизма")
+FEATURES = (
+    "съемные чехлы",
+    "ящик для белья",
+    "глубокая посадка",
+    "ортопедическое основание",
+    "высокие подлокотники",
+    "подушки в комплекте",
+    "ножки из массива дуба",
+    "спальное место",
+)
+QUERIES = (
+    "диван",
+    "угловой диван",
+    "кресло велюр",
+    "диван букле",
+    "раскладной диван еврокнижка",
+    "спальное место",
+    "ящик для белья",
+    "экокожа",
+    "модульный диван",
+    "съемные чехлы",
+    "независимые пружины",
+    "осло",
+    "диван дельфин серый",
+    "ортопедическое основание",
+)
+
+
+def make_products(count: int, seed: int = 1) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    products = []
+    for i in range(count):
+        category = rng.choice(tuple(CATEGORIES))
+        features = rng.sample(FEATURES, 3)
+        specs = {
+            "frame": rng.choice(FRAMES),
+            "filler": rng.choice(FILLERS),
+            "mechanism": rng.choice(MECHANISMS) if category != "kreslo" else "Без механизма",
+            "warranty": f"{rng.randint(1, 5)} года",
+        }
+        dimensions = {
+            "width": rng.randrange(80, 360, 5),
+            "depth": rng.randrange(80, 180, 5),
+            "height": rng.randrange(75, 110, 5),
+        }
+        fabrics = []
+        for j in range(3):
+            fabric = rng.choice(tuple(FABRICS))
+            name = f"{fabric} — {rng.choice(FABRICS[fabric])}"
+            fabrics.append(
+                {
+                    "code": f"fabric-{j}",
+                    "name": name,
+                    "fabric_type": fabric_type(name),
+                    "price_delta": rng.randrange(0, 15_000, 1000),
+                    "color": "#cccccc",
+                }
+            )
+        short = f"{rng.choice(STYLES).capitalize()}, {', '.join(features[:2])}"
+        description = (
+            f"{CATEGORIES[category]} {rng.choice(STYLES)} с каркасом «{specs['frame'].lower()}», "
+            f"{features[2]}. Наполнитель: {specs['filler'].lower()}."
+        )
+        products.append(
+            {
+                "slug": f"product-{i}",
+                "category": category,
+                "name": f"{CATEGORIES[category]} {rng.choice(MODELS)} {i}",
+                "badge": "Новинка" if i % 20 == 0 else None,
+                "price": rng.randrange(20_000, 200_000, 500),
+                "old_price": None,
+                "short": short,
+                "description": description,
+                "images": [f"images/p{i}-1.webp"],
+                "specs": specs,
+                "dimensions": dimensions,
+                "search_text": search_text_for(
+                    category, short, description, specs, dimensions, [fabric["name"] for fabric in fabrics]
+                ),
+                "popularity": rng.randrange(10_000),
+                "published_at": now - timedelta(minutes=i),
+                "is_active": True,
+                "fabrics": fabrics,
+            }
+        )
+    return products
+
+
+def make_searches(count: int, seed: int = 2) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    searches = []
+    for _ in range(count):
+        search: Dict[str, Any] = {"query": rng.choice(QUERIES)}
+        roll = rng.random()
+        if roll < 0.2:
+            search["fabric"] = rng.choice(tuple(FABRICS))
+        elif roll < 0.4:
+            search["max_price"] = rng.choice((50_000, 80_000, 120_000))
+        elif roll < 0.5:
+            search["category"] = rng.choice(tuple(CATEGORIES))
+        searches.append(search)
+    return searches
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run(database_url: str, product_count: int, query_count: int) -> None:
+    engine = create_async_engine(database_url)
+    sessions = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        if engine.dialect.name == "postgresql":  # as in migration 004
+            await conn.execute(
+                text(
+                    "ALTER TABLE products ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+                    "setweight(to_tsvector('russian', coalesce(name, '')), 'A') || "
+                    "setweight(to_tsvector('russian', coalesce(search_text, '')), 'B')) STORED"
+                )
+            )
+            await conn.execute(text("CREATE INDEX ix_products_search_vector ON products USING gin (search_vector)"))
+
+    start = perf_counter()
+    async with sessions() as session:
+        await ProductRepository(session).upsert_many(make_products(product_count))
+    if engine.dialect.name == "postgresql":
+        async with engine.begin() as conn:
+            await conn.execute(text("ANALYZE products"))
+            await conn.execute(text("ANALYZE product_fabrics"))
+    print(f"generated {product_count} products in {perf_counter() - start:.1f}s")
+
+    # The SQLite fallback searches the snapshot; point the service's store at this database
+    catalog_snapshots.session_factory = sessions
+    catalog_snapshots.invalidate()
+    if engine.dialect.name != "postgresql":
+        start = perf_counter()
+        snapshot = await catalog_snapshots.get()
+        len(snapshot.search_index.postings)
+        print(f"snapshot + inverted index: {(perf_counter() - start) * 1000:.0f} ms")
+
+    searches = make_searches(query_count)
+    samples: List[float] = []
+    hits = 0
+    async with sessions() as session:
+        service = CatalogSearchService(session)
+        for search in searches[:20]:  # warm up
+            await service.search(limit=24, **search)
+        for search in searches:
+            start = perf_counter()
+            response = await service.search(limit=24, **search)
+            samples.append(perf_counter() - start)
+            hits += response.total
+
+    print(f"{len(samples)} searches, {hits / len(samples):,.0f} hits on average")
+    for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+        print(f"{name}: {percentile(samples, fraction) * 1000:8.2f} ms")
+
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--database-url", default="")
+    args = parser.parse_args()
+
+    if args.database_url:
+        asyncio.run(run(args.database_url, args.products, args.queries))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}", args.products, args.queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Benchmark: catalog listing and product page, per-request ORM query vs in-memory snapshot.
+
+"orm" is what the endpoints did before the snapshot: open a session, run the
+keyset query (or the product + fabrics query), build the response models and
+serialize them. "snapshot" looks up the pre-rendered body and builds the
+Response ("first" is a product page rendered on its first request); "304" is a revalidation with a matching If-None-Match. Runs against a
+scratch SQLite database by default (needs ``aiosqlite``) or a throwaway
+PostgreSQL database via --database-url; the schema is created with
+metadata.create_all, so never point it at a real one.
+
+    python -m benchmarks.catalog_snapshot --products 2000 --requests 2000
+    python -m benchmarks.catalog_snapshot --database-url postgresql+asyncpg://user:pw@localhost/bench
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.requests import Request
+
+from app.core.db import Base
+from app.repositories.catalog import ProductRepository
+from app.schemas.catalog import ProductDetail
+from app.services.catalog import CatalogService
+from app.services.catalog_snapshot import CatalogSnapshotStore
+
+CATEGORIES = ("divan", "uglovoy", "kreslo", "krovat")
+
+
+def make_products(count: int):
+    now = datetime.utcnow()
+    return [
+        {
+            "slug": f"product-{i}",
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "name": f"Диван модель {i}",
+            "badge": "Новинка" if i % 7 == 0 else "Хит",
+            "price": random.randrange(20_000, 200_000, 500),
+            "old_price": None,
+            "short": "Съемные чехлы, глубокая посадка, спальное место 200×150 см",
+            "description": "Мягкий диван с модульной системой. " * 5,
+            "images": [f"images/p{i}-1.webp", f"images/p{i}-2.webp"],
+            "specs": {"frame": "Берёзовая фанера", "filler": "HR-пена 35/45", "warranty": "3 года"},
+            "dimensions": {"width": 230, "depth": 105, "height": 90, "weight": 68},
+            "popularity": random.randrange(10_000),
+            "published_at": now - timedelta(minutes=i),
+            "is_active": True,
+            "fabrics": [
+                {"code": f"fabric-{j}", "name": f"Ткань {j}", "price_delta": j * 1000, "color": "#cccccc"}
+                for j in range(3)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def make_request(headers: dict) -> Request:
+    raw = [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw, "query_string": b""})
+
+
+async def timed(name: str, requests: int, func) -> None:
+    start = perf_counter()
+    for i in range(requests):
+        await func(i)
+    elapsed = perf_counter() - start
+    print(f"{name:>26}: {requests / elapsed:10,.0f} req/s {elapsed / requests * 1e6:9.1f} us/req")
+
+
+async def run(database_url: str, product_count: int, requests: int) -> None:
+    engine = create_async_engine(database_url)
+    sessions = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with sessions() as session:
+        await ProductRepository(session).upsert_many(make_products(product_count))
+
+    store = CatalogSnapshotStore(sessions, poll_interval=60, page_size=24)
+    start = perf_counter()
+    snapshot = await store.rebuild()
+    stored = sum(
+        len(body.identity) + len(body.gzip or b"") + len(body.br or b"")
+        for body in snapshot._pages.values()
+    )
+    print(
+        f"snapshot build: {(perf_counter() - start) * 1000:.0f} ms, "
+        f"{len(snapshot._pages)} pages, {stored / 1e6:.1f} MB (product pages are rendered on first request)"
+    )
+
+    slugs = list(snapshot._by_slug)
+    plain = make_request({"accept-encoding": "gzip, br"})
+
+    async def orm_listing(i: int) -> None:
+        async with sessions() as session:
+            page = await CatalogService(session).list_products("popular", 24, category=CATEGORIES[i % 4])
+        page.json().encode()
+
+    async def orm_product(i: int) -> None:
+        async with sessions() as session:
+            product = await CatalogService(session).get_product(slugs[i % len(slugs)])
+        ProductDetail.from_orm(product).json().encode()
+
+    async def snapshot_listing(i: int) -> None:
+        (await store.get()).listing("popular", 24, category=CATEGORIES[i % 4]).response(plain)
+
+    async def snapshot_filtered(i: int) -> None:
+        (await store.get()).listing("price-asc", 24, category=CATEGORIES[i % 4], max_price=100_000).response(plain)
+
+    async def snapshot_product(i: int) -> None:
+        (await store.get()).detail(slugs[i % len(slugs)]).response(plain)
+
+    etag = snapshot.listing("popular", 24, category=CATEGORIES[0]).etag
+    revalidate = make_request({"if-none-match": f'"{etag}-br"'})
+
+    async def not_modified(i: int) -> None:
+        response = (await store.get()).listing("popular", 24, category=CATEGORIES[0]).response(revalidate)
+        assert response.status_code == 304
+
+    await timed("listing orm", requests, orm_listing)
+    await timed("listing snapshot", requests, snapshot_listing)
+    await timed("listing snapshot filtered", requests, snapshot_filtered)
+    await timed("listing 304", requests, not_modified)
+    await timed("product orm", requests, orm_product)
+    # The first pass renders each product page, later ones serve the memoized body
+    await timed("product snapshot first", min(requests, len(slugs)), snapshot_product)
+    await timed("product snapshot", requests, snapshot_product)
+
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--database-url", default="")
+    args = parser.parse_args()
+
+    if args.database_url:
+        asyncio.run(run(args.database_url, args.products, args.requests))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}", args.products, args.requests))
+
+
+if __name__ == "__main__":
+    main()
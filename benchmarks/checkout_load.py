@@ -0,0 +1,186 @@
+"""Benchmark: checkout throughput and tail latency with simulated payment and delivery providers.
+
+Runs OrderService.checkout from --concurrency concurrent clients, each order
+from its own anonymous cart, against the fake providers with the given
+latency and failure rates. A share of requests (--duplicates) repeats an
+Idempotency-Key right away, like a client retrying after a timeout; the run
+checks that no key produced a second order or a second charge. Runs against
+a scratch SQLite database by default (needs ``aiosqlite``) or a throwaway
+PostgreSQL database via --database-url; the schema is created with
+metadata.create_all, so never point it at a real one.
+
+    python -m benchmarks.checkout_load --orders 500 --concurrency 50
+    python -m benchmarks.checkout_load --failure-rate 0.1 --decline-rate 0.05 --duplicates 0.2
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+from collections import Counter
+from datetime import datetime
+from statistics import quantiles
+from time import perf_counter
+from typing import List, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.config import settings
+from app.core.db import Base
+from app.models.order import Order
+from app.repositories.catalog import ProductRepository
+from app.schemas.cart import CartLineUpdate
+from app.schemas.order import CheckoutRequest
+from app.services.cart import CartService
+from app.services.delivery import FakeDeliveryProvider
+from app.services.orders import OrderService
+from app.services.payments import FakePaymentProvider
+from app.services.stock import create_stock_reservations
+
+
+def make_products(count: int):
+    return [
+        {
+            "slug": f"product-{i}",
+            "category": "divan",
+            "name": f"Диван {i}",
+            "badge": None,
+            "price": 50_000 + i * 100,
+            "old_price": None,
+            "short": "",
+            "description": "",
+            "images": [],
+            "specs": {},
+            "dimensions": {"weight": 40 + i % 50},
+            "popularity": i,
+            "published_at": datetime.utcnow(),
+            "is_active": True,
+            "fabrics": [
+                {"code": f"fabric-{j}", "name": f"Велюр — {j}", "price_delta": j * 1000, "color": None}
+                for j in range(4)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def _sqlite_wal(dbapi_connection, _) -> None:
+    # WAL lets readers run alongside the writer and commits without an fsync each
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+async def run(database_url: str, args: argparse.Namespace) -> None:
+    sqlite = database_url.startswith("sqlite")
+    options = {"pool_size": args.concurrency, "max_overflow": 0}
+    if sqlite:
+        # Pooled (aiosqlite defaults to a connection, and a thread, per session); SQLite
+        # serializes writers, so give them longer than the default 5 s busy timeout
+        options.update(poolclass=AsyncAdaptedQueuePool, connect_args={"timeout": 30})
+    engine = create_async_engine(database_url, **options)
+    if sqlite:
+        event.listen(engine.sync_engine, "connect", _sqlite_wal)
+    sessions = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with sessions() as session:
+        await ProductRepository(session).upsert_many(make_products(200))
+
+    rng = random.Random(1)
+    tokens = []
+    async with sessions() as session:
+        service = CartService(session)
+        for _ in range(args.orders):
+            lines = [
+                CartLineUpdate(product=f"product-{i}", fabric=f"fabric-{rng.randrange(4)}", quantity=rng.randint(1, 2))
+                for i in rng.sample(range(200), rng.randint(1, 4))
+            ]
+            _, token = await service.replace(None, None, lines)
+            tokens.append(token)
+
+    # Requests in arrival order: (cart token, Idempotency-Key); retries follow their original closely
+    requests: List[Tuple[str, str]] = []
+    for i, token in enumerate(tokens):
+        requests.append((token, f"bench-{i}"))
+        if rng.random() < args.duplicates:
+            requests.append((token, f"bench-{i}"))
+
+    payments = FakePaymentProvider(args.payment_latency, args.failure_rate, args.decline_rate)
+    delivery = FakeDeliveryProvider(args.delivery_latency, args.failure_rate)
+    stock = create_stock_reservations(sessions)
+    settings.provider_timeout = args.timeout
+    form = CheckoutRequest(name="Иван", phone="+79990000000", address="Москва, ул. Ленина, 1", pay="online")
+    queue: asyncio.Queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+    latencies: List[float] = []
+    outcomes: Counter = Counter()
+
+    async def client() -> None:
+        while not queue.empty():
+            token, key = queue.get_nowait()
+            start = perf_counter()
+            async with sessions() as session:
+                try:
+                    _, replayed = await OrderService(session, payments, delivery, stock).checkout(
+                        None, token, key, form
+                    )
+                    outcomes["replayed" if replayed else "created"] += 1
+                except HTTPException as exc:
+                    outcomes[str(exc.status_code)] += 1
+            latencies.append(perf_counter() - start)
+
+    start = perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    elapsed = perf_counter() - start
+
+    async with sessions() as session:
+        orders = (await session.execute(select(func.count(Order.id)))).scalar_one()
+        charged = (await session.execute(select(func.count(Order.transaction_id)))).scalar_one()
+        statuses = dict((await session.execute(select(Order.status, func.count()).group_by(Order.status))).all())
+    await engine.dispose()
+
+    p50, p95, p99 = (q * 1000 for q in (quantiles(latencies, n=100)[i] for i in (49, 94, 98)))
+    print(
+        f"{len(requests)} requests ({len(requests) - len(tokens)} retries), concurrency {args.concurrency}: "
+        f"{len(requests) / elapsed:,.1f} requests/s"
+    )
+    print(f"latency p50 {p50:7.1f} ms  p95 {p95:7.1f} ms  p99 {p99:7.1f} ms  max {max(latencies) * 1000:7.1f} ms")
+    print(f"responses: {dict(outcomes)}")
+    print(f"orders: {statuses}")
+    # 409 responses are retries that arrived while the original was still being processed
+    print(f"unique keys {len(tokens)}, orders {orders}: {'OK' if orders == len(tokens) else 'MISMATCH'}")
+    print(
+        f"charges {len(payments.charges)}, orders with a transaction {charged}, refunds {len(payments.refunds)}: "
+        f"{'OK' if len(payments.charges) == charged else 'MISMATCH'}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duplicates", type=float, default=0.1, help="share of requests retried with the same key")
+    parser.add_argument("--payment-latency", type=float, default=0.7)
+    parser.add_argument("--delivery-latency", type=float, default=0.5)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of provider calls failing transiently")
+    parser.add_argument("--decline-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=settings.provider_timeout)
+    parser.add_argument("--database-url", default="")
+    args = parser.parse_args()
+
+    if args.database_url:
+        asyncio.run(run(args.database_url, args))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}", args))
+
+
+if __name__ == "__main__":
+    main()
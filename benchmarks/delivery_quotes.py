@@ -0,0 +1,116 @@
+"""Benchmark: delivery quote latency and provider calls with and without the quote cache.
+
+Simulates shoppers clicking "Рассчитать": --requests quotes from
+--concurrency concurrent clients, for addresses drawn with a skewed
+popularity from --addresses distinct ones (each typed in varying case and
+with or without abbreviations) and cart weights of one to three sofas;
+each shopper asks one to three times. The same requests are served by DeliveryQuoter (TTL cache plus single-flight)
+and by calling the fake provider directly. No database is needed.
+
+    python -m benchmarks.delivery_quotes --requests 5000 --concurrency 100
+    python -m benchmarks.delivery_quotes --addresses 5000 --latency 0.5
+"""
+import argparse
+import asyncio
+import random
+from statistics import quantiles
+from time import perf_counter
+from typing import Awaitable, Callable, List, Tuple
+
+from app.services.delivery import FakeDeliveryProvider, billable_weight
+from app.services.delivery_quotes import DeliveryQuoter
+
+STREETS = ("ул. Ленина", "пр-т Мира", "ул. Гагарина", "Садовая ул.", "ш. Энтузиастов", "пер. Строителей")
+CITIES = ("Москва", "Санкт-Петербург", "Казань", "Екатеринбург", "Новосибирск")
+
+
+def make_requests(count: int, addresses: int, seed: int) -> List[Tuple[str, float, str]]:
+    rng = random.Random(seed)
+    places = [
+        (rng.choice(CITIES), rng.choice(STREETS), rng.randint(1, 200), rng.randint(1, 300)) for _ in range(addresses)
+    ]
+    weights = [1 / (rank + 1) for rank in range(addresses)]  # Zipf-like: a few addresses are quoted often
+    requests = []
+    while len(requests) < count:
+        city, street, house, flat = rng.choices(places, weights=weights)[0]
+        if rng.random() < 0.5:
+            address = f"{city}, {street}, д. {house}, кв. {flat}"
+        else:
+            address = f"{city.lower()} {street.replace('ул.', 'улица')} дом {house} квартира {flat}"
+        weight = sum(rng.choice((45, 60, 72, 85)) for _ in range(rng.randint(1, 3)))
+        # A shopper clicks once or a few times (after changing a quantity or the tariff)
+        for _ in range(rng.randint(1, 3)):
+            tariff = rng.choice(("courier", "courier", "courier", "express"))
+            requests.append((address, weight + rng.choice((0, 0, 0, 2)), tariff))
+    rng.shuffle(requests)
+    return requests[:count]
+
+
+async def measure(
+    quote: Callable[[str, float, str], Awaitable[object]], requests: List[Tuple[str, float, str]], concurrency: int
+) -> Tuple[float, List[float]]:
+    queue: asyncio.Queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+    latencies: List[float] = []
+
+    async def client() -> None:
+        while not queue.empty():
+            address, weight, tariff = queue.get_nowait()
+            start = perf_counter()
+            await quote(address, weight, tariff)
+            latencies.append(perf_counter() - start)
+
+    start = perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return perf_counter() - start, latencies
+
+
+def report(label: str, elapsed: float, latencies: List[float], provider_calls: int) -> None:
+    p50, p95, p99 = (quantiles(latencies, n=100)[i] * 1000 for i in (49, 94, 98))
+    print(
+        f"{label:<8} {len(latencies) / elapsed:9,.0f} quotes/s  p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  "
+        f"p99 {p99:7.2f} ms  provider calls {provider_calls}"
+    )
+
+
+class CountingProvider(FakeDeliveryProvider):
+    def __init__(self, latency: float):
+        super().__init__(latency)
+        self.calls = 0
+
+    async def quote(self, address, weight, tariff):
+        self.calls += 1
+        return await super().quote(address, weight, tariff)
+
+
+async def run(args: argparse.Namespace) -> None:
+    requests = make_requests(args.requests, args.addresses, seed=1)
+
+    direct = CountingProvider(args.latency)
+    elapsed, latencies = await measure(
+        lambda address, weight, tariff: direct.quote(address, billable_weight(weight), tariff),
+        requests,
+        args.concurrency,
+    )
+    report("direct", elapsed, latencies, direct.calls)
+
+    provider = CountingProvider(args.latency)
+    quoter = DeliveryQuoter(provider, ttl=600, maxsize=100_000)
+    elapsed, latencies = await measure(quoter.quote, requests, args.concurrency)
+    report("cached", elapsed, latencies, provider.calls)
+    print(f"         {quoter.stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--addresses", type=int, default=1000, help="distinct addresses")
+    parser.add_argument("--latency", type=float, default=0.5, help="mean provider latency, seconds")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Micro-benchmark: access token signing and verification, HS256 against ES256 and EdDSA.
+
+Signs --tokens access tokens with each algorithm through the same Keyring the
+app uses, then verifies them for --iterations rounds (no verified-claims
+cache, see jwt_cache for that). Also reports the token size, since ES256 and
+EdDSA tokens carry a kid header and a 64-byte signature.
+
+    python -m benchmarks.jwt_signing --tokens 1000 --iterations 20000
+"""
+import argparse
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Callable, List
+
+from app.core.jwt_keys import HmacKey, Keyring, generate_key
+
+
+def rate(func: Callable[[int], object], iterations: int) -> float:
+    start = perf_counter()
+    for i in range(iterations):
+        func(i)
+    return iterations / (perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=1000, help="distinct access tokens")
+    parser.add_argument("--iterations", type=int, default=20000, help="signatures and verifications per algorithm")
+    args = parser.parse_args()
+
+    keyrings = {
+        "HS256": Keyring(HmacKey("benchmark-secret-key")),
+        "ES256": Keyring(generate_key("ES256")),
+        "EdDSA": Keyring(generate_key("EdDSA")),
+    }
+    expire = datetime.utcnow() + timedelta(minutes=15)
+
+    def claims(i: int) -> dict:
+        return {"sub": str(i % args.tokens), "ver": 0, "exp": expire, "type": "access"}
+
+    print(f"{args.iterations} signatures and verifications per algorithm, {args.tokens} distinct tokens")
+    for name, keyring in keyrings.items():
+        tokens: List[str] = [keyring.encode(claims(i)) for i in range(args.tokens)]
+        signed = rate(lambda i: keyring.encode(claims(i)), args.iterations)
+        verified = rate(lambda i: keyring.decode(tokens[i % args.tokens]), args.iterations)
+        print(
+            f"{name:>6}: sign {signed:10,.0f}/s ({1e6 / signed:7.1f} us)  "
+            f"verify {verified:10,.0f}/s ({1e6 / verified:7.1f} us)  token {len(tokens[0])} bytes"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Benchmark: request latency with the access log written synchronously vs through the queue.
+
+Drives --requests GETs of --path through the app (httpx ASGITransport,
+--concurrency clients at once) with access_log_enabled, so every request
+emits its structured access line. "sync" is the previous setup
+(StreamHandler + JSONFormatter on the event loop); "queued" is
+BoundedQueueHandler + BatchingLogWriter. Output goes to a sink that sleeps
+``--sink-delay`` ms per write, standing in for a container log driver under
+pressure; with "sync" that sleep blocks every request in flight.
+
+    python -m benchmarks.logging_pipeline --requests 5000 --concurrency 20 --sink-delay 0.5
+"""
+import argparse
+import asyncio
+import io
+import logging
+import queue
+import time
+from statistics import quantiles
+from time import perf_counter
+from typing import List, Optional
+
+import httpx
+
+from app.core import logging as app_logging
+from app.core.config import settings
+from app.core.logging import BatchingLogWriter, BoundedQueueHandler, JSONFormatter, dumps
+from app.core.request_context import RequestContextFilter
+from app.main import create_app
+
+
+class SlowSink(io.StringIO):
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        time.sleep(self.delay)
+        return len(text)
+
+
+def install(handler: logging.Handler) -> None:
+    """Make ``handler`` the only handler of the root logger, as setup_logging would."""
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    handler.addFilter(RequestContextFilter())
+    root.addHandler(handler)
+
+
+async def drive(app, path: str, requests: int, concurrency: int) -> List[float]:
+    latencies: List[float] = []
+    remaining = iter(range(requests))
+
+    async def client_loop(client: httpx.AsyncClient) -> None:
+        for _ in remaining:
+            start = perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(perf_counter() - start)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+    return latencies
+
+
+def run(name: str, app, args: argparse.Namespace, sink: SlowSink, writer: Optional[BatchingLogWriter]) -> None:
+    start = perf_counter()
+    latencies = asyncio.run(drive(app, args.path, args.requests, args.concurrency))
+    elapsed = perf_counter() - start
+    if writer is not None:
+        writer.stop()
+
+    p50, p99 = (q * 1000 for q in (quantiles(latencies, n=100)[i] for i in (49, 98)))
+    print(
+        f"{name:>8}: p50 {p50:7.2f} ms  p99 {p99:7.2f} ms  max {max(latencies) * 1000:7.2f} ms  "
+        f"{args.requests / elapsed:8,.0f} req/s  writes={sink.writes}"
+        + (f" {writer.stats()}" if writer is not None else "")
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20, help="requests in flight")
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--sink-delay", type=float, default=0.5, help="milliseconds per write")
+    parser.add_argument("--queue-size", type=int, default=settings.log_queue_size)
+    parser.add_argument("--batch-size", type=int, default=settings.log_batch_size)
+    parser.add_argument("--policy", choices=["drop", "block"], default=settings.log_queue_policy)
+    args = parser.parse_args()
+    delay = args.sink_delay / 1000
+
+    settings.access_log_enabled = True
+    # Importing the app set up logging to stdout; the benchmark installs its own handlers
+    if app_logging.log_writer is not None:
+        app_logging.log_writer.stop()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    app = create_app()
+
+    print(f"serializer: {dumps.__name__}, {args.concurrency} concurrent requests to {args.path}")
+
+    sink = SlowSink(delay)
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(JSONFormatter())
+    install(handler)
+    run("sync", app, args, sink, None)
+
+    sink = SlowSink(delay)
+    log_queue: "queue.Queue[Optional[logging.LogRecord]]" = queue.Queue(maxsize=args.queue_size)
+    handler = BoundedQueueHandler(log_queue, policy=args.policy)
+    writer = BatchingLogWriter(log_queue, handler, sink, JSONFormatter(), batch_size=args.batch_size)
+    writer.start()
+    install(handler)
+    run(f"q-{args.policy}", app, args, sink, writer)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Benchmark: outbox job throughput per worker.
+
+Queues --jobs jobs, then drains them with --workers OutboxWorker instances
+running side by side (as separate processes would, each claiming its own
+batches with SKIP LOCKED). The handler sleeps --latency seconds, like a call
+to a mail relay, and fails a --failure-rate share of runs, which are retried
+after a short backoff. Reports jobs/s overall and per worker, how the jobs
+were shared between workers, and checks that every job finished exactly once
+(or died after --max-attempts).
+
+SQLite serializes the claim and outcome transactions; run it against
+PostgreSQL to see workers scale. The schema is created with
+metadata.create_all, so never point it at a real database.
+
+    python -m benchmarks.outbox_throughput --jobs 20000 --workers 1 2 4
+    python -m benchmarks.outbox_throughput --database-url postgresql+asyncpg://user:pw@localhost/bench
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import tempfile
+from collections import Counter
+from time import perf_counter
+from typing import Any, Dict
+
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.db import Base
+from app.models.outbox import JOB_PENDING, OutboxJob
+from app.services.outbox import OutboxWorker
+
+CHUNK_SIZE = 5_000
+
+
+def _sqlite_wal(dbapi_connection, _) -> None:
+    # As in checkout_load: WAL and no fsync per commit
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+async def run(database_url: str, args: argparse.Namespace) -> None:
+    sqlite = database_url.startswith("sqlite")
+    options: Dict[str, Any] = {"pool_size": max(args.workers) * 2 + 2, "max_overflow": 0}
+    if sqlite:
+        options.update(poolclass=AsyncAdaptedQueuePool, connect_args={"timeout": 30})
+    engine = create_async_engine(database_url, **options)
+    if sqlite:
+        event.listen(engine.sync_engine, "connect", _sqlite_wal)
+    sessions = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    print(
+        f"{args.jobs} jobs, batch {args.batch_size}, concurrency {args.concurrency} per worker, "
+        f"handler latency {args.latency * 1000:.0f} ms, failure rate {args.failure_rate:.0%}"
+    )
+    for worker_count in args.workers:
+        async with sessions() as session:
+            await session.execute(delete(OutboxJob))
+            for start in range(0, args.jobs, CHUNK_SIZE):
+                await session.execute(
+                    insert(OutboxJob),
+                    [
+                        {"kind": "bench", "payload": {"n": n}, "status": JOB_PENDING, "attempts": 0}
+                        for n in range(start, min(args.jobs, start + CHUNK_SIZE))
+                    ],
+                )
+            await session.commit()
+
+        runs: Counter = Counter()  # job number -> successful runs
+
+        async def handler(session: AsyncSession, payload: Dict[str, Any]) -> None:
+            await asyncio.sleep(args.latency)
+            if random.random() < args.failure_rate:
+                raise RuntimeError("transient failure")
+            runs[payload["n"]] += 1
+
+        workers = [
+            OutboxWorker(
+                sessions,
+                {"bench": handler},
+                batch_size=args.batch_size,
+                concurrency=args.concurrency,
+                interval=0.05,
+                lease=60.0,
+                max_attempts=args.max_attempts,
+                backoff=0.01,
+                backoff_max=0.1,
+            )
+            for _ in range(worker_count)
+        ]
+
+        async def drain(worker: OutboxWorker) -> None:
+            # Retries become due a little later, so keep draining until nothing is left
+            while True:
+                await worker.drain()
+                async with sessions() as session:
+                    left = (
+                        await session.execute(
+                            select(func.count()).select_from(OutboxJob).where(OutboxJob.status == JOB_PENDING)
+                        )
+                    ).scalar_one()
+                if not left:
+                    return
+                await asyncio.sleep(0.01)
+
+        start = perf_counter()
+        await asyncio.gather(*(drain(worker) for worker in workers))
+        elapsed = perf_counter() - start
+
+        async with sessions() as session:
+            result = await session.execute(select(OutboxJob.status, func.count()).group_by(OutboxJob.status))
+            statuses = dict(result.all())
+        outcomes = sum((worker.outcomes for worker in workers), Counter())
+        shares = ", ".join(str(worker.outcomes["done"] + worker.outcomes["dead"]) for worker in workers)
+        dead = statuses.get("dead", 0)
+        exactly_once = len(runs) + dead == args.jobs and all(count == 1 for count in runs.values())
+        print(
+            f"workers {worker_count}: {args.jobs / elapsed:9,.1f} jobs/s  "
+            f"({args.jobs / elapsed / worker_count:,.1f} per worker)  in {elapsed:.2f}s"
+        )
+        print(
+            f"           finished per worker [{shares}], runs {dict(outcomes)}, left {statuses}: "
+            f"{'OK' if exactly_once else 'MISMATCH'}"
+        )
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10, help="jobs running at once per worker")
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds per handler call")
+    parser.add_argument("--failure-rate", type=float, default=0.01)
+    parser.add_argument("--max-attempts", type=int, default=8)
+    parser.add_argument("--database-url", default="")
+    args = parser.parse_args()
+    # Retried failures are expected here; keep the report readable
+    logging.getLogger("app.services.outbox").setLevel(logging.ERROR)
+
+    if args.database_url:
+        asyncio.run(run(args.database_url, args))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}", args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Load benchmark: /health latency while bcrypt logins are running.
+
+Runs a burst of concurrent password verifications either inline on the event
+loop (the old behaviour) or through the password hashing pool, and probes
+``/health`` through the ASGI app at a fixed rate meanwhile.
+
+    python -m benchmarks.password_hash_load --logins 8 --duration 5
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+from time import perf_counter
+from typing import List
+
+import httpx
+
+from app.core.security import averify_password, get_password_hash, verify_password
+from app.main import app
+
+PASSWORD = "correct horse battery staple"
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def login_worker(mode: str, hashed: str, deadline: float) -> int:
+    done = 0
+    while perf_counter() < deadline:
+        if mode == "inline":
+            verify_password(PASSWORD, hashed)
+            await asyncio.sleep(0)
+        else:
+            await averify_password(PASSWORD, hashed)
+        done += 1
+    return done
+
+
+async def probe_health(client: httpx.AsyncClient, deadline: float, interval: float) -> List[float]:
+    latencies = []
+    while perf_counter() < deadline:
+        start = perf_counter()
+        response = await client.get("/health")
+        response.raise_for_status()
+        latencies.append(perf_counter() - start)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def run(mode: str, logins: int, duration: float, interval: float) -> None:
+    hashed = get_password_hash(PASSWORD)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        deadline = perf_counter() + duration
+        results = await asyncio.gather(
+            probe_health(client, deadline, interval),
+            *(login_worker(mode, hashed, deadline) for _ in range(logins)),
+        )
+
+    latencies, verified = results[0], sum(results[1:])
+    print(
+        f"{mode:>6}: logins={verified:5d} ({verified / duration:6.1f}/s) "
+        f"/health n={len(latencies):5d} "
+        f"p50={statistics.median(latencies) * 1000:8.2f}ms "
+        f"p99={percentile(latencies, 99) * 1000:8.2f}ms "
+        f"max={max(latencies) * 1000:8.2f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=8, help="concurrent login workers")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per mode")
+    parser.add_argument("--interval", type=float, default=0.01, help="seconds between probes")
+    parser.add_argument("--mode", choices=["inline", "pool", "both"], default="both")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    modes = ["inline", "pool"] if args.mode == "both" else [args.mode]
+    for mode in modes:
+        asyncio.run(run(mode, args.logins, args.duration, args.interval))
+
+
+if __name__ == "__main__":
+    main()
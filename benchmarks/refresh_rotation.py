@@ -0,0 +1,99 @@
+"""Benchmark: refresh token rotation throughput, before and after rotate_refresh_token.
+
+"before" replays the old AuthService.refresh sequence (get_refresh_token,
+revoke_refresh_token, save_refresh_token); "after" is a single
+rotate_refresh_token call. Runs against a scratch SQLite database by default
+(needs ``aiosqlite``) or a throwaway PostgreSQL database via --database-url;
+the schema is created with metadata.create_all, so never point it at a real one.
+
+    python -m benchmarks.refresh_rotation --rotations 2000
+    python -m benchmarks.refresh_rotation --database-url postgresql+asyncpg://user:pw@localhost/bench
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+from time import perf_counter
+from uuid import uuid4
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.db import Base
+from app.models.user import User
+from app.repositories.user import UserRepository
+
+
+EXPIRES_AT = datetime.utcnow() + timedelta(days=30)
+
+
+async def before(repo: UserRepository, token_hash: str) -> str:
+    stored = await repo.get_refresh_token(token_hash)
+    await repo.revoke_refresh_token(token_hash)
+    new_hash = uuid4().hex
+    await repo.save_refresh_token(stored.user_id, new_hash, EXPIRES_AT, stored.device_info)
+    return new_hash
+
+
+async def after(repo: UserRepository, token_hash: str) -> str:
+    new_hash = uuid4().hex
+    await repo.rotate_refresh_token(token_hash, new_hash, EXPIRES_AT)
+    return new_hash
+
+
+async def run(database_url: str, rotations: int) -> None:
+    engine = create_async_engine(database_url)
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    sessions = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with sessions() as session:
+        user = User(email="bench@example.com", hashed_password="x")
+        session.add(user)
+        await session.commit()
+        user_id = user.id
+
+    for name, rotate in (("before", before), ("after", after)):
+        async with sessions() as session:
+            repo = UserRepository(session)
+            token_hash = uuid4().hex
+            await repo.save_refresh_token(user_id, token_hash, EXPIRES_AT, "bench")
+            statements = 0
+            start = perf_counter()
+            for _ in range(rotations):
+                token_hash = await rotate(repo, token_hash)
+            elapsed = perf_counter() - start
+        print(
+            f"{name:>6}: {rotations / elapsed:8,.0f} refreshes/s "
+            f"{elapsed / rotations * 1000:6.2f} ms/refresh "
+            f"{statements / rotations:4.1f} statements/refresh"
+        )
+
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rotations", type=int, default=2000)
+    parser.add_argument("--database-url", default="")
+    args = parser.parse_args()
+
+    if args.database_url:
+        asyncio.run(run(args.database_url, args.rotations))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}", args.rotations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Benchmark: review listing and product rating latency on a generated reviews table.
+
+Generates ``--products`` products and ``--reviews`` reviews spread over them
+with a skewed popularity (the top product gets a large share, as on a real
+storefront), mostly approved. Then, for the most reviewed products, times:
+
+* listing a page of reviews at page depth 1, 10, 100 and 1000 with the
+  keyset query ReviewRepository.list_approved uses, against the same page
+  fetched with LIMIT/OFFSET;
+* the product rating read from the precomputed products.rating_count /
+  rating_sum, against COUNT(*)/AVG() over the product's approved reviews;
+* submitting a review (the single INSERT behind POST /reviews).
+
+The schema is created with metadata.create_all, so never point it at a real
+database.
+
+    python -m benchmarks.reviews_listing --reviews 1000000
+    python -m benchmarks.reviews_listing --database-url postgresql+asyncpg://user:pw@localhost/bench
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Awaitable, Callable, List
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.db import Base
+from app.models.catalog import Product
+from app.models.review import REVIEW_APPROVED, REVIEW_PENDING, REVIEW_REJECTED, Review
+from app.repositories.review import ReviewRepository
+
+CHUNK_SIZE = 10_000
+AUTHORS = ("Марина", "Игорь", "Светлана", "Дарья", "Алексей", "Ольга", "Павел", "Наталья")
+TEXTS = (
+    "Комфортный, ткань легко чистится, привезли за неделю.",
+    "Брал в букле, выглядит богато. Подлокотники удобные.",
+    "Мягкий, угол можно переставлять, ниша вместительная.",
+    "Сборка в тот же день доставки, упаковка отличная.",
+    "Цвет чуть темнее, чем на фото, но в целом доволен.",
+)
+
+
+async def generate(sessions: async_sessionmaker[AsyncSession], product_count: int, review_count: int) -> None:
+    rng = random.Random(1)
+    now = datetime.utcnow()
+    async with sessions() as session:
+        await session.execute(
+            insert(Product),
+            [
+                {"slug": f"product-{i}", "category": "divan", "name": f"Диван {i}", "price": 50_000, "published_at": now}
+                for i in range(product_count)
+            ],
+        )
+        ids = list((await session.execute(select(Product.id).order_by(Product.id))).scalars())
+        weights = [1 / (rank + 1) for rank in range(len(ids))]  # Zipf-like
+        for start in range(0, review_count, CHUNK_SIZE):
+            size = min(CHUNK_SIZE, review_count - start)
+            products = rng.choices(ids, weights=weights, k=size)
+            await session.execute(
+                insert(Review),
+                [
+                    {
+                        "product_id": product_id,
+                        "author": rng.choice(AUTHORS),
+                        "rating": rng.choice((3, 4, 4, 5, 5, 5)),
+                        "text": rng.choice(TEXTS),
+                        "status": rng.choices((REVIEW_APPROVED, REVIEW_PENDING, REVIEW_REJECTED), (90, 5, 5))[0],
+                        "created_at": now - timedelta(seconds=review_count - start - offset),
+                    }
+                    for offset, product_id in enumerate(products)
+                ],
+            )
+        await ReviewRepository(session).recompute_ratings()
+        await session.commit()
+
+
+async def timed(samples: int, call: Callable[[], Awaitable[object]]) -> List[float]:
+    await call()  # warm up
+    latencies = []
+    for _ in range(samples):
+        start = perf_counter()
+        await call()
+        latencies.append(perf_counter() - start)
+    return latencies
+
+
+def report(label: str, latencies: List[float]) -> None:
+    ordered = sorted(latencies)
+    p50, p95 = (ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000 for q in (0.5, 0.95))
+    print(f"  {label:<28} p50 {p50:8.2f} ms  p95 {p95:8.2f} ms")
+
+
+async def run(database_url: str, product_count: int, review_count: int, page_size: int, samples: int) -> None:
+    engine = create_async_engine(database_url)
+    sessions = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    start = perf_counter()
+    await generate(sessions, product_count, review_count)
+    async with engine.begin() as conn:
+        await conn.execute(text("ANALYZE"))
+    print(f"generated {review_count:,} reviews of {product_count:,} products in {perf_counter() - start:.1f}s")
+
+    approved = Review.status == REVIEW_APPROVED
+    async with sessions() as session:
+        repo = ReviewRepository(session)
+        top = (
+            await session.execute(
+                select(Product.id, Product.slug, Product.rating_count).order_by(Product.rating_count.desc()).limit(3)
+            )
+        ).all()
+        for product_id, slug, count in top:
+            print(f"{slug}: {count:,} approved reviews")
+            newest_first = select(Review).where(Review.product_id == product_id, approved).order_by(Review.id.desc())
+            for depth in (1, 10, 100, 1000):
+                skipped = (depth - 1) * page_size
+                if skipped >= count:
+                    break
+                # The cursor a client would hold after paging this deep
+                before_id = (
+                    await session.execute(
+                        select(Review.id)
+                        .where(Review.product_id == product_id, approved)
+                        .order_by(Review.id.desc())
+                        .offset(skipped - 1)
+                        .limit(1)
+                    )
+                ).scalar_one() if skipped else None
+                keyset = await timed(samples, lambda: repo.list_approved(product_id, page_size, before_id))
+
+                async def offset_page() -> List[Review]:
+                    result = await session.execute(newest_first.offset(skipped).limit(page_size))
+                    return list(result.scalars())
+
+                offset = await timed(samples, offset_page)
+                report(f"page {depth:>4} keyset", keyset)
+                report(f"page {depth:>4} OFFSET", offset)
+
+            report("rating precomputed", await timed(samples, lambda: repo.product_rating(slug)))
+            report(
+                "rating COUNT/AVG",
+                await timed(
+                    samples,
+                    lambda: session.execute(
+                        select(func.count(), func.avg(Review.rating)).where(Review.product_id == product_id, approved)
+                    ),
+                ),
+            )
+            session.expunge_all()
+
+        async def submit() -> None:
+            await repo.submit(top[0].slug, {"user_id": None, "author": "Бенчмарк", "rating": 5, "text": TEXTS[0]})
+            await session.commit()
+
+        report("submit (INSERT + commit)", await timed(samples, submit))
+
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--reviews", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--samples", type=int, default=200, help="timed calls per measurement")
+    parser.add_argument("--database-url", default="")
+    args = parser.parse_args()
+
+    options = (args.products, args.reviews, args.page_size, args.samples)
+    if args.database_url:
+        asyncio.run(run(args.database_url, *options))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}", *options))
+
+
+if __name__ == "__main__":
+    main()
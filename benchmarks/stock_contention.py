@@ -0,0 +1,162 @@
+"""Benchmark: concurrent stock reservations of a single hot SKU.
+
+Sets the stock of one SKU to --stock units and fires --reservations
+reservations of --quantity units each at it at once, the way a flash sale
+does, through StockReservations.reserve with up to --concurrency of them in
+flight. It runs once per --shards value, so the single-row SKU can be
+compared with one spread over several rows, and checks that no unit was
+oversold: the reservations that succeeded hold exactly the units that left
+stock, and never more than there were.
+
+SQLite serializes writers whatever the row, so sharding only pays off on
+PostgreSQL, where each shard row has its own lock. The schema is created with
+metadata.create_all, so never point it at a real database.
+
+    python -m benchmarks.stock_contention --reservations 500 --stock 300
+    python -m benchmarks.stock_contention --database-url postgresql+asyncpg://user:pw@localhost/bench --shards 1 4 16
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+from collections import Counter
+from datetime import timedelta
+from statistics import quantiles
+from time import perf_counter
+from typing import List
+
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.db import Base
+from app.models.catalog import Product
+from app.models.order import Order
+from app.models.stock import RESERVATION_HELD, StockItem, StockReservation
+from app.repositories.stock import StockRepository
+from app.services.stock import StockReservations
+
+
+def _sqlite_wal(dbapi_connection, _) -> None:
+    # As in checkout_load: WAL and no fsync per commit
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+async def run(database_url: str, args: argparse.Namespace) -> None:
+    sqlite = database_url.startswith("sqlite")
+    options = {"pool_size": args.concurrency, "max_overflow": 0}
+    if sqlite:
+        options.update(poolclass=AsyncAdaptedQueuePool, connect_args={"timeout": 30})
+    engine = create_async_engine(database_url, **options)
+    if sqlite:
+        event.listen(engine.sync_engine, "connect", _sqlite_wal)
+    sessions = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    # Reservations reference orders; these stand in for checkouts in progress
+    async with sessions() as session:
+        product_id = (
+            await session.execute(
+                insert(Product)
+                .values(slug="hot-sofa", category="divan", name="Диван распродажи", price=50_000)
+                .returning(Product.id)
+            )
+        ).scalar_one()
+        await session.execute(
+            insert(Order),
+            [
+                {
+                    "idempotency_key": f"bench-{i}",
+                    "request_hash": "",
+                    "name": "Бенчмарк",
+                    "phone": "+79990000000",
+                    "address": "Москва",
+                    "payment_method": "online",
+                    "items_total": 50_000,
+                    "delivery_price": 0,
+                    "total": 50_000,
+                    "weight": 60.0,
+                }
+                for i in range(args.reservations)
+            ],
+        )
+        order_ids = list((await session.execute(select(Order.id).order_by(Order.id))).scalars())
+        await session.commit()
+
+    stock = StockReservations(
+        sessions, ttl=timedelta(minutes=15), attempts=args.attempts, reaper_batch_size=500, reaper_interval=30.0
+    )
+    print(
+        f"{args.reservations} reservations of {args.quantity} unit(s), {args.stock} units in stock, "
+        f"concurrency {args.concurrency}"
+    )
+    for shards in args.shards:
+        async with sessions() as session:
+            await session.execute(delete(StockReservation))
+            await StockRepository(session).set_quantity(product_id, None, args.stock, shards)
+            await session.commit()
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies: List[float] = []
+        outcomes: Counter = Counter()
+
+        async def reserve(order_id: int) -> None:
+            async with semaphore:
+                started = perf_counter()
+                reserved = await stock.reserve(order_id, [(product_id, None, args.quantity)])
+                latencies.append(perf_counter() - started)
+                outcomes["reserved" if reserved else "refused"] += 1
+
+        start = perf_counter()
+        await asyncio.gather(*(reserve(order_id) for order_id in order_ids))
+        elapsed = perf_counter() - start
+
+        async with sessions() as session:
+            left = (
+                await session.execute(select(func.sum(StockItem.quantity)).where(StockItem.product_id == product_id))
+            ).scalar_one()
+            held = (
+                await session.execute(
+                    select(func.coalesce(func.sum(StockReservation.quantity), 0)).where(
+                        StockReservation.status == RESERVATION_HELD
+                    )
+                )
+            ).scalar_one()
+
+        p50, p95, p99 = (q * 1000 for q in (quantiles(latencies, n=100)[i] for i in (49, 94, 98)))
+        expected = min(args.reservations, args.stock // args.quantity)
+        consistent = held + left == args.stock and held == outcomes["reserved"] * args.quantity
+        print(f"shards {shards:>3}: {args.reservations / elapsed:8,.1f} reservations/s  ", end="")
+        print(f"p50 {p50:7.1f} ms  p95 {p95:7.1f} ms  p99 {p99:7.1f} ms")
+        print(
+            f"            reserved {outcomes['reserved']} (of {expected} possible), refused {outcomes['refused']}, "
+            f"held {held} + left {left} = {held + left}: {'OK' if consistent else 'OVERSOLD'}"
+        )
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reservations", type=int, default=500)
+    parser.add_argument("--stock", type=int, default=300, help="units of the SKU")
+    parser.add_argument("--quantity", type=int, default=1, help="units per reservation")
+    parser.add_argument("--concurrency", type=int, default=100, help="reservations in flight at once")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--attempts", type=int, default=3, help="StockReservations attempts")
+    parser.add_argument("--database-url", default="")
+    args = parser.parse_args()
+
+    if args.database_url:
+        asyncio.run(run(args.database_url, args))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}", args))
+
+
+if __name__ == "__main__":
+    main()
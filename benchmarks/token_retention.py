@@ -0,0 +1,124 @@
+"""Benchmark: refresh token lookup latency with and without the retention reaper.
+
+Seeds ``--rows`` refresh tokens of which ``--active-ratio`` are live and the
+rest are expired or long revoked, measures get_refresh_token latency, runs the
+reaper to completion and measures again. Uses a scratch SQLite database by
+default (needs ``aiosqlite``) or a throwaway PostgreSQL database via
+--database-url; the schema is created with metadata.create_all.
+
+    python -m benchmarks.token_retention --rows 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.db import Base
+from app.models.user import RefreshToken, User
+from app.repositories.user import UserRepository
+from app.services.token_retention import RefreshTokenReaper
+
+CHUNK = 10000
+
+
+async def seed(sessions, rows: int, active_ratio: float) -> list:
+    now = datetime.utcnow()
+    active_hashes = []
+    async with sessions() as session:
+        user = User(email="bench@example.com", hashed_password="x")
+        session.add(user)
+        await session.commit()
+
+        for offset in range(0, rows, CHUNK):
+            batch = []
+            for i in range(offset, min(rows, offset + CHUNK)):
+                token_hash = f"{i:064x}"
+                roll = random.random()
+                if roll < active_ratio:
+                    active_hashes.append(token_hash)
+                    revoked_at, expires_at = None, now + timedelta(days=30)
+                elif roll < (1 + active_ratio) / 2:
+                    revoked_at, expires_at = now - timedelta(days=20), now + timedelta(days=10)
+                else:
+                    revoked_at, expires_at = None, now - timedelta(days=1)
+                batch.append(
+                    {
+                        "user_id": user.id,
+                        "token_hash": token_hash,
+                        "device_info": "bench",
+                        "issued_at": now - timedelta(days=30),
+                        "revoked_at": revoked_at,
+                        "expires_at": expires_at,
+                    }
+                )
+            await session.execute(insert(RefreshToken), batch)
+            await session.commit()
+    return active_hashes
+
+
+async def measure_lookups(sessions, active_hashes: list, lookups: int) -> str:
+    samples = []
+    async with sessions() as session:
+        repo = UserRepository(session)
+        for token_hash in random.choices(active_hashes, k=lookups):
+            start = perf_counter()
+            await repo.get_refresh_token(token_hash)
+            samples.append(perf_counter() - start)
+        rows = (await session.execute(select(func.count()).select_from(RefreshToken))).scalar_one()
+    samples.sort()
+    return (
+        f"rows={rows:>9,} p50={statistics.median(samples) * 1e6:8.1f}us "
+        f"p99={samples[int(len(samples) * 0.99)] * 1e6:8.1f}us"
+    )
+
+
+async def run(database_url: str, rows: int, active_ratio: float, lookups: int, batch_size: int) -> None:
+    engine = create_async_engine(database_url)
+    sessions = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    start = perf_counter()
+    active_hashes = await seed(sessions, rows, active_ratio)
+    print(f"seeded {rows:,} rows in {perf_counter() - start:.1f}s")
+
+    print(f"without reaper: {await measure_lookups(sessions, active_hashes, lookups)}")
+
+    reaper = RefreshTokenReaper(
+        sessions, batch_size=batch_size, batch_sleep=0, interval=0, revoked_retention=timedelta(days=7)
+    )
+    start = perf_counter()
+    deleted = await reaper.purge()
+    print(f"reaper deleted {deleted:,} rows in {perf_counter() - start:.1f}s (batch size {batch_size})")
+
+    print(f"with reaper:    {await measure_lookups(sessions, active_hashes, lookups)}")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--active-ratio", type=float, default=0.05)
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--database-url", default="")
+    args = parser.parse_args()
+
+    options = (args.rows, args.active_ratio, args.lookups, args.batch_size)
+    if args.database_url:
+        asyncio.run(run(args.database_url, *options))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}", *options))
+
+
+if __name__ == "__main__":
+    main()
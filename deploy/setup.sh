@@ -65,6 +65,12 @@ User=${USER}
 Group=${USER}
 WorkingDirectory=${APP_DIR}
 Environment="PATH=${APP_DIR}/venv/bin"
+# Per-worker metric snapshots, merged by /metrics; systemd empties it on restart
+RuntimeDirectory=${SERVICE_NAME}-metrics
+Environment="metrics_multiproc_dir=/run/${SERVICE_NAME}-metrics"
+# Uploaded images live outside the code and static roots; Nginx sends them (see /_media/ below)
+Environment="media_root=${APP_DIR}/media"
+Environment="media_accel_redirect=true"
 ExecStart=${APP_DIR}/venv/bin/gunicorn app.main:app \
     --workers 4 \
     --worker-class uvicorn.workers.UvicornWorker \
@@ -79,8 +85,9 @@ RestartSec=10
 WantedBy=multi-user.target
 EOF
 
-# Create logs directory
+# Create logs and media directories
 mkdir -p ${APP_DIR}/logs
+mkdir -p ${APP_DIR}/media
 
 # Enable and start service
 sudo systemctl daemon-reload
@@ -159,6 +166,24 @@ server {
     access_log /var/log/nginx/${SITE_NAME}_access.log;
     error_log /var/log/nginx/${SITE_NAME}_error.log;
 
+    # Internal operational endpoints are only reachable on the app port
+    location /internal/ {
+        deny all;
+    }
+
+    location = /metrics {
+        deny all;
+    }
+
+    # Images: the app checks the name and answers with X-Accel-Redirect to this
+    # internal location; Nginx sends the file with sendfile and handles Range.
+    location /_media/ {
+        internal;
+        alias ${APP_DIR}/media/;
+        sendfile on;
+        tcp_nopush on;
+    }
+
     # Proxy settings
     location / {
         proxy_pass http://${SITE_NAME}_backend;
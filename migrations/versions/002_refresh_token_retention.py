@@ -0,0 +1,58 @@
+"""Refresh token retention: expires_at column and partial indexes
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '002'
+down_revision: Union[str, None] = '001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('refresh_tokens', sa.Column('expires_at', sa.DateTime(), nullable=True))
+
+    # Existing tokens were issued with a 30 day lifetime
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("UPDATE refresh_tokens SET expires_at = issued_at + INTERVAL '30 days'")
+    else:
+        op.execute("UPDATE refresh_tokens SET expires_at = datetime(issued_at, '+30 days')")
+
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.alter_column('expires_at', existing_type=sa.DateTime(), nullable=False)
+
+    # Lookups only ever want active tokens; keep that index small
+    op.create_index(
+        'ix_refresh_tokens_active_token_hash',
+        'refresh_tokens',
+        ['token_hash'],
+        unique=False,
+        postgresql_where=sa.text('revoked_at IS NULL'),
+        sqlite_where=sa.text('revoked_at IS NULL'),
+    )
+    # Used by the retention reaper to find expired and revoked tokens
+    op.create_index(op.f('ix_refresh_tokens_expires_at'), 'refresh_tokens', ['expires_at'], unique=False)
+    op.create_index(
+        'ix_refresh_tokens_revoked_at',
+        'refresh_tokens',
+        ['revoked_at'],
+        unique=False,
+        postgresql_where=sa.text('revoked_at IS NOT NULL'),
+        sqlite_where=sa.text('revoked_at IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_refresh_tokens_revoked_at', table_name='refresh_tokens')
+    op.drop_index(op.f('ix_refresh_tokens_expires_at'), table_name='refresh_tokens')
+    op.drop_index('ix_refresh_tokens_active_token_hash', table_name='refresh_tokens')
+    op.drop_column('refresh_tokens', 'expires_at')
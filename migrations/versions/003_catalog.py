@@ -0,0 +1,85 @@
+"""Catalog: products and product_fabrics with keyset pagination indexes
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, columns): one per sort order, with and without the category filter
+PRODUCT_INDEXES = [
+    ('ix_products_popular', ['popularity', 'id']),
+    ('ix_products_price', ['price', 'id']),
+    ('ix_products_new', ['published_at', 'id']),
+    ('ix_products_category_popular', ['category', 'popularity', 'id']),
+    ('ix_products_category_price', ['category', 'price', 'id']),
+    ('ix_products_category_new', ['category', 'published_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    # Create products table
+    op.create_table(
+        'products',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('slug', sa.String(length=64), nullable=False),
+        sa.Column('category', sa.String(length=32), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('badge', sa.String(length=32), nullable=True),
+        sa.Column('price', sa.Integer(), nullable=False),
+        sa.Column('old_price', sa.Integer(), nullable=True),
+        sa.Column('short', sa.String(length=500), nullable=False),
+        sa.Column('description', sa.Text(), nullable=False),
+        sa.Column('images', sa.JSON(), nullable=False),
+        sa.Column('specs', sa.JSON(), nullable=False),
+        sa.Column('dimensions', sa.JSON(), nullable=False),
+        sa.Column('popularity', sa.Integer(), nullable=False),
+        sa.Column('published_at', sa.DateTime(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False, server_default='true'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('slug')
+    )
+    # Partial on active products; the predicates match ProductRepository's WHERE clause
+    for name, columns in PRODUCT_INDEXES:
+        op.create_index(
+            name,
+            'products',
+            columns,
+            unique=False,
+            postgresql_where=sa.text('is_active'),
+            sqlite_where=sa.text('is_active = 1'),
+        )
+
+    # Create product_fabrics table
+    op.create_table(
+        'product_fabrics',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('code', sa.String(length=64), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('price_delta', sa.Integer(), nullable=False),
+        sa.Column('color', sa.String(length=32), nullable=True),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.UniqueConstraint('product_id', 'code', name='uq_product_fabrics_product_code')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('product_fabrics')
+    for name, _ in reversed(PRODUCT_INDEXES):
+        op.drop_index(name, table_name='products')
+    op.drop_table('products')
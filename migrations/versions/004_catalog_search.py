@@ -0,0 +1,58 @@
+"""Catalog search: search_text, fabric types and a russian tsvector with GIN index
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+
+    op.add_column('products', sa.Column('search_text', sa.Text(), nullable=False, server_default=''))
+    op.add_column('product_fabrics', sa.Column('fabric_type', sa.String(length=64), nullable=True))
+
+    # Fabric names look like "Букле — песочный"; the part before the dash is the type.
+    # Re-running the catalog import also fills search_text with specs, dimensions and fabrics.
+    op.execute("UPDATE products SET search_text = short || ' ' || description")
+    if is_postgresql:
+        op.execute("UPDATE product_fabrics SET fabric_type = btrim(split_part(name, '—', 1))")
+    else:
+        op.execute(
+            "UPDATE product_fabrics SET fabric_type = trim("
+            "CASE WHEN instr(name, '—') > 0 THEN substr(name, 1, instr(name, '—') - 1) ELSE name END)"
+        )
+    op.create_index('ix_product_fabrics_fabric_type', 'product_fabrics', ['fabric_type', 'product_id'], unique=False)
+
+    if is_postgresql:
+        # Name terms rank above description terms; kept up to date by PostgreSQL itself
+        op.execute(
+            "ALTER TABLE products ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('russian', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(search_text, '')), 'B')"
+            ") STORED"
+        )
+        op.create_index(
+            'ix_products_search_vector', 'products', ['search_vector'], unique=False, postgresql_using='gin'
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_products_search_vector', table_name='products')
+        op.drop_column('products', 'search_vector')
+    op.drop_index('ix_product_fabrics_fabric_type', table_name='product_fabrics')
+    op.drop_column('product_fabrics', 'fabric_type')
+    op.drop_column('products', 'search_text')
@@ -0,0 +1,58 @@
+"""Carts: server-side carts and cart lines
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Create carts table
+    op.create_table(
+        'carts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('token_hash', sa.String(length=64), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.UniqueConstraint('user_id'),
+        sa.UniqueConstraint('token_hash')
+    )
+    op.create_index(op.f('ix_carts_updated_at'), 'carts', ['updated_at'], unique=False)
+
+    # Create cart_items table; the unique line key doubles as the index for a cart's lines
+    op.create_table(
+        'cart_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cart_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('fabric_id', sa.Integer(), nullable=True),
+        sa.Column('fabric_key', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['cart_id'], ['carts.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['fabric_id'], ['product_fabrics.id'], ondelete='CASCADE'),
+        sa.UniqueConstraint('cart_id', 'product_id', 'fabric_key', name='uq_cart_items_line')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('cart_items')
+    op.drop_index(op.f('ix_carts_updated_at'), table_name='carts')
+    op.drop_table('carts')
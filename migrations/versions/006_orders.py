@@ -0,0 +1,77 @@
+"""Orders: checkout orders with idempotency keys, and order items
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Create orders table; the unique idempotency key is what serializes retried checkouts
+    op.create_table(
+        'orders',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('idempotency_key', sa.String(length=64), nullable=False),
+        sa.Column('request_hash', sa.String(length=64), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=24), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('phone', sa.String(length=32), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=True),
+        sa.Column('address', sa.String(length=500), nullable=False),
+        sa.Column('comment', sa.Text(), nullable=True),
+        sa.Column('payment_method', sa.String(length=16), nullable=False),
+        sa.Column('items_total', sa.Integer(), nullable=False),
+        sa.Column('delivery_price', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('weight', sa.Float(), nullable=False),
+        sa.Column('transaction_id', sa.String(length=64), nullable=True),
+        sa.Column('delivery_id', sa.String(length=64), nullable=True),
+        sa.Column('tracking', sa.String(length=64), nullable=True),
+        sa.Column('eta', sa.String(length=64), nullable=True),
+        sa.Column('error', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+        sa.UniqueConstraint('idempotency_key')
+    )
+    op.create_index(op.f('ix_orders_user_id'), 'orders', ['user_id'], unique=False)
+
+    # Create order_items table
+    op.create_table(
+        'order_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=True),
+        sa.Column('fabric_id', sa.Integer(), nullable=True),
+        sa.Column('product_slug', sa.String(length=64), nullable=False),
+        sa.Column('product_name', sa.String(length=255), nullable=False),
+        sa.Column('fabric_name', sa.String(length=255), nullable=True),
+        sa.Column('unit_price', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['fabric_id'], ['product_fabrics.id'], ondelete='SET NULL')
+    )
+    op.create_index(op.f('ix_order_items_order_id'), 'order_items', ['order_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_order_items_order_id'), table_name='order_items')
+    op.drop_table('order_items')
+    op.drop_index(op.f('ix_orders_user_id'), table_name='orders')
+    op.drop_table('orders')
@@ -0,0 +1,68 @@
+"""Reviews: moderated reviews and per-product rating aggregates
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Partial index predicates; they must match app.models.review
+APPROVED = sa.text("status = 'approved'")
+PENDING = sa.text("status = 'pending'")
+FLAGGED = sa.text("status = 'flagged'")
+
+
+def upgrade() -> None:
+    # Count and sum of approved ratings, maintained by the moderation worker
+    op.add_column('products', sa.Column('rating_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('products', sa.Column('rating_sum', sa.Integer(), nullable=False, server_default='0'))
+
+    # Create reviews table; product_id is NULL for reviews of the store
+    op.create_table(
+        'reviews',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('author', sa.String(length=100), nullable=False),
+        sa.Column('rating', sa.SmallInteger(), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('import_key', sa.String(length=64), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('moderated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+        sa.UniqueConstraint('import_key')
+    )
+    # Keyset listing of approved reviews per product, and the small moderation queues
+    op.create_index(
+        'ix_reviews_product_approved', 'reviews', ['product_id', 'id'], unique=False,
+        postgresql_where=APPROVED, sqlite_where=APPROVED,
+    )
+    op.create_index(
+        'ix_reviews_pending', 'reviews', ['id'], unique=False, postgresql_where=PENDING, sqlite_where=PENDING
+    )
+    op.create_index(
+        'ix_reviews_flagged', 'reviews', ['id'], unique=False, postgresql_where=FLAGGED, sqlite_where=FLAGGED
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reviews_flagged', table_name='reviews')
+    op.drop_index('ix_reviews_pending', table_name='reviews')
+    op.drop_index('ix_reviews_product_approved', table_name='reviews')
+    op.drop_table('reviews')
+    op.drop_column('products', 'rating_sum')
+    op.drop_column('products', 'rating_count')
@@ -0,0 +1,54 @@
+"""Images: uploaded images stored by content hash, with their responsive variants
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Partial index predicate; it must match app.models.media
+UNPROCESSED = sa.text("status IN ('pending', 'processing')")
+
+
+def upgrade() -> None:
+    # Create images table; the unique sha256 deduplicates repeated uploads
+    op.create_table(
+        'images',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('content_type', sa.String(length=32), nullable=False),
+        sa.Column('extension', sa.String(length=8), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('width', sa.Integer(), nullable=True),
+        sa.Column('height', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('variants', sa.JSON(), nullable=False),
+        sa.Column('error', sa.String(length=255), nullable=True),
+        sa.Column('uploaded_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['uploaded_by'], ['users.id'], ondelete='SET NULL'),
+        sa.UniqueConstraint('sha256')
+    )
+    # The variant worker's queue
+    op.create_index(
+        'ix_images_unprocessed', 'images', ['updated_at'], unique=False,
+        postgresql_where=UNPROCESSED, sqlite_where=UNPROCESSED,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_images_unprocessed', table_name='images')
+    op.drop_table('images')
@@ -0,0 +1,68 @@
+"""Stock: sharded per-SKU stock levels and checkout reservations
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Partial index predicate; it must match app.models.stock
+HELD = sa.text("status = 'held'")
+
+
+def upgrade() -> None:
+    # Create stock_items table; a SKU's stock is the sum of its shard rows
+    op.create_table(
+        'stock_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('fabric_id', sa.Integer(), nullable=True),
+        sa.Column('fabric_key', sa.Integer(), nullable=False),
+        sa.Column('shard', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['fabric_id'], ['product_fabrics.id'], ondelete='CASCADE'),
+        sa.UniqueConstraint('product_id', 'fabric_key', 'shard', name='uq_stock_items_shard'),
+        sa.CheckConstraint('quantity >= 0', name='ck_stock_items_quantity')
+    )
+
+    # Create stock_reservations table
+    op.create_table(
+        'stock_reservations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('stock_item_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['stock_item_id'], ['stock_items.id'], ondelete='CASCADE')
+    )
+    op.create_index(op.f('ix_stock_reservations_order_id'), 'stock_reservations', ['order_id'], unique=False)
+    # The reaper's queue: held reservations by expiry
+    op.create_index(
+        'ix_stock_reservations_expires_at', 'stock_reservations', ['expires_at'], unique=False,
+        postgresql_where=HELD, sqlite_where=HELD,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_stock_reservations_expires_at', table_name='stock_reservations')
+    op.drop_index(op.f('ix_stock_reservations_order_id'), table_name='stock_reservations')
+    op.drop_table('stock_reservations')
+    op.drop_table('stock_items')
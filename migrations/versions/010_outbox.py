@@ -0,0 +1,47 @@
+"""Outbox: side-effect jobs written with the business change and run by a worker
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '010'
+down_revision: Union[str, None] = '009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Partial index predicate; it must match app.models.outbox
+QUEUED = sa.text("status IN ('pending', 'running')")
+
+
+def upgrade() -> None:
+    # Create outbox_jobs table; finished jobs are deleted, dead ones kept
+    op.create_table(
+        'outbox_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=64), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('last_error', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # The worker's queue: due jobs by time
+    op.create_index(
+        'ix_outbox_jobs_queued', 'outbox_jobs', ['available_at'], unique=False,
+        postgresql_where=QUEUED, sqlite_where=QUEUED,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_jobs_queued', table_name='outbox_jobs')
+    op.drop_table('outbox_jobs')
@@ -0,0 +1,44 @@
+"""Auth events: append-only audit trail of logins, refreshes and logouts
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '011'
+down_revision: Union[str, None] = '010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Create auth_events table; no foreign key, the trail outlives deleted users
+    op.create_table(
+        'auth_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event', sa.String(length=16), nullable=False),
+        sa.Column('outcome', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('email', sa.String(length=255), nullable=True),
+        sa.Column('ip', sa.String(length=45), nullable=True),
+        sa.Column('device_info', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_auth_events_created_at'), 'auth_events', ['created_at'], unique=False)
+    op.create_index('ix_auth_events_email_created_at', 'auth_events', ['email', 'created_at'], unique=False)
+    op.create_index('ix_auth_events_user_id_created_at', 'auth_events', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_auth_events_user_id_created_at', table_name='auth_events')
+    op.drop_index('ix_auth_events_email_created_at', table_name='auth_events')
+    op.drop_index(op.f('ix_auth_events_created_at'), table_name='auth_events')
+    op.drop_table('auth_events')
@@ -0,0 +1,37 @@
+"""Session management: users.token_version and (user_id, id) refresh token index
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '012'
+down_revision: Union[str, None] = '011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing access tokens carry no version and count as version 0
+    op.add_column(
+        'users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False)
+    )
+
+    # Sessions are listed and revoked per user in id order
+    op.drop_index('ix_refresh_tokens_user_id', table_name='refresh_tokens')
+    op.create_index('ix_refresh_tokens_user_id', 'refresh_tokens', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_refresh_tokens_user_id', table_name='refresh_tokens')
+    op.create_index('ix_refresh_tokens_user_id', 'refresh_tokens', ['user_id'], unique=False)
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('token_version')
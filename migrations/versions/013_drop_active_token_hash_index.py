@@ -0,0 +1,34 @@
+"""Drop the partial refresh token hash index
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '013'
+down_revision: Union[str, None] = '012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Tokens are looked up by exact hash, which the unique index on token_hash already answers
+    op.drop_index('ix_refresh_tokens_active_token_hash', table_name='refresh_tokens')
+
+
+def downgrade() -> None:
+    op.create_index(
+        'ix_refresh_tokens_active_token_hash',
+        'refresh_tokens',
+        ['token_hash'],
+        unique=False,
+        postgresql_where=sa.text('revoked_at IS NULL'),
+        sqlite_where=sa.text('revoked_at IS NULL'),
+    )
@@ -0,0 +1,59 @@
+"""Orders: idempotency keys unique per user
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '014'
+down_revision: Union[str, None] = '013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Revision 006 left the unique constraint unnamed: PostgreSQL named it orders_idempotency_key_key,
+# SQLite gave it no name, so batch mode names it by this convention to drop it
+SQLITE_NAMING = {'uq': 'uq_%(table_name)s_%(column_0_name)s'}
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_constraint('orders_idempotency_key_key', 'orders', type_='unique')
+    else:
+        with op.batch_alter_table('orders', naming_convention=SQLITE_NAMING) as batch_op:
+            batch_op.drop_constraint('uq_orders_idempotency_key', type_='unique')
+
+    # Keys are unique per user; anonymous orders (no user) share one key space
+    op.create_index(
+        'uq_orders_user_idempotency_key',
+        'orders',
+        ['user_id', 'idempotency_key'],
+        unique=True,
+        postgresql_where=sa.text('user_id IS NOT NULL'),
+        sqlite_where=sa.text('user_id IS NOT NULL'),
+    )
+    op.create_index(
+        'uq_orders_anonymous_idempotency_key',
+        'orders',
+        ['idempotency_key'],
+        unique=True,
+        postgresql_where=sa.text('user_id IS NULL'),
+        sqlite_where=sa.text('user_id IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    # Fails if two users have used the same key since the upgrade
+    op.drop_index('uq_orders_anonymous_idempotency_key', table_name='orders')
+    op.drop_index('uq_orders_user_idempotency_key', table_name='orders')
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_unique_constraint('orders_idempotency_key_key', 'orders', ['idempotency_key'])
+    else:
+        with op.batch_alter_table('orders', naming_convention=SQLITE_NAMING) as batch_op:
+            batch_op.create_unique_constraint('uq_orders_idempotency_key', ['idempotency_key'])
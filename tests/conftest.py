@@ -0,0 +1,47 @@
+"""Tests run against a throwaway SQLite database (aiosqlite).
+
+Settings are read when app modules are imported, so they are overridden here,
+before anything else from the app is imported.
+"""
+import os
+import tempfile
+
+from app.core.config import settings
+
+TEST_DIR = tempfile.mkdtemp(prefix="boofmebel-tests-")
+DATABASE_URL = f"sqlite+aiosqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+
+settings.database_url = DATABASE_URL
+# Background workers are started explicitly by the tests that need them
+settings.refresh_token_reaper_enabled = False
+settings.review_moderation_enabled = False
+settings.media_processing_enabled = False
+settings.stock_reaper_enabled = False
+settings.outbox_worker_enabled = False
+settings.rate_limit_backend = "memory"
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+import app.models  # noqa: E402,F401  (registers every table on Base.metadata)
+from app.core.db import Base, SessionLocal, engine  # noqa: E402
+from app.core.user_cache import user_cache  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture
+async def db():
+    """Empty schema for each test; yields the app's session factory."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    # Ids are reused by the fresh schema, so users cached by an earlier test must go
+    user_cache.clear()
+    yield SessionLocal
+
+
+@pytest.fixture
+async def client(db):
+    """HTTP client calling the app in-process; the lifespan (background workers) is not run."""
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
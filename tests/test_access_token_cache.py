@@ -0,0 +1,63 @@
+from datetime import timedelta
+from time import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import cache, jwt_keys, security
+from app.core.security import access_token_cache, create_access_token, create_refresh_token, decode_access_token
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Wall clock of the token checks and monotonic clock of the cache, moved together."""
+    now = [time()]
+    monkeypatch.setattr(security, "time", lambda: now[0])
+    monkeypatch.setattr(jwt_keys, "time", lambda: now[0])
+    monkeypatch.setattr(cache, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Tokens that were verified (not served from the cache)."""
+    verified = []
+    decode_token = security.decode_token
+
+    def counting_decode(token):
+        verified.append(token)
+        return decode_token(token)
+
+    monkeypatch.setattr(security, "decode_token", counting_decode)
+    access_token_cache.clear()
+    yield verified
+    access_token_cache.clear()
+
+
+def test_claims_are_cached_until_the_token_expires(clock, decodes):
+    token = create_access_token({"sub": "1", "ver": 0}, expires_delta=timedelta(minutes=5))
+    exp = decode_access_token(token)["exp"]
+    assert decode_access_token(token)["sub"] == "1"
+    assert len(decodes) == 1
+
+    clock[0] = exp - 1
+    decode_access_token(token)
+    assert len(decodes) == 1
+
+    # Past exp the entry is gone; the token is verified again and rejected as expired
+    clock[0] = exp + 1
+    with pytest.raises(HTTPException) as error:
+        decode_access_token(token)
+    assert error.value.status_code == 401
+    assert len(decodes) == 2
+    assert len(access_token_cache) == 0
+
+
+def test_refresh_tokens_are_rejected_and_not_cached(clock, decodes):
+    token = create_refresh_token({"sub": "1"})
+    for _ in range(2):
+        with pytest.raises(HTTPException) as error:
+            decode_access_token(token)
+        assert error.value.detail == "Invalid token type"
+    assert len(decodes) == 2
+    assert len(access_token_cache) == 0
@@ -0,0 +1,230 @@
+import asyncio
+import hashlib
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.core.security import create_access_token, create_refresh_token, get_password_hash
+from app.models.auth_event import AuthEvent
+from app.models.user import RefreshToken
+from app.repositories.user import UserRepository
+from app.services import auth, auth_events
+from app.services.auth import AuthService, _refresh_token_expiry
+from app.services.auth_events import LoginThrottle
+
+PASSWORD = "correct horse battery staple"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Monotonic clock of the login lockout, moved by the test."""
+    now = [1000.0]
+    monkeypatch.setattr(auth_events, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def throttle(monkeypatch, clock):
+    """A fresh lockout: three failures within a minute lock the account."""
+    throttle = LoginThrottle(max_failures=3, window=60, max_keys=100)
+    monkeypatch.setattr(auth, "login_throttle", throttle)
+    return throttle
+
+
+def token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def add_user(db, email: str = "buyer@example.com", password: str = PASSWORD) -> int:
+    async with db() as session:
+        return (await UserRepository(session).create(email, get_password_hash(password))).id
+
+
+async def login(db, email: str, password: str = PASSWORD):
+    async with db() as session:
+        return await AuthService(session).login(email, password)
+
+
+async def add_session(db, user_id: int, device: str = "phone") -> str:
+    """A refresh token saved as a login would."""
+    token = create_refresh_token({"sub": str(user_id)})
+    async with db() as session:
+        await UserRepository(session).save_refresh_token(user_id, token_hash(token), _refresh_token_expiry(), device)
+    return token
+
+
+async def refresh(db, token: str):
+    async with db() as session:
+        return await AuthService(session).refresh(token)
+
+
+async def test_concurrent_refreshes_with_one_token_rotate_it_once(db):
+    user_id = await add_user(db)
+    token = await add_session(db, user_id)
+
+    results = await asyncio.gather(*(refresh(db, token) for _ in range(5)), return_exceptions=True)
+    [(_, new_token)] = [result for result in results if isinstance(result, tuple)]
+    rejected = [result for result in results if isinstance(result, HTTPException)]
+    assert len(rejected) == 4
+    assert {error.status_code for error in rejected} == {401}
+
+    async with db() as session:
+        tokens = (await session.execute(select(RefreshToken).order_by(RefreshToken.id))).scalars().all()
+    assert [(t.token_hash, t.revoked_at is None, t.device_info) for t in tokens] == [
+        (token_hash(token), False, "phone"),
+        (token_hash(new_token), True, "phone"),
+    ]
+
+    # The winner's token rotates on; the old one stays dead
+    await refresh(db, new_token)
+    with pytest.raises(HTTPException):
+        await refresh(db, token)
+
+
+async def test_email_is_matched_whatever_its_case(db, throttle):
+    await add_user(db, " Buyer@Example.com")
+    assert await login(db, "BUYER@example.COM ")
+
+    for _ in range(3):
+        with pytest.raises(HTTPException):
+            await login(db, "buyer@EXAMPLE.com", "wrong")
+    # The failures under every spelling count towards one lockout
+    assert len(throttle) == 1
+    assert throttle.retry_after("buyer@example.com") > 0
+
+
+async def test_lockout_lasts_until_the_oldest_failure_leaves_the_window(db, clock, throttle):
+    await add_user(db)
+    for seconds in (0, 10, 20):
+        clock[0] = 1000.0 + seconds
+        with pytest.raises(HTTPException) as error:
+            await login(db, "buyer@example.com", "wrong")
+        assert error.value.status_code == 401
+
+    # Even the right password is refused while locked, and locked attempts do not count
+    for seconds in (30, 59):
+        clock[0] = 1000.0 + seconds
+        with pytest.raises(HTTPException) as error:
+            await login(db, "buyer@example.com")
+        assert error.value.status_code == 429
+        assert error.value.headers == {"Retry-After": str(60 - seconds)}
+
+    # The first failure is out of the window: one more failure locks the account again
+    clock[0] = 1061.0
+    with pytest.raises(HTTPException):
+        await login(db, "buyer@example.com", "wrong")
+    with pytest.raises(HTTPException) as error:
+        await login(db, "buyer@example.com")
+    assert error.value.status_code == 429
+
+    # Unlocked when the oldest of the last three failures leaves the window; a success clears the history
+    clock[0] = 1071.0
+    assert await login(db, "buyer@example.com")
+    assert len(throttle) == 0
+
+
+async def test_audit_events_are_written_in_batches(db, monkeypatch, throttle):
+    log = auth_events.AuthEventLog(db, batch_size=3, flush_interval=60, max_buffered=100)
+    monkeypatch.setattr(auth, "auth_event_log", log)
+    await add_user(db)
+    writer = asyncio.create_task(log.run())
+    try:
+        for password in ("wrong", "wrong"):
+            with pytest.raises(HTTPException):
+                await login(db, "buyer@example.com", password)
+        await asyncio.sleep(0.05)
+        assert (len(log), log.written) == (2, 0)
+
+        # The third event fills a batch, which is written without waiting for the interval
+        await login(db, "buyer@example.com")
+        for _ in range(100):
+            if log.written:
+                break
+            await asyncio.sleep(0.01)
+        assert (len(log), log.written) == (0, 3)
+    finally:
+        writer.cancel()
+
+    async with db() as session:
+        rows = (await session.execute(select(AuthEvent.event, AuthEvent.outcome).order_by(AuthEvent.id))).all()
+    assert rows == [("login", "invalid_credentials")] * 2 + [("login", "success")]
+
+
+async def test_audit_events_are_kept_while_the_database_is_down(db):
+    def unavailable():
+        raise ConnectionError("database is down")
+
+    log = auth_events.AuthEventLog(unavailable, batch_size=10, flush_interval=60, max_buffered=3)
+    for outcome in ("invalid_credentials", "locked"):
+        log.record("login", outcome, email="buyer@example.com")
+    with pytest.raises(ConnectionError):
+        await log.flush()
+    assert len(log) == 2
+
+    # Beyond max_buffered the oldest events go first
+    log.record("login", "success", email="buyer@example.com")
+    log.record("logout", "success", email="buyer@example.com")
+    assert (len(log), log.dropped) == (3, 1)
+
+    log.session_factory = db
+    assert await log.flush() == 3
+    async with db() as session:
+        rows = (await session.execute(select(AuthEvent.event, AuthEvent.outcome).order_by(AuthEvent.id))).all()
+    assert rows == [("login", "locked"), ("login", "success"), ("logout", "success")]
+
+
+def bearer(user_id: int, version: int = 0) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id), 'ver': version})}"}
+
+
+async def test_revoking_one_device_logs_only_that_device_out(db, client):
+    user_id = await add_user(db)
+    other_id = await add_user(db, "other@example.com")
+    phone, laptop = await add_session(db, user_id, "phone"), await add_session(db, user_id, "laptop")
+    await add_session(db, other_id, "tablet")
+    headers = bearer(user_id)
+
+    client.cookies.set("refresh_token", laptop)
+    response = await client.get("/auth/sessions", headers=headers)
+    assert [(s["device_info"], s["current"]) for s in response.json()["items"]] == [("laptop", True), ("phone", False)]
+    phone_id = response.json()["items"][1]["id"]
+
+    # Another user's session cannot be revoked, nor one that is already revoked
+    other_session = (await client.get("/auth/sessions", headers=bearer(other_id))).json()["items"][0]["id"]
+    assert (await client.delete(f"/auth/sessions/{other_session}", headers=headers)).status_code == 404
+    assert (await client.delete(f"/auth/sessions/{phone_id}", headers=headers)).status_code == 204
+    assert (await client.delete(f"/auth/sessions/{phone_id}", headers=headers)).status_code == 404
+
+    with pytest.raises(HTTPException):
+        await refresh(db, phone)
+    assert await refresh(db, laptop)
+    # The access token of the request stays valid: only refresh tokens were revoked
+    assert (await client.get("/auth/me", headers=headers)).status_code == 200
+
+
+async def test_logging_out_everywhere_revokes_refresh_and_access_tokens(db, client):
+    user_id = await add_user(db)
+    other_id = await add_user(db, "other@example.com")
+    tokens = [await add_session(db, user_id, device) for device in ("phone", "laptop")]
+    other_token = await add_session(db, other_id, "tablet")
+    headers = bearer(user_id)
+    assert (await client.get("/auth/me", headers=headers)).status_code == 200
+
+    response = await client.delete("/auth/sessions", headers=headers)
+    assert response.json() == {"revoked": 2}
+
+    # token_version was bumped, so access tokens issued before are rejected at once
+    response = await client.get("/auth/me", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked"
+    for token in tokens:
+        with pytest.raises(HTTPException):
+            await refresh(db, token)
+    assert await refresh(db, other_token)
+
+    # A new login gets tokens of the new version
+    access_token, _ = await login(db, "buyer@example.com")
+    response = await client.get("/auth/me", headers={"Authorization": f"Bearer {access_token}"})
+    assert response.status_code == 200
+    assert (await client.get("/auth/me", headers=bearer(user_id, version=1))).status_code == 200
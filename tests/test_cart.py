@@ -0,0 +1,67 @@
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.cart import Cart, CartItem
+from app.models.catalog import Product
+from app.models.user import User
+from app.repositories.cart import CartRepository
+from app.services.cart import CartService, cart_token_hash
+
+CART_TOKEN = "anonymous-cart-token"
+
+
+async def lines(session, cart_id: int) -> dict:
+    result = await session.execute(
+        select(Product.slug, CartItem.quantity)
+        .join(Product, Product.id == CartItem.product_id)
+        .where(CartItem.cart_id == cart_id)
+        .order_by(CartItem.id)
+    )
+    return dict(result.all())
+
+
+async def test_merge_keeps_shared_lines_and_drops_new_lines_beyond_the_limit(db, monkeypatch):
+    monkeypatch.setattr(settings, "cart_max_lines", 3)
+    monkeypatch.setattr(settings, "cart_max_quantity", 10)
+    async with db() as session:
+        user = User(email="buyer@example.com", hashed_password="x")
+        session.add(user)
+        for slug in "abcde":
+            session.add(Product(slug=slug, category="sofas", name=slug.upper(), price=1000))
+        await session.flush()
+        repo = CartRepository(session)
+        target_id = await repo.create(user_id=user.id)
+        for slug, quantity in (("a", 1), ("b", 8)):
+            assert await repo.set_line(target_id, slug, None, quantity, max_lines=3)
+        source_id = await repo.create(token_hash=cart_token_hash(CART_TOKEN))
+        for slug, quantity in (("d", 1), ("b", 5), ("c", 2), ("e", 4)):
+            assert await repo.set_line(source_id, slug, None, quantity, max_lines=50)
+        await session.commit()
+
+        await CartService(session).merge_anonymous_cart(user.id, CART_TOKEN)
+
+        # "b" is shared and capped at the max quantity; of the new lines only the first one fits
+        assert await lines(session, target_id) == {"a": 1, "b": 10, "d": 1}
+        assert await session.scalar(select(Cart.id).where(Cart.id == source_id)) is None
+
+
+async def test_merge_into_a_full_cart_still_adds_up_shared_lines(db, monkeypatch):
+    monkeypatch.setattr(settings, "cart_max_lines", 2)
+    async with db() as session:
+        user = User(email="buyer@example.com", hashed_password="x")
+        session.add(user)
+        for slug in "abc":
+            session.add(Product(slug=slug, category="sofas", name=slug.upper(), price=1000))
+        await session.flush()
+        repo = CartRepository(session)
+        target_id = await repo.create(user_id=user.id)
+        for slug in "ab":
+            assert await repo.set_line(target_id, slug, None, 1, max_lines=2)
+        source_id = await repo.create(token_hash=cart_token_hash(CART_TOKEN))
+        for slug in "cb":
+            assert await repo.set_line(source_id, slug, None, 2, max_lines=50)
+        await session.commit()
+
+        await CartService(session).merge_anonymous_cart(user.id, CART_TOKEN)
+
+        assert await lines(session, target_id) == {"a": 1, "b": 3}
@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text, update
+
+from app.core.config import settings
+from app.models.catalog import Product
+from app.repositories.catalog import ProductRepository
+from app.services.catalog import CatalogService
+from app.services.catalog_snapshot import catalog_snapshots
+
+
+def product(n: int, category: str, price: int, popularity: int) -> dict:
+    return {
+        "slug": f"p{n}",
+        "category": category,
+        "name": f"Диван {n}",
+        "price": price,
+        "popularity": popularity,
+        "published_at": datetime(2026, 1, 1) + timedelta(days=n),
+        "fabrics": [{"code": "velvet", "name": "Велюр", "price_delta": 1000}],
+    }
+
+
+# Ties on price and popularity, so pages have to be ordered by id as well
+PRODUCTS = [
+    product(1, "divan", 30_000, 5),
+    product(2, "kreslo", 15_000, 9),
+    product(3, "divan", 50_000, 5),
+    product(4, "divan", 30_000, 1),
+    product(5, "kreslo", 70_000, 7),
+    product(6, "divan", 90_000, 5),
+]
+
+
+@pytest.fixture
+async def catalog(db):
+    async with db() as session:
+        await ProductRepository(session).upsert_many(PRODUCTS)
+    catalog_snapshots.invalidate()
+    yield
+    catalog_snapshots.invalidate()
+
+
+async def test_snapshot_disabled_is_served_from_the_database(client, catalog, monkeypatch):
+    monkeypatch.setattr(settings, "catalog_snapshot_enabled", False)
+    response = await client.get("/catalog/products", params={"category": "kreslo"})
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+    assert [item["slug"] for item in response.json()["items"]] == ["p2", "p5"]
+
+    response = await client.get("/catalog/products/p3")
+    assert response.status_code == 200
+    assert response.json()["fabrics"][0]["code"] == "velvet"
+    assert (await client.get("/catalog/products/missing")).status_code == 404
+    assert catalog_snapshots.snapshot is None
+
+
+async def test_cold_snapshot_falls_back_to_the_database_while_it_is_built(client, catalog):
+    cold = await client.get("/catalog/products")
+    assert "etag" not in cold.headers
+    await catalog_snapshots._warming
+
+    warm = await client.get("/catalog/products")
+    assert "etag" in warm.headers
+    assert warm.json() == cold.json()
+
+
+async def test_product_pages_are_rendered_on_first_request(client, catalog, monkeypatch):
+    monkeypatch.setattr(settings, "catalog_snapshot_enabled", False)
+    from_db = (await client.get("/catalog/products/p3")).json()
+    monkeypatch.setattr(settings, "catalog_snapshot_enabled", True)
+    snapshot = await catalog_snapshots.get()
+    assert snapshot._details == {}
+
+    response = await client.get("/catalog/products/p3")
+    assert response.headers["etag"]
+    assert response.json() == from_db
+    assert snapshot.detail("p3") is snapshot.detail("p3")
+    assert list(snapshot._details) == ["p3"]
+    assert (await client.get("/catalog/products/missing")).status_code == 404
+
+
+async def walk(db, sort: str, limit: int, **filters) -> list:
+    """Slugs of every page of a listing, following next_cursor."""
+    slugs, cursor = [], None
+    while True:
+        async with db() as session:
+            page = await CatalogService(session).list_products(sort, limit, cursor=cursor, **filters)
+        assert len(page.items) <= limit
+        slugs.extend(item.slug for item in page.items)
+        if page.next_cursor is None:
+            return slugs
+        cursor = page.next_cursor
+
+
+@pytest.mark.parametrize(
+    "sort, expected",
+    [
+        ("popular", ["p2", "p5", "p6", "p3", "p1", "p4"]),
+        ("price-asc", ["p2", "p1", "p4", "p3", "p5", "p6"]),
+        ("price-desc", ["p6", "p5", "p3", "p4", "p1", "p2"]),
+        ("new", ["p6", "p5", "p4", "p3", "p2", "p1"]),
+    ],
+)
+@pytest.mark.parametrize("limit", [1, 2, 4, 24])
+async def test_sort_orders_page_through_ties_without_gaps(db, catalog, sort, expected, limit):
+    assert await walk(db, sort, limit) == expected
+
+
+async def test_filters_apply_on_every_page(db, catalog):
+    assert await walk(db, "price-asc", 1, category="divan") == ["p1", "p4", "p3", "p6"]
+    assert await walk(db, "popular", 2, min_price=30_000, max_price=70_000) == ["p5", "p3", "p1", "p4"]
+    assert await walk(db, "new", 2, category="kreslo", max_price=20_000) == ["p2"]
+    assert await walk(db, "popular", 2, category="stol") == []
+
+
+async def test_inactive_products_are_not_listed(db, catalog):
+    async with db() as session:
+        await session.execute(update(Product).where(Product.slug == "p6").values(is_active=False))
+        await session.commit()
+    assert await walk(db, "price-desc", 2) == ["p5", "p3", "p4", "p1", "p2"]
+    async with db() as session:
+        with pytest.raises(HTTPException) as error:
+            await CatalogService(session).get_product("p6")
+    assert error.value.status_code == 404
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not-a-cursor",
+        "WyJwcmljZS1hc2MiLDMwMDAwLDFd",  # ["price-asc",30000,1]: issued for another sort order
+        "WyJwb3B1bGFyIiwiNSIsMV0",  # ["popular","5",1]: the sort value must be a number
+    ],
+)
+async def test_invalid_cursor_is_rejected(db, catalog, cursor):
+    async with db() as session:
+        with pytest.raises(HTTPException) as error:
+            await CatalogService(session).list_products("popular", 2, cursor=cursor)
+    assert error.value.status_code == 400
+
+
+async def test_price_range_must_not_be_inverted(db, catalog):
+    async with db() as session:
+        with pytest.raises(HTTPException) as error:
+            await CatalogService(session).list_products("popular", 2, min_price=10, max_price=5)
+    assert error.value.status_code == 400
+
+
+class ExplainingSession:
+    """Runs each statement after recording SQLite's query plan for it."""
+
+    def __init__(self, session):
+        self.session = session
+        self.plan = ""
+
+    async def execute(self, statement):
+        sql = statement.compile(dialect=self.session.get_bind().dialect, compile_kwargs={"literal_binds": True})
+        rows = await self.session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))
+        self.plan = " ".join(row[-1] for row in rows)
+        return await self.session.execute(statement)
+
+
+@pytest.mark.parametrize(
+    "sort, category, after, index",
+    [
+        ("popular", None, (5, 3), "ix_products_popular"),
+        ("price-desc", None, (30_000, 4), "ix_products_price"),
+        ("price-asc", "divan", (30_000, 1), "ix_products_category_price"),
+        ("new", "divan", (datetime(2026, 1, 4), 3), "ix_products_category_new"),
+    ],
+)
+async def test_pages_seek_on_the_keyset_indexes(db, catalog, sort, category, after, index):
+    async with db() as session:
+        explaining = ExplainingSession(session)
+        await ProductRepository(explaining).list_page(sort, 3, category=category, after=after)
+    assert f"USING INDEX {index}" in explaining.plan
+    assert "TEMP B-TREE" not in explaining.plan  # no sort step: rows come out of the index in order
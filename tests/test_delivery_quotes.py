@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.delivery import FakeDeliveryProvider
+from app.services.delivery_quotes import DeliveryQuoter, normalize_address
+from app.services.providers import ProviderError
+
+
+class CountingProvider(FakeDeliveryProvider):
+    """The fake delivery service, counting quote calls and failing for chosen addresses."""
+
+    def __init__(self, latency: float = 0.02, failure_rate: float = 0.0, failing=()):
+        super().__init__(latency=latency, failure_rate=failure_rate)
+        self.calls = []
+        self.failing = set(failing)
+
+    async def quote(self, address, weight, tariff):
+        self.calls.append((address, weight, tariff))
+        if address in self.failing:
+            raise ProviderError("Address is outside the delivery area")
+        return await super().quote(address, weight, tariff)
+
+
+@pytest.fixture(autouse=True)
+def no_retries(monkeypatch):
+    monkeypatch.setattr(settings, "provider_attempts", 1)
+    monkeypatch.setattr(settings, "provider_backoff", 0.0)
+    monkeypatch.setattr(settings, "delivery_quote_weight_step", 5.0)
+
+
+def make_quoter(provider) -> DeliveryQuoter:
+    return DeliveryQuoter(provider, ttl=60.0, maxsize=100)
+
+
+@pytest.mark.parametrize(
+    "address",
+    [
+        "Москва, ул. Королёва, д.1, кв. 5",
+        "москва  улица королева дом 1",
+        "МОСКВА, Улица Королёва, дом 1, квартира 12",
+        "Москва ул Королева д 1",
+    ],
+)
+def test_normalize_address(address):
+    assert normalize_address(address) == "москва ул королева д 1"
+
+
+def test_normalize_address_keeps_what_tells_buildings_apart():
+    assert normalize_address("Москва, пр. Мира, д. 1, корпус 2") == "москва пр мира д 1 к 2"
+    assert normalize_address("Москва, ул. Ленина, д. 1") != normalize_address("Москва, ул. Ленина, д. 10")
+
+
+async def test_weights_in_one_step_share_a_quote():
+    provider = CountingProvider()
+    quoter = make_quoter(provider)
+    first = await quoter.quote("Москва, ул. Ленина, 1", 41)
+    second = await quoter.quote("москва улица ленина 1", 44.9)
+    third = await quoter.quote("Москва, ул. Ленина, 1", 45.1)
+    assert first == second
+    assert first.weight == 45 and third.weight == 50
+    assert len(provider.calls) == 2
+    assert quoter.lookups == {"miss": 2, "hit": 1}
+
+
+async def test_concurrent_identical_quotes_make_one_call():
+    provider = CountingProvider()
+    quoter = make_quoter(provider)
+    quotes = await asyncio.gather(*(quoter.quote("Москва, ул. Ленина, 1", 60) for _ in range(20)))
+    assert len(set(quotes)) == 1
+    assert len(provider.calls) == 1
+    assert quoter.lookups == {"miss": 1, "coalesced": 19}
+    assert quoter.stats()["in_flight"] == 0
+
+
+async def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    provider = CountingProvider(latency=0.05)
+    quoter = make_quoter(provider)
+    impatient = asyncio.create_task(quoter.quote("Москва, ул. Ленина, 1", 60))
+    patient = asyncio.create_task(quoter.quote("Москва, ул. Ленина, 1", 60))
+    await asyncio.sleep(0)
+    impatient.cancel()
+
+    quote = await patient
+    assert quote.price > 0
+    assert impatient.cancelled()
+    assert len(provider.calls) == 1
+    # The result was cached for the next caller
+    assert await quoter.quote("Москва, ул. Ленина, 1", 60) == quote
+    assert len(provider.calls) == 1
+
+
+async def test_failures_are_not_cached():
+    provider = CountingProvider(failure_rate=1.0)
+    quoter = make_quoter(provider)
+    with pytest.raises(ProviderError):
+        await quoter.quote("Москва, ул. Ленина, 1", 60)
+    assert quoter.stats()["size"] == 0
+
+    provider.failure_rate = 0.0
+    quote = await quoter.quote("Москва, ул. Ленина, 1", 60)
+    assert quote.price > 0
+    assert len(provider.calls) == 2
+    assert quoter.lookups == {"miss": 2}
+
+
+async def test_quote_many_returns_failures_as_entries():
+    provider = CountingProvider(failing={"Владивосток, ул. Светланская, 1"})
+    quoter = make_quoter(provider)
+    results = await quoter.quote_many(
+        [
+            ("Москва, ул. Ленина, 1", "courier"),
+            ("Владивосток, ул. Светланская, 1", "courier"),
+            ("Москва, ул. Ленина, 1", "express"),
+        ],
+        60,
+    )
+    assert [type(result).__name__ for result in results] == ["Quote", "ProviderError", "Quote"]
+    assert str(results[1]) == "Address is outside the delivery area"
+    assert results[2].price > results[0].price
@@ -0,0 +1,157 @@
+import hashlib
+import hmac
+import json
+from time import time
+
+import jwt as pyjwt
+import pytest
+
+from app.core.jwt_keys import HmacKey, Keyring, TokenError, b64encode, generate_key
+
+CLAIMS = {"sub": "1", "type": "access"}
+SECRET = "test-secret-key-at-least-32-bytes-long"
+
+
+def forge(header: dict, claims: dict, sign=lambda signing_input: b"") -> str:
+    """A token with an arbitrary header; ``sign`` gets the signing input."""
+    signing_input = f"{b64encode(json.dumps(header).encode())}.{b64encode(json.dumps(claims).encode())}"
+    return f"{signing_input}.{b64encode(sign(signing_input.encode()))}"
+
+
+@pytest.fixture(scope="module")
+def es256():
+    return generate_key("ES256")
+
+
+@pytest.fixture(scope="module")
+def eddsa():
+    return generate_key("EdDSA")
+
+
+@pytest.fixture
+def keyring(es256, eddsa):
+    """Signs with ES256, also accepts the EdDSA key and (legacy) HS256 tokens."""
+    return Keyring(es256, [eddsa, HmacKey(SECRET)])
+
+
+@pytest.mark.parametrize("alg", ["HS256", "ES256", "EdDSA"])
+def test_round_trip(alg):
+    key = HmacKey(SECRET) if alg == "HS256" else generate_key(alg)
+    keyring = Keyring(key)
+    claims = {**CLAIMS, "exp": int(time()) + 60}
+    assert keyring.decode(keyring.encode(claims)) == claims
+
+
+def test_alg_none_is_rejected(keyring):
+    for header in ({"alg": "none"}, {"alg": "none", "typ": "JWT"}, {"alg": "none", "kid": None}):
+        with pytest.raises(TokenError):
+            keyring.decode(forge(header, CLAIMS))
+
+
+def test_hs256_signed_with_the_public_key_is_rejected(keyring, es256):
+    jwk_bytes = json.dumps(es256.jwk()).encode()
+    jwks_bytes = keyring.jwks
+    for secret in (jwk_bytes, jwks_bytes):
+        for header in ({"alg": "HS256", "kid": es256.kid}, {"alg": "HS256"}):
+            token = forge(header, CLAIMS, lambda data: hmac.new(secret, data, hashlib.sha256).digest())
+            with pytest.raises(TokenError):
+                keyring.decode(token)
+
+
+def test_unknown_kid_is_rejected(keyring):
+    other = generate_key("EdDSA")
+    with pytest.raises(TokenError, match="Unknown signing key"):
+        keyring.decode(Keyring(other).encode(CLAIMS))
+
+
+def test_header_alg_must_match_the_key(keyring, es256, eddsa):
+    # A valid EdDSA signature presented as ES256 with the EdDSA kid, and the reverse
+    token = Keyring(eddsa).encode(CLAIMS)
+    header, payload, signature = token.split(".")
+    relabeled = b64encode(json.dumps({"alg": "ES256", "typ": "JWT", "kid": eddsa.kid}).encode())
+    with pytest.raises(TokenError, match="Unknown signing key"):
+        keyring.decode(f"{relabeled}.{payload}.{signature}")
+
+    token = forge({"alg": "EdDSA", "kid": es256.kid}, CLAIMS, es256.sign)
+    with pytest.raises(TokenError, match="Unknown signing key"):
+        keyring.decode(token)
+
+
+def test_tampered_payload_is_rejected(keyring):
+    header, _, signature = keyring.encode(CLAIMS).split(".")
+    payload = b64encode(json.dumps({**CLAIMS, "sub": "2"}).encode())
+    with pytest.raises(TokenError, match="Signature verification failed"):
+        keyring.decode(f"{header}.{payload}.{signature}")
+
+
+def test_expired_token_is_rejected(keyring):
+    with pytest.raises(TokenError, match="expired"):
+        keyring.decode(keyring.encode({**CLAIMS, "exp": int(time()) - 1}))
+
+
+@pytest.mark.parametrize("exp", ["9999999999", None, [1], {"at": 1}])
+def test_non_numeric_exp_is_rejected(keyring, exp):
+    token = keyring.encode({**CLAIMS, "exp": exp})
+    with pytest.raises(TokenError, match="Invalid exp claim"):
+        keyring.decode(token)
+
+
+@pytest.mark.parametrize(
+    "mangle",
+    [
+        lambda h, p, s: f"{h}.{p}.{s}!",  # not base64url
+        lambda h, p, s: f"{h}.{p}.{s[:-1]}+",  # standard base64 alphabet
+        lambda h, p, s: f"{h}.{p}=.{s}",  # padding inside a segment
+        lambda h, p, s: f"{h}.{p}.{s}.{s}",  # four segments
+        lambda h, p, s: f"{h}.{p}",  # two segments
+        lambda h, p, s: f"@@.{p}.{s}",  # unknown, malformed header
+        lambda h, p, s: f"{b64encode(b'[1]')}.{p}.{s}",  # header not an object
+    ],
+)
+def test_malformed_token_is_rejected(keyring, mangle):
+    token = mangle(*keyring.encode(CLAIMS).split("."))
+    with pytest.raises(TokenError):
+        keyring.decode(token)
+
+
+def test_payload_must_be_an_object(keyring, es256):
+    header = keyring.signing_header
+    payload = b64encode(b"[1, 2]")
+    signature = b64encode(es256.sign(f"{header}.{payload}".encode()))
+    with pytest.raises(TokenError, match="Invalid token payload"):
+        keyring.decode(f"{header}.{payload}.{signature}")
+
+
+def test_legacy_hs256_token_is_accepted_only_with_the_secret(keyring):
+    assert keyring.decode(pyjwt.encode(CLAIMS, SECRET, algorithm="HS256")) == CLAIMS
+    with pytest.raises(TokenError):
+        keyring.decode(pyjwt.encode(CLAIMS, SECRET + "-other", algorithm="HS256"))
+    # Without an HmacKey in the ring, HS256 is not accepted at all
+    with pytest.raises(TokenError):
+        Keyring(generate_key("EdDSA")).decode(pyjwt.encode(CLAIMS, SECRET, algorithm="HS256"))
+
+
+def test_rotation_accepts_tokens_of_the_previous_key(es256, eddsa):
+    old = Keyring(es256)
+    new = Keyring(eddsa, [es256])
+    token = old.encode(CLAIMS)
+    assert new.decode(token) == CLAIMS
+    assert json.loads(new.jwks)["keys"][1]["kid"] == es256.kid
+
+
+@pytest.mark.parametrize("alg", ["ES256", "EdDSA"])
+def test_tokens_verify_against_the_published_jwks_with_pyjwt(alg):
+    key = generate_key(alg)
+    keyring = Keyring(key, [HmacKey(SECRET)])
+    claims = {**CLAIMS, "exp": int(time()) + 60}
+    token = keyring.encode(claims)
+
+    jwks = pyjwt.PyJWKSet.from_json(keyring.jwks.decode())
+    assert [jwk.key_id for jwk in jwks.keys] == [key.kid]  # the HS256 secret is never published
+    header = pyjwt.get_unverified_header(token)
+    assert header == {"alg": alg, "typ": "JWT", "kid": key.kid}
+    assert pyjwt.decode(token, jwks[header["kid"]].key, algorithms=[alg]) == claims
+
+    # And the other way round: PyJWT's tokens verify with the keyring
+    signed = pyjwt.encode(claims, key.private_pem(), algorithm=alg, headers={"kid": key.kid})
+    assert keyring.decode(signed) == claims
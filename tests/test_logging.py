@@ -0,0 +1,73 @@
+import io
+import json
+import logging
+import queue
+
+from app.core.logging import BatchingLogWriter, BoundedQueueHandler, JSONFormatter
+
+
+def make_logger(handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger("tests.logging")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def queued_messages(log_queue: queue.Queue) -> list:
+    messages = []
+    while not log_queue.empty():
+        record = log_queue.get_nowait()
+        messages.append(record.msg if record is not None else None)
+    return messages
+
+
+def test_full_queue_drops_the_oldest_records():
+    log_queue: queue.Queue = queue.Queue(maxsize=3)
+    handler = BoundedQueueHandler(log_queue, policy="drop")
+    logger = make_logger(handler)
+
+    for i in range(5):
+        logger.info("record %d", i)
+
+    assert handler.dropped == 2
+    assert queued_messages(log_queue) == ["record 2", "record 3", "record 4"]
+
+
+def test_stop_marker_is_never_dropped():
+    log_queue: queue.Queue = queue.Queue(maxsize=2)
+    handler = BoundedQueueHandler(log_queue, policy="drop")
+    logger = make_logger(handler)
+    log_queue.put(None)
+    logger.info("record 0")
+
+    logger.info("record 1")
+    assert handler.dropped == 1
+    assert queued_messages(log_queue) == ["record 0", None]
+
+
+class BrokenStream(io.StringIO):
+    def write(self, text: str) -> int:
+        raise OSError("broken pipe")
+
+
+def test_failed_writes_are_counted_not_written():
+    log_queue: queue.Queue = queue.Queue(maxsize=100)
+    handler = BoundedQueueHandler(log_queue)
+    stream = BrokenStream()
+    writer = BatchingLogWriter(log_queue, handler, stream, JSONFormatter(), batch_size=10)
+    logger = make_logger(handler)
+
+    writer.start()
+    for i in range(3):
+        logger.info("record %d", i)
+    writer.stop()
+    assert writer.stats() == {"queued": 0, "written": 0, "dropped": 0, "failed": 3}
+
+    # Once the stream works again, records are written and counted as such
+    writer.stream = io.StringIO()
+    writer.start()
+    logger.info("record 3")
+    writer.stop()
+    assert (writer.written, writer.failed) == (1, 3)
+    assert json.loads(writer.stream.getvalue())["message"] == "record 3"
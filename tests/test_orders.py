@@ -0,0 +1,271 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+
+from app.core.config import settings
+from app.models.catalog import Product
+from app.models.order import ORDER_FAILED, ORDER_OUT_OF_STOCK, ORDER_PAID, ORDER_PAYMENT_FAILED, ORDER_PENDING, Order
+from app.models.user import User
+from app.repositories.cart import CartRepository
+from app.repositories.stock import StockRepository
+from app.schemas.order import CheckoutRequest
+from app.services.cart import cart_token_hash
+from app.services.delivery import create_delivery_provider
+from app.services.orders import OrderService
+from app.services.payments import FakePaymentProvider, create_payment_provider
+from app.services.stock import create_stock_reservations
+
+CART_TOKEN = "test-cart-token"
+FORM = CheckoutRequest(name="Иван", phone="+79990000000", address="Москва, ул. Ленина, 1", pay="online")
+STOCK = 3
+
+
+class CountingPaymentProvider(FakePaymentProvider):
+    """The fake gateway, counting charge calls (its own dedup by key hides repeated charges)."""
+
+    def __init__(self, latency: float):
+        super().__init__(latency=latency)
+        self.calls = 0
+
+    async def charge(self, idempotency_key, amount, description):
+        self.calls += 1
+        return await super().charge(idempotency_key, amount, description)
+
+
+@pytest.fixture(autouse=True)
+def fast_providers(monkeypatch):
+    monkeypatch.setattr(settings, "provider_attempts", 1)
+    monkeypatch.setattr(settings, "provider_backoff", 0.0)
+    monkeypatch.setattr(settings, "fake_payment_latency", 0.01)
+    monkeypatch.setattr(settings, "fake_delivery_latency", 0.01)
+
+
+@pytest.fixture
+async def product_id(db):
+    """An anonymous cart with two units of a product that has three in stock."""
+    async with db() as session:
+        product = Product(slug="soho", category="sofas", name="Диван Сохо", price=50000, dimensions={"weight": 40})
+        session.add(product)
+        await session.flush()
+        await StockRepository(session).set_quantity(product.id, None, STOCK, 2)
+        cart = CartRepository(session)
+        cart_id = await cart.create(token_hash=cart_token_hash(CART_TOKEN))
+        assert await cart.set_line(cart_id, "soho", None, 2, max_lines=50)
+        await session.commit()
+        return product.id
+
+
+async def checkout(db, key: str, payments=None, delivery=None):
+    async with db() as session:
+        service = OrderService(session, payments, delivery, create_stock_reservations(db))
+        return await service.checkout(None, CART_TOKEN, key, FORM)
+
+
+async def stock_level(db, product_id: int) -> dict:
+    """Available and reserved units; which shards hold them is random."""
+    async with db() as session:
+        [level] = await StockRepository(session).levels(product_id)
+    return {"available": level["available"], "reserved": level["reserved"]}
+
+
+async def order_by_key(db, key: str) -> Order:
+    async with db() as session:
+        return (
+            await session.execute(select(Order).where(Order.user_id.is_(None), Order.idempotency_key == key))
+        ).scalar_one()
+
+
+async def expire_reservations(db) -> int:
+    """Run the reaper as if the reservation TTL had passed."""
+    async with db() as session:
+        released = await StockRepository(session).release_expired(datetime.utcnow() + timedelta(days=1), 100)
+        await session.commit()
+    return released
+
+
+async def make_stale(db, order_id: int) -> None:
+    async with db() as session:
+        await session.execute(
+            update(Order).where(Order.id == order_id).values(updated_at=datetime.utcnow() - timedelta(hours=1))
+        )
+        await session.commit()
+
+
+async def abandon_checkout(db, key: str, payments) -> Order:
+    """Start a checkout and cancel it while the providers are being called, as a crashed request would."""
+    first = asyncio.create_task(checkout(db, key, payments, create_delivery_provider()))
+    while not payments.calls:
+        await asyncio.sleep(0.01)
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    return await order_by_key(db, key)
+
+
+async def test_declined_payment_cancels_the_shipment_and_releases_stock(db, monkeypatch, product_id):
+    monkeypatch.setattr(settings, "fake_payment_decline_rate", 1.0)
+    payments, delivery = create_payment_provider(), create_delivery_provider()
+
+    with pytest.raises(HTTPException) as error:
+        await checkout(db, "key-declined", payments, delivery)
+    assert error.value.status_code == 402
+    assert error.value.detail["status"] == ORDER_PAYMENT_FAILED
+    assert error.value.detail["message"] == "Card declined"
+
+    order = await order_by_key(db, "key-declined")
+    assert delivery.cancelled == {f"cancel-{order.id}": order.delivery_id}
+    assert payments.refunds == {}
+    assert await stock_level(db, product_id) == {"available": STOCK, "reserved": 0}
+
+    # A replay reports the same failure without calling the providers again
+    with pytest.raises(HTTPException) as replay:
+        await checkout(db, "key-declined", payments, delivery)
+    assert replay.value.status_code == 402
+    assert replay.value.headers == {"Idempotent-Replayed": "true"}
+    assert len(delivery.shipments) == 1
+
+
+async def test_delivery_failure_refunds_the_payment(db, monkeypatch, product_id):
+    monkeypatch.setattr(settings, "fake_provider_failure_rate", 1.0)
+    delivery = create_delivery_provider()
+    monkeypatch.setattr(settings, "fake_provider_failure_rate", 0.0)
+    payments = create_payment_provider()
+
+    with pytest.raises(HTTPException) as error:
+        await checkout(db, "key-no-delivery", payments, delivery)
+    assert error.value.status_code == 502
+    assert error.value.detail["status"] == ORDER_FAILED
+
+    order = await order_by_key(db, "key-no-delivery")
+    [payment] = payments.charges.values()
+    assert order.transaction_id == payment.transaction_id
+    assert payments.refunds == {f"refund-{order.id}": payment.transaction_id}
+    assert delivery.shipments == {}
+    assert (await stock_level(db, product_id))["available"] == STOCK
+
+
+async def test_stale_pending_order_is_taken_over_by_a_retry(db, product_id):
+    payments = CountingPaymentProvider(latency=0.5)
+    delivery = create_delivery_provider()
+
+    # The first request dies while the providers are being called
+    order = await abandon_checkout(db, "key-stale", payments)
+    assert order.status == ORDER_PENDING
+    assert (await stock_level(db, product_id))["reserved"] == 2
+
+    # While the order is fresh, a retry is told the checkout is still running
+    payments.latency = 0.01
+    with pytest.raises(HTTPException) as busy:
+        await checkout(db, "key-stale", payments, delivery)
+    assert busy.value.status_code == 409
+
+    await make_stale(db, order.id)
+    response, replayed = await checkout(db, "key-stale", payments, delivery)
+    assert (response.id, response.status, replayed) == (order.id, ORDER_PAID, False)
+    # The reservation is reused and the charge key is the same, so nothing is taken twice
+    assert list(payments.charges) == [f"order-{order.id}"]
+    assert await stock_level(db, product_id) == {"available": STOCK - 2, "reserved": 0}
+
+
+async def test_checkout_resumed_after_its_reservation_expired_reserves_again(db, product_id):
+    payments = CountingPaymentProvider(latency=0.5)
+    order = await abandon_checkout(db, "key-expired", payments)
+    assert await expire_reservations(db) == 1
+    assert await stock_level(db, product_id) == {"available": STOCK, "reserved": 0}
+
+    # Another order takes two of the three units the expired reservation returned
+    async with db() as session:
+        cart = CartRepository(session)
+        cart_id = await cart.create(token_hash=cart_token_hash("other-cart"))
+        assert await cart.set_line(cart_id, "soho", None, 2, max_lines=50)
+        await session.commit()
+    async with db() as session:
+        service = OrderService(session, payments, create_delivery_provider(), create_stock_reservations(db))
+        other, _ = await service.checkout(None, "other-cart", "key-other", FORM)
+    assert other.status == ORDER_PAID
+
+    # The resumed checkout must not complete on the units it no longer holds
+    payments.latency = 0.01
+    await make_stale(db, order.id)
+    with pytest.raises(HTTPException) as error:
+        await checkout(db, "key-expired", payments, create_delivery_provider())
+    assert error.value.status_code == 409
+    assert error.value.detail["status"] == ORDER_OUT_OF_STOCK
+    assert await stock_level(db, product_id) == {"available": STOCK - 2, "reserved": 0}
+
+
+async def test_reservation_expiring_before_the_order_completes_fails_it(db, product_id):
+    class ExpiringPaymentProvider(CountingPaymentProvider):
+        """Charges only after the reaper has taken the reservation back."""
+
+        async def charge(self, idempotency_key, amount, description):
+            await expire_reservations(db)
+            return await super().charge(idempotency_key, amount, description)
+
+    payments = ExpiringPaymentProvider(latency=0.01)
+    with pytest.raises(HTTPException) as error:
+        await checkout(db, "key-late", payments, create_delivery_provider())
+    assert error.value.status_code == 409
+    assert error.value.detail["status"] == ORDER_OUT_OF_STOCK
+
+    order = await order_by_key(db, "key-late")
+    [payment] = payments.charges.values()
+    assert payments.refunds == {f"refund-{order.id}": payment.transaction_id}
+    assert await stock_level(db, product_id) == {"available": STOCK, "reserved": 0}
+
+
+async def test_concurrent_requests_with_one_key_charge_once(db, product_id):
+    payments = CountingPaymentProvider(latency=0.05)
+    delivery = create_delivery_provider()
+
+    results = await asyncio.gather(
+        *(checkout(db, "key-concurrent", payments, delivery) for _ in range(2)), return_exceptions=True
+    )
+    [(response, replayed)] = [result for result in results if isinstance(result, tuple)]
+    [conflict] = [result for result in results if isinstance(result, HTTPException)]
+    assert (response.status, replayed) == (ORDER_PAID, False)
+    assert conflict.status_code == 409
+    assert payments.calls == 1
+    async with db() as session:
+        assert await session.scalar(select(func.count(Order.id))) == 1
+
+    # Once the order is final, the key replays it
+    again, replayed = await checkout(db, "key-concurrent", payments, delivery)
+    assert (again.id, replayed) == (response.id, True)
+    assert payments.calls == 1
+
+
+async def test_idempotency_keys_are_scoped_to_the_user(db, product_id):
+    payments = CountingPaymentProvider(latency=0.01)
+    async with db() as session:
+        user_ids = []
+        for email in ("first@example.com", "second@example.com"):
+            user = User(email=email, hashed_password="x")
+            session.add(user)
+            await session.flush()
+            cart = CartRepository(session)
+            assert await cart.set_line(await cart.create(user_id=user.id), "soho", None, 1, max_lines=50)
+            user_ids.append(user.id)
+        await session.commit()
+
+    async def user_checkout(user_id: int):
+        async with db() as session:
+            service = OrderService(session, payments, create_delivery_provider(), create_stock_reservations(db))
+            return await service.checkout(user_id, None, "shared-key", FORM)
+
+    (first, first_replayed), (second, second_replayed) = [await user_checkout(user_id) for user_id in user_ids]
+    assert first.id != second.id
+    assert (first.status, second.status, first_replayed, second_replayed) == (ORDER_PAID, ORDER_PAID, False, False)
+    assert payments.calls == 2
+
+    # Each user's retry replays their own order
+    again, replayed = await user_checkout(user_ids[1])
+    assert (again.id, replayed) == (second.id, True)
+    # An anonymous cart with the key gets a new order too (which finds one unit left for its two)
+    with pytest.raises(HTTPException) as error:
+        await checkout(db, "shared-key", payments, create_delivery_provider())
+    assert error.value.detail["status"] == ORDER_OUT_OF_STOCK
+    assert error.value.detail["order_id"] not in (first.id, second.id)
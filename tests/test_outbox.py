@@ -0,0 +1,200 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql
+
+from app.models.outbox import JOB_DEAD, JOB_PENDING, JOB_RUNNING, OutboxJob
+from app.models.user import User
+from app.repositories.outbox import OutboxRepository
+from app.services.outbox import OutboxWorker, queue_job
+from tests.conftest import DATABASE_URL
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_worker(sessions, handlers, **options) -> OutboxWorker:
+    params = dict(
+        batch_size=10, concurrency=2, interval=0.01, lease=60.0, max_attempts=3, backoff=0.0, backoff_max=0.0
+    )
+    params.update(options)
+    return OutboxWorker(sessions, handlers, **params)
+
+
+async def queue(sessions, kind: str = "test", count: int = 1) -> None:
+    async with sessions() as session:
+        for n in range(count):
+            queue_job(session, kind, {"n": n})
+        await session.commit()
+
+
+async def jobs(sessions):
+    async with sessions() as session:
+        return list((await session.execute(select(OutboxJob).order_by(OutboxJob.id))).scalars())
+
+
+async def make_due(sessions) -> None:
+    """Skip the backoff or lease of every job instead of sleeping through it."""
+    async with sessions() as session:
+        await session.execute(update(OutboxJob).values(available_at=datetime.utcnow() - timedelta(seconds=1)))
+        await session.commit()
+
+
+async def test_job_is_rolled_back_with_the_business_transaction(db):
+    async with db() as session:
+        session.add(User(email="a@example.com", hashed_password="x"))
+        queue_job(session, "test", {"n": 1})
+        await session.flush()
+        await session.rollback()
+    assert await jobs(db) == []
+
+    async with db() as session:
+        session.add(User(email="a@example.com", hashed_password="x"))
+        queue_job(session, "test", {"n": 1})
+        await session.commit()
+    [job] = await jobs(db)
+    assert (job.kind, job.payload, job.status, job.attempts) == ("test", {"n": 1}, JOB_PENDING, 0)
+
+
+async def test_claim_locks_with_skip_locked():
+    class RecordingSession:
+        async def execute(self, statement, **kwargs):
+            self.statement = statement
+
+            class Result:
+                def scalars(self):
+                    return iter(())
+
+            return Result()
+
+    session = RecordingSession()
+    now = datetime.utcnow()
+    await OutboxRepository(session).claim(10, now, now + timedelta(seconds=60))
+    sql = str(session.statement.compile(dialect=postgresql.dialect()))
+    assert "FOR UPDATE SKIP LOCKED" in sql
+
+
+async def test_concurrent_claims_are_disjoint(db):
+    await queue(db, count=10)
+    now = datetime.utcnow()
+
+    async def claim():
+        async with db() as session:
+            claimed = await OutboxRepository(session).claim(4, now, now + timedelta(seconds=60))
+            await session.commit()
+        return {job.id for job in claimed}
+
+    batches = await asyncio.gather(claim(), claim(), claim())
+    assert sorted(len(batch) for batch in batches) == [2, 4, 4]
+    assert len(set().union(*batches)) == 10
+    assert all(job.status == JOB_RUNNING and job.attempts == 1 for job in await jobs(db))
+
+
+async def test_failed_job_is_retried_after_backoff(db):
+    runs = []
+
+    async def flaky(session, payload):
+        runs.append(payload["n"])
+        if len(runs) == 1:
+            raise RuntimeError("relay down")
+
+    worker = make_worker(db, {"test": flaky}, backoff=30.0, backoff_max=60.0)
+    worker.retry_delay = lambda attempts: 30.0
+    await queue(db)
+
+    assert await worker.process_batch() == 1
+    [job] = await jobs(db)
+    assert job.status == JOB_PENDING
+    assert job.attempts == 1
+    assert job.last_error == "RuntimeError('relay down')"
+    assert job.available_at > datetime.utcnow() + timedelta(seconds=25)
+
+    # Not due until the backoff has passed
+    assert await worker.process_batch() == 0
+    await make_due(db)
+    assert await worker.process_batch() == 1
+    assert runs == [0, 0]
+    assert await jobs(db) == []
+    assert worker.outcomes == {"retry": 1, "done": 1}
+
+
+def test_retry_delay_is_jittered_exponential_backoff():
+    worker = make_worker(None, {}, backoff=1.0, backoff_max=10.0)
+    for attempts, cap in ((1, 1.0), (2, 2.0), (3, 4.0), (4, 8.0), (5, 10.0), (20, 10.0)):
+        delays = [worker.retry_delay(attempts) for _ in range(200)]
+        assert all(0 <= delay <= cap for delay in delays)
+        assert max(delays) > cap / 2
+
+
+async def test_expired_lease_is_claimed_again(db):
+    await queue(db)
+    start = datetime.utcnow()
+    async with db() as session:
+        [first] = await OutboxRepository(session).claim(10, start, start + timedelta(seconds=60))
+        await session.commit()
+
+    # The worker holding the lease died; nobody else may take the job while the lease runs
+    async with db() as session:
+        repo = OutboxRepository(session)
+        assert await repo.claim(10, start + timedelta(seconds=30), start + timedelta(seconds=90)) == []
+        [again] = await repo.claim(10, start + timedelta(seconds=61), start + timedelta(seconds=121))
+        await session.commit()
+    assert again.id == first.id
+    assert again.attempts == 2
+
+
+async def test_job_goes_dead_after_max_attempts_and_retry_dead_requeues_it(db):
+    async def broken(session, payload):
+        raise RuntimeError("smtp down")
+
+    worker = make_worker(db, {"test": broken}, max_attempts=3)
+    await queue(db)
+    for _ in range(3):
+        assert await worker.process_batch() == 1
+        await make_due(db)
+    [job] = await jobs(db)
+    assert (job.status, job.attempts, job.last_error) == (JOB_DEAD, 3, "RuntimeError('smtp down')")
+    assert await worker.process_batch() == 0
+    assert worker.outcomes == {"retry": 2, "dead": 1}
+
+    # python -m app.services.outbox --retry-dead, in its own process and event loop
+    script = (
+        "import sys\n"
+        "from app.core.config import settings\n"
+        f"settings.database_url = {DATABASE_URL!r}\n"
+        "from app.services.outbox import main\n"
+        "sys.argv = ['outbox', '--retry-dead']\n"
+        "main()\n"
+    )
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-c", script, cwd=ROOT, stdout=asyncio.subprocess.PIPE
+    )
+    stdout, _ = await process.communicate()
+    assert process.returncode == 0
+    assert b"Queued 1 dead jobs again" in stdout
+
+    [job] = await jobs(db)
+    assert (job.status, job.attempts) == (JOB_PENDING, 0)
+
+
+async def test_job_without_handler_goes_dead(db):
+    worker = make_worker(db, {}, max_attempts=1)
+    await queue(db, kind="unknown")
+    await worker.process_batch()
+    [job] = await jobs(db)
+    assert job.status == JOB_DEAD
+    assert job.last_error == "No handler for job kind 'unknown'"
+
+
+@pytest.mark.parametrize("kind, requeued", [("other", 0), ("test", 1), ("", 1)])
+async def test_retry_dead_by_kind(db, kind, requeued):
+    await queue(db)
+    async with db() as session:
+        await session.execute(update(OutboxJob).values(status=JOB_DEAD, attempts=3))
+        await session.commit()
+    async with db() as session:
+        assert await OutboxRepository(session).retry_dead(kind) == requeued
+        await session.commit()
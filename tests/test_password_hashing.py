@@ -0,0 +1,83 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import security
+from app.core.security import PasswordHashPool, aget_password_hash, get_password_hash, verify_password
+from app.models.user import User
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """A small pool in place of the app's: one worker and one waiting call."""
+    pool = PasswordHashPool(workers=1, max_queue=1)
+    monkeypatch.setattr(security, "password_hash_pool", pool)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def blocked_hashing(monkeypatch):
+    """Hashing that waits for the returned event, so the test can fill the pool."""
+    release = threading.Event()
+
+    def slow_hash(password: str) -> str:
+        release.wait(5)
+        return "hash"
+
+    monkeypatch.setattr(security, "get_password_hash", slow_hash)
+    yield release
+    release.set()
+
+
+async def fill(pool: PasswordHashPool) -> list:
+    calls = [asyncio.create_task(aget_password_hash(f"password-{i}")) for i in range(2)]
+    while pool.in_flight + pool.queue_depth < 2:
+        await asyncio.sleep(0.01)
+    return calls
+
+
+async def test_hashing_runs_on_the_pool(pool, monkeypatch):
+    threads = []
+
+    def hash_in_worker(password: str) -> str:
+        threads.append(threading.current_thread().name)
+        return get_password_hash(password)
+
+    monkeypatch.setattr(security, "get_password_hash", hash_in_worker)
+    hashed = await aget_password_hash("correct horse")
+
+    assert verify_password("correct horse", hashed)
+    assert threads[0].startswith("password-hash")
+    assert pool.stats()["hash_seconds"]["count"] == 1
+
+
+async def test_full_queue_is_rejected_with_retry_after(pool, blocked_hashing):
+    calls = await fill(pool)
+    assert (pool.in_flight, pool.queue_depth) == (1, 1)
+
+    with pytest.raises(HTTPException) as error:
+        await aget_password_hash("one too many")
+    assert error.value.status_code == 503
+    assert error.value.headers == {"Retry-After": "1"}
+    assert pool.rejected == 1
+
+    blocked_hashing.set()
+    assert await asyncio.gather(*calls) == ["hash", "hash"]
+    assert pool.in_flight + pool.queue_depth == 0
+
+
+async def test_login_answers_503_while_the_pool_is_full(db, client, pool, blocked_hashing):
+    async with db() as session:
+        session.add(User(email="buyer@example.com", hashed_password="hash"))
+        await session.commit()
+
+    calls = await fill(pool)
+    response = await client.post("/auth/login", json={"email": "buyer@example.com", "password": "secret"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+    blocked_hashing.set()
+    await asyncio.gather(*calls)
@@ -0,0 +1,94 @@
+import asyncio
+import math
+import os
+
+import fakeredis
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.core.rate_limit import (
+    InMemoryRateLimitBackend,
+    RateLimitBackend,
+    RateLimitMiddleware,
+    RedisRateLimitBackend,
+    SQLiteRateLimitBackend,
+)
+from tests.conftest import TEST_DIR
+
+# Three requests at once, then one every 0.2 s
+LIMIT, WINDOW = 3, 0.6
+INTERVAL = WINDOW / LIMIT
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+async def backend(request):
+    if request.param == "memory":
+        backend = InMemoryRateLimitBackend()
+    elif request.param == "sqlite":
+        path = os.path.join(TEST_DIR, "rate_limits.db")
+        if os.path.exists(path):
+            os.remove(path)
+        backend = SQLiteRateLimitBackend(path)
+    else:
+        # The Lua script and the server clock run in fakeredis, as they would in Redis
+        backend = RedisRateLimitBackend(client=fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer()))
+    yield backend
+    await backend.close()
+
+
+async def hits(backend: RateLimitBackend, count: int, key: str = "ip:/path") -> list:
+    return [await backend.hit(key, LIMIT, WINDOW) for _ in range(count)]
+
+
+async def test_burst_then_retry_after(backend):
+    results = await hits(backend, LIMIT + 1)
+    assert [result.allowed for result in results] == [True] * LIMIT + [False]
+    # The next slot opens one interval after the burst
+    assert 0 < results[-1].retry_after <= INTERVAL
+
+    # Other keys have their own budget
+    assert (await backend.hit("other:/path", LIMIT, WINDOW)).allowed
+
+
+async def test_refill_one_request_per_interval(backend):
+    await hits(backend, LIMIT)
+    [denied] = await hits(backend, 1)
+    assert not denied.allowed
+
+    await asyncio.sleep(denied.retry_after + 0.05)
+    allowed, denied = await hits(backend, 2)
+    assert allowed.allowed
+    assert not denied.allowed
+
+
+async def test_full_burst_again_after_a_window(backend):
+    await hits(backend, LIMIT + 1)
+    await asyncio.sleep(WINDOW + 0.05)
+    assert [result.allowed for result in await hits(backend, LIMIT + 1)] == [True] * LIMIT + [False]
+
+
+async def test_middleware_answers_429_with_retry_after(backend):
+    app = FastAPI()
+
+    @app.post("/auth/login")
+    async def login():
+        return {"ok": True}
+
+    limited = RateLimitMiddleware(app, {"/auth/login": (2, 60)}, backend=backend)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=limited), base_url="http://test") as client:
+        codes = [(await client.post("/auth/login")).status_code for _ in range(2)]
+        rejected = await client.post("/auth/login")
+
+    assert codes == [200, 200]
+    assert rejected.status_code == 429
+    # One request every 30 s; rounded up to whole seconds
+    assert int(rejected.headers["Retry-After"]) == math.ceil(60 / 2)
+
+
+def test_backend_must_implement_hit():
+    class Incomplete(RateLimitBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
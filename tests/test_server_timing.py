@@ -0,0 +1,50 @@
+import re
+import time
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.db import engine
+from app.core.security import create_access_token
+from app.models.user import User
+
+
+def phases(response) -> dict:
+    return {name: float(ms) for name, ms in re.findall(r"(\w+);dur=([\d.]+)", response.headers["server-timing"])}
+
+
+@pytest.fixture
+def slow_checkout():
+    """Checkouts take 50 ms longer, as if the pool were exhausted."""
+
+    def wait(dbapi_connection, connection_record, connection_proxy):
+        time.sleep(0.05)
+
+    event.listen(engine.sync_engine, "checkout", wait, insert=True)
+    yield
+    event.remove(engine.sync_engine, "checkout", wait)
+
+
+async def test_session_phase_is_the_connection_checkout(db, client, slow_checkout):
+    async with db() as session:
+        user = User(email="buyer@example.com", hashed_password="hash")
+        session.add(user)
+        await session.commit()
+    token = create_access_token({"sub": str(user.id), "ver": 0})
+
+    response = await client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    timings = phases(response)
+    assert timings["session"] >= 50
+    assert timings["handler"] < timings["session"]
+
+
+async def test_failed_statement_leaves_no_query_timer_behind(db):
+    async with db() as session:
+        with pytest.raises(OperationalError):
+            await session.execute(text("SELECT * FROM no_such_table"))
+        connection = await session.connection()
+        assert connection.info["query_start"] == []
+        await session.execute(text("SELECT 1"))
+        assert connection.info["query_start"] == []
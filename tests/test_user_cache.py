@@ -0,0 +1,108 @@
+import pytest
+from sqlalchemy.orm.exc import DetachedInstanceError
+
+from app.core import cache
+from app.core.security import create_access_token
+from app.core.user_cache import UserCache, user_cache
+from app.models.user import User
+from app.repositories.user import UserRepository
+
+
+class CountingUserRepository(UserRepository):
+    def __init__(self, session):
+        super().__init__(session)
+        self.lookups = 0
+
+    async def get_by_id(self, user_id):
+        self.lookups += 1
+        return await super().get_by_id(user_id)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Monotonic time of the cache, moved forward by the test."""
+    now = [1000.0]
+    monkeypatch.setattr(cache, "monotonic", lambda: now[0])
+    return now
+
+
+async def add_user(session, email: str = "buyer@example.com") -> int:
+    user = User(email=email, hashed_password="hash")
+    session.add(user)
+    await session.commit()
+    return user.id
+
+
+def bearer(user_id: int, version: int = 0) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id), 'ver': version})}"}
+
+
+async def test_hit_returns_a_detached_copy_without_the_password_hash(db, clock):
+    users = UserCache(maxsize=10, ttl=30, negative_ttl=5, stats_interval=60)
+    async with db() as session:
+        user_id = await add_user(session)
+        repo = CountingUserRepository(session)
+
+        first = await users.get(repo, user_id)
+        second = await users.get(repo, user_id)
+
+    assert repo.lookups == 1
+    assert second is not first
+    assert (second.id, second.email, second.is_active) == (user_id, "buyer@example.com", True)
+    with pytest.raises(DetachedInstanceError):
+        second.hashed_password
+    assert users.stats()["hits"] == 1
+
+    # Past the TTL the user is read again
+    clock[0] += 31
+    async with db() as session:
+        repo = CountingUserRepository(session)
+        await users.get(repo, user_id)
+    assert repo.lookups == 1
+
+
+async def test_unknown_ids_are_cached_for_the_negative_ttl(db, clock):
+    users = UserCache(maxsize=10, ttl=30, negative_ttl=5, stats_interval=60)
+    async with db() as session:
+        repo = CountingUserRepository(session)
+        assert await users.get(repo, 1) is None
+        user_id = await add_user(session)
+        assert user_id == 1
+
+        # Still cached as unknown
+        assert await users.get(repo, 1) is None
+        assert repo.lookups == 1
+
+        clock[0] += 6
+        assert (await users.get(repo, 1)).email == "buyer@example.com"
+        assert repo.lookups == 2
+
+
+async def test_disabling_a_user_invalidates_the_cache(db, client):
+    async with db() as session:
+        user_id = await add_user(session)
+
+    response = await client.get("/auth/me", headers=bearer(user_id))
+    assert response.status_code == 200
+    assert response.json()["is_active"] is True
+
+    async with db() as session:
+        await UserRepository(session).set_active(user_id, False)
+    assert user_cache.stats()["size"] == 0
+
+    response = await client.get("/auth/me", headers=bearer(user_id))
+    assert response.status_code == 403
+    assert response.json()["detail"] == "User account is disabled"
+
+
+async def test_password_change_invalidates_the_cache(db):
+    async with db() as session:
+        user_id = await add_user(session)
+        await user_cache.get(UserRepository(session), user_id)
+        assert user_cache.stats()["size"] == 1
+
+        await UserRepository(session).update_password(user_id, "new-hash")
+
+    assert user_cache.stats()["size"] == 0
+    async with db() as session:
+        assert (await UserRepository(session).get_by_id(user_id)).hashed_password == "new-hash"